@@ -235,5 +235,11 @@ def download_all_resources(token):
         return f"Eroare la generarea arhivei: {str(e)}", 500
 
 
+# === PROGRES BATCH ===
+# Înlocuiește callback-ul Dash de 1s al barei de progres (vezi progress_stream.py)
+from progress_stream import route_batch_progress
+route_batch_progress(app.server)
+
+
 # Înregistrăm un mesaj informativ pentru a confirma că instanța a fost creată.
 logger.info("Instanța aplicației Dash a fost creată cu succes.")
\ No newline at end of file
@@ -0,0 +1,156 @@
+/* ==============================================================================
+ * batch_progress_poll.js - Progres batch prin polling pe versiunea sesiunii
+ * ------------------------------------------------------------------------------
+ * ROL: Întreabă /batch_progress/<job_id>?v=<versiune> (progress_stream.py) la
+ *      `poll_ms` și actualizează bara de progres direct în browser
+ *      (dash_clientside.set_props), fără callback-uri Dash. Serverul răspunde
+ *      204 cât timp versiunea sesiunii nu s-a schimbat; nicio cerere nu ține
+ *      un thread gunicorn între două verificări.
+ *
+ * FALLBACK: fără fetch, la 404 (endpoint dezactivat) sau la erori repetate
+ *           se reactivează `admin-batch-progress-interval` (polling Dash).
+ * ============================================================================== */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    batch_progress: (function () {
+        var timer = null;
+        var activeJob = null;
+        var DEFAULT_POLL_MS = 3000;
+        var MAX_SILENT_ERRORS = 3;
+
+        function close() {
+            if (timer) {
+                clearTimeout(timer);
+                timer = null;
+            }
+            activeJob = null;
+        }
+
+        function fallbackToPolling(reason) {
+            close();
+            console.warn('[BATCH_PROGRESS] Revenire la polling Dash:', reason);
+            window.dash_clientside.set_props('admin-batch-progress-interval', {disabled: false});
+        }
+
+        function span(text, color, marginRight) {
+            var style = {color: color};
+            if (marginRight) {
+                style.marginRight = '15px';
+            }
+            return {type: 'Span', namespace: 'dash_html_components', props: {children: text, style: style}};
+        }
+
+        function render(progress) {
+            var processed = progress.processed || 0;
+            var failed = progress.failed || 0;
+            var total = progress.total || 0;
+            var percentage = total > 0 ? Math.floor(processed / total * 100) : 0;
+            var setProps = window.dash_clientside.set_props;
+
+            setProps('admin-batch-progress-text', {children: processed + ' / ' + total + ' fișiere'});
+            setProps('admin-batch-progress-bar', {style: {
+                height: '30px',
+                width: percentage + '%',
+                backgroundColor: '#27ae60',
+                borderRadius: '5px',
+                transition: 'width 0.3s ease',
+                display: 'flex',
+                alignItems: 'center',
+                justifyContent: 'center',
+                color: 'white',
+                fontWeight: 'bold',
+                fontSize: '12px'
+            }});
+
+            var detail = [span('✅ Procesate: ' + processed + ' ', 'green', true)];
+            if (failed > 0) {
+                detail.push(span('❌ Erori: ' + failed + ' ', 'red', true));
+            }
+            detail.push(span('⏳ Rămase: ' + (total - processed), 'orange', false));
+            setProps('admin-batch-status-detail', {children: {
+                type: 'Div', namespace: 'dash_html_components', props: {children: detail}
+            }});
+        }
+
+        return {
+            connect: function (jobId, intervalDisabled) {
+                close();
+                var noUpdate = window.dash_clientside.no_update;
+                // Fără job sau mod polling Dash (endpoint dezactivat pe server): nimic de pornit
+                if (!jobId || !intervalDisabled) {
+                    return noUpdate;
+                }
+                if (!window.fetch || !window.dash_clientside.set_props) {
+                    return false;
+                }
+
+                var version = null;
+                var pollMs = DEFAULT_POLL_MS;
+                var silentErrors = 0;
+                activeJob = jobId;
+
+                function schedule() {
+                    if (activeJob === jobId) {
+                        timer = setTimeout(poll, pollMs);
+                    }
+                }
+
+                function finish(status) {
+                    close();
+                    window.dash_clientside.set_props('admin-batch-job-event', {
+                        data: {job_id: jobId, status: status, at: Date.now()}
+                    });
+                }
+
+                function poll() {
+                    var url = '/batch_progress/' + encodeURIComponent(jobId) +
+                        (version === null ? '' : '?v=' + encodeURIComponent(version));
+                    fetch(url, {credentials: 'same-origin', cache: 'no-store'}).then(function (response) {
+                        if (activeJob !== jobId) {
+                            return null;  // job înlocuit sau oprit între timp
+                        }
+                        if (response.status === 204) {
+                            silentErrors = 0;
+                            schedule();
+                            return null;
+                        }
+                        if (!response.ok) {
+                            // 404 / 401 / 403: endpoint-ul nu poate servi acest job
+                            fallbackToPolling('HTTP ' + response.status);
+                            return null;
+                        }
+                        return response.json().then(function (payload) {
+                            if (activeJob !== jobId) {
+                                return;
+                            }
+                            silentErrors = 0;
+                            version = payload.version === undefined ? version : payload.version;
+                            pollMs = payload.poll_ms || pollMs;
+                            if (payload.progress) {
+                                render(payload.progress);
+                            }
+                            if (payload.done) {
+                                finish(payload.done);
+                                return;
+                            }
+                            schedule();
+                        });
+                    }).catch(function (error) {
+                        if (activeJob !== jobId) {
+                            return;
+                        }
+                        silentErrors += 1;
+                        if (silentErrors > MAX_SILENT_ERRORS) {
+                            fallbackToPolling(silentErrors + ' erori consecutive (' + error + ')');
+                            return;
+                        }
+                        schedule();
+                    });
+                }
+
+                poll();
+                return noUpdate;
+            }
+        };
+    })()
+});
@@ -5,12 +5,16 @@
 #      - Doctor (utilizatori medici)
 #      - PasswordResetToken (token-uri reset parolă)
 #      - LoginSession (tracking sesiuni active)
+#      - PatientLinkRow / PatientRecording (date pacienți)
+#      - BatchJob (coadă persistentă procesare batch)
+#      - IngestedFile (index hash conținut CSV/PDF - re-ingestie idempotentă)
 #
 # RESPECTĂ: .cursorrules - Zero date personale în log-uri, GDPR compliant
 # ==============================================================================
 
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from datetime import datetime, timedelta
 from typing import Optional
 import uuid
@@ -255,13 +259,59 @@ class PatientLinkRow(db.Model):
     """
     O înregistrare per token UUID; payload-ul oglindește structura din patient_links.json.
     Folosit ca sursă de adevăr când USE_POSTGRES_PATIENT_LINKS=1 sau după migrare automată.
+
+    Câmpurile filtrate / sortate în dashboard sunt copiate din payload în coloane
+    indexate la fiecare atribuire a `payload` (vezi `_sync_hot_columns`).
+    Migrare + backfill: migrations/versions/ (Alembic) sau `_ensure_patient_link_columns`.
     """
     __tablename__ = 'patient_link_rows'
 
+    HOT_COLUMNS = ('is_active', 'device_name', 'recording_date', 'created_at', 'last_processed_at', 'sent_status')
+
     token = db.Column(db.String(36), primary_key=True)
     payload = db.Column(db.JSON, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
+    # Coloane derivate din payload (doar pentru interogări; payload-ul rămâne sursa)
+    is_active = db.Column(db.Boolean, default=True, server_default=db.true(), nullable=False, index=True)
+    device_name = db.Column(db.String(255), index=True)
+    recording_date = db.Column(db.Date, index=True)
+    created_at = db.Column(db.DateTime, index=True)
+    last_processed_at = db.Column(db.DateTime, index=True)
+    sent_status = db.Column(db.Boolean, default=False, server_default=db.false(), nullable=False, index=True)
+
+    __table_args__ = (
+        db.Index('ix_patient_link_rows_active_created', 'is_active', 'created_at'),
+    )
+
+    @staticmethod
+    def hot_columns(payload: dict) -> dict:
+        """Valorile coloanelor indexate pentru un payload (date invalide → None)."""
+        def _parse(value, parser):
+            if not value:
+                return None
+            try:
+                return parser(value)
+            except (TypeError, ValueError):
+                return None
+
+        payload = payload or {}
+        return {
+            'is_active': bool(payload.get('is_active', True)),
+            'device_name': (payload.get('device_name') or None) and str(payload['device_name'])[:255],
+            'recording_date': _parse(payload.get('recording_date'), lambda v: datetime.strptime(v, '%Y-%m-%d').date()),
+            'created_at': _parse(payload.get('created_at'), lambda v: datetime.fromisoformat(v).replace(tzinfo=None)),
+            'last_processed_at': _parse(payload.get('last_processed_at'),
+                                        lambda v: datetime.fromisoformat(v).replace(tzinfo=None)),
+            'sent_status': bool(payload.get('sent_status', False)),
+        }
+
+    @validates('payload')
+    def _sync_hot_columns(self, key, payload):
+        for column, value in self.hot_columns(payload).items():
+            setattr(self, column, value)
+        return payload
+
     def __repr__(self):
         return f"<PatientLinkRow {self.token[:8]}...>"
 
@@ -291,6 +341,7 @@ class PatientRecording(db.Model):
     csv_path = db.Column(db.Text, nullable=False)  # Full path: local or "r2://bucket/key"
     r2_url = db.Column(db.Text)  # HTTP URL if stored in Scaleway R2
     storage_type = db.Column(db.String(10), default='local')  # 'local' or 'r2'
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 CSV → artefact "{hash}.parquet"
     
     # Metadata înregistrare
     recording_date = db.Column(db.Date, nullable=False, index=True)
@@ -323,6 +374,7 @@ class PatientRecording(db.Model):
             'csv_path': self.csv_path,
             'r2_url': self.r2_url,
             'storage_type': self.storage_type,
+            'content_hash': self.content_hash,
             'recording_date': self.recording_date.isoformat() if self.recording_date else None,
             'start_time': self.start_time.strftime('%H:%M:%S') if self.start_time else None,
             'end_time': self.end_time.strftime('%H:%M:%S') if self.end_time else None,
@@ -356,6 +408,7 @@ class PatientRecording(db.Model):
             csv_path=recording_dict.get('csv_path', ''),
             r2_url=recording_dict.get('r2_url'),
             storage_type=recording_dict.get('storage_type', 'local'),
+            content_hash=recording_dict.get('content_hash'),
             recording_date=parse_date(recording_dict['recording_date']).date() if 'recording_date' in recording_dict else None,
             start_time=parse_date(recording_dict['start_time']).time() if 'start_time' in recording_dict else None,
             end_time=parse_date(recording_dict['end_time']).time() if 'end_time' in recording_dict else None,
@@ -372,6 +425,118 @@ class PatientRecording(db.Model):
         return recording
 
 
+# ==============================================================================
+# MODEL: BatchJob (Coadă persistentă pentru procesarea batch)
+# ==============================================================================
+
+class BatchJob(db.Model):
+    """
+    Un job de procesare batch (folder CSV/PDF), pus în coadă de callback-ul
+    admin și executat de un worker (batch_worker.py sau worker-ul inline).
+
+    STATUS: queued → running → completed | failed | cancelled
+    Un job `running` fără heartbeat recent este repus în coadă (crash recovery);
+    la reluare se procesează doar fișierele rămase în sesiunea batch.
+    """
+    __tablename__ = 'batch_jobs'
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_COMPLETED = 'completed'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+    TERMINAL_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    doctor_id = db.Column(db.Integer, db.ForeignKey('doctors.id'), index=True)
+    status = db.Column(db.String(16), nullable=False, default=STATUS_QUEUED)
+
+    # Parametrii run_batch_job
+    batch_mode = db.Column(db.String(10), default='local')  # 'local' | 'upload'
+    input_folder = db.Column(db.Text, nullable=False)
+    output_folder = db.Column(db.Text, nullable=False)
+    window_minutes = db.Column(db.Integer, nullable=False)
+    session_id = db.Column(db.String(36))  # Sesiunea batch_session_manager (progres per fișier)
+    cleanup_input = db.Column(db.Boolean, default=False)  # Ștergem folderul de upload la final
+    force_reprocess = db.Column(db.Boolean, default=False)  # Ignorăm indexul de hash-uri (ingest_index)
+
+    # Execuție
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    worker_id = db.Column(db.String(128))
+    cancel_requested = db.Column(db.Boolean, default=False, nullable=False)
+    error = db.Column(db.Text)
+    result = db.Column(db.JSON)  # Link-urile generate
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_batch_jobs_status_created', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f"<BatchJob {self.id[:8]} {self.status}>"
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'doctor_id': self.doctor_id,
+            'status': self.status,
+            'batch_mode': self.batch_mode,
+            'input_folder': self.input_folder,
+            'output_folder': self.output_folder,
+            'window_minutes': self.window_minutes,
+            'session_id': self.session_id,
+            'cleanup_input': bool(self.cleanup_input),
+            'force_reprocess': bool(self.force_reprocess),
+            'attempts': self.attempts,
+            'worker_id': self.worker_id,
+            'cancel_requested': bool(self.cancel_requested),
+            'error': self.error,
+            'result': self.result,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+# ==============================================================================
+# MODEL: IngestedFile (Index hash conținut pentru re-ingestie idempotentă)
+# ==============================================================================
+
+class IngestedFile(db.Model):
+    """
+    Amprenta SHA-256 a unui fișier deja ingerat (CSV sau PDF) → token pacient.
+
+    Batch-ul caută aici (o singură interogare pe tot folderul) ÎNAINTE de
+    parsare/randare: fișierele cunoscute sunt legate de link-ul existent.
+    Un PDF e unic per (hash, token) - același raport nu se atașează de două ori.
+    """
+    __tablename__ = 'ingested_files'
+
+    KIND_CSV = 'csv'
+    KIND_PDF = 'pdf'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(8), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    token = db.Column(db.String(36), nullable=False, index=True)
+    original_filename = db.Column(db.String(255))
+    size_bytes = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'content_hash', 'token', name='uq_ingested_files_kind_hash_token'),
+        db.Index('idx_ingested_files_kind_hash', 'kind', 'content_hash'),
+    )
+
+    def __repr__(self):
+        return f"<IngestedFile {self.kind} {self.content_hash[:12]} → {self.token[:8]}>"
+
+
 # ==============================================================================
 # FUNCȚII UTILITARE
 # ==============================================================================
@@ -392,6 +557,15 @@ def init_db(app):
     flask_app = app.server if hasattr(app, 'server') else app
     db.init_app(flask_app)
     
+    # Flask-Migrate (opțional): `flask db upgrade` cu reviziile din migrations/versions
+    try:
+        import os
+        from flask_migrate import Migrate
+        migrations_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+        Migrate(flask_app, db, directory=migrations_dir)
+    except ImportError:
+        logger.debug("Flask-Migrate indisponibil - schema se actualizează doar la pornire")
+    
     with flask_app.app_context():
         # === SELF-HEALING: Auto-fix orphaned PostgreSQL objects ===
         try:
@@ -445,9 +619,71 @@ def init_db(app):
         logger.info("📊 [DB_INIT] Creating database tables...")
         db.create_all()
         
+        _ensure_recording_columns(logger)
+        _ensure_patient_link_columns(logger)
+        
         logger.info("✅ Database inițializat: tabele create/verificate.")
 
 
+def _ensure_recording_columns(logger):
+    """
+    Adaugă coloanele noi din PatientRecording pe tabele create înainte de ele
+    (db.create_all nu modifică tabele existente).
+    """
+    try:
+        from sqlalchemy import inspect, text
+        
+        existing = {col['name'] for col in inspect(db.engine).get_columns('patient_recordings')}
+        if 'content_hash' not in existing:
+            logger.warning("🔧 [DB_INIT] Adding missing column patient_recordings.content_hash...")
+            db.session.execute(text("ALTER TABLE patient_recordings ADD COLUMN content_hash VARCHAR(64)"))
+            db.session.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_patient_recordings_content_hash "
+                "ON patient_recordings (content_hash)"
+            ))
+            db.session.commit()
+            logger.warning("✅ [DB_INIT] Column content_hash added")
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"⚠️ [DB_INIT] Column check failed (non-critical): {e}")
+
+
+def _ensure_patient_link_columns(logger):
+    """
+    Adaugă coloanele indexate din PatientLinkRow pe un tabel creat înainte de
+    ele și le completează din payload (aceeași schemă ca migrarea Alembic
+    `b7d41c9e2a10`, pentru deploy-urile care nu rulează `flask db upgrade`).
+    """
+    try:
+        from sqlalchemy import inspect, text
+        
+        table = PatientLinkRow.__table__
+        existing = {col['name'] for col in inspect(db.engine).get_columns(table.name)}
+        missing = [name for name in PatientLinkRow.HOT_COLUMNS if name not in existing]
+        if not missing:
+            return
+        
+        logger.warning(f"🔧 [DB_INIT] Adding patient_link_rows columns: {missing}...")
+        dialect = db.engine.dialect
+        for name in missing:
+            column = table.columns[name]
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {name} {column.type.compile(dialect=dialect)}"
+            if column.server_default is not None:
+                ddl += f" NOT NULL DEFAULT {'TRUE' if name == 'is_active' else 'FALSE'}"
+            db.session.execute(text(ddl))
+        for index in table.indexes:
+            columns = ", ".join(col.name for col in index.columns)
+            db.session.execute(text(f"CREATE INDEX IF NOT EXISTS {index.name} ON {table.name} ({columns})"))
+        db.session.commit()
+        
+        from repositories.patient_repository import backfill_link_columns
+        filled = backfill_link_columns()
+        logger.warning(f"✅ [DB_INIT] patient_link_rows columns added, {filled} rows backfilled")
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"⚠️ [DB_INIT] patient_link_rows column check failed (non-critical): {e}")
+
+
 def create_admin_user(email: str, password: str, full_name: str) -> Optional[Doctor]:
     """
     Creează primul utilizator admin (pentru setup inițial).
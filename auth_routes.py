@@ -77,7 +77,21 @@ def route_health(app_server):
             health_status['checks']['storage'] = f'degraded: {str(e)[:50]}'
             logger.warning(f"⚠️ Health check: Storage warning - {e}")
         
-        # Check 3: Application callbacks (informațional)
+        # Check 3: Cache figuri interactive (informațional - contoare hit/miss)
+        try:
+            from figure_cache import figure_cache
+            health_status['checks']['figure_cache'] = figure_cache.stats()
+        except Exception:
+            health_status['checks']['figure_cache'] = 'unknown'
+        
+        # Check 3b: Cache metadata link-uri (informațional - hit rate, prospețime)
+        try:
+            from links_cache import links_cache
+            health_status['checks']['links_cache'] = links_cache.stats()
+        except Exception:
+            health_status['checks']['links_cache'] = 'unknown'
+        
+        # Check 4: Application callbacks (informațional)
         try:
             from app_instance import app as dash_app
             health_status['checks']['callbacks'] = len(dash_app.callback_map)
@@ -0,0 +1,244 @@
+# ==============================================================================
+# batch_link_writer.py
+# ------------------------------------------------------------------------------
+# ROL: Unitate de lucru (unit of work) pentru metadatele unui job batch:
+#      link-uri noi, rânduri `PatientRecording`, intrări `ingested_files` și
+#      patch-uri de metadata se adună în memorie și se scriu o dată la
+#      `flush_every` fișiere.
+#
+# DE CE: Per CSV, batch-ul apela `generate_patient_link` (load + save complet),
+#        o citire de verificare, apoi încă un `load_patient_links` +
+#        `save_patient_links` (PostgreSQL replace_all + blob S3 + JSON local).
+#        Costul creștea cu pătratul numărului de link-uri.
+#
+# FLUSH (per lot de N fișiere):
+#   - Se scriu DOAR câmpurile schimbate de job (nu snapshot-ul încărcat la
+#     start): între timp aplicația web, ingest watcher-ul sau alt job pot
+#     modifica notițe, status trimis, vizualizări, pot dezactiva / șterge link-uri
+#   - PostgreSQL activ: o singură tranzacție - rândurile noi + insert pentru
+#     link-urile noi + merge pe rând blocat (patch_link_fields) pentru cele
+#     existente; blob-ul JSON se reface apoi din tabel
+#   - Fără PostgreSQL: sursa curentă (S3 / JSON) e recitită, schimbările
+#     aplicate peste ea și scrise o dată (link-urile șterse între timp rămân șterse)
+#   - Abia apoi fișierele lotului devin "completed" în sesiune; la eșec devin
+#     "failed" și link-urile lor noi sunt scoase din memorie
+#
+# CONFIG: config.BATCH_METADATA_FLUSH_EVERY (env PULSOX_BATCH_FLUSH_EVERY).
+# NOTĂ: Necesită Flask app context (ca patient_links); un singur thread.
+# ==============================================================================
+
+import os
+from typing import Dict, List, Tuple
+
+import config
+from logger_setup import logger
+import batch_session_manager
+
+
+class LinkBatchWriter:
+    """Acumulează scrierile de metadata ale unui job batch și le aplică pe loturi."""
+
+    def __init__(self, session_id: str = None, generated_links: List[Dict] = None,
+                 flush_every: int = None):
+        from patient_links import load_patient_links
+
+        self.session_id = session_id
+        self.generated_links = generated_links if generated_links is not None else []
+        self.flush_every = max(1, int(flush_every or config.BATCH_METADATA_FLUSH_EVERY))
+
+        # O singură încărcare per job - doar pentru detectarea duplicatelor și
+        # starea link-urilor create de job; flush-ul nu rescrie acest snapshot
+        self.links: Dict[str, Dict] = load_patient_links()
+
+        # Detectare duplicate O(1): (aparat, dată, oră start) → token
+        self._link_index: Dict[Tuple, str] = {}
+        for token, metadata in self.links.items():
+            key = (metadata.get('device_name'), metadata.get('recording_date'), metadata.get('start_time'))
+            self._link_index.setdefault(key, token)
+
+        self._reset_chunk()
+        self._counters = {'flushes': 0, 'files': 0, 'failed_flushes': 0}
+
+    def _reset_chunk(self):
+        self._dirty_tokens = set()
+        self._created_tokens = set()
+        self._changes: Dict[str, Dict] = {}    # token existent → câmpuri suprascrise
+        self._appends: Dict[str, Dict] = {}    # token existent → câmp listă → valori adăugate
+        self._rows = []
+        self._ingested_keys = set()
+        self._completions = []
+
+    # --- Link-uri -------------------------------------------------------------
+
+    def get_or_create_link(self, device_name: str, notes: str = "", recording_date: str = None,
+                           start_time: str = None, end_time: str = None) -> str:
+        """Echivalentul `generate_patient_link`, în memorie (scris la flush)."""
+        import uuid
+        from patient_links import new_link_metadata, PATIENT_DATA_DIR
+
+        key = (device_name, recording_date, start_time)
+        if device_name and recording_date and start_time and key in self._link_index:
+            token = self._link_index[key]
+            logger.info(f"🔗 [LINK_WRITER] Link existent reutilizat pentru {device_name} {recording_date} {start_time}: {token[:8]}...")
+            return token
+
+        token = str(uuid.uuid4())
+        os.makedirs(os.path.join(PATIENT_DATA_DIR, token), exist_ok=True)
+        self.links[token] = new_link_metadata(device_name, notes, recording_date, start_time, end_time)
+        self._link_index[key] = token
+        self._dirty_tokens.add(token)
+        self._created_tokens.add(token)
+        logger.info(f"🔗 [LINK_WRITER] Link nou (în așteptare) pentru '{device_name}': {token[:8]}...")
+        return token
+
+    def patch_link(self, token: str, **fields):
+        if token not in self.links:
+            logger.warning(f"⚠️ [LINK_WRITER] Patch ignorat - link inexistent: {token[:8]}...")
+            return
+        self.links[token].update(fields)
+        self._dirty_tokens.add(token)
+        if token not in self._created_tokens:
+            self._changes.setdefault(token, {}).update(fields)
+
+    def append_pdf_path(self, token: str, pdf_path: str):
+        metadata = self.links.get(token)
+        if metadata is None:
+            return
+        pdf_paths = metadata.setdefault('pdf_paths', [])
+        if pdf_path not in pdf_paths:
+            pdf_paths.append(pdf_path)
+            self._dirty_tokens.add(token)
+            if token not in self._created_tokens:
+                self._appends.setdefault(token, {}).setdefault('pdf_paths', []).append(pdf_path)
+
+    # --- Rânduri DB -----------------------------------------------------------
+
+    def stage_recording(self, recording):
+        """Un `PatientRecording` construit de `patient_links.add_recording(link_writer=...)`."""
+        self._rows.append(recording)
+
+    def stage_ingested(self, kind: str, content_hash: str, token: str, filename: str = None,
+                       size_bytes: int = None):
+        """Intrare în indexul de ingestie (ingest_index), în tranzacția lotului."""
+        import ingest_index
+        from auth.models import IngestedFile
+
+        key = (kind, content_hash, token)
+        if not content_hash or key in self._ingested_keys or ingest_index.is_ingested(*key):
+            return
+        self._ingested_keys.add(key)
+        self._rows.append(IngestedFile(
+            kind=kind,
+            content_hash=content_hash,
+            token=token,
+            original_filename=(filename or '')[:255] or None,
+            size_bytes=size_bytes,
+        ))
+
+    # --- Fișiere --------------------------------------------------------------
+
+    def file_done(self, file_name: str, link_entry: Dict, pdf_associated: str = None):
+        """
+        Fișierul e complet în memorie. Devine "completed" (și apare în
+        rezultatul job-ului) după flush-ul lotului său.
+        """
+        self._completions.append((file_name, link_entry, pdf_associated))
+        self._counters['files'] += 1
+        if len(self._completions) >= self.flush_every:
+            self.flush()
+
+    def has_pending(self) -> bool:
+        return bool(self._dirty_tokens or self._rows or self._completions)
+
+    def flush(self) -> bool:
+        """
+        Scrie lotul curent: o tranzacție DB + o scriere a blob-ului de link-uri.
+
+        Returns:
+            bool: True dacă lotul a fost persistat
+        """
+        if not self.has_pending():
+            return True
+
+        from auth.models import db
+        from patient_links import _sync_links_blob_from_postgres
+        from repositories.patient_repository import links_table_active, upsert_link, patch_link_fields
+
+        completions = self._completions
+        links_changed = bool(self._dirty_tokens)
+        pg_active = links_changed and links_table_active()
+        try:
+            if self._rows:
+                db.session.add_all(self._rows)
+            if pg_active:
+                for token in self._created_tokens:
+                    upsert_link(token, self.links[token], commit=False)
+                for token in set(self._changes) | set(self._appends):
+                    patch_link_fields(token, self._changes.get(token, {}),
+                                      append=self._appends.get(token), commit=False)
+            db.session.commit()
+        except Exception as e:
+            self._counters['failed_flushes'] += 1
+            logger.error(f"❌ [LINK_WRITER] Flush eșuat ({len(completions)} fișiere): {e}", exc_info=True)
+            try:
+                db.session.rollback()
+            except Exception:
+                pass
+            for token in self._created_tokens:
+                metadata = self.links.pop(token, {})
+                key = (metadata.get('device_name'), metadata.get('recording_date'), metadata.get('start_time'))
+                if self._link_index.get(key) == token:
+                    del self._link_index[key]
+            if self.session_id:
+                for file_name, _entry, _pdf in completions:
+                    batch_session_manager.update_file_status(self.session_id, file_name, "failed",
+                                                             error=f"Salvare metadata eșuată: {e}")
+            self._reset_chunk()
+            return False
+
+        if pg_active:
+            _sync_links_blob_from_postgres()
+        elif links_changed:
+            self._save_merged_blob()
+
+        for file_name, link_entry, pdf_associated in completions:
+            self.generated_links.append(link_entry)
+            if self.session_id:
+                batch_session_manager.update_file_status(
+                    self.session_id,
+                    file_name,
+                    "completed",
+                    token=link_entry.get('token'),
+                    pdf_associated=pdf_associated
+                )
+
+        self._counters['flushes'] += 1
+        logger.warning(f"💾 [LINK_WRITER] Flush #{self._counters['flushes']}: {len(completions)} fișiere, "
+                       f"{len(self._rows)} rânduri, {len(self._dirty_tokens)} link-uri modificate")
+        self._reset_chunk()
+        return True
+
+    def _save_merged_blob(self):
+        """
+        Fluxul legacy (blob-ul e sursa de adevăr): recitește sursa curentă,
+        aplică doar schimbările lotului și o scrie o dată. Cu PostgreSQL
+        activat dar tabel încă gol, `save_patient_links` îl și populează.
+        """
+        from patient_links import _load_patient_links_uncached, save_patient_links
+
+        current = _load_patient_links_uncached()
+        for token in self._created_tokens:
+            current[token] = dict(self.links[token])
+        for token in set(self._changes) | set(self._appends):
+            metadata = current.get(token)
+            if metadata is None:
+                continue  # șters între timp (ex: GDPR) - nu îl recreăm
+            metadata.update(self._changes.get(token, {}))
+            for key, values in self._appends.get(token, {}).items():
+                existing = list(metadata.get(key) or [])
+                existing.extend(value for value in values if value not in existing)
+                metadata[key] = existing
+        save_patient_links(current)
+
+    def stats(self) -> Dict:
+        return {**self._counters, 'flush_every': self.flush_every, 'links': len(self.links)}
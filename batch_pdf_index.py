@@ -0,0 +1,201 @@
+# ==============================================================================
+# batch_pdf_index.py
+# ------------------------------------------------------------------------------
+# ROL: Indexul rapoartelor PDF dintr-un folder batch: (aparat, oră) → PDF,
+#      construit O SINGURĂ dată la pornirea job-ului, plus parsarea PDF-urilor
+#      din memorie pe un pool de thread-uri.
+#
+# DE CE: `process_associated_pdf` rula `os.listdir(input_folder)` pentru
+#        fiecare CSV (O(fișiere²)) și lua primul PDF care conținea numărul
+#        aparatului - același raport ajungea la toate nopțile aceluiași aparat.
+#        Apoi scria PDF-ul într-un `NamedTemporaryFile` doar ca parserul
+#        să-l redeschidă.
+#
+# POTRIVIRE: PDF-urile aceluiași aparat cu oră în nume
+#            ("Checkme O2 0331_70_100_20251015203510.pdf") → cel mai apropiat
+#            de ora de start a înregistrării, în limita
+#            config.BATCH_PDF_MATCH_TOLERANCE_MIN. Fără oră în nume → primul
+#            PDF al aparatului (comportamentul vechi).
+#
+# PARALELISM: `prefetch` trimite citirea + parsarea PDF-urilor potrivite
+#             CSV-urilor de procesat în pool (config.BATCH_PDF_PARSE_WORKERS),
+#             în timp ce CSV-urile se parsează și se randează.
+# ==============================================================================
+
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import config
+from logger_setup import logger
+from recording_cache import compute_content_hash
+
+_TIMESTAMP_RE = re.compile(r'(?<!\d)(\d{14})(?!\d)')
+
+
+class PdfCandidate(NamedTuple):
+    """Un PDF din folderul batch."""
+    file_name: str
+    path: str
+    device_number: str
+    timestamp: Optional[datetime]
+
+
+class LoadedPdf(NamedTuple):
+    """Conținutul unui PDF citit o singură dată per job."""
+    content: bytes
+    content_hash: str
+
+
+def timestamp_from_filename(file_name: str) -> Optional[datetime]:
+    """Ora înregistrării din numele fișierelor Checkme ("..._20251015203510.ext")."""
+    match = _TIMESTAMP_RE.search(os.path.splitext(file_name)[0])
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), '%Y%m%d%H%M%S')
+    except ValueError:
+        return None
+
+
+class BatchPdfIndex:
+    """PDF-urile unui folder batch, indexate după aparat și oră."""
+
+    def __init__(self, input_folder: str, file_names: Optional[Iterable[str]] = None,
+                 workers: int = None, tolerance_minutes: float = None):
+        from batch_processor import extract_device_number
+
+        self.input_folder = input_folder
+        self.tolerance = timedelta(minutes=(config.BATCH_PDF_MATCH_TOLERANCE_MIN
+                                            if tolerance_minutes is None else tolerance_minutes))
+        self._workers = max(1, int(workers or config.BATCH_PDF_PARSE_WORKERS))
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, LoadedPdf] = {}
+        self._parsed: Dict[str, Future] = {}
+
+        if file_names is None:
+            try:
+                file_names = os.listdir(input_folder)
+            except OSError as e:
+                logger.warning(f"⚠️ [PDF_INDEX] Folder inaccesibil '{input_folder}': {e}")
+                file_names = []
+
+        # aparat → [(oră, PDF)], sortat după oră (PDF-urile fără oră la final)
+        self._by_device: Dict[str, List[PdfCandidate]] = {}
+        for name in file_names:
+            if not name.lower().endswith('.pdf'):
+                continue
+            candidate = PdfCandidate(
+                file_name=name,
+                path=os.path.join(input_folder, name),
+                device_number=extract_device_number(name),
+                timestamp=timestamp_from_filename(name),
+            )
+            self._by_device.setdefault(candidate.device_number, []).append(candidate)
+        for candidates in self._by_device.values():
+            candidates.sort(key=lambda c: (c.timestamp is None, c.timestamp or datetime.min, c.file_name))
+
+        count = sum(len(c) for c in self._by_device.values())
+        if count:
+            logger.info(f"📄 [PDF_INDEX] {count} PDF-uri indexate pentru {len(self._by_device)} aparate")
+
+    def __len__(self):
+        return sum(len(c) for c in self._by_device.values())
+
+    # --- Potrivire ------------------------------------------------------------
+
+    def match(self, device_number: str, recording_time: Optional[datetime] = None) -> Optional[PdfCandidate]:
+        """
+        PDF-ul asociat unei înregistrări.
+
+        Args:
+            device_number: Numărul aparatului (ex: "3539")
+            recording_time: Ora de start a înregistrării (None → primul PDF al aparatului)
+
+        Returns:
+            PdfCandidate sau None dacă aparatul nu are PDF în toleranță
+        """
+        candidates = self._by_device.get(device_number)
+        if not candidates:
+            return None
+
+        timed = [c for c in candidates if c.timestamp is not None]
+        if recording_time is None or not timed:
+            return candidates[0]
+
+        recording_time = recording_time.replace(tzinfo=None) if hasattr(recording_time, 'tzinfo') else recording_time
+        best = min(timed, key=lambda c: abs(c.timestamp - recording_time))
+        if abs(best.timestamp - recording_time) > self.tolerance:
+            logger.debug(f"Niciun PDF pentru #{device_number} în {self.tolerance} de {recording_time}")
+            return None
+        return best
+
+    # --- Conținut și parsare ----------------------------------------------------
+
+    def load(self, candidate: PdfCandidate) -> LoadedPdf:
+        """Bytes + hash-ul PDF-ului (citit o singură dată per job)."""
+        with self._lock:
+            loaded = self._loaded.get(candidate.file_name)
+        if loaded is None:
+            with open(candidate.path, 'rb') as f:
+                content = f.read()
+            loaded = LoadedPdf(content, compute_content_hash(content))
+            with self._lock:
+                loaded = self._loaded.setdefault(candidate.file_name, loaded)
+        return loaded
+
+    def prefetch(self, wanted: Iterable[Tuple[str, Optional[datetime]]]) -> int:
+        """
+        Pornește în pool parsarea PDF-urilor potrivite (aparat, oră) date.
+
+        Returns:
+            int: Numărul de PDF-uri trimise la parsare
+        """
+        submitted = 0
+        for device_number, recording_time in wanted:
+            candidate = self.match(device_number, recording_time)
+            if candidate is not None and self._submit_parse(candidate) is not None:
+                submitted += 1
+        if submitted:
+            logger.info(f"📄 [PDF_INDEX] {submitted} PDF-uri trimise la parsare pe {self._workers} thread-uri")
+        return submitted
+
+    def parsed(self, candidate: PdfCandidate) -> Optional[Dict]:
+        """Datele parsate (așteaptă parsarea din pool). None dacă pdfplumber lipsește."""
+        future = self._submit_parse(candidate)
+        if future is None:
+            return None
+        return future.result()
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._loaded.clear()
+            self._parsed.clear()
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # --- Intern ---------------------------------------------------------------
+
+    def _submit_parse(self, candidate: PdfCandidate) -> Optional[Future]:
+        from pdf_parser import PDF_SUPPORT
+
+        if not PDF_SUPPORT:
+            return None
+        with self._lock:
+            future = self._parsed.get(candidate.file_name)
+            if future is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="pdf-parse")
+                future = self._pool.submit(self._parse, candidate)
+                self._parsed[candidate.file_name] = future
+        return future
+
+    def _parse(self, candidate: PdfCandidate) -> Dict:
+        from pdf_parser import parse_checkme_o2_report
+
+        return parse_checkme_o2_report(self.load(candidate).content, source_name=candidate.file_name)
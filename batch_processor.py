@@ -1,5 +1,5 @@
 # ==============================================================================
-# batch_processor.py (VERSIUNEA 3.0 - Nume Intuitiv Folder și Imagini)
+# batch_processor.py (VERSIUNEA 4.0 - Index PDF per Job)
 # ------------------------------------------------------------------------------
 # ROL: Conține motorul pentru procesarea în lot. Scanează un folder, citește
 #      fiecare fișier CSV, îl "feliază" în intervale de timp definite și
@@ -11,6 +11,74 @@
 #   # ideal într-un proces/thread separat pentru a nu bloca interfața.
 #   run_batch_job("cale/folder_intrare", "cale/folder_iesire", 30)
 #
+# MODIFICĂRI CHEIE (v4.0):
+#  - [PERF] PDF-urile folderului se indexează o singură dată la pornirea
+#    job-ului (batch_pdf_index.BatchPdfIndex) - dispare `os.listdir` per CSV
+#  - [FIX] PDF-ul se alege după aparat + ora cea mai apropiată de startul
+#    înregistrării (înainte: primul PDF cu numărul aparatului, pentru toate nopțile)
+#  - [PERF] Parsare PDF din memorie (fără `NamedTemporaryFile`), pe un pool
+#    de thread-uri, în paralel cu parsarea/randarea CSV-urilor
+#
+# MODIFICĂRI CHEIE (v3.9):
+#  - [PERF] Unit of work per job (batch_link_writer.LinkBatchWriter): link-urile,
+#    înregistrările, indexul și patch-urile de metadata se scriu o dată la N
+#    fișiere (PULSOX_BATCH_FLUSH_EVERY) - o tranzacție + o scriere de blob,
+#    în loc de load/save complet al tuturor link-urilor per fișier
+#  - [PERF] Dispare citirea de verificare `get_patient_recordings` per fișier
+#  - [FIX] Fișierul devine "completed" abia după ce lotul lui a fost salvat
+#
+# MODIFICĂRI CHEIE (v3.8):
+#  - [FIX] Fiecare CSV se urcă O SINGURĂ dată: dispare thread-ul per fișier
+#    `upload_r2_background` (al doilea upload + rescrierea tuturor link-urilor)
+#  - [PERF] Upload-urile trec prin executorul partajat (upload_executor):
+#    thread-uri limitate, backpressure, reîncercări; `_finish_uploads` este
+#    bariera așteptată înainte ca sesiunea să fie marcată finalizată
+#  - [FIX] Upload-urile care depășesc bariera se aplică din callback, cele
+#    eșuate se reiau la următorul job; sesiunea devine `degraded`
+#
+# MODIFICĂRI CHEIE (v3.7):
+#  - [PERF] CSV-urile sunt amprentate (SHA-256) ÎNAINTE de parsare; cele deja
+#    ingerate (ingest_index) sunt legate de link-ul existent, fără parsare,
+#    randare, `PatientRecording` nou sau upload S3
+#  - [FEATURE] PDF-ul asociat se atașează o singură dată per (hash, token)
+#  - [FEATURE] `run_batch_job(..., force_reprocess=True)` ignoră indexul
+#
+# MODIFICĂRI CHEIE (v3.6):
+#  - [FEATURE] `run_batch_job(..., only_files, should_cancel)` pentru job-urile
+#    din coada persistentă (job_queue.py): reluare după crash doar pe fișierele
+#    rămase și anulare cooperativă între fișiere
+#
+# MODIFICĂRI CHEIE (v3.5):
+#  - [PERF] Feliere într-o singură trecere: `compute_slice_bounds` găsește
+#    limitele tuturor ferestrelor cu un `searchsorted` vectorizat; feliile
+#    sunt `iloc[lo:hi]`, ferestrele goale se detectează din lo == hi
+#  - [PERF] Feliile unui fișier se randează/codează în paralel
+#    (config.SLICE_RENDER_WORKERS / PULSOX_SLICE_RENDER_WORKERS)
+#
+# MODIFICĂRI CHEIE (v3.4):
+#  - [PERF] Mod paralel (config.BATCH_WORKERS / PULSOX_BATCH_WORKERS > 1):
+#    fiecare CSV e un task izolat într-un proces worker (parsare, feliere,
+#    randare); DB, metadata link și statusurile sesiunii rămân în părinte
+#  - [REFACTOR] Etapele per fișier: `prepare_batch_file` (calcul) și
+#    `_register_batch_file` (persistență), comune ambelor moduri
+#
+# MODIFICĂRI CHEIE (v3.3):
+#  - [PERF] Logo-ul se compune pe imaginea randată în memorie și imaginea se
+#    codează o singură dată (înainte: JPG scris, redeschis, recodat la q95)
+#  - [FEATURE] Format ieșire configurabil: JPEG progresiv / WebP / PNG
+#    (config.IMAGE_OUTPUT_CONFIG, extensia urmează formatul)
+#
+# MODIFICĂRI CHEIE (v3.2):
+#  - [PERF] Feliile unui fișier sunt exportate ca un singur lot prin worker-ul
+#    Kaleido persistent (render_worker) - fără pornire de browser per imagine
+#  - [PERF] Pipelining: lotul fișierului N se randează în timp ce fișierul
+#    N+1 este parsat și feliat; imaginile se scriu în `finalize_slice_images`
+#
+# MODIFICĂRI CHEIE (v3.1):
+#  - [PERF] Export JPG prin config.IMAGE_EXPORT_BACKEND: 'native' (Pillow,
+#    fără Chromium) sau 'kaleido', cu comutare automată pe 'native' când
+#    Chrome lipsește (înainte: batch-ul continua fără nicio imagine)
+#
 # MODIFICĂRI CHEIE (v3.0):
 #  - [FEATURE] Nume imagini intuitive: "Aparat1442_00h25m-00h55m.jpg"
 #  - [FEATURE] Nume folder intuitiv: "02mai2025_00h25-06h37_Aparat1442"
@@ -18,22 +86,32 @@
 #  - [UX] Format ușor citibil de orice utilizator (folder + imagini)
 # ==============================================================================
 
+import io
 import os
 import re
+import numpy as np
 import pandas as pd
-from datetime import timedelta
-from typing import List, Dict
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+from typing import Callable, List, Dict, NamedTuple, Optional, Tuple
 
 # Importăm modulele și configurațiile necesare
 import config
 from logger_setup import logger
 from data_parser import parse_csv_data
 from plot_generator import create_plot
-from patient_links import generate_patient_link, add_recording
+from patient_links import add_recording, reconcile_local_recordings
+from batch_link_writer import LinkBatchWriter
+from batch_pdf_index import BatchPdfIndex, timestamp_from_filename
 import batch_session_manager
-from storage_service import upload_patient_csv
-import threading
+import ingest_index
+from recording_cache import compute_content_hash
+from upload_executor import UploadGroup
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 
 # --- Mapare Luni în Română ---
 MONTH_NAMES_RO = {
@@ -41,6 +119,153 @@ MONTH_NAMES_RO = {
     7: 'iul', 8: 'aug', 9: 'sep', 10: 'oct', 11: 'nov', 12: 'dec'
 }
 
+# [v3.1] Backend-ul efectiv de export; devine 'native' după primul eșec Kaleido/Chrome
+_active_image_backend = config.IMAGE_EXPORT_BACKEND
+
+
+class PendingSliceImages(NamedTuple):
+    """Feliile unui fișier trimise la export; `future` e None pentru backend-ul nativ."""
+    file_name: str
+    slice_jobs: List[Tuple[pd.DataFrame, str]]  # (df_slice, image_full_path)
+    figures: Optional[list]
+    future: Optional[Future]
+
+
+def _is_chrome_missing(error: Exception) -> bool:
+    return "Kaleido requires" in str(error) or "Chrome" in str(error)
+
+
+def _switch_to_native_backend(error: Exception):
+    global _active_image_backend
+    logger.warning(
+        f"⚠️ Kaleido/Chrome indisponibil ({error}). "
+        f"Export imagini comutat pe backend-ul nativ (Pillow)."
+    )
+    _active_image_backend = 'native'
+
+
+def submit_slice_images(file_name: str, slice_jobs: List[Tuple[pd.DataFrame, str]]) -> PendingSliceImages:
+    """
+    [v3.2] Pornește exportul imaginilor pentru toate feliile unui fișier.
+
+    Cu backend-ul 'kaleido', figurile sunt trimise ca un singur lot worker-ului
+    persistent (render_worker) și funcția revine imediat - randarea se suprapune
+    cu procesarea fișierului următor. Rezultatul se colectează cu
+    `finalize_slice_images`.
+    """
+    if _active_image_backend != 'native' and slice_jobs:
+        try:
+            from render_worker import get_render_worker
+            worker = get_render_worker()
+            figures = [create_plot(df_slice, file_name) for df_slice, _ in slice_jobs]
+            # PNG fără pierderi: logo-ul se compune peste el și codarea finală e una singură
+            return PendingSliceImages(file_name, slice_jobs, figures, worker.submit_batch(figures, image_format='png'))
+        except RuntimeError as kaleido_error:
+            # FALLBACK GRACEFUL: Kaleido necesită Chrome (lipsește din container)
+            if not _is_chrome_missing(kaleido_error):
+                raise
+            _switch_to_native_backend(kaleido_error)
+
+    return PendingSliceImages(file_name, slice_jobs, None, None)
+
+
+def _collect_kaleido_images(pending: PendingSliceImages) -> Optional[List[bytes]]:
+    """Așteaptă lotul Kaleido; la eșec repornește worker-ul și reîncearcă o dată."""
+    try:
+        return pending.future.result()
+    except Exception as first_error:
+        logger.warning(f"⚠️ Lot Kaleido eșuat pentru '{pending.file_name}': {first_error}. Repornire worker și reîncercare...")
+    try:
+        from render_worker import get_render_worker
+        worker = get_render_worker()
+        worker.restart()
+        return worker.render_batch(pending.figures, image_format='png')
+    except Exception as retry_error:
+        _switch_to_native_backend(retry_error)
+        return None
+
+
+def finalize_slice_images(pending: Optional[PendingSliceImages], doctor_id: str = "default") -> int:
+    """
+    Compune logo-ul medicului peste fiecare imagine randată, în memorie, și o
+    codează o singură dată în formatul configurat (config.IMAGE_OUTPUT_CONFIG).
+
+    Returns:
+        int: Numărul de imagini salvate
+    """
+    from PIL import Image
+    from plot_generator import get_logo_overlay, composite_logo, save_image
+
+    if pending is None:
+        return 0
+
+    images = _collect_kaleido_images(pending) if pending.future is not None else None
+    canvas_size = (config.IMAGE_RESOLUTION['width'], config.IMAGE_RESOLUTION['height'])
+
+    # Logo-ul (redimensionat, din cache) se rezolvă o dată per lot
+    try:
+        overlay = get_logo_overlay(canvas_size, doctor_id)
+    except Exception as logo_error:
+        logger.warning(f"Nu s-a putut pregăti logo-ul pentru '{pending.file_name}': {logo_error}")
+        overlay = None
+
+    def _save_slice(index: int) -> bool:
+        df_slice, image_full_path = pending.slice_jobs[index]
+        image_file_name = os.path.basename(image_full_path)
+        try:
+            if images is not None:
+                image = Image.open(io.BytesIO(images[index]))
+            else:
+                from native_renderer import render_plot
+                image = render_plot(df_slice, *canvas_size)
+                if image is None:
+                    logger.warning(f"Date insuficiente pentru '{image_file_name}' - imagine omisă.")
+                    return False
+
+            save_image(composite_logo(image, overlay), image_full_path)
+            logger.info(f"Salvat imaginea: {image_file_name}")
+            return True
+
+        except Exception as img_error:
+            # Orice altă eroare la salvare imagine - CONTINUĂM procesarea (resilience)
+            logger.error(
+                f"❌ Eroare neașteptată la salvarea imaginii {image_file_name}: {img_error}",
+                exc_info=True
+            )
+            return False
+
+    # [v3.5] Feliile sunt independente: randare nativă / decodare + logo + codare
+    # în paralel (Pillow și numpy eliberează GIL-ul pe operațiile grele)
+    indices = range(len(pending.slice_jobs))
+    workers = min(config.SLICE_RENDER_WORKERS, len(pending.slice_jobs))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slice-render") as pool:
+            return sum(pool.map(_save_slice, indices))
+    return sum(_save_slice(index) for index in indices)
+
+
+def compute_slice_bounds(index: pd.DatetimeIndex, window: timedelta) -> List[Tuple[int, int, int]]:
+    """
+    [v3.5] Limitele (poziționale) ale ferestrelor de timp pe un index sortat.
+
+    Ferestrele sunt [start + k*window, start + (k+1)*window) cât timp începutul
+    e < ultimul timestamp - exact ca bucla clasică de feliere - dar limitele
+    vin dintr-un singur `searchsorted` vectorizat (O(n + k log n)), fără măști
+    booleene pe toată înregistrarea pentru fiecare felie.
+
+    Returns:
+        List[Tuple[int, int, int]]: (număr felie 1-based, lo, hi) - ferestrele
+        goale au lo == hi
+    """
+    record_start_time = index[0]
+    record_end_time = index[-1]
+    n_windows = int(np.ceil((record_end_time - record_start_time) / window))
+    window_starts = record_start_time + window * np.arange(n_windows + 1)
+
+    edges = index.searchsorted(window_starts, side='left')
+    return [(k + 1, int(edges[k]), int(edges[k + 1])) for k in range(n_windows)]
+
+
 def extract_device_number(filename: str) -> str:
     """
     Extrage numărul aparatului din numele fișierului.
@@ -134,50 +359,64 @@ def generate_intuitive_folder_name(df: pd.DataFrame, original_filename: str) ->
         logger.warning(f"Se folosește numele fallback: '{fallback_name}'")
         return fallback_name
 
-def process_associated_pdf(input_folder: str, csv_filename: str, device_number: str, token: str) -> bool:
+def _pdf_match_time(file_name: str, fallback_time=None) -> Optional[datetime]:
+    """
+    Ora după care se asociază PDF-ul unui CSV - aceeași la `pdf_index.prefetch`
+    (înainte de parsare) și la înregistrare: ora din numele CSV-ului, apoi
+    `fallback_time` (începutul datelor) pentru fișierele fără oră în nume.
+    """
+    return timestamp_from_filename(file_name) or fallback_time
+
+
+def process_associated_pdf(input_folder: str, csv_filename: str, device_number: str, token: str,
+                           link_writer: Optional[LinkBatchWriter] = None,
+                           pdf_index: Optional[BatchPdfIndex] = None,
+                           recording_time=None) -> bool:
     """
     Caută și procesează PDF-ul asociat unui CSV în același folder.
     
     Logica de matching:
     - Același device number (ex: "3539", "0331")
     - Format: "Checkme O2 {device}_*.pdf" sau similar
+    - [v4.0] Ora din numele PDF-ului cea mai apropiată de `recording_time`
     
     Args:
         input_folder: Folder unde se caută PDF-ul
         csv_filename: Numele fișierului CSV (pentru referință)
         device_number: Numărul aparatului (ex: "3539")
         token: Token-ul pacientului pentru salvare
+        link_writer: [v3.9] Unitatea de lucru a batch-ului - calea PDF și
+                     intrarea din index se scriu la flush-ul lotului
+        pdf_index: [v4.0] Indexul PDF-urilor job-ului (construit o dată);
+                   None → se indexează folderul doar pentru acest apel
+        recording_time: [v4.0] Ora de start a înregistrării (implicit din numele CSV)
         
     Returns:
         bool: True dacă PDF găsit și procesat cu succes
     """
+    own_index = pdf_index is None
     try:
-        # Listăm toate PDF-urile din folder
-        pdf_files = [f for f in os.listdir(input_folder) if f.lower().endswith('.pdf')]
-        
-        if not pdf_files:
-            logger.debug(f"Nu există PDF-uri în folderul {input_folder}")
-            return False
-        
-        # Căutăm PDF cu același device number
-        matching_pdf = None
-        for pdf_file in pdf_files:
-            # Verificăm dacă device_number apare în numele PDF-ului
-            if device_number in pdf_file:
-                matching_pdf = pdf_file
-                break
-        
-        if not matching_pdf:
+        if own_index:
+            pdf_index = BatchPdfIndex(input_folder)
+        if recording_time is None:
+            recording_time = timestamp_from_filename(csv_filename)
+
+        # Căutăm PDF cu același device number, cel mai apropiat ca oră
+        matching = pdf_index.match(device_number, recording_time)
+        if matching is None:
             logger.debug(f"Nu s-a găsit PDF asociat pentru device #{device_number}")
             return False
-        
-        # Avem PDF potrivit - procesăm
-        pdf_path = os.path.join(input_folder, matching_pdf)
+
+        matching_pdf = matching.file_name
         logger.info(f"📄 Găsit PDF asociat: {matching_pdf} pentru device #{device_number}")
         
-        # Citim PDF-ul
-        with open(pdf_path, 'rb') as f:
-            pdf_content = f.read()
+        # Citim PDF-ul (o singură dată per job)
+        pdf_content, pdf_hash = pdf_index.load(matching)
+        
+        # [v3.7] Același raport deja atașat acestui link → nu-l mai salvăm/parsăm
+        if ingest_index.is_ingested('pdf', pdf_hash, token):
+            logger.info(f"♻️ PDF {matching_pdf} deja atașat link-ului {token[:8]}... - omis")
+            return True
         
         # Salvăm PDF-ul pentru pacient
         from patient_links import save_pdf_for_link, save_pdf_parsed_data
@@ -186,37 +425,27 @@ def process_associated_pdf(input_folder: str, csv_filename: str, device_number:
         if not saved_path:
             logger.error(f"Eroare la salvarea PDF-ului {matching_pdf}")
             return False
+        if link_writer is not None:
+            link_writer.stage_ingested('pdf', pdf_hash, token, matching_pdf, len(pdf_content))
+        else:
+            ingest_index.record_ingested('pdf', pdf_hash, token, matching_pdf, len(pdf_content))
         
-        # Parsăm PDF-ul
+        # Parsăm PDF-ul - [v4.0] din memorie, pe pool-ul indexului (de regulă deja gata)
         try:
-            from pdf_parser import parse_checkme_o2_report, PDF_SUPPORT
-            
-            if not PDF_SUPPORT:
+            parsed_data = pdf_index.parsed(matching)
+            if parsed_data is None:
                 logger.warning("pdfplumber nu este instalat - skip parsing PDF")
                 return True  # PDF salvat, dar nu parsat
             
-            # Creăm fișier temporar pentru parsing
-            import tempfile
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp_file:
-                tmp_file.write(pdf_content)
-                tmp_pdf_path = tmp_file.name
-            
-            try:
-                # Parsăm PDF-ul
-                parsed_data = parse_checkme_o2_report(tmp_pdf_path)
-                
-                # Salvăm datele parsate
-                if save_pdf_parsed_data(token, saved_path, parsed_data):
-                    logger.info(f"✅ PDF {matching_pdf} parsat și salvat pentru token {token[:8]}...")
-                    return True
-                else:
-                    logger.warning(f"Eroare la salvarea datelor parsate pentru {matching_pdf}")
-                    return False
-                    
-            finally:
-                # Ștergem fișierul temporar
-                if os.path.exists(tmp_pdf_path):
-                    os.remove(tmp_pdf_path)
+            # Salvăm datele parsate
+            if save_pdf_parsed_data(token, saved_path, parsed_data, update_link=link_writer is None):
+                if link_writer is not None:
+                    link_writer.append_pdf_path(token, saved_path)
+                logger.info(f"✅ PDF {matching_pdf} parsat și salvat pentru token {token[:8]}...")
+                return True
+            else:
+                logger.warning(f"Eroare la salvarea datelor parsate pentru {matching_pdf}")
+                return False
                     
         except Exception as parse_error:
             logger.error(f"Eroare la parsarea PDF {matching_pdf}: {parse_error}")
@@ -225,6 +454,9 @@ def process_associated_pdf(input_folder: str, csv_filename: str, device_number:
     except Exception as e:
         logger.error(f"Eroare la procesarea PDF asociat: {e}", exc_info=True)
         return False
+    finally:
+        if own_index and pdf_index is not None:
+            pdf_index.close()
 
 
 def generate_intuitive_image_name(df_slice: pd.DataFrame, device_number: str) -> str:
@@ -253,7 +485,7 @@ def generate_intuitive_image_name(df_slice: pd.DataFrame, device_number: str) ->
         if start_time.date() == end_time.date():
             # Aceeași zi - doar ora
             end_hour = f"{end_time.hour:02d}h{end_time.minute:02d}m"
-            image_name = f"Aparat{device_number}_{start_hour}-{end_hour}.jpg"
+            image_name = f"Aparat{device_number}_{start_hour}-{end_hour}{config.IMAGE_OUTPUT_EXTENSION}"
         else:
             # Zile diferite - includem datele
             start_day = start_time.day
@@ -262,7 +494,7 @@ def generate_intuitive_image_name(df_slice: pd.DataFrame, device_number: str) ->
             end_month = MONTH_NAMES_RO[end_time.month]
             end_hour = f"{end_time.hour:02d}h{end_time.minute:02d}m"
             
-            image_name = f"Aparat{device_number}_{start_day:02d}{start_month}_{start_hour}-{end_day:02d}{end_month}_{end_hour}.jpg"
+            image_name = f"Aparat{device_number}_{start_day:02d}{start_month}_{start_hour}-{end_day:02d}{end_month}_{end_hour}{config.IMAGE_OUTPUT_EXTENSION}"
         
         logger.debug(f"Nume imagine generat: {image_name}")
         return image_name
@@ -272,9 +504,448 @@ def generate_intuitive_image_name(df_slice: pd.DataFrame, device_number: str) ->
         # Fallback la formatul vechi
         start_str = df_slice.index.min().strftime('%Y%m%d_%H%M%S')
         end_str = df_slice.index.max().strftime('%H%M%S')
-        return f"grafic_{start_str}_pana_la_{end_str}.jpg"
+        return f"grafic_{start_str}_pana_la_{end_str}{config.IMAGE_OUTPUT_EXTENSION}"
+
+def prepare_batch_file(file_path: str, file_name: str, output_folder: str, window_minutes: int) -> Dict:
+    """
+    [v3.4] Etapa "de calcul" a unui fișier: citire, parsare, folder de ieșire și feliere.
+    Nu atinge baza de date - poate rula într-un proces worker.
+
+    Returns:
+        Dict: Conținutul CSV, DataFrame-ul, metadatele înregistrării și `slice_jobs`
+    """
+    # Citim conținutul fișierului
+    with open(file_path, 'rb') as f:
+        file_content = f.read()
+
+    # Parsăm și validăm datele folosind modulul dedicat
+    df = parse_csv_data(file_content, file_name)
+
+    # [v2.0] Creăm un sub-folder dedicat cu nume intuitiv bazat pe date și aparat
+    file_output_folder_name = generate_intuitive_folder_name(df, file_name)
+    file_output_path = os.path.join(output_folder, file_output_folder_name)
+    os.makedirs(file_output_path, exist_ok=True)
+    logger.info(f"Folderul de ieșire pentru acest fișier a fost creat la: '{file_output_path}'")
+
+    # Extragem numărul aparatului pentru numele imaginilor
+    device_number = extract_device_number(file_name)
+
+    # Logica de "feliere" - [v3.5] limite calculate o singură dată pe indexul sortat
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')
+    record_start_time = df.index.min()
+    record_end_time = df.index.max()
+    time_window = timedelta(minutes=window_minutes)
+
+    slice_bounds = compute_slice_bounds(df.index, time_window)
+    slice_count = len(slice_bounds)
+    slice_jobs = []
+
+    for slice_number, lo, hi in slice_bounds:
+        if lo == hi:
+            window_start = record_start_time + time_window * (slice_number - 1)
+            logger.warning(f"Felia {slice_number} ({window_start.time()} - {(window_start + time_window).time()}) nu conține date. Se omite.")
+            continue
+
+        df_slice = df.iloc[lo:hi]
+
+        # [v3.0] Creăm un nume de fișier intuitiv și ușor citibil
+        image_file_name = generate_intuitive_image_name(df_slice, device_number)
+        image_full_path = os.path.join(file_output_path, image_file_name)
+
+        slice_jobs.append((df_slice, image_full_path))
+
+    return {
+        "file_name": file_name,
+        "file_content": file_content,
+        "df": df,
+        "device_number": device_number,
+        "record_start_time": record_start_time,
+        "record_end_time": record_end_time,
+        "slice_count": slice_count,
+        "slice_jobs": slice_jobs,
+        "file_output_folder_name": file_output_folder_name,
+        "file_output_path": file_output_path,
+    }
+
+
+def process_file_task(file_path: str, file_name: str, output_folder: str, window_minutes: int) -> Dict:
+    """
+    [v3.4] Task-ul unui proces worker: parsare + feliere + randare imagini.
+    Rezultatul (fără feliile individuale) se întoarce procesului părinte,
+    care face înregistrarea în DB, metadatele și asocierea PDF.
+    """
+    prepared = prepare_batch_file(file_path, file_name, output_folder, window_minutes)
+    prepared["images_saved"] = finalize_slice_images(submit_slice_images(file_name, prepared.pop("slice_jobs")))
+    logger.info(f"Procesare finalizată pentru '{file_name}' în worker (PID {os.getpid()}). S-au generat {prepared['images_saved']} imagini.")
+    return prepared
+
+
+def _register_batch_file(prepared: Dict, input_folder: str, link_writer: LinkBatchWriter,
+                         upload_group: Optional[UploadGroup] = None,
+                         pdf_index: Optional[BatchPdfIndex] = None):
+    """
+    [v3.4] Etapa "de persistență" a unui fișier (doar în procesul părinte):
+    link pacient, înregistrare, metadata link, upload, PDF asociat.
+
+    [v3.9] Totul trece prin `link_writer` (unit of work): nimic nu se scrie
+    per fișier; lotul se salvează la fiecare `flush_every` fișiere, iar
+    statusul "completed" din sesiune se pune abia după flush.
+    """
+    file_name = prepared["file_name"]
+    file_content = prepared["file_content"]
+    df = prepared["df"]
+    device_number = prepared["device_number"]
+    record_start_time = prepared["record_start_time"]
+    record_end_time = prepared["record_end_time"]
+    slice_count = prepared["slice_count"]
+    file_output_folder_name = prepared["file_output_folder_name"]
+    file_output_path = prepared["file_output_path"]
+
+    # [DIAGNOSTIC LOG 1] Pre-processing summary
+    logger.critical(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    logger.critical(f"📋 [BATCH_TRACE] Processing device from CSV: {file_name}")
+    logger.critical(f"   - Device number extracted: #{device_number}")
+    logger.critical(f"   - Recording start: {record_start_time}")
+    logger.critical(f"   - Recording end: {record_end_time}")
+    logger.critical(f"   - Images generated: {slice_count-1}")
+    logger.critical(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+
+    # Extragem metadata pentru link
+    recording_date = record_start_time.strftime('%Y-%m-%d')
+    start_time_str = record_start_time.strftime('%H:%M:%S')
+    end_time_str = record_end_time.strftime('%H:%M:%S')
+    device_display_name = f"Checkme O2 #{device_number}"
+
+    # STEP 1: Link (în memorie - detectare duplicate O(1) după aparat + dată + oră)
+    token = link_writer.get_or_create_link(
+        device_name=device_display_name,
+        notes=f"Procesare automată batch - {file_name}",
+        recording_date=recording_date,
+        start_time=start_time_str,
+        end_time=end_time_str
+    )
+    logger.critical(f"✅ [BATCH_TRACE] STEP 1 COMPLETE: Link {token[:8]}... ({device_display_name}, {recording_date} {start_time_str} → {end_time_str})")
+
+    # Calculăm statistici SpO2 pentru această înregistrare
+    try:
+        avg_spo2 = float(df['SpO2 (%)'].mean()) if 'SpO2 (%)' in df.columns else None
+        min_spo2 = int(df['SpO2 (%)'].min()) if 'SpO2 (%)' in df.columns else None
+        max_spo2 = int(df['SpO2 (%)'].max()) if 'SpO2 (%)' in df.columns else None
+    except Exception as stats_error:
+        logger.warning(f"Nu s-au putut calcula statistici SpO2: {stats_error}")
+        avg_spo2, min_spo2, max_spo2 = None, None, None
 
-def run_batch_job(input_folder: str, output_folder: str, window_minutes: int, session_id: str = None) -> List[Dict]:
+    # STEP 2: Înregistrarea (CSV local/S3 + artefact); rândul intră în lotul curent
+    recording_added = add_recording(
+        token=token,
+        csv_filename=file_name,
+        csv_content=file_content,
+        recording_date=recording_date,
+        start_time=start_time_str,
+        end_time=end_time_str,
+        avg_spo2=avg_spo2,
+        min_spo2=min_spo2,
+        max_spo2=max_spo2,
+        df=df,
+        upload_group=upload_group,
+        link_writer=link_writer
+    )
+    if not recording_added:
+        raise ValueError(f"Înregistrarea nu a putut fi pregătită pentru '{file_name}'")
+    link_writer.stage_ingested('csv', compute_content_hash(file_content), token, file_name, len(file_content))
+    logger.critical(f"✅ [BATCH_TRACE] STEP 2 COMPLETE: Recording staged ({len(file_content)/1024:.2f} KB)")
+
+    # STEP 3: Metadata link-ului (output folder, etc.)
+    link_writer.patch_link(
+        token,
+        output_folder=file_output_folder_name,
+        output_folder_path=file_output_path,
+        images_count=slice_count - 1,
+        original_filename=file_name
+    )
+
+    # [NEW v5.0] Căutăm și procesăm PDF asociat (același folder, același device)
+    pdf_processed = False
+    try:
+        pdf_processed = process_associated_pdf(input_folder, file_name, device_number, token, link_writer,
+                                               pdf_index, recording_time=_pdf_match_time(file_name, record_start_time))
+        if pdf_processed:
+            logger.info(f"📄 PDF asociat procesat pentru {device_display_name}")
+    except Exception as pdf_error:
+        logger.warning(f"Nu s-a putut procesa PDF asociat pentru '{file_name}': {pdf_error}")
+
+    link_writer.file_done(
+        file_name,
+        {
+            "token": token,
+            "device_name": device_display_name,
+            "device_number": device_number,
+            "recording_date": recording_date,
+            "start_time": start_time_str,
+            "end_time": end_time_str,
+            "original_filename": file_name,
+            "output_folder": file_output_folder_name,
+            "images_count": slice_count - 1,
+            "recording_saved_to_db": recording_added
+        },
+        pdf_associated=f"Checkme O2 {device_number}*.pdf" if pdf_processed else None
+    )
+    logger.critical(f"✅ [BATCH_SUMMARY] {file_name} → {token[:8]}... | Output: {file_output_folder_name} | PDF: {pdf_processed}")
+
+
+def _link_ingested_file(file_name: str, token: str, link: Dict, input_folder: str,
+                        link_writer: LinkBatchWriter, pdf_index: Optional[BatchPdfIndex] = None):
+    """
+    [v3.7] Un CSV deja ingerat: reutilizăm link-ul, înregistrarea și imaginile
+    existente. Doar PDF-ul asociat se verifică (poate fi nou în folder).
+    """
+    device_number = extract_device_number(file_name)
+    recording_time = None
+    if link.get('recording_date') and link.get('start_time'):
+        try:
+            recording_time = datetime.strptime(f"{link['recording_date']} {link['start_time']}", '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            pass
+    pdf_processed = False
+    try:
+        pdf_processed = process_associated_pdf(input_folder, file_name, device_number, token, link_writer,
+                                               pdf_index, recording_time=_pdf_match_time(file_name, recording_time))
+    except Exception as pdf_error:
+        logger.warning(f"Nu s-a putut procesa PDF asociat pentru '{file_name}': {pdf_error}")
+
+    link_writer.file_done(
+        file_name,
+        {
+            "token": token,
+            "device_name": link.get('device_name') or f"Checkme O2 #{device_number}",
+            "device_number": device_number,
+            "recording_date": link.get('recording_date'),
+            "start_time": link.get('start_time'),
+            "end_time": link.get('end_time'),
+            "original_filename": link.get('original_filename') or file_name,
+            "output_folder": link.get('output_folder'),
+            "images_count": link.get('images_count', 0),
+            "recording_saved_to_db": True,
+            "reused": True
+        },
+        pdf_associated=f"Checkme O2 {device_number}*.pdf" if pdf_processed else None
+    )
+
+
+def _skip_ingested_files(csv_files: List[str], input_folder: str, link_writer: LinkBatchWriter,
+                         pdf_index: Optional[BatchPdfIndex] = None) -> List[str]:
+    """
+    [v3.7] Amprentează CSV-urile și leagă de link-ul existent pe cele deja ingerate
+    (o singură interogare pentru tot folderul).
+
+    Returns:
+        List[str]: CSV-urile care trebuie procesate complet
+    """
+    try:
+        file_hashes = ingest_index.fingerprint_files(input_folder, csv_files)
+        known = ingest_index.find_ingested_csvs(file_hashes.values())
+    except Exception as e:
+        logger.warning(f"⚠️ [INGEST_INDEX] Index indisponibil - procesăm toate fișierele: {e}")
+        return csv_files
+
+    if not known:
+        return csv_files
+
+    remaining = []
+    for file_name in csv_files:
+        token = known.get(file_hashes.get(file_name))
+        link = link_writer.links.get(token) if token else None
+        if not link or not link.get('is_active', True):
+            remaining.append(file_name)
+            continue
+        logger.info(f"♻️ [INGEST_INDEX] '{file_name}' deja ingerat → link existent {token[:8]}...")
+        _link_ingested_file(file_name, token, link, input_folder, link_writer, pdf_index)
+
+    skipped = len(csv_files) - len(remaining)
+    if skipped:
+        logger.warning(f"♻️ [INGEST_INDEX] {skipped}/{len(csv_files)} fișiere deja ingerate - reutilizate fără reprocesare")
+    return remaining
+
+
+def _mark_file_failed(session_id: str, file_name: str, error: Exception):
+    """Statusul "failed" în batch_session_manager (dacă există sesiune)."""
+    if session_id:
+        batch_session_manager.update_file_status(
+            session_id,
+            file_name,
+            "failed",
+            error=str(error)
+        )
+
+
+def _complete_pipelined_file(pending_file, session_id: str, input_folder: str,
+                             link_writer, upload_group, pdf_index) -> None:
+    """
+    [v3.2] Încheie fișierul anterior din pipeline: așteaptă scrierea imaginilor
+    lui și abia apoi îl înregistrează (link + `file_done`). Altfel flush-ul
+    writer-ului putea marca fișierul "completed" cu imaginile încă în randare.
+    """
+    if pending_file is None:
+        return
+
+    prepared, images = pending_file
+    file_name = prepared["file_name"]
+    try:
+        finalize_slice_images(images)
+        logger.info(f"Procesare finalizată pentru '{file_name}'. S-au generat {prepared['slice_count']-1} imagini.")
+        _register_batch_file(prepared, input_folder, link_writer, upload_group, pdf_index)
+    except Exception as e:
+        logger.critical(f"EROARE CRITICĂ neașteptată la finalizarea fișierului '{file_name}': {e}", exc_info=True)
+        _mark_file_failed(session_id, file_name, e)
+
+
+def _batch_mp_context():
+    """
+    Contextul multiprocessing pentru workerii batch (config.BATCH_MP_CONTEXT).
+    Implicit 'forkserver': workerii pornesc dintr-un proces server curat, nu din
+    procesul web cu thread-uri; __main__ se importă o singură dată, în server
+    (sub run_medical.py asta înseamnă o inițializare în plus a aplicației).
+    'fork' (opțional) e protejat parțial: plot_generator / render_worker /
+    upload_executor își refac lock-urile și singleton-urile în copil
+    (`os.register_at_fork`); workerii fac doar calcul, fără DB.
+    """
+    method = config.BATCH_MP_CONTEXT
+    if method not in multiprocessing.get_all_start_methods():
+        method = 'spawn'
+    return multiprocessing.get_context(method)
+
+
+def _run_file_isolated(file_path: str, file_name: str, output_folder: str, window_minutes: int) -> Dict:
+    """Rulează un singur fișier într-un pool propriu - un crash nu mai afectează alte fișiere."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=_batch_mp_context()) as pool:
+        return pool.submit(process_file_task, file_path, file_name, output_folder, window_minutes).result()
+
+
+def _run_files_parallel(csv_files: List[str], input_folder: str, output_folder: str, window_minutes: int,
+                        session_id: str, link_writer: LinkBatchWriter, workers: int,
+                        should_cancel: Optional[Callable[[], bool]] = None,
+                        upload_group: Optional[UploadGroup] = None,
+                        pdf_index: Optional[BatchPdfIndex] = None):
+    """
+    [v3.4] Procesare paralelă: fiecare CSV e un task izolat (parsare, feliere,
+    randare) într-un proces worker; înregistrarea în DB, metadatele și
+    statusurile sunt făcute DOAR de procesul părinte, pe măsură ce rezultatele sosesc.
+
+    Un fișier invalid eșuează doar pe el. Dacă un worker moare (pool "broken"),
+    fișierele afectate sunt reluate individual, fiecare în propriul proces.
+    La anulare, fișierele încă neînregistrate revin la "pending".
+    """
+    logger.info(f"⚡ [BATCH_PARALLEL] {len(csv_files)} fișiere pe {workers} procese worker")
+
+    def _path(name):
+        return os.path.join(input_folder, name)
+
+    def _mark_processing(name):
+        logger.info(f"--- Procesare fișier: {name} ---")
+        if session_id:
+            batch_session_manager.update_file_status(session_id, name, "processing")
+
+    def _register(name, prepared):
+        try:
+            _register_batch_file(prepared, input_folder, link_writer, upload_group, pdf_index)
+        except Exception as e:
+            logger.critical(f"EROARE CRITICĂ la înregistrarea fișierului '{name}': {e}", exc_info=True)
+            _mark_file_failed(session_id, name, e)
+
+    broken_files = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_batch_mp_context()) as pool:
+        futures = {
+            pool.submit(process_file_task, _path(name), name, output_folder, window_minutes): name
+            for name in csv_files
+        }
+
+        # Pool-ul preia task-urile în ordinea trimiterii: marcăm "processing"
+        # primele `workers` fișiere, apoi câte unul la fiecare fișier terminat
+        queued = iter(csv_files)
+        for name in islice(queued, workers):
+            _mark_processing(name)
+
+        unregistered = set(csv_files)
+        for future in as_completed(futures):
+            file_name = futures[future]
+            if should_cancel and should_cancel():
+                logger.warning(f"⏹️ [BATCH_PARALLEL] Job anulat - {len(unregistered)} fișiere nu se mai înregistrează")
+                pool.shutdown(wait=False, cancel_futures=True)
+                if session_id:
+                    for name in unregistered:
+                        batch_session_manager.update_file_status(session_id, name, "pending")
+                return
+
+            unregistered.discard(file_name)
+            next_name = next(queued, None)
+            if next_name:
+                _mark_processing(next_name)
+
+            try:
+                prepared = future.result()
+            except BrokenProcessPool:
+                broken_files.append(file_name)
+                continue
+            except ValueError as e:
+                # Prindem erorile de la data_parser (ex: CSV invalid)
+                logger.error(f"EROARE la procesarea fișierului '{file_name}': {e}. Se trece la următorul fișier.")
+                _mark_file_failed(session_id, file_name, e)
+                continue
+            except Exception as e:
+                logger.critical(f"EROARE CRITICĂ neașteptată la procesarea fișierului '{file_name}': {e}", exc_info=True)
+                _mark_file_failed(session_id, file_name, e)
+                continue
+
+            _register(file_name, prepared)
+
+    for file_name in broken_files:
+        logger.warning(f"🔁 [BATCH_PARALLEL] Worker oprit neașteptat - reluare izolată pentru '{file_name}'")
+        try:
+            prepared = _run_file_isolated(_path(file_name), file_name, output_folder, window_minutes)
+        except Exception as e:
+            logger.critical(f"EROARE CRITICĂ la reluarea fișierului '{file_name}': {e}", exc_info=True)
+            _mark_file_failed(session_id, file_name, e)
+            continue
+        _register(file_name, prepared)
+
+
+def _finish_uploads(upload_group: UploadGroup, session_id: str = None):
+    """
+    [v3.8] Bariera de upload: așteptăm upload-urile job-ului, apoi trecem
+    înregistrările urcate pe S3. Apelantul marchează sesiunea finalizată abia după.
+
+    Upload-urile încă în curs la expirarea barierei se aplică din callback la
+    terminare; cele eșuate definitiv rămân locale și se reiau la următorul job
+    (`reconcile_local_recordings`). În ambele cazuri sesiunea devine `degraded`.
+    """
+    if not len(upload_group):
+        return
+    from functools import partial
+    from flask import current_app
+    from patient_links import apply_late_recording_upload, apply_recording_uploads
+
+    logger.info(f"⏳ [UPLOAD_EXECUTOR] Așteptăm {len(upload_group)} upload-uri ale job-ului...")
+    finished = upload_group.wait(timeout=config.UPLOAD_EXECUTOR_CONFIG['barrier_timeout_s'])
+    try:
+        # Callback-ul se atașează înainte de aplicare: niciun upload nu scapă între cele două
+        late = 0 if finished else upload_group.on_late_result(
+            partial(apply_late_recording_upload, current_app._get_current_object()))
+        apply_recording_uploads(upload_group)
+    except Exception as e:
+        logger.error(f"❌ [UPLOAD_EXECUTOR] Finalizare upload-uri eșuată: {e}", exc_info=True)
+        return
+
+    failed = len(upload_group.failed())
+    if (late or failed) and session_id:
+        batch_session_manager.mark_session_degraded(
+            session_id, f"{late} upload-uri încă în curs după barieră, {failed} eșuate definitiv")
+
+
+def run_batch_job(input_folder: str, output_folder: str, window_minutes: int, session_id: str = None,
+                  only_files: Optional[List[str]] = None,
+                  should_cancel: Optional[Callable[[], bool]] = None,
+                  force_reprocess: bool = False) -> List[Dict]:
     """
     Execută procesul de generare în lot a imaginilor cu grafice.
     
@@ -287,6 +958,12 @@ def run_batch_job(input_folder: str, output_folder: str, window_minutes: int, se
                              rezultatele.
         window_minutes (int): Durata în minute a fiecărei "felii" de grafic.
         session_id (str, optional): UUID sesiune pentru tracking progres.
+        only_files (list, optional): [v3.6] Procesăm doar aceste CSV-uri (reluare job).
+        should_cancel (callable, optional): [v3.6] Verificat înaintea fiecărui
+                             fișier; True → oprim job-ul (fișierele rămase
+                             rămân "pending" în sesiune).
+        force_reprocess (bool): [v3.7] Reprocesăm și fișierele deja ingerate
+                             (altfel sunt legate de link-ul existent).
                              
     Returns:
         List[Dict]: Listă cu link-urile generate (token, device, date, etc.)
@@ -309,16 +986,28 @@ def run_batch_job(input_folder: str, output_folder: str, window_minutes: int, se
     logger.info("=" * 50)
     
     generated_links = []  # Lista de link-uri generate
+    # [v3.8] Upload-urile S3 ale job-ului (executor partajat) - barieră la final
+    upload_group = UploadGroup(name=(session_id or "batch")[:8])
+    # [v3.9] Metadatele job-ului (link-uri, înregistrări, index) - scrise pe loturi
+    link_writer = None
+    # [v4.0] PDF-urile folderului, indexate o singură dată (aparat, oră)
+    pdf_index = None
 
     try:
+        # [v3.8] Upload-urile rămase locale din job-urile anterioare trec prin bariera acestui job
+        reconcile_local_recordings(upload_group)
+
+        link_writer = LinkBatchWriter(session_id, generated_links)
+
         # Validăm existența folderului de intrare
         if not os.path.isdir(input_folder):
             logger.error(f"Folderul de intrare '{input_folder}' nu există sau nu este un director.")
             return
 
-        # Listăm doar fișierele CSV
+        # Listăm folderul o singură dată: CSV-urile de procesat + indexul PDF
         try:
-            csv_files = [f for f in os.listdir(input_folder) if f.lower().endswith('.csv')]
+            folder_files = os.listdir(input_folder)
+            csv_files = [f for f in folder_files if f.lower().endswith('.csv')]
             if not csv_files:
                 logger.warning(f"Niciun fișier .csv găsit în folderul de intrare '{input_folder}'.")
                 return
@@ -326,10 +1015,41 @@ def run_batch_job(input_folder: str, output_folder: str, window_minutes: int, se
             logger.error(f"Nu s-a putut accesa conținutul folderului de intrare '{input_folder}'. Motiv: {e}")
             return
 
+        # [v3.6] Reluare: doar fișierele rămase neprocesate
+        if only_files is not None:
+            csv_files = [f for f in csv_files if f in set(only_files)]
+
+        pdf_index = BatchPdfIndex(input_folder, folder_files)
+
+        # [v3.7] Fișierele deja ingerate nu se mai parsează/randează
+        if not force_reprocess:
+            csv_files = _skip_ingested_files(csv_files, input_folder, link_writer, pdf_index)
+            if not csv_files:
+                return generated_links
+
         logger.info(f"S-au găsit {len(csv_files)} fișiere CSV pentru procesare.")
 
+        # [v4.0] Rapoartele PDF se parsează din memorie în paralel cu CSV-urile
+        # (doar CSV-urile cu oră în nume: cheia trebuie să fie cea de la asociere, `_pdf_match_time`)
+        pdf_index.prefetch((extract_device_number(f), _pdf_match_time(f)) for f in csv_files
+                           if timestamp_from_filename(f) is not None)
+
+        # [v3.4] Mod paralel (config.BATCH_WORKERS > 1): calculul în procese worker
+        workers = min(config.BATCH_WORKERS, len(csv_files))
+        if workers > 1:
+            _run_files_parallel(csv_files, input_folder, output_folder, window_minutes,
+                                session_id, link_writer, workers, should_cancel, upload_group, pdf_index)
+            return generated_links
+
+        # [v3.2] Fișierul anterior: (date pregătite, lotul de imagini încă în randare)
+        pending_file = None
+
         # Iterăm prin fiecare fișier CSV găsit
         for file_name in csv_files:
+            if should_cancel and should_cancel():
+                logger.warning(f"⏹️ [BATCH] Job anulat - fișierele rămase nu se mai procesează (următorul: {file_name})")
+                break
+
             file_path = os.path.join(input_folder, file_name)
             logger.info(f"--- Procesare fișier: {file_name} ---")
             
@@ -342,354 +1062,44 @@ def run_batch_job(input_folder: str, output_folder: str, window_minutes: int, se
                 )
 
             try:
-                # Citim conținutul fișierului
-                with open(file_path, 'rb') as f:
-                    file_content = f.read()
-
-                # Parsăm și validăm datele folosind modulul dedicat
-                df = parse_csv_data(file_content, file_name)
-
-                # [v2.0] Creăm un sub-folder dedicat cu nume intuitiv bazat pe date și aparat
-                file_output_folder_name = generate_intuitive_folder_name(df, file_name)
-                file_output_path = os.path.join(output_folder, file_output_folder_name)
-                os.makedirs(file_output_path, exist_ok=True)
-                logger.info(f"Folderul de ieșire pentru acest fișier a fost creat la: '{file_output_path}'")
-                
-                # Extragem numărul aparatului pentru numele imaginilor
-                device_number = extract_device_number(file_name)
-
-                # Logica de "feliere"
-                record_start_time = df.index.min()
-                record_end_time = df.index.max()
-                time_window = timedelta(minutes=window_minutes)
-                
-                current_slice_start = record_start_time
-                slice_count = 0
-
-                while current_slice_start < record_end_time:
-                    slice_count += 1
-                    current_slice_end = current_slice_start + time_window
-                    
-                    # Selectăm datele pentru felia curentă
-                    df_slice = df[(df.index >= current_slice_start) & (df.index < current_slice_end)]
-
-                    if df_slice.empty:
-                        logger.warning(f"Felia {slice_count} ({current_slice_start.time()} - {current_slice_end.time()}) nu conține date. Se omite.")
-                        current_slice_start = current_slice_end
-                        continue
-                    
-                    # Generăm graficul pentru felie
-                    fig = create_plot(df_slice, file_name)
-
-                    # [v3.0] Creăm un nume de fișier intuitiv și ușor citibil
-                    image_file_name = generate_intuitive_image_name(df_slice, device_number)
-                    image_full_path = os.path.join(file_output_path, image_file_name)
-
-                    # [v7.0 DEFENSIVE] Salvăm imaginea cu fallback graceful pentru Kaleido/Chrome
-                    try:
-                        fig.write_image(
-                            image_full_path,
-                            width=config.IMAGE_RESOLUTION['width'],
-                            height=config.IMAGE_RESOLUTION['height']
-                        )
-                        logger.info(f"Salvat imaginea: {image_file_name}")
-                        
-                        # Aplicăm logo-ul medicului pe imagine (dacă este configurat)
-                        try:
-                            from plot_generator import apply_logo_to_image
-                            apply_logo_to_image(image_full_path)
-                        except Exception as logo_error:
-                            logger.warning(f"Nu s-a putut aplica logo pe {image_file_name}: {logo_error}")
-                            
-                    except RuntimeError as kaleido_error:
-                        # FALLBACK GRACEFUL: Kaleido necesită Chrome (lipsește din container)
-                        if "Kaleido requires" in str(kaleido_error) or "Chrome" in str(kaleido_error):
-                            logger.warning(
-                                f"⚠️ Kaleido/Chrome indisponibil pentru {image_file_name}. "
-                                f"Export imagini dezactivat. SOLUȚIE: Adaugă 'chromium' în nixpacks.toml"
-                            )
-                            logger.warning(f"Eroare Kaleido: {kaleido_error}")
-                            
-                            # CONTINUĂM procesarea fără imagini (graceful degradation)
-                            # Link-ul pacient va funcționa cu grafice interactive HTML
-                        else:
-                            # Altă eroare runtime - re-raise
-                            raise
-                            
-                    except Exception as img_error:
-                        # Orice altă eroare la salvare imagine
-                        logger.error(
-                            f"❌ Eroare neașteptată la salvarea imaginii {image_file_name}: {img_error}",
-                            exc_info=True
-                        )
-                        # CONTINUĂM procesarea (resilience)
-                    
-                    # Trecem la următoarea felie
-                    current_slice_start = current_slice_end
+                prepared = prepare_batch_file(file_path, file_name, output_folder, window_minutes)
 
-                logger.info(f"Procesare finalizată pentru '{file_name}'. S-au generat {slice_count-1} imagini.")
-                
-                # =====================================================================
-                # [CRITICAL FIX] Generăm link + SALVĂM ÎNREGISTRAREA în PostgreSQL
-                # =====================================================================
-                # BUG IDENTIFICAT: generate_patient_link() era apelat, DAR add_recording() NU!
-                # REZULTAT: Link-uri existau, dar PostgreSQL avea 0 recordings
-                # =====================================================================
-                try:
-                    # [DIAGNOSTIC LOG 1] Pre-processing summary
-                    logger.critical(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-                    logger.critical(f"📋 [BATCH_TRACE] Processing device from CSV: {file_name}")
-                    logger.critical(f"   - Device number extracted: #{device_number}")
-                    logger.critical(f"   - Recording start: {record_start_time}")
-                    logger.critical(f"   - Recording end: {record_end_time}")
-                    logger.critical(f"   - Images generated: {slice_count-1}")
-                    logger.critical(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-                    
-                    # Extragem metadata pentru link
-                    recording_date = record_start_time.strftime('%Y-%m-%d')
-                    start_time_str = record_start_time.strftime('%H:%M:%S')
-                    end_time_str = record_end_time.strftime('%H:%M:%S')
-                    device_display_name = f"Checkme O2 #{device_number}"
-                    
-                    # [DIAGNOSTIC LOG 2] Pre-link creation
-                    logger.critical(f"🔗 [BATCH_TRACE] STEP 1: Creating patient link...")
-                    logger.critical(f"   - Device name: {device_display_name}")
-                    logger.critical(f"   - Recording date: {recording_date}")
-                    logger.critical(f"   - Time range: {start_time_str} → {end_time_str}")
-                    
-                    # Generăm link-ul cu metadata despre folderul de output
-                    token = generate_patient_link(
-                        device_name=device_display_name,
-                        notes=f"Procesare automată batch - {file_name}",
-                        recording_date=recording_date,
-                        start_time=start_time_str,
-                        end_time=end_time_str
-                    )
-                    
-                    # [DIAGNOSTIC LOG 3] Post-link creation
-                    if token:
-                        logger.critical(f"✅ [BATCH_TRACE] STEP 1 COMPLETE: Link created successfully")
-                        logger.critical(f"   - Token: {token}")
-                        logger.critical(f"   - Short token: {token[:8]}...")
-                    else:
-                        logger.critical(f"❌ [BATCH_TRACE] STEP 1 FAILED: Link generation returned None")
-                        raise ValueError(f"Failed to generate patient link for {file_name}")
-                    
-                    if token:
-                        # =====================================================================
-                        # [CRITICAL FIX] STEP 2: Adăugăm înregistrarea în PostgreSQL
-                        # =====================================================================
-                        logger.critical(f"💾 [BATCH_TRACE] STEP 2: Adding recording to PostgreSQL...")
-                        logger.critical(f"   - Token: {token[:8]}...")
-                        logger.critical(f"   - CSV filename: {file_name}")
-                        logger.critical(f"   - CSV size: {len(file_content)} bytes ({len(file_content)/1024:.2f} KB)")
-                        
-                        # Calculăm statistici SpO2 pentru această înregistrare
-                        try:
-                            avg_spo2 = float(df['SpO2 (%)'].mean()) if 'SpO2 (%)' in df.columns else None
-                            min_spo2 = int(df['SpO2 (%)'].min()) if 'SpO2 (%)' in df.columns else None
-                            max_spo2 = int(df['SpO2 (%)'].max()) if 'SpO2 (%)' in df.columns else None
-                            
-                            logger.critical(f"   - SpO2 Stats: avg={avg_spo2:.1f}%, min={min_spo2}%, max={max_spo2}%")
-                        except Exception as stats_error:
-                            logger.warning(f"Nu s-au putut calcula statistici SpO2: {stats_error}")
-                            avg_spo2, min_spo2, max_spo2 = None, None, None
-                        
-                        # [CRITICAL FIX] Apelăm add_recording() pentru a salva în PostgreSQL
-                        recording_added = add_recording(
-                            token=token,
-                            csv_filename=file_name,
-                            csv_content=file_content,
-                            recording_date=recording_date,
-                            start_time=start_time_str,
-                            end_time=end_time_str,
-                            avg_spo2=avg_spo2,
-                            min_spo2=min_spo2,
-                            max_spo2=max_spo2
-                        )
-                        
-                        # [DIAGNOSTIC LOG 4] Post-recording addition
-                        if recording_added:
-                            logger.critical(f"✅ [BATCH_TRACE] STEP 2 COMPLETE: Recording added to PostgreSQL")
-                            
-                            # Verificăm IMEDIAT că înregistrarea există în PostgreSQL
-                            from patient_links import get_patient_recordings
-                            verification_recordings = get_patient_recordings(token)
-                            logger.critical(f"🔍 [BATCH_VERIFY] PostgreSQL verification check:")
-                            logger.critical(f"   - Expected recordings: 1")
-                            logger.critical(f"   - Actual recordings in DB: {len(verification_recordings)}")
-                            logger.critical(f"   - MATCH: {len(verification_recordings) >= 1}")
-                            
-                            if len(verification_recordings) == 0:
-                                logger.critical(f"❌ [BATCH_VERIFY] CRITICAL: Recording add_recording() returned True but PostgreSQL has 0 records!")
-                                logger.critical(f"   - This indicates a database commit issue")
-                            else:
-                                logger.critical(f"✅ [BATCH_VERIFY] Recording successfully persisted in PostgreSQL")
-                                if verification_recordings:
-                                    logger.critical(f"   - Recording ID: {verification_recordings[0].get('recording_id', 'N/A')}")
-                                    logger.critical(f"   - Storage type: {verification_recordings[0].get('storage_type', 'N/A')}")
-                        else:
-                            logger.critical(f"❌ [BATCH_TRACE] STEP 2 FAILED: add_recording() returned False")
-                            logger.critical(f"   - Check PostgreSQL connection and constraints")
-                        
-                        # =====================================================================
-                        # [STEP 3] Salvăm metadata link-ului (output folder, etc.)
-                        # =====================================================================
-                        logger.critical(f"📝 [BATCH_TRACE] STEP 3: Updating link metadata...")
-                        from patient_links import load_patient_links, save_patient_links
-                        links = load_patient_links()
-                        if token in links:
-                            links[token]['output_folder'] = file_output_folder_name
-                            links[token]['output_folder_path'] = file_output_path
-                            links[token]['images_count'] = slice_count - 1
-                            links[token]['output_folder'] = file_output_folder_name
-                            links[token]['output_folder_path'] = file_output_path
-                            links[token]['images_count'] = slice_count - 1
-                            links[token]['original_filename'] = file_name
-                            
-                            logger.critical(f"✅ [BATCH_TRACE] STEP 3 COMPLETE: Metadata updated")
-                            logger.critical(f"   - Output folder: {file_output_folder_name}")
-                            logger.critical(f"   - Images count: {slice_count - 1}")
-                            
-                            # [FIX TEAM] Async Scaleway Upload (Threaded) to prevent 502 Timeout
-                            def upload_r2_background(token_val, content_val, filename_val):
-                                # [ITERATION 2] Thread lifecycle tracking
-                                import threading
-                                thread_id = threading.current_thread().name
-                                logger.warning(f"🧵 [BATCH_THREAD_{thread_id}] Thread STARTED for {token_val[:8]}...")
-                                
-                                try:
-                                    logger.warning(f"🧵 [BATCH_THREAD_{thread_id}] Starting Async Scaleway Upload for {token_val[:8]}...")
-                                    
-                                    # [ITERATION 2] Log file size
-                                    file_size_mb = len(content_val) / (1024 * 1024)
-                                    logger.warning(f"🧵 [BATCH_THREAD_{thread_id}] Upload size: {file_size_mb:.2f} MB")
-                                    
-                                    r2_url = upload_patient_csv(token_val, content_val, filename_val)
-                                    
-                                    # [ITERATION 2] Log return value type
-                                    logger.warning(f"🧵 [BATCH_THREAD_{thread_id}] upload_patient_csv returned: {type(r2_url).__name__}")
-                                    
-                                    if r2_url and (r2_url.startswith('http') or 's3' in r2_url):
-                                        logger.warning(f"☁️ [BATCH_S3_FIX] Async Upload Success: {r2_url}")
-                                        # Update links metadata after success
-                                        current_links = load_patient_links()
-                                        if token_val in current_links:
-                                            # [ITERATION 2] Log metadata state before update
-                                            old_storage = current_links[token_val].get('storage_type', 'unknown')
-                                            logger.warning(f"🔄 [BATCH_METADATA] Updating storage_type: {old_storage} → s3")
-                                            
-                                            current_links[token_val]['r2_url'] = r2_url
-                                            current_links[token_val]['storage_type'] = 's3'
-                                            current_links[token_val]['csv_path'] = f"s3://{token_val}/csvs/{filename_val}"
-                                            save_patient_links(current_links)
-                                            
-                                            logger.warning(f"✅ [BATCH_METADATA] Metadata updated successfully")
-                                    else:
-                                        # [DIAGNOSTIC] Log explicit al valorii returnate
-                                        logger.warning(f"⚠️ [BATCH_S3_FIX] S3 Upload returned fallback path: '{r2_url}'")
-                                        logger.warning(f"   - Reason: URL does not start with 'http' or 's3'")
-                                        logger.warning(f"   - Action: Keeping storage_type='local'")
-                                        # Nu actualizăm la 'r2', rămâne 'local' cum a fost setat inițial
-                                        
-                                    # [ITERATION 2] Thread completion log
-                                    logger.warning(f"🧵 [BATCH_THREAD_{thread_id}] Thread COMPLETED for {token_val[:8]}")
-                                    
-                                except FileNotFoundError as fnf:
-                                    logger.error(f"❌ [BATCH_SCALEWAY_FIX] File Not Found Error: {fnf}")
-                                except KeyError as ke:
-                                    logger.error(f"❌ [BATCH_SCALEWAY_FIX] Metadata Key Error: {ke}")
-                                except Exception as e:
-                                    logger.error(f"❌ [BATCH_SCALEWAY_FIX] Async R2 Error: {e}", exc_info=True)
-                                finally:
-                                    logger.warning(f"🧵 [BATCH_THREAD_{thread_id}] Thread FINISHED (cleanup)")
-
-                            # Start the thread
-                            r2_filename = f"recording_batch_{token[:8]}_{file_name}"
-                            threading.Thread(target=upload_r2_background, args=(token, file_content, r2_filename)).start()
-                            
-                            # Initial save as 'local' (will be updated by thread)
-                            links[token]['storage_type'] = 'local' 
-                            save_patient_links(links)
-                        
-                        # [NEW v5.0] Căutăm și procesăm PDF asociat (același folder, același device)
-                        try:
-                            pdf_processed = process_associated_pdf(input_folder, file_name, device_number, token)
-                            if pdf_processed:
-                                logger.info(f"📄 PDF asociat procesat pentru {device_display_name}")
-                        except Exception as pdf_error:
-                            logger.warning(f"Nu s-a putut procesa PDF asociat pentru '{file_name}': {pdf_error}")
-                        
-                        generated_links.append({
-                            "token": token,
-                            "device_name": device_display_name,
-                            "device_number": device_number,
-                            "recording_date": recording_date,
-                            "start_time": start_time_str,
-                            "end_time": end_time_str,
-                            "original_filename": file_name,
-                            "output_folder": file_output_folder_name,
-                            "images_count": slice_count - 1,
-                            "recording_saved_to_db": recording_added
-                        })
-                        
-                        # [DIAGNOSTIC LOG 5] Final summary
-                        logger.critical(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-                        logger.critical(f"✅ [BATCH_SUMMARY] Processing complete for {file_name}")
-                        logger.critical(f"   - Token: {token}")
-                        logger.critical(f"   - Device: {device_display_name}")
-                        logger.critical(f"   - Output folder: {file_output_folder_name}")
-                        logger.critical(f"   - Images generated: {slice_count - 1}")
-                        logger.critical(f"   - Recording in PostgreSQL: {recording_added}")
-                        logger.critical(f"   - PDF associated: {pdf_processed}")
-                        logger.critical(f"   - Link URL: https://pulsoximetrie.cardiohelpteam.ro/?token={token}")
-                        logger.critical(f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-                        
-                        # [NEW v6.0] Actualizăm status la "completed" pentru tracking
-                        if session_id:
-                            pdf_name = f"Checkme O2 {device_number}*.pdf" if pdf_processed else None
-                            batch_session_manager.update_file_status(
-                                session_id, 
-                                file_name, 
-                                "completed",
-                                token=token,
-                                pdf_associated=pdf_name
-                            )
-                    else:
-                        logger.warning(f"Nu s-a putut genera link pentru '{file_name}'")
-                        
-                except Exception as link_error:
-                    logger.error(f"Eroare la generarea link-ului pentru '{file_name}': {link_error}", exc_info=True)
+                # [v3.2] Pipelining: lotul fișierului curent se randează în worker
+                # în timp ce finalizăm imaginile fișierului anterior și trecem mai departe
+                current_images = submit_slice_images(file_name, prepared.pop("slice_jobs"))
 
             except ValueError as e:
                 # Prindem erorile de la data_parser (ex: CSV invalid)
                 logger.error(f"EROARE la procesarea fișierului '{file_name}': {e}. Se trece la următorul fișier.")
                 
                 # [NEW v6.0] Actualizăm status la "failed" pentru tracking
-                if session_id:
-                    batch_session_manager.update_file_status(
-                        session_id, 
-                        file_name, 
-                        "failed",
-                        error=str(e)
-                    )
-                    
+                _mark_file_failed(session_id, file_name, e)
+                continue
+
             except Exception as e:
                 # Prindem orice altă eroare neașteptată
                 logger.critical(f"EROARE CRITICĂ neașteptată la procesarea fișierului '{file_name}': {e}", exc_info=True)
                 
                 # [NEW v6.0] Actualizăm status la "failed" pentru tracking
-                if session_id:
-                    batch_session_manager.update_file_status(
-                        session_id, 
-                        file_name, 
-                        "failed",
-                        error=str(e)
-                    )
+                _mark_file_failed(session_id, file_name, e)
+                continue
+
+            _complete_pipelined_file(pending_file, session_id, input_folder, link_writer, upload_group, pdf_index)
+            pending_file = (prepared, current_images)
+
+        _complete_pipelined_file(pending_file, session_id, input_folder, link_writer, upload_group, pdf_index)
 
     except Exception as e:
         logger.critical(f"O eroare critică a oprit procesul de batch: {e}", exc_info=True)
     finally:
+        if link_writer is not None:
+            link_writer.flush()
+        if pdf_index is not None:
+            pdf_index.close()
+        _finish_uploads(upload_group, session_id)
+        if not config.KALEIDO_WORKER_CONFIG['keep_alive']:
+            from render_worker import shutdown_render_worker
+            shutdown_render_worker()
         logger.info("=" * 50)
         logger.info("PROCESUL DE PROCESARE ÎN LOT (BATCH) S-A FINALIZAT.")
         logger.info(f"🔗 Link-uri generate: {len(generated_links)}")
@@ -9,18 +9,25 @@ FUNCȚIONALITĂȚI:
 - Istoric sesiuni cu statistici
 - Backup incremental pentru reziliență
 
-STORAGE:
-- batch_sessions/{session_id}/
-  - session_metadata.json (status, timestamp, total_files)
-  - files_progress.json (listă fișiere cu status)
-  - processed_files/ (copii CSV procesate)
+STORAGE (v2.0 - SQLite, O(1) per actualizare):
+- batch_sessions/progress.sqlite3 (WAL - sigur pentru mai multe procese/thread-uri)
+  - batch_sessions: o linie per sesiune, cu contoarele (processed/failed/processing)
+  - batch_session_files: o linie per fișier, cheie (session_id, filename)
+- `update_file_status` = o tranzacție: UPDATE pe rândul fișierului + incrementarea
+  contoarelor sesiunii (fără citirea/rescrierea tuturor fișierelor și a indexului)
+- `get_session_summary` / `get_all_sessions`: citiri pe un index, pentru polling
+- `version` crește la fiecare schimbare; polling-ul de progres
+  (progress_stream.py) compară doar `version` (`get_session_version`)
+- Sesiunile vechi (session_metadata.json / files_progress.json / sessions_index.json)
+  se importă automat la primul acces
+- batch_sessions/{session_id}/processed_files/ (copii CSV procesate)
 
 MODEL DATE:
 {
   "session_id": "uuid",
   "created_at": "2025-11-11T20:30:00",
   "updated_at": "2025-11-11T20:35:00",
-  "status": "in_progress|completed|failed|paused",
+  "status": "in_progress|completed|degraded|failed|paused",
   "total_files": 10,
   "processed_files": 7,
   "failed_files": 1,
@@ -41,8 +48,11 @@ PRIVACY: Zero date personale, doar metadata tehnică.
 import os
 import json
 import uuid
+import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional
 from pathlib import Path
 
 from logger_setup import logger
@@ -51,9 +61,100 @@ from logger_setup import logger
 BATCH_SESSIONS_DIR = Path("batch_sessions")
 BATCH_SESSIONS_DIR.mkdir(exist_ok=True)
 
-# Fișier index global cu toate sesiunile
+# [v2.0] Store-ul de progres (SQLite)
+PROGRESS_DB_FILE = BATCH_SESSIONS_DIR / "progress.sqlite3"
+
+# Fișier index global (format vechi, doar pentru import)
 SESSIONS_INDEX_FILE = BATCH_SESSIONS_DIR / "sessions_index.json"
 
+_SESSION_COLUMNS = ("session_id", "created_at", "updated_at", "status", "total_files",
+                    "processed_files", "failed_files", "paused_files")
+_FILE_COLUMNS = ("filename", "status", "token", "processed_at", "error", "pdf_associated")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_sessions (
+    session_id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total_files INTEGER NOT NULL DEFAULT 0,
+    processed_files INTEGER NOT NULL DEFAULT 0,
+    failed_files INTEGER NOT NULL DEFAULT 0,
+    paused_files INTEGER NOT NULL DEFAULT 0,
+    processing_files INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS ix_batch_sessions_created_at ON batch_sessions (created_at);
+CREATE TABLE IF NOT EXISTS batch_session_files (
+    session_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    token TEXT,
+    processed_at TEXT,
+    error TEXT,
+    pdf_associated TEXT,
+    PRIMARY KEY (session_id, filename)
+);
+CREATE TABLE IF NOT EXISTS batch_sessions_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Contorul afectat de fiecare status (celelalte statusuri nu se numără)
+_STATUS_COUNTERS = {
+    "completed": "processed_files",
+    "failed": "failed_files",
+    "processing": "processing_files",
+}
+
+_local = threading.local()
+
+
+def _connection() -> sqlite3.Connection:
+    """Conexiunea thread-ului curent (redeschisă după fork)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None and getattr(_local, "pid", None) == os.getpid():
+        return conn
+
+    BATCH_SESSIONS_DIR.mkdir(exist_ok=True)
+    conn = sqlite3.connect(str(PROGRESS_DB_FILE), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(batch_sessions)")}
+    if "version" not in columns:
+        conn.execute("ALTER TABLE batch_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    _local.conn = conn
+    _local.pid = os.getpid()
+    _import_legacy_index(conn)
+    return conn
+
+
+@contextmanager
+def _write_transaction():
+    """Tranzacție de scriere (BEGIN IMMEDIATE - scriitorii concurenți se serializează)."""
+    conn = _connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def _session_row(conn: sqlite3.Connection, session_id: str) -> Optional[Dict]:
+    row = conn.execute(
+        f"SELECT {', '.join(_SESSION_COLUMNS)} FROM batch_sessions WHERE session_id = ?",
+        (session_id,)
+    ).fetchone()
+    if row is None and _import_legacy_session(conn, session_id):
+        return _session_row(conn, session_id)
+    return dict(row) if row is not None else None
+
 
 def create_batch_session(total_files: int, file_list: List[str]) -> str:
     """
@@ -73,42 +174,19 @@ def create_batch_session(total_files: int, file_list: List[str]) -> str:
     # Creare subdirectoare
     (session_dir / "processed_files").mkdir(exist_ok=True)
     
-    # Metadata sesiune
-    session_metadata = {
-        "session_id": session_id,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat(),
-        "status": "pending",
-        "total_files": total_files,
-        "processed_files": 0,
-        "failed_files": 0,
-        "paused_files": 0
-    }
-    
-    # Lista fișiere cu status inițial
-    files_progress = {
-        "files": [
-            {
-                "filename": filename,
-                "status": "pending",
-                "token": None,
-                "processed_at": None,
-                "error": None,
-                "pdf_associated": None
-            }
-            for filename in file_list
-        ]
-    }
-    
-    # Salvare metadata
-    with open(session_dir / "session_metadata.json", "w", encoding="utf-8") as f:
-        json.dump(session_metadata, f, indent=2, ensure_ascii=False)
-    
-    with open(session_dir / "files_progress.json", "w", encoding="utf-8") as f:
-        json.dump(files_progress, f, indent=2, ensure_ascii=False)
-    
-    # Actualizare index global
-    _update_sessions_index(session_id, session_metadata)
+    now = datetime.now().isoformat()
+    with _write_transaction() as conn:
+        conn.execute(
+            "INSERT INTO batch_sessions (session_id, created_at, updated_at, status, total_files) "
+            "VALUES (?, ?, ?, 'pending', ?)",
+            (session_id, now, now, total_files)
+        )
+        # Lista fișiere cu status inițial (un nume duplicat apare o singură dată)
+        conn.executemany(
+            "INSERT OR IGNORE INTO batch_session_files (session_id, filename, position, status) "
+            "VALUES (?, ?, ?, 'pending')",
+            [(session_id, filename, position) for position, filename in enumerate(file_list)]
+        )
     
     logger.info(f"✅ Sesiune batch creată: {session_id} ({total_files} fișiere)")
     return session_id
@@ -125,6 +203,9 @@ def update_file_status(
     """
     Actualizează statusul unui fișier în sesiunea batch.
     
+    [v2.0] O(1): rândul fișierului + incrementarea contoarelor sesiunii,
+    într-o singură tranzacție.
+    
     Args:
         session_id: UUID sesiune
         filename: Numele fișierului
@@ -136,47 +217,61 @@ def update_file_status(
     Returns:
         True dacă actualizare reușită
     """
-    session_dir = BATCH_SESSIONS_DIR / session_id
-    
-    if not session_dir.exists():
-        logger.error(f"❌ Sesiune {session_id} nu există")
-        return False
-    
-    # Citire progress actual
-    progress_file = session_dir / "files_progress.json"
-    with open(progress_file, "r", encoding="utf-8") as f:
-        files_progress = json.load(f)
-    
-    # Găsire și actualizare fișier
-    file_found = False
-    for file_entry in files_progress["files"]:
-        if file_entry["filename"] == filename:
-            file_entry["status"] = status
-            file_entry["processed_at"] = datetime.now().isoformat()
-            if token:
-                file_entry["token"] = token
-            if error:
-                file_entry["error"] = error
-            if pdf_associated:
-                file_entry["pdf_associated"] = pdf_associated
-            file_found = True
-            break
-    
-    if not file_found:
-        logger.warning(f"⚠️ Fișier {filename} nu găsit în sesiune {session_id}")
-        return False
-    
-    # Salvare progress actualizat
-    with open(progress_file, "w", encoding="utf-8") as f:
-        json.dump(files_progress, f, indent=2, ensure_ascii=False)
-    
-    # Actualizare metadata sesiune (contoare)
-    _update_session_counters(session_id)
+    now = datetime.now().isoformat()
+    with _write_transaction() as conn:
+        if _session_row(conn, session_id) is None:
+            logger.error(f"❌ Sesiune {session_id} nu există")
+            return False
+        
+        row = conn.execute(
+            "SELECT status FROM batch_session_files WHERE session_id = ? AND filename = ?",
+            (session_id, filename)
+        ).fetchone()
+        if row is None:
+            logger.warning(f"⚠️ Fișier {filename} nu găsit în sesiune {session_id}")
+            return False
+        
+        conn.execute(
+            "UPDATE batch_session_files SET status = ?, processed_at = ?, "
+            "token = COALESCE(?, token), error = COALESCE(?, error), "
+            "pdf_associated = COALESCE(?, pdf_associated) "
+            "WHERE session_id = ? AND filename = ?",
+            (status, now, token or None, error or None, pdf_associated or None, session_id, filename)
+        )
+        
+        # Contoarele: -1 pe statusul vechi, +1 pe cel nou
+        deltas = {}
+        old_counter = _STATUS_COUNTERS.get(row["status"])
+        new_counter = _STATUS_COUNTERS.get(status)
+        if old_counter != new_counter:
+            if old_counter:
+                deltas[old_counter] = deltas.get(old_counter, 0) - 1
+            if new_counter:
+                deltas[new_counter] = deltas.get(new_counter, 0) + 1
+        _apply_counter_deltas(conn, session_id, deltas, now)
     
     logger.info(f"📝 Actualizat: {filename} → {status} (sesiune {session_id[:8]}...)")
     return True
 
 
+def get_session_summary(session_id: str) -> Optional[Dict]:
+    """
+    [v2.0] Doar metadata sesiunii (contoare, status) - o citire pe cheie primară,
+    pentru callback-ul de polling al progresului.
+    """
+    if not session_id:
+        return None
+    return _session_row(_connection(), session_id)
+
+
+def get_session_version(session_id: str) -> Optional[int]:
+    """Versiunea curentă a sesiunii (crește la fiecare schimbare) sau None."""
+    row = _connection().execute(
+        "SELECT version FROM batch_sessions WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    return row["version"] if row is not None else None
+
+
 def get_session_progress(session_id: str) -> Optional[Dict]:
     """
     Obține progresul curent al sesiunii.
@@ -184,42 +279,45 @@ def get_session_progress(session_id: str) -> Optional[Dict]:
     Returns:
         Dict cu metadata și progress sau None
     """
-    session_dir = BATCH_SESSIONS_DIR / session_id
-    
-    if not session_dir.exists():
+    conn = _connection()
+    metadata = _session_row(conn, session_id)
+    if metadata is None:
         return None
     
-    # Citire metadata
-    with open(session_dir / "session_metadata.json", "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    
-    # Citire progress fișiere
-    with open(session_dir / "files_progress.json", "r", encoding="utf-8") as f:
-        files_progress = json.load(f)
+    rows = conn.execute(
+        f"SELECT {', '.join(_FILE_COLUMNS)} FROM batch_session_files WHERE session_id = ? ORDER BY position",
+        (session_id,)
+    ).fetchall()
     
     return {
         "metadata": metadata,
-        "files": files_progress["files"]
+        "files": [dict(row) for row in rows]
     }
 
 
-def get_pending_files(session_id: str) -> List[Dict]:
+def get_pending_files(session_id: str, include_interrupted: bool = False) -> List[Dict]:
     """
     Obține lista fișierelor neprocesate (pending) din sesiune.
     Folosit pentru reluare automată.
     
+    Args:
+        session_id: UUID sesiune
+        include_interrupted: Include și fișierele rămase "processing" (worker oprit în timpul lor)
+    
     Returns:
         Lista cu fișiere pending
     """
-    progress = get_session_progress(session_id)
-    
-    if not progress:
+    conn = _connection()
+    if _session_row(conn, session_id) is None:
         return []
     
-    pending_files = [
-        file_entry for file_entry in progress["files"]
-        if file_entry["status"] == "pending"
-    ]
+    statuses = ("pending", "processing") if include_interrupted else ("pending",)
+    rows = conn.execute(
+        f"SELECT {', '.join(_FILE_COLUMNS)} FROM batch_session_files "
+        f"WHERE session_id = ? AND status IN ({', '.join('?' * len(statuses))}) ORDER BY position",
+        (session_id, *statuses)
+    ).fetchall()
+    pending_files = [dict(row) for row in rows]
     
     logger.info(f"📋 Găsite {len(pending_files)} fișiere pending în sesiune {session_id[:8]}...")
     return pending_files
@@ -235,109 +333,149 @@ def get_all_sessions(limit: int = 20) -> List[Dict]:
     Returns:
         Lista cu metadata sesiuni, sortate descrescător după dată
     """
-    if not SESSIONS_INDEX_FILE.exists():
-        return []
-    
-    with open(SESSIONS_INDEX_FILE, "r", encoding="utf-8") as f:
-        sessions_index = json.load(f)
-    
-    # Sortare după created_at (descrescător)
-    sessions_list = list(sessions_index.get("sessions", {}).values())
-    sessions_list.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-    
-    return sessions_list[:limit]
+    rows = _connection().execute(
+        "SELECT session_id, created_at, updated_at, status, total_files, processed_files, failed_files "
+        "FROM batch_sessions ORDER BY created_at DESC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    return [dict(row) for row in rows]
 
 
 def mark_session_completed(session_id: str) -> bool:
     """
-    Marchează sesiunea ca fiind completată.
+    Marchează sesiunea ca fiind completată (o sesiune `degraded` rămâne așa).
     """
-    session_dir = BATCH_SESSIONS_DIR / session_id
-    
-    if not session_dir.exists():
-        return False
-    
-    # Citire metadata
-    metadata_file = session_dir / "session_metadata.json"
-    with open(metadata_file, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    
-    metadata["status"] = "completed"
-    metadata["updated_at"] = datetime.now().isoformat()
-    
-    with open(metadata_file, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    
-    # Actualizare index
-    _update_sessions_index(session_id, metadata)
+    with _write_transaction() as conn:
+        if _session_row(conn, session_id) is None:
+            return False
+        conn.execute(
+            "UPDATE batch_sessions SET status = 'completed', updated_at = ?, version = version + 1 "
+            "WHERE session_id = ? AND status != 'degraded'",
+            (datetime.now().isoformat(), session_id)
+        )
     
     logger.info(f"✅ Sesiune {session_id[:8]}... marcată ca COMPLETĂ")
     return True
 
 
-def _update_session_counters(session_id: str):
+def mark_session_degraded(session_id: str, reason: str) -> bool:
     """
-    Actualizează contoarele (processed_files, failed_files) din metadata.
+    Marchează sesiunea ca `degraded`: fișierele sunt procesate, dar o parte din
+    upload-urile S3 nu s-au terminat la barieră (se reiau la următorul job).
     """
-    session_dir = BATCH_SESSIONS_DIR / session_id
-    
-    # Citire progress
-    with open(session_dir / "files_progress.json", "r", encoding="utf-8") as f:
-        files_progress = json.load(f)
-    
-    # Calcul contoare
-    completed = sum(1 for f in files_progress["files"] if f["status"] == "completed")
-    failed = sum(1 for f in files_progress["files"] if f["status"] == "failed")
-    processing = sum(1 for f in files_progress["files"] if f["status"] == "processing")
-    
-    # Citire și actualizare metadata
-    metadata_file = session_dir / "session_metadata.json"
-    with open(metadata_file, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-    
-    metadata["processed_files"] = completed
-    metadata["failed_files"] = failed
-    metadata["updated_at"] = datetime.now().isoformat()
-    
-    # Actualizare status sesiune
-    if completed + failed == metadata["total_files"]:
-        metadata["status"] = "completed"
-    elif processing > 0:
-        metadata["status"] = "in_progress"
-    
-    with open(metadata_file, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    
-    # Actualizare index global
-    _update_sessions_index(session_id, metadata)
+    with _write_transaction() as conn:
+        if _session_row(conn, session_id) is None:
+            return False
+        conn.execute(
+            "UPDATE batch_sessions SET status = 'degraded', updated_at = ?, version = version + 1 WHERE session_id = ?",
+            (datetime.now().isoformat(), session_id)
+        )
+    
+    logger.warning(f"⚠️ Sesiune {session_id[:8]}... marcată ca DEGRADATĂ: {reason}")
+    return True
 
 
-def _update_sessions_index(session_id: str, metadata: Dict):
+def _apply_counter_deltas(conn: sqlite3.Connection, session_id: str, deltas: Dict[str, int], now: str):
     """
-    Actualizează index-ul global cu toate sesiunile.
+    Incrementează contoarele și recalculează statusul sesiunii în SQL
+    (aceleași reguli ca înainte: toate terminate → completed, ceva în lucru → in_progress).
     """
-    # Citire index existent
-    if SESSIONS_INDEX_FILE.exists():
+    assignments = [f"{column} = {column} + ?" for column in deltas]
+    conn.execute(
+        f"UPDATE batch_sessions SET {', '.join(assignments + ['updated_at = ?', 'version = version + 1'])} "
+        f"WHERE session_id = ?",
+        (*deltas.values(), now, session_id)
+    )
+    conn.execute(
+        "UPDATE batch_sessions SET status = CASE "
+        "WHEN processed_files + failed_files = total_files THEN 'completed' "
+        "WHEN processing_files > 0 THEN 'in_progress' "
+        "ELSE status END "
+        "WHERE session_id = ?",
+        (session_id,)
+    )
+
+
+# ==============================================================================
+# IMPORT SESIUNI VECHI (JSON)
+# ==============================================================================
+
+def _import_legacy_index(conn: sqlite3.Connection):
+    """Sesiunile din `sessions_index.json` (o singură dată per store)."""
+    if not SESSIONS_INDEX_FILE.exists():
+        return
+    if conn.execute("SELECT 1 FROM batch_sessions_meta WHERE key = 'legacy_index_imported'").fetchone():
+        return
+    try:
         with open(SESSIONS_INDEX_FILE, "r", encoding="utf-8") as f:
-            sessions_index = json.load(f)
-    else:
-        sessions_index = {"sessions": {}}
-    
-    # Actualizare sesiune
-    sessions_index["sessions"][session_id] = {
-        "session_id": session_id,
-        "created_at": metadata.get("created_at"),
-        "updated_at": metadata.get("updated_at"),
-        "status": metadata.get("status"),
-        "total_files": metadata.get("total_files"),
-        "processed_files": metadata.get("processed_files", 0),
-        "failed_files": metadata.get("failed_files", 0)
-    }
-    
-    # Salvare index
-    with open(SESSIONS_INDEX_FILE, "w", encoding="utf-8") as f:
-        json.dump(sessions_index, f, indent=2, ensure_ascii=False)
+            sessions = json.load(f).get("sessions", {})
+        imported = 0
+        conn.execute("BEGIN IMMEDIATE")
+        for session_id in sessions:
+            imported += int(_import_legacy_session(conn, session_id, in_transaction=True))
+        conn.execute("INSERT OR REPLACE INTO batch_sessions_meta (key, value) VALUES ('legacy_index_imported', ?)",
+                     (datetime.now().isoformat(),))
+        conn.execute("COMMIT")
+        if imported:
+            logger.info(f"📦 {imported} sesiuni batch vechi (JSON) importate în {PROGRESS_DB_FILE}")
+    except Exception as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        logger.warning(f"⚠️ Import index sesiuni vechi eșuat: {e}")
 
 
-logger.info("✅ Modulul batch_session_manager.py inițializat cu succes.")
+def _import_legacy_session(conn: sqlite3.Connection, session_id: str, in_transaction: bool = None) -> bool:
+    """O sesiune în format vechi (session_metadata.json + files_progress.json) → SQLite."""
+    if not session_id:
+        return False
+    session_dir = BATCH_SESSIONS_DIR / session_id
+    metadata_file = session_dir / "session_metadata.json"
+    if not metadata_file.exists():
+        return False
+    try:
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        files = []
+        progress_file = session_dir / "files_progress.json"
+        if progress_file.exists():
+            with open(progress_file, "r", encoding="utf-8") as f:
+                files = json.load(f).get("files", [])
+    except Exception as e:
+        logger.warning(f"⚠️ Sesiune veche ilizibilă {session_id[:8]}...: {e}")
+        return False
+
+    processing = sum(1 for entry in files if entry.get("status") == "processing")
+    own_transaction = not conn.in_transaction if in_transaction is None else not in_transaction
+    if own_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "INSERT OR IGNORE INTO batch_sessions (session_id, created_at, updated_at, status, total_files, "
+            "processed_files, failed_files, paused_files, processing_files) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (session_id,
+             metadata.get("created_at") or datetime.now().isoformat(),
+             metadata.get("updated_at") or metadata.get("created_at") or datetime.now().isoformat(),
+             metadata.get("status") or "pending",
+             metadata.get("total_files", len(files)),
+             metadata.get("processed_files", 0),
+             metadata.get("failed_files", 0),
+             metadata.get("paused_files", 0),
+             processing)
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO batch_session_files (session_id, filename, position, status, token, "
+            "processed_at, error, pdf_associated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(session_id, entry.get("filename"), position, entry.get("status") or "pending",
+              entry.get("token"), entry.get("processed_at"), entry.get("error"), entry.get("pdf_associated"))
+             for position, entry in enumerate(files) if entry.get("filename")]
+        )
+        if own_transaction:
+            conn.execute("COMMIT")
+    except Exception:
+        if own_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    return True
 
+
+logger.info("✅ Modulul batch_session_manager.py inițializat cu succes.")
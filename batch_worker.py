@@ -0,0 +1,87 @@
+# ==============================================================================
+# batch_worker.py - Worker separat pentru coada de job-uri batch
+# ------------------------------------------------------------------------------
+# ROL: Proces dedicat care preia job-urile din tabela `batch_jobs` (job_queue)
+#      și rulează `run_batch_job` în afara workerilor gunicorn.
+#
+# UTILIZARE:
+#   PULSOX_BATCH_QUEUE_MODE=worker   (în procesul web - dezactivează worker-ul inline)
+#   python batch_worker.py           (buclă continuă)
+#   python batch_worker.py --once    (un singur job, apoi ieșire)
+#
+# CERINȚĂ: Același DATABASE_URL și ACELAȘI filesystem ca procesul web
+#          (temp_uploads/, batch_sessions/, output/).
+#
+# NOTĂ: Nu face parte din Procfile - modul implicit e 'inline', iar un proces
+#       Procfile separat rulează în alt container (alt disc, nu vede CSV-urile
+#       scrise de web) și ar fi al doilea consumator al cozii. Se pornește doar
+#       lângă procesul web, pe același disc, cu PULSOX_BATCH_QUEUE_MODE=worker.
+# ==============================================================================
+
+import os
+import sys
+import signal
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_worker_app():
+    """Aplicație Flask minimă (fără Dash/callbacks) - doar pentru DB."""
+    from dotenv import load_dotenv
+    from flask import Flask
+    from shared.runtime_mode import (
+        apply_default_patient_links_storage_mode,
+        is_cloud_runtime,
+        resolve_database_url,
+        sqlalchemy_engine_options,
+    )
+    from auth.models import init_db
+
+    load_dotenv()
+    apply_default_patient_links_storage_mode()
+
+    database_url = resolve_database_url()
+    if is_cloud_runtime() and not (database_url or "").strip():
+        raise RuntimeError("DATABASE_URL unavailable în mediul cloud")
+
+    flask_app = Flask("pulsox_batch_worker")
+    flask_app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    flask_app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    flask_app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlalchemy_engine_options(database_url)
+    init_db(flask_app)
+    return flask_app
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Worker coadă job-uri batch pulsoximetrie")
+    parser.add_argument("--once", action="store_true", help="Procesează cel mult un job și iese")
+    parser.add_argument("--worker-id", default=None, help="Identificator worker (implicit host:pid)")
+    args = parser.parse_args(argv)
+
+    from logger_setup import logger
+    import config
+    import job_queue
+
+    # Procesul dedicat păstrează browserul Kaleido între job-uri (în procesul web
+    # se închide la finalul fiecărui job), cu excepția unei setări explicite
+    if "PULSOX_KALEIDO_KEEP_ALIVE" not in os.environ:
+        config.KALEIDO_WORKER_CONFIG['keep_alive'] = True
+
+    flask_app = create_worker_app()
+    stop_event = threading.Event()
+
+    def _request_stop(signum, _frame):
+        logger.warning(f"🛑 [BATCH_WORKER] Semnal {signum} primit - oprire după job-ul curent")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    job_queue.work_loop(flask_app, worker_id=args.worker_id, once=args.once, stop_event=stop_event)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
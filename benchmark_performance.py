@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+==============================================================================
+benchmark_performance.py - BENCHMARK PERFORMANȚĂ PIPELINE PULSOXIMETRIE
+==============================================================================
+ROL: Măsoară throughput-ul etapelor costisitoare pe înregistrări reale de o
+     noapte din `bach data/` și compară calea nouă cu implementarea anterioară:
+     - BENCHMARK 1: Parsare CSV (calea rapidă Checkme O2 vs. calea generică)
+     - BENCHMARK 2: Densificare gradient SaO2 (np.interp vs. reindex/interpolate)
+
+ACTIVARE: Rulați "python benchmark_performance.py [număr_repetări]"
+==============================================================================
+"""
+
+import os
+import sys
+import glob
+import time
+import logging
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+BENCH_DATA_DIR = "bach data"
+DEFAULT_REPEATS = 5
+
+
+# ==============================================================================
+# UTILITIES
+# ==============================================================================
+
+def _silence_app_logger():
+    """Logging-ul INFO per fișier ar domina măsurătorile - îl oprim pe durata benchmark-ului."""
+    from logger_setup import logger
+    logger.setLevel(logging.ERROR)
+
+
+def _best_of(func: Callable[[], object], repeats: int) -> float:
+    """Returnează cel mai bun timp (secunde) din `repeats` rulări."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _load_bench_files() -> Dict[str, bytes]:
+    files = sorted(glob.glob(os.path.join(BENCH_DATA_DIR, "*.csv")))
+    contents = {}
+    for path in files:
+        with open(path, "rb") as f:
+            contents[os.path.basename(path)] = f.read()
+    return contents
+
+
+def _print_header(title: str):
+    print(f"\n{'=' * 78}")
+    print(f">>> {title}")
+    print(f"{'=' * 78}")
+
+
+# ==============================================================================
+# BENCHMARK 1: PARSARE CSV
+# ==============================================================================
+
+def benchmark_csv_parsing(contents: Dict[str, bytes], repeats: int) -> List[Dict]:
+    """Compară `parse_csv_data` (cale rapidă) cu calea generică v2.1."""
+    from data_parser import parse_csv_data, _parse_csv_generic
+
+    _print_header("BENCHMARK 1: PARSARE CSV (rapid vs. generic)")
+    print(f"{'Fișier':<40} {'Rânduri':>8} {'Generic':>10} {'Rapid':>10} {'Speedup':>8}")
+
+    results = []
+    for name, content in contents.items():
+        rows = len(parse_csv_data(content, name))
+        generic_s = _best_of(lambda: _parse_csv_generic(content, name), repeats)
+        fast_s = _best_of(lambda: parse_csv_data(content, name), repeats)
+        results.append({"file": name, "rows": rows, "generic_s": generic_s, "fast_s": fast_s})
+        print(f"{name:<40} {rows:>8} {generic_s * 1000:>8.1f}ms {fast_s * 1000:>8.1f}ms {generic_s / fast_s:>7.1f}x")
+
+    total_rows = sum(r["rows"] for r in results)
+    total_generic = sum(r["generic_s"] for r in results)
+    total_fast = sum(r["fast_s"] for r in results)
+    print("-" * 78)
+    print(f"{'TOTAL':<40} {total_rows:>8} {total_generic * 1000:>8.1f}ms {total_fast * 1000:>8.1f}ms {total_generic / total_fast:>7.1f}x")
+    print(f"Throughput: generic {total_rows / total_generic:,.0f} rânduri/s | rapid {total_rows / total_fast:,.0f} rânduri/s")
+    return results
+
+
+# ==============================================================================
+# BENCHMARK 2: DENSIFICARE GRADIENT
+# ==============================================================================
+
+def _interpolate_data_reference(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Implementarea anterioară din plot_generator (v12.0) - referința pentru comparație."""
+    new_index = pd.date_range(start=df.index.min(), end=df.index.max(), periods=len(df) * factor)
+    return df.reindex(df.index.union(new_index)).interpolate(method='time').loc[new_index]
+
+
+def benchmark_densification(contents: Dict[str, bytes], repeats: int) -> List[Dict]:
+    """
+    Compară `interpolate_data` vectorizat cu implementarea anterioară, la același
+    factor (fără plafon) și verifică identitatea rezultatului; raportează și
+    factorul adaptiv ales sub plafonul configurat.
+    """
+    import config
+    from data_parser import parse_csv_data
+    from plot_generator import interpolate_data, resolve_densification_factor
+
+    spo2_style = config.GOLDEN_STYLE['traces']['spo2']
+    factor = spo2_style['interpolation_factor']
+    cap = spo2_style.get('max_dense_markers')
+
+    _print_header(f"BENCHMARK 2: DENSIFICARE GRADIENT (factor {factor}, plafon {cap})")
+    print(f"{'Fișier':<40} {'Puncte':>8} {'Anterior':>10} {'Vector.':>10} {'Speedup':>8} {'Adaptiv':>8}")
+
+    results = []
+    for name, content in contents.items():
+        df = parse_csv_data(content, name)[['SpO2']]
+        reference = _interpolate_data_reference(df, factor)
+        dense = interpolate_data(df, factor, max_points=0)
+        identical = reference.index.equals(dense.index) and np.array_equal(reference['SpO2'].values, dense['SpO2'].values)
+
+        before_s = _best_of(lambda: _interpolate_data_reference(df, factor), repeats)
+        after_s = _best_of(lambda: interpolate_data(df, factor, max_points=0), repeats)
+        adaptive_s = _best_of(lambda: interpolate_data(df, factor), repeats)
+        adaptive_factor = resolve_densification_factor(len(df), factor, cap)
+
+        results.append({"file": name, "points": len(dense), "before_s": before_s, "after_s": after_s,
+                        "adaptive_s": adaptive_s, "adaptive_factor": adaptive_factor, "identical": identical})
+        flag = "" if identical else "  ⚠️ DIFERIT"
+        print(f"{name:<40} {len(dense):>8} {before_s * 1000:>8.1f}ms {after_s * 1000:>8.1f}ms "
+              f"{before_s / after_s:>7.1f}x {adaptive_factor:>7}x{flag}")
+
+    total_before = sum(r["before_s"] for r in results)
+    total_after = sum(r["after_s"] for r in results)
+    total_adaptive = sum(r["adaptive_s"] for r in results)
+    print("-" * 78)
+    print(f"{'TOTAL':<40} {sum(r['points'] for r in results):>8} {total_before * 1000:>8.1f}ms "
+          f"{total_after * 1000:>8.1f}ms {total_before / total_after:>7.1f}x")
+    print(f"Cu plafon adaptiv: {total_adaptive * 1000:.1f}ms ({total_before / total_adaptive:.1f}x) | "
+          f"Rezultat identic: {all(r['identical'] for r in results)}")
+    return results
+
+
+# ==============================================================================
+# MAIN
+# ==============================================================================
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_REPEATS
+
+    contents = _load_bench_files()
+    if not contents:
+        print(f"Nu există fișiere CSV în '{BENCH_DATA_DIR}/' - benchmark anulat.")
+        return 1
+
+    _silence_app_logger()
+    print(f"Benchmark pe {len(contents)} fișiere din '{BENCH_DATA_DIR}/' (best of {repeats})")
+
+    benchmark_csv_parsing(contents, repeats)
+    benchmark_densification(contents, repeats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
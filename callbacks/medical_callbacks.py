@@ -16,9 +16,11 @@ import pathlib
 import re
 import time
 import dash_uploader as du
+import flask
 import plotly.graph_objects as go
-from dash.dependencies import Input, Output, State, ALL
-from dash import html, no_update, dcc, callback_context
+from dash.dependencies import Input, Output, State, ALL, MATCH, ClientsideFunction
+from dash import html, no_update, dcc, callback_context, Patch
+from flask_login import current_user
 from datetime import datetime
 from typing import List, Dict
 
@@ -27,11 +29,14 @@ from logger_setup import logger
 import patient_links
 from data_parser import parse_csv_data
 from plot_generator import create_plot
-from services.batch_service import run_batch_job
+from plot_downsampling import parse_relayout_window, slice_time_window
 import batch_session_manager
+import job_queue
+from auth.models import BatchJob
 import config
 from auth_ui_components import create_auth_header
 import data_service  # [NEW] Serviciu centralizat de date
+import figure_cache
 from shared.runtime_mode import is_cloud_runtime
 
 
@@ -78,6 +83,48 @@ def _parent_clamped(current: pathlib.Path, root: pathlib.Path) -> pathlib.Path:
         return root
 
 
+def _zoom_window_patch(token: str, relayout_data: dict, log_tag: str):
+    """
+    Re-generează urmele unui grafic interactiv pentru fereastra de zoom curentă.
+
+    Zoom → datele din fereastră la rezoluție completă (plafonată la lățimea ecranului);
+    Reset axe → noaptea întreagă, downsampled. Doar `data` este înlocuit (Patch),
+    layout-ul (logo, axe, uirevision) rămâne neatins.
+    """
+    action, start, end = parse_relayout_window(relayout_data)
+    if action is None or not token:
+        return no_update
+
+    df, csv_filename, _ = data_service.get_patient_dataframe(token)
+    if df is None or df.empty:
+        return no_update
+
+    window_df = slice_time_window(df, start, end) if action == 'zoom' else df
+    if len(window_df) < 2:
+        return no_update
+
+    logger.info(f"🔍 [{log_tag}] {action.upper()} pentru {token[:8]}...: {len(window_df)}/{len(df)} puncte în fereastră")
+    fig = create_plot(window_df, file_name=csv_filename,
+                      max_points=config.INTERACTIVE_PLOT_CONFIG['max_points_per_trace'])
+
+    patched_figure = Patch()
+    patched_figure['data'] = fig.to_plotly_json()['data']
+    return patched_figure
+
+
+def _interactive_figure_etag(token: str):
+    """ETag-ul figurii interactive a celei mai recente înregistrări (None dacă nu există)."""
+    try:
+        recording_id = data_service.get_latest_recording_id(token)
+        if not recording_id:
+            return None
+        variant = f"interactive-{config.INTERACTIVE_PLOT_CONFIG['max_points_per_trace']}"
+        return figure_cache.build_figure_etag(token, recording_id, variant)
+    except Exception as e:
+        logger.warning(f"⚠️ [FIGURE_CACHE] ETag indisponibil pentru {token[:8]}...: {e}")
+        return None
+
+
 def _list_subdir_names(abs_dir: str) -> list[str]:
     """Numele subdirectoarelor (fără ascunse .), sortate."""
     names: list[str] = []
@@ -772,11 +819,8 @@ quest.args (care e gol în contextul callback-urilor Dash triggerate de Interval
     logger.info(f"📊 [TRACE-DATA] [LOG 19] Încărcare date pentru pacient: {token[:8]}...")
     
     try:
-        # Tracking vizualizare
-        patient_links.track_link_view(token)
-        
-        # Preluăm metadata pacientului
-        patient_data = patient_links.get_patient_link(token, track_view=False)  # Track deja făcut
+        # Preluăm metadata pacientului (vizualizarea se contorizează doar pentru token-uri existente)
+        patient_data = patient_links.get_patient_link(token, track_view=True)
         
         if not patient_data:
             error_msg = html.Div([
@@ -797,11 +841,23 @@ quest.args (care e gol în contextul callback-urilor Dash triggerate de Interval
         # [TRACE-DATA] [LOG 23] Apel DataService din Patient View
         logger.info(f"🏥 [TRACE-DATA] [LOG 23] Apel data_service.get_patient_dataframe pentru token {token[:8]}...")
         
-        # Folosim logica centralizată din data_service.py
-        df, csv_filename, status_msg = data_service.get_patient_dataframe(token)
+        # Figura serializată din cache (înregistrările sunt imutabile) - HIT sare peste
+        # descărcare, parsare, interpolare, construcția Plotly și logo
+        figure_etag = _interactive_figure_etag(token)
+        fig = figure_cache.get_figure(figure_etag)
+        figure_from_cache = fig is not None
+        
+        if figure_from_cache:
+            logger.info(f"🧊 [PATIENT_LOAD] Figură servită din cache pentru {token[:8]}...")
+            df, csv_filename, status_msg = None, '', 'cache'
+        else:
+            # Folosim logica centralizată din data_service.py
+            df, csv_filename, status_msg = data_service.get_patient_dataframe(token)
         
         # [ENHANCED ERROR HANDLING v2] Detailed data service result checking
-        if df is not None:
+        if figure_from_cache:
+            pass
+        elif df is not None:
             logger.critical(f"✅ [PATIENT_LOAD] DataService SUCCESS")  
             logger.critical(f"✅ [PATIENT_LOAD] DataFrame shape: {df.shape}")
             logger.critical(f"✅ [PATIENT_LOAD] DataFrame columns: {list(df.columns)}")
@@ -892,13 +948,17 @@ quest.args (care e gol în contextul callback-urilor Dash triggerate de Interval
             return error_content, empty_fig
         
         # Generăm figura cu error boundaries defensive
-        if df is not None and not df.empty:
+        if figure_from_cache:
+            pass
+        elif df is not None and not df.empty:
+            plot_ok = False
             try:
                 logger.critical(f"📈 [PATIENT_LOAD] START plot generation")
                 logger.critical(f"📈 [PATIENT_LOAD] DataFrame ready: rows={len(df)}, empty={df.empty}")
                 logger.critical(f"📈 [PATIENT_LOAD] Calling create_plot() with filename: {csv_filename}")
                 
-                fig = create_plot(df, file_name=csv_filename)
+                fig = create_plot(df, file_name=csv_filename,
+                                  max_points=config.INTERACTIVE_PLOT_CONFIG['max_points_per_trace'])
                 
                 # [DEFENSIVE VALIDATION] Check figure integrity
                 if fig is None:
@@ -929,12 +989,15 @@ quest.args (care e gol în contextul callback-urilor Dash triggerate de Interval
                     logger.critical(f"✅ [PATIENT_LOAD] Plot generated successfully!")
                     logger.critical(f"✅ [PATIENT_LOAD] Figure traces count: {len(fig.data)}")
                     # Removed buggy line: fig.layout.keys() causes AttributeError
+                    plot_ok = True
                 
                 # Apply logo (non-critical, failures logged but ignored)
                 try:
                     from plot_generator import apply_logo_to_figure
                     fig = apply_logo_to_figure(fig)
                     logger.debug("✅ [PATIENT_LOAD] Logo applied to figure")
+                    if plot_ok:
+                        figure_cache.put_figure(figure_etag, fig)
                 except Exception as logo_err:
                     logger.warning(f"⚠️ [PATIENT_LOAD] Logo application failed (non-critical): {logo_err}")
 
@@ -1023,13 +1086,14 @@ quest.args (care e gol în contextul callback-urilor Dash triggerate de Interval
         logger.warning(f"📁 [PATIENT_VIEW_FIX] patient_folder: {patient_folder}")
         logger.warning(f"📁 [PATIENT_VIEW_FIX] patient_folder exists: {os.path.exists(patient_folder)}")
         
-        # [DIAGNOSTIC] Log DF status
-        logger.warning(f"📊 [PATIENT_VIEW_FIX] df is None: {df is None}")
-        if df is not None:
-            logger.warning(f"📊 [PATIENT_VIEW_FIX] df.shape: {df.shape}")
-            logger.warning(f"📊 [PATIENT_VIEW_FIX] df.empty: {df.empty}")
-        else:
-            logger.error(f"❌ [PATIENT_VIEW_FIX] DataFrame is NONE! Data not available!")
+        # [DIAGNOSTIC] Log DF status (la un HIT de cache DataFrame-ul nu se încarcă deloc)
+        if not figure_from_cache:
+            logger.warning(f"📊 [PATIENT_VIEW_FIX] df is None: {df is None}")
+            if df is not None:
+                logger.warning(f"📊 [PATIENT_VIEW_FIX] df.shape: {df.shape}")
+                logger.warning(f"📊 [PATIENT_VIEW_FIX] df.empty: {df.empty}")
+            else:
+                logger.error(f"❌ [PATIENT_VIEW_FIX] DataFrame is NONE! Data not available!")
         
         # 2. IMAGINI GENERATE (dacă există)
         images_folder = os.path.join(patient_folder, "images")
@@ -1189,6 +1253,21 @@ quest.args (care e gol în contextul callback-urilor Dash triggerate de Interval
         return error_msg, go.Figure()
 
 
+@app.callback(
+    Output('patient-main-graph', 'figure', allow_duplicate=True),
+    Input('patient-main-graph', 'relayoutData'),
+    State('global-token-store', 'data'),
+    prevent_initial_call=True
+)
+def zoom_patient_main_graph(relayout_data, token):
+    """Zoom pe graficul pacientului → rezoluție completă doar pentru fereastra vizibilă."""
+    try:
+        return _zoom_window_patch(token, relayout_data, 'PATIENT_ZOOM')
+    except Exception as e:
+        logger.error(f"❌ [PATIENT_ZOOM] Eroare la re-generarea ferestrei: {e}", exc_info=True)
+        return no_update
+
+
 # ==============================================================================
 # CALLBACKS ADMIN - DASHBOARD MEDICAL PROFESIONAL
 # ==============================================================================
@@ -1563,6 +1642,94 @@ def handle_file_deletion(clear_all_clicks, delete_clicks, current_files):
     return no_update
 
 
+def _render_batch_links_result(generated_links: List[Dict]):
+    """
+    Mesajul final al unui job batch: lista de link-uri generate (sau avertisment
+    dacă nu s-a generat niciunul). Folosit de `admin_poll_batch_job`.
+    """
+    if not generated_links:
+        return html.Div([
+            html.H4("⚠️ Procesare Finalizată, Dar Fără Link-uri Generate", style={'color': 'orange'}),
+            html.P("Verificați dacă există fișiere CSV valide și log-urile pentru detalii.")
+        ], style={'padding': '20px', 'backgroundColor': '#fff3cd', 'border': '1px solid #ffc107', 'borderRadius': '10px'})
+    
+    # Obținem APP_URL din environment (Railway sau localhost)
+    app_url = os.getenv('APP_URL', 'http://127.0.0.1:8050')
+    
+    link_rows = []
+    for link in generated_links:
+        link_url = f"{app_url}/?token={link['token']}"
+        link_rows.append(
+            html.Div([
+                html.Strong(f"📅 {link['recording_date']} | {link['start_time']} - {link['end_time']}", style={'display': 'block', 'marginBottom': '8px'}),
+                html.Small(f"🔧 {link['device_name']} | 🖼️ {link['images_count']} imagini" + (" | ♻️ deja încărcat - link existent" if link.get('reused') else ""), style={'color': '#666', 'display': 'block', 'marginBottom': '8px'}),
+                html.Div([
+                    dcc.Input(
+                        id={'type': 'link-input-batch', 'index': link['token']},
+                        value=link_url,
+                        readOnly=True,
+                        style={
+                            'width': '100%',
+                            'padding': '8px',
+                            'fontSize': '11px',
+                            'fontFamily': 'monospace',
+                            'backgroundColor': '#f0f0f0',
+                            'border': '1px solid #bdc3c7',
+                            'borderRadius': '3px',
+                            'marginBottom': '8px'
+                        }
+                    ),
+                    html.Div([
+                        html.Button(
+                            '📋 ',
+                            id={'type': 'copy-link-batch', 'index': link['token']},
+                            n_clicks=0,
+                            style={
+                                'padding': '6px 15px',
+                                'marginRight': '8px',
+                                'backgroundColor': '#3498db',
+                                'color': 'white',
+                                'border': 'none',
+                                'borderRadius': '3px',
+                                'cursor': 'pointer',
+                                'fontWeight': 'bold'
+                            }
+                        ),
+                        html.A(
+                            '🌐 Testează în browser',
+                            href=link_url,
+                            target='_blank',
+                            style={
+                                'padding': '6px 15px',
+                                'backgroundColor': '#27ae60',
+                                'color': 'white',
+                                'textDecoration': 'none',
+                                'borderRadius': '3px',
+                                'fontSize': '12px',
+                                'fontWeight': 'bold',
+                                'display': 'inline-block'
+                            }
+                        )
+                    ], style={'display': 'flex', 'gap': '8px'})
+                ], style={'marginBottom': '5px'}),
+                html.Small(f"Token: {link['token'][:16]}...", style={'color': '#95a5a6', 'fontSize': '10px'})
+            ], style={
+                'padding': '15px',
+                'marginBottom': '10px',
+                'backgroundColor': '#e8f5e9',
+                'borderRadius': '5px',
+                'border': '1px solid #27ae60'
+            })
+        )
+    
+    return html.Div([
+        html.H4(f"✅ Procesare Batch Finalizată Cu Succes!", style={'color': 'green'}),
+        html.P(f"🔗 {len(generated_links)} link-uri generate automat:"),
+        html.Hr(),
+        html.Div(link_rows, style={'maxHeight': '400px', 'overflowY': 'auto'})
+    ], style={'padding': '20px', 'backgroundColor': '#d4edda', 'border': '1px solid #28a745', 'borderRadius': '10px'})
+
+
 @app.callback(
     [Output('admin-batch-result', 'children'),
      Output('admin-refresh-trigger', 'data'),
@@ -1570,16 +1737,18 @@ def handle_file_deletion(clear_all_clicks, delete_clicks, current_files):
      Output('admin-batch-progress-container', 'style'),
      Output('admin-batch-progress-interval', 'disabled'),
      Output('admin-batch-uploaded-files-store', 'data', allow_duplicate=True),
-     Output('active-date-filter', 'data', allow_duplicate=True)],  # [FIX] Resetăm filtrul dată după batch
+     Output('active-date-filter', 'data', allow_duplicate=True),  # [FIX] Resetăm filtrul dată după batch
+     Output('admin-batch-job-id', 'data')],
     [Input('admin-start-batch-button', 'n_clicks')],
     [State('admin-batch-mode-selector', 'value'),
      State('admin-batch-input-folder', 'value'),
      State('admin-batch-session-id', 'data'),
      State('admin-batch-output-folder', 'value'),
-     State('admin-batch-window-minutes', 'value')],
+     State('admin-batch-window-minutes', 'value'),
+     State('admin-batch-force-reprocess', 'value')],
     prevent_initial_call=True
 )
-def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, output_folder, window_minutes):
+def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, output_folder, window_minutes, force_options):
     """
     Callback pentru procesare batch + generare automată link-uri + tracking progres.
     Suportă AMBELE moduri: local (folder) și upload (fișiere).
@@ -1587,7 +1756,7 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
     # [FIX] Top-level try-except pentru a prinde ORICE eroare și a preveni 500 Generic
     try:
         if n_clicks == 0:
-            return no_update, no_update, no_update, no_update, no_update, no_update, no_update
+            return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
         
         logger.warning(f"🔍 [BATCH] START PROCESSING - Mode: {batch_mode}, Session: {session_id}")
         
@@ -1600,7 +1769,7 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
                 return html.Div(
                     "⚠️ Specificați folderul de intrare!",
                     style={'padding': '15px', 'backgroundColor': '#fff3cd', 'border': '1px solid #ffc107', 'borderRadius': '5px'}
-                ), no_update, no_update, no_update, no_update, no_update, no_update
+                ), no_update, no_update, no_update, no_update, no_update, no_update, no_update
             
             processing_folder = input_folder
             logger.warning(f"✅ Procesare LOCALĂ din folder: {input_folder}")
@@ -1612,7 +1781,7 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
                 return html.Div(
                     "⚠️ Niciun fișier încărcat! Vă rugăm să încărcați fișierele întâi.",
                     style={'padding': '15px', 'backgroundColor': '#fff3cd', 'border': '1px solid #ffc107', 'borderRadius': '5px'}
-                ), no_update, no_update, no_update, no_update, no_update, no_update
+                ), no_update, no_update, no_update, no_update, no_update, no_update, no_update
             
             # Construim calea către folderul de upload dash-uploader
             # Acesta se află în ./temp_uploads/{session_id}
@@ -1632,7 +1801,7 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
                  return html.Div(
                     f"⚠️ Sesiunea de upload nu a fost găsită. Căutat în: {processing_folder}. Disponibil: {available_folders}",
                     style={'padding': '15px', 'backgroundColor': '#ffdddd', 'border': '1px solid red', 'borderRadius': '5px'}
-                ), no_update, no_update, no_update, no_update, no_update, no_update
+                ), no_update, no_update, no_update, no_update, no_update, no_update, no_update
 
             logger.warning(f"🚀 [BATCH] Procesare UPLOAD din folder: {processing_folder}")
         
@@ -1650,7 +1819,7 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
             return html.Div(
                 f"⚠️ Nu există fișiere CSV în folder! (Găsite: {len(pdf_files)} PDF-uri)",
                 style={'padding': '15px', 'backgroundColor': '#fff3cd', 'border': '1px solid #ffc107', 'borderRadius': '5px'}
-            ), no_update, no_update, no_update, no_update, no_update, no_update
+            ), no_update, no_update, no_update, no_update, no_update, no_update, no_update
         
         # Creăm sesiune batch cu tracking
         batch_id = batch_session_manager.create_batch_session(
@@ -1660,122 +1829,38 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
         
         logger.info(f"📊 Sesiune batch creată: {batch_id} cu {len(csv_files)} fișiere")
         
-        # ACTIVĂM bara de progres și interval-ul de refresh
+        # ACTIVĂM bara de progres; progresul vine din endpoint-ul ieftin pe versiune
+        # (progress_stream.py), interval-ul Dash rămâne doar ca fallback
         progress_style = {'display': 'block', 'marginBottom': '20px'}
-        interval_disabled = False
-        
-        # Rulăm procesarea batch
-        # Nota: Deși avem dash-uploader, logica de procesare rămâne aceeași
-        # run_batch_job citește din folderul specificat
-        generated_links = run_batch_job(
-            processing_folder,  
-            output_folder, 
+        interval_disabled = config.PROGRESS_POLL_CONFIG['enabled']
+        
+        # [v3.6] Job-ul intră în coada persistentă (job_queue) - callback-ul NU mai
+        # rulează `run_batch_job` sincron (thread gunicorn blocat + timeout 120s).
+        # Worker-ul marchează sesiunea finalizată și șterge folderul de upload.
+        doctor_id = current_user.id if current_user.is_authenticated else None
+        job_id = job_queue.enqueue_batch_job(
+            processing_folder,
+            output_folder,
             window_minutes,
-            session_id=batch_id  
+            session_id=batch_id,
+            doctor_id=doctor_id,
+            batch_mode=batch_mode,
+            cleanup_input=(batch_mode == 'upload'),
+            force_reprocess='force' in (force_options or [])
         )
-        
-        # Marcăm sesiunea ca finalizată
-        batch_session_manager.mark_session_completed(batch_id)
-        
-        # Ștergem folderul temporar dacă e în mod upload
-        if batch_mode == 'upload':
-            import shutil
-            try:
-                shutil.rmtree(processing_folder)
-                logger.info(f"🗑️ Folder temporar șters: {processing_folder}")
-            except Exception as cleanup_error:
-                logger.warning(f"Nu s-a putut șterge folderul temporar: {cleanup_error}")
+        job_queue.ensure_inline_worker(flask.current_app._get_current_object())
         
         # [FIX v3] NU MAI GOLIM AUTOMAT STORE-UL după procesare
         # [WHY] Utilizatorul poate dori să proceseze din nou sau să verifice lista
         # [SOLUTION] Butonul "🗑️ Șterge toate" permite golire manuală
         files_to_clear = no_update  # Nu golim automat
-        logger.warning(f"🗑️ Store files_to_clear: {files_to_clear} (batch_mode={batch_mode})")
-        logger.warning("✅ Store-ul rămâne INTACT după procesare (golire manuală disponibilă)")
-        
-        if not generated_links:
-            return html.Div([
-                html.H4("⚠️ Procesare Finalizată, Dar Fără Link-uri Generate", style={'color': 'orange'}),
-                html.P("Verificați dacă există fișiere CSV valide și log-urile pentru detalii.")
-            ], style={'padding': '20px', 'backgroundColor': '#fff3cd', 'border': '1px solid #ffc107', 'borderRadius': '10px'}), n_clicks, None, {'display': 'none'}, True, files_to_clear, no_update
-        
-        # Construim mesajul de succes cu lista de link-uri
-        # Obținem APP_URL din environment (Railway sau localhost)
-        app_url = os.getenv('APP_URL', 'http://127.0.0.1:8050')
-        
-        link_rows = []
-        for link in generated_links:
-            link_url = f"{app_url}/?token={link['token']}"
-            link_rows.append(
-                html.Div([
-                    html.Strong(f"📅 {link['recording_date']} | {link['start_time']} - {link['end_time']}", style={'display': 'block', 'marginBottom': '8px'}),
-                    html.Small(f"🔧 {link['device_name']} | 🖼️ {link['images_count']} imagini", style={'color': '#666', 'display': 'block', 'marginBottom': '8px'}),
-                    html.Div([
-                        dcc.Input(
-                            id={'type': 'link-input-batch', 'index': link['token']},
-                            value=link_url,
-                            readOnly=True,
-                            style={
-                                'width': '100%',
-                                'padding': '8px',
-                                'fontSize': '11px',
-                                'fontFamily': 'monospace',
-                                'backgroundColor': '#f0f0f0',
-                                'border': '1px solid #bdc3c7',
-                                'borderRadius': '3px',
-                                'marginBottom': '8px'
-                            }
-                        ),
-                        html.Div([
-                            html.Button(
-                                '📋 ',
-                                id={'type': 'copy-link-batch', 'index': link['token']},
-                                n_clicks=0,
-                                style={
-                                    'padding': '6px 15px',
-                                    'marginRight': '8px',
-                                    'backgroundColor': '#3498db',
-                                    'color': 'white',
-                                    'border': 'none',
-                                    'borderRadius': '3px',
-                                    'cursor': 'pointer',
-                                    'fontWeight': 'bold'
-                                }
-                            ),
-                            html.A(
-                                '🌐 Testează în browser',
-                                href=link_url,
-                                target='_blank',
-                                style={
-                                    'padding': '6px 15px',
-                                    'backgroundColor': '#27ae60',
-                                    'color': 'white',
-                                    'textDecoration': 'none',
-                                    'borderRadius': '3px',
-                                    'fontSize': '12px',
-                                    'fontWeight': 'bold',
-                                    'display': 'inline-block'
-                                }
-                            )
-                        ], style={'display': 'flex', 'gap': '8px'})
-                    ], style={'marginBottom': '5px'}),
-                    html.Small(f"Token: {link['token'][:16]}...", style={'color': '#95a5a6', 'fontSize': '10px'})
-                ], style={
-                    'padding': '15px',
-                    'marginBottom': '10px',
-                    'backgroundColor': '#e8f5e9',
-                    'borderRadius': '5px',
-                    'border': '1px solid #27ae60'
-                })
-            )
         
         return html.Div([
-            html.H4(f"✅ Procesare Batch Finalizată Cu Succes!", style={'color': 'green'}),
-            html.P(f"🔗 {len(generated_links)} link-uri generate automat:"),
-            html.Small(f"ℹ️ {len(pdf_files)} PDF-uri detectate în folder pentru asociere.", style={'color': '#666', 'display': 'block', 'marginBottom': '10px'}),
-            html.Hr(),
-            html.Div(link_rows, style={'maxHeight': '400px', 'overflowY': 'auto'})
-        ], style={'padding': '20px', 'backgroundColor': '#d4edda', 'border': '1px solid #28a745', 'borderRadius': '10px'}), n_clicks, session_id, progress_style, interval_disabled, files_to_clear, None  # [FIX] Return None pentru resetare filtru dată
+            html.H4("⏳ Procesare Batch Pusă în Coadă", style={'color': '#2980b9'}),
+            html.P(f"📦 {len(csv_files)} fișiere CSV • job {job_id[:8]}"),
+            html.Small(f"ℹ️ {len(pdf_files)} PDF-uri detectate în folder pentru asociere.", style={'color': '#666', 'display': 'block'}),
+            html.Small("Link-urile apar aici la finalizare. Puteți părăsi pagina - procesarea continuă.", style={'color': '#666', 'display': 'block'})
+        ], style={'padding': '20px', 'backgroundColor': '#eaf2f8', 'border': '1px solid #3498db', 'borderRadius': '10px'}), no_update, session_id, progress_style, interval_disabled, files_to_clear, None, job_id  # [FIX] Return None pentru resetare filtru dată
         
     except Exception as e:
         logger.error("="*100)
@@ -1798,261 +1883,752 @@ def admin_run_batch_processing(n_clicks, batch_mode, input_folder, session_id, o
             {'display': 'none'},  # admin-batch-progress-container
             True,  # admin-batch-progress-interval disabled
             no_update,  # admin-batch-uploaded-files-store
-            no_update  # active-date-filter
+            no_update,  # active-date-filter
+            None  # admin-batch-job-id
         )
 
 
+# Polling-ul de progres pe versiune (assets/batch_progress_poll.js) pornește pentru
+# fiecare job nou; evenimentul final ajunge în 'admin-batch-job-event'
+app.clientside_callback(
+    ClientsideFunction(namespace='batch_progress', function_name='connect'),
+    Output('admin-batch-progress-interval', 'disabled', allow_duplicate=True),
+    Input('admin-batch-job-id', 'data'),
+    State('admin-batch-progress-interval', 'disabled'),
+    prevent_initial_call=True
+)
+
+
 @app.callback(
-    [Output('data-view-container', 'children'),
-     Output('expanded-row-id', 'data'),
-     Output('collapsed-groups-store', 'data')],
-    [Input('admin-refresh-data-view', 'n_clicks'),
-     Input('admin-refresh-trigger', 'data'),
-     Input({'type': 'expand-row-btn', 'index': ALL}, 'n_clicks'),
-     Input({'type': 'toggle-group-btn', 'index': ALL}, 'n_clicks'),
-     Input('active-date-filter', 'data'),
-     Input('date-filter-mode', 'value'),  # [NEW] Filter mode: 'upload' or 'recording'
-     Input('date-grouping', 'value')],
-    [State('expanded-row-id', 'data'),
-     State({'type': 'expand-row-btn', 'index': ALL}, 'id'),
-     State({'type': 'toggle-group-btn', 'index': ALL}, 'id'),
-     State('collapsed-groups-store', 'data')]
+    [Output('admin-batch-result', 'children', allow_duplicate=True),
+     Output('admin-refresh-trigger', 'data', allow_duplicate=True),
+     Output('admin-batch-progress-interval', 'disabled', allow_duplicate=True),
+     Output('admin-batch-progress-container', 'style', allow_duplicate=True)],
+    [Input('admin-batch-progress-interval', 'n_intervals'),
+     Input('admin-batch-job-event', 'data')],
+    [State('admin-batch-job-id', 'data')],
+    prevent_initial_call=True
 )
-def load_data_view_with_accordion(n_clicks_refresh, trigger, expand_clicks, toggle_group_clicks, date_filter, filter_mode, grouping, expanded_id, expand_btn_ids, toggle_group_ids, collapsed_groups):
+def admin_poll_batch_job(n_intervals, job_event, job_id):
     """
-    Încarcă vizualizarea datelor cu funcționalitate accordion (expandare/colapsare).
+    Urmărește job-ul din coadă; la finalizare afișează link-urile generate,
+    oprește interval-ul și declanșează refresh-ul listei de înregistrări.
+    
+    Declanșat de evenimentul "done" al polling-ului de progres sau, în fallback, de interval.
     """
-    from dash import ctx
-    import base64
+    if not job_id:
+        return no_update, no_update, no_update, no_update
     
-    logger.debug("Callback data-view apelat.")
+    job = job_queue.get_job(job_id)
+    if not job:
+        return html.Div("⚠️ Job-ul batch nu mai există.", style={'padding': '15px', 'backgroundColor': '#fff3cd', 'border': '1px solid #ffc107', 'borderRadius': '5px'}), no_update, True, {'display': 'none'}
     
-    # [DIAGNOSTIC LOG GLOBAL]
-    trigger_id = ctx.triggered_id
-    logger.info("="*80)
-    logger.info(f"⚡ [ADMIN_CALLBACK] TRIGGERED! ID: {trigger_id}")
+    if job['status'] not in BatchJob.TERMINAL_STATUSES:
+        return no_update, no_update, no_update, no_update
     
-    # LOG: Afișăm ce a trigger-uit callback-ul
-    if trigger_id:
-        logger.info(f"   - Type: {type(trigger_id)}")
-        if isinstance(trigger_id, dict):
-             logger.info(f"   - Dict Keys: {trigger_id.keys()}")
-             logger.info(f"   - Index: {trigger_id.get('index')}")
-    else:
-        logger.info("   - Initial Call / No Trigger")
-    
-    logger.info("="*80)
-
-    # Inițializăm collapsed_groups dacă e None
-    if collapsed_groups is None:
-        collapsed_groups = []
-    
-    # Determinăm care rând trebuie expandat
-    current_expanded = expanded_id
-    
-    # Verificăm dacă s-a dat click pe un buton de toggle grup
-    if ctx.triggered_id and isinstance(ctx.triggered_id, dict) and ctx.triggered_id.get('type') == 'toggle-group-btn':
-        clicked_group = ctx.triggered_id['index']
-        logger.info(f"🔵 CLICK TOGGLE GRUP DETECTAT: '{clicked_group}'")
-        logger.info(f"📋 Grupuri collapsed înainte: {collapsed_groups}")
-        # Toggle: dacă grupul e collapsed, îl expandăm; altfel îl colapsăm
-        if clicked_group in collapsed_groups:
-            collapsed_groups.remove(clicked_group)
-            logger.info(f"✅ EXPANDARE grup: '{clicked_group}' → Grupuri collapsed: {collapsed_groups}")
-        else:
-            collapsed_groups.append(clicked_group)
-            logger.info(f"⬇️ COLAPSARE grup: '{clicked_group}' → Grupuri collapsed: {collapsed_groups}")
-    
-    # Verificăm dacă s-a dat click pe un buton de expandare rând
-    if ctx.triggered_id and isinstance(ctx.triggered_id, dict) and ctx.triggered_id.get('type') == 'expand-row-btn':
-        clicked_token = ctx.triggered_id['index']
-        # Toggle: dacă e deja expandat, îl închidem; altfel îl deschidem
-        if current_expanded == clicked_token:
-            current_expanded = None
-        else:
-            current_expanded = clicked_token
+    logger.info(f"🏁 [BATCH] Job {job_id[:8]} terminat cu status {job['status']}")
+    hidden = {'display': 'none'}
+    refresh_token = time.time()
+    
+    if job['status'] == BatchJob.STATUS_FAILED:
+        return html.Div([
+            html.H4("❌ EROARE CRITICĂ", style={'color': 'red'}),
+            html.P(f"Batch processing a eșuat: {job.get('error') or 'eroare necunoscută'}"),
+            html.P("Verificați Railway logs pentru detalii complete.")
+        ], style={'padding': '15px', 'backgroundColor': '#ffdddd', 'border': '1px solid red', 'borderRadius': '5px', 'color': 'red'}), refresh_token, True, hidden
+    
+    result = _render_batch_links_result(job.get('result') or [])
+    if job['status'] == BatchJob.STATUS_CANCELLED:
+        result = html.Div([
+            html.H4("⏹️ Procesare Anulată", style={'color': '#7f8c8d'}),
+            html.P("Fișierele procesate înainte de anulare au fost păstrate."),
+            result if job.get('result') else ""
+        ])
+    return result, refresh_token, True, hidden
+
+
+@app.callback(
+    Output('admin-batch-status-detail', 'children', allow_duplicate=True),
+    [Input('admin-batch-cancel-button', 'n_clicks')],
+    [State('admin-batch-job-id', 'data')],
+    prevent_initial_call=True
+)
+def admin_cancel_batch_job(n_clicks, job_id):
+    """Cere anularea job-ului batch curent (oprire înainte de următorul fișier)."""
+    if not n_clicks or not job_id:
+        return no_update
+    if job_queue.request_cancel(job_id):
+        return html.Span("⏹️ Anulare cerută - procesarea se oprește după fișierul curent.", style={'color': '#e67e22'})
+    return no_update
+
+
+# ==============================================================================
+# VIZUALIZARE DATE - schelet listă + detalii încărcate la cerere
+# ------------------------------------------------------------------------------
+# Lista (grupuri + rânduri compacte) se reconstruiește doar la refresh /
+# schimbarea filtrului / grupării. Expandarea unui rând sau a unui grup NU mai
+# refiltrează și nu mai re-randează lista: callback-urile pattern-matching
+# trimit doar detaliile rândului (grafic, imagini, PDF-uri) sau stilurile
+# grupului (Patch); restul elementelor primesc no_update.
+# ==============================================================================
+
+_MONTH_NAMES_RO = ['Ianuarie', 'Februarie', 'Martie', 'Aprilie', 'Mai', 'Iunie',
+                   'Iulie', 'August', 'Septembrie', 'Octombrie', 'Noiembrie', 'Decembrie']
+
+
+def _row_highlight(is_expanded: bool) -> Dict:
+    """Proprietățile de stil ale rândului compact care diferă între expandat / închis."""
+    return {
+        'backgroundColor': '#fff' if not is_expanded else '#e8f4f8',
+        'border': '2px solid #ddd' if not is_expanded else '2px solid #3498db',
+        'borderLeft': '5px solid #3498db' if is_expanded else '5px solid #95a5a6',
+        'boxShadow': '0 2px 4px rgba(0,0,0,0.08)' if not is_expanded else '0 4px 12px rgba(52, 152, 219, 0.2)',
+    }
+
+
+def _group_highlight(is_collapsed: bool) -> Dict:
+    """Proprietățile de stil ale header-ului de grup care diferă între deschis / colapsat."""
+    return {
+        'backgroundColor': '#3498db' if not is_collapsed else '#ecf0f1',
+        'color': 'white' if not is_collapsed else '#2c3e50',
+        'border': f"2px solid {'#3498db' if not is_collapsed else '#bdc3c7'}",
+        'boxShadow': '0 3px 6px rgba(0,0,0,0.15)' if not is_collapsed else '0 2px 4px rgba(0,0,0,0.08)',
+    }
+
+
+def _style_patch(values: Dict) -> Patch:
+    """Patch doar pentru cheile de stil date (restul stilului rămâne în browser)."""
+    patch = Patch()
+    for key, value in values.items():
+        patch[key] = value
+    return patch
+
+
+def _build_row_details(link_data: Dict):
+    """
+    Detaliile unui rând expandat: grafic interactiv, imagini, PDF-uri,
+    interpretare, link pacient, ștergere. Construit doar la expandarea rândului.
+    """
+    from callbacks.patient_view_callbacks import render_pdfs_display
+    
+    token = link_data['token']
+    
+    # Încărcăm imaginile pentru rândul expandat
+    images_content = [html.P("Nu există imagini disponibile.", style={'color': '#666', 'fontStyle': 'italic'})]
     
+    # Încercăm să găsim folderul cu imagini pentru această înregistrare
     try:
-        from datetime import datetime
-        
-        logger.info("="*100)
-        logger.info("📊 [DATA VIEW] load_data_view_with_accordion CALLBACK START")
-        logger.info("="*100)
+        # Verificăm dacă avem calea stocată în metadata
+        output_folder_path = link_data.get('output_folder_path')
         
-        # [LOG 1-5] Parametri callback
-        logger.info(f"📋 [LOG 1] date_filter param: {date_filter}")
-        logger.info(f"📋 [LOG 1.5] filter_mode param: {filter_mode}")  # [NEW] Log filter mode
-        logger.info(f"📋 [LOG 2] grouping param: {grouping}")
-        logger.info(f"📋 [LOG 3] n_clicks_refresh: {n_clicks_refresh}")
-        logger.info(f"📋 [LOG 4] trigger data: {trigger}")
-        logger.info(f"📋 [LOG 5] expanded_id: {expanded_id}")
+        if output_folder_path and os.path.exists(output_folder_path):
+                # Găsim imaginile din folder
+                image_files = [f for f in os.listdir(output_folder_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                
+                if image_files:
+                    # Sortăm imaginile alfabetic
+                    image_files.sort()
+                    
+                    # Creăm galerie de imagini
+                    images_content = []
+                    images_count = len(image_files)
+                    
+                    # Adăugăm header cu număr imagini
+                    images_content.append(
+                        html.P(
+                            f"📊 {images_count} imagini generate",
+                            style={'fontSize': '14px', 'color': '#2c3e50', 'fontWeight': 'bold', 'marginBottom': '15px'}
+                        )
+                    )
+                    
+                    # Creăm vizualizarea desfășurată (LIST VIEW - default)
+                    for img_file in image_files:
+                        img_path = os.path.join(output_folder_path, img_file)
+                        try:
+                            with open(img_path, 'rb') as img_f:
+                                img_data = base64.b64encode(img_f.read()).decode()
+                                images_content.append(
+                                    html.Div([
+                                        html.Img(
+                                            src=f'data:image/jpeg;base64,{img_data}',
+                                            style={
+                                                'width': '100%',
+                                                'maxWidth': '900px',
+                                                'borderRadius': '8px',
+                                                'boxShadow': '0 2px 8px rgba(0,0,0,0.15)',
+                                                'marginBottom': '10px',
+                                                'border': '1px solid #ddd',
+                                                'display': 'block',
+                                                'marginLeft': 'auto',
+                                                'marginRight': 'auto'
+                                            }
+                                        ),
+                                        html.P(
+                                            img_file,
+                                            style={
+                                                'fontSize': '13px',
+                                                'color': '#7f8c8d',
+                                                'textAlign': 'center',
+                                                'marginBottom': '25px',
+                                                'fontFamily': 'monospace'
+                                            }
+                                        )
+                                    ], className='image-item', **{'data-img-src': f'data:image/jpeg;base64,{img_data}', 'data-img-name': img_file})
+                                )
+                        except Exception as img_err:
+                            logger.error(f"Eroare la încărcarea imaginii {img_file}: {img_err}")
+                else:
+                    images_content = [html.P(
+                        f"Nu s-au găsit imagini în folderul: {output_folder_path}",
+                        style={'color': '#e74c3c', 'fontStyle': 'italic'}
+                    )]
+        else:
+            # Fallback: încercăm să găsim folderul după numărul aparatului
+            output_base = config.OUTPUT_DIR
+            if os.path.exists(output_base):
+                device_num = link_data['device_name'].split('#')[-1] if '#' in link_data['device_name'] else ''
+                
+                for folder_name in os.listdir(output_base):
+                    folder_path = os.path.join(output_base, folder_name)
+                    if os.path.isdir(folder_path) and device_num in folder_name:
+                        image_files = [f for f in os.listdir(folder_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
+                        if image_files:
+                            image_files.sort()
+                            images_content = []
+                            
+                            images_content.append(
+                                html.P(
+                                    f"📊 {len(image_files)} imagini găsite (căutare automată)",
+                                    style={'fontSize': '14px', 'color': '#f39c12', 'fontWeight': 'bold', 'marginBottom': '15px'}
+                                )
+                            )
+                            
+                            for img_file in image_files:
+                                img_path = os.path.join(folder_path, img_file)
+                                try:
+                                    with open(img_path, 'rb') as img_f:
+                                        img_data = base64.b64encode(img_f.read()).decode()
+                                        images_content.append(
+                                            html.Div([
+                                                html.Img(
+                                                    src=f'data:image/jpeg;base64,{img_data}',
+                                                    style={
+                                                        'width': '100%',
+                                                        'maxWidth': '900px',
+                                                        'borderRadius': '8px',
+                                                        'boxShadow': '0 2px 8px rgba(0,0,0,0.15)',
+                                                        'marginBottom': '10px',
+                                                        'border': '1px solid #ddd'
+                                                    }
+                                                ),
+                                                html.P(
+                                                    img_file,
+                                                    style={
+                                                        'fontSize': '13px',
+                                                        'color': '#7f8c8d',
+                                                        'textAlign': 'center',
+                                                        'marginBottom': '25px',
+                                                        'fontFamily': 'monospace'
+                                                    }
+                                                )
+                                            ])
+                                        )
+                                except Exception as img_err:
+                                    logger.error(f"Eroare la încărcarea imaginii {img_file}: {img_err}")
+                            break
+    
+    except Exception as e:
+        logger.error(f"Eroare la căutarea imaginilor pentru {token[:8]}...: {e}", exc_info=True)
+        images_content = [html.P(
+            f"⚠️ Eroare la încărcarea imaginilor: {str(e)}",
+            style={'color': '#e74c3c', 'fontStyle': 'italic'}
+        )]
+    
+    # Secțiune grafic interactiv - IMPLEMENTAT v2.0
+    graph_content = []
+    try:
+        # [DIAGNOSTIC LOG A1] Start Admin Graph
+        logger.info(f"📊 [ADMIN_VIEW] Start generare grafic pentru token: {token[:8]}...")
         
-        # [LOG 6-10] Încărcare date
-        logger.info(f"🔄 [LOG 6] Calling patient_links.get_all_links_for_admin()...")
-        all_links = patient_links.get_all_links_for_admin()
-        logger.info(f"📊 [LOG 7] TOTAL LINKS RECEIVED: {len(all_links)}")
+        # 0. Figura serializată din cache (aceeași cheie ca în vizualizarea pacientului)
+        admin_etag = _interactive_figure_etag(token)
+        admin_fig = figure_cache.get_figure(admin_etag)
         
-        if not all_links:
-            logger.warning("⚠️ [LOG 8] NO LINKS FOUND - returning empty state")
-            return html.Div(
-                "📭 Nu există înregistrări încă. Procesați fișiere CSV din tab-ul 'Procesare Batch'.",
-                style={'padding': '50px', 'textAlign': 'center', 'color': '#666', 'fontStyle': 'italic', 'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}
-            ), current_expanded, collapsed_groups
-        
-        # [LOG 11-15] Analiza date range
-        logger.info(f"📅 [LOG 11] Analyzing date range of all links...")
-        dates_found = []
-        for link in all_links:
-            if link.get('recording_date'):
-                dates_found.append(link['recording_date'])
-            elif link.get('created_at'):
-                try:
-                    created = datetime.fromisoformat(link['created_at']).date().isoformat()
-                    dates_found.append(created)
-                except:
-                    pass
-        
-        if dates_found:
-            logger.info(f"📅 [LOG 12] Oldest date in dataset: {min(dates_found)}")
-            logger.info(f"📅 [LOG 13] Newest date in dataset: {max(dates_found)}")
-            logger.info(f"📅 [LOG 14] Sample dates (first 5): {dates_found[:5]}")
+        # 1. Recuperăm datele folosind serviciul centralizat
+        # [DIAGNOSTIC LOG A2] Apel DataService
+        if admin_fig is not None:
+            graph_df, graph_filename, graph_status = None, '', 'cache'
         else:
-            logger.warning("⚠️ [LOG 15] NO DATES FOUND in any link!")
+            graph_df, graph_filename, graph_status = data_service.get_patient_dataframe(token)
         
-        # [LOG 16-20] Detalii link-uri înainte de filtrare
-        logger.info(f"📋 [LOG 16] First 3 links details:")
-        for idx, link in enumerate(all_links[:3]):
-            logger.info(f"   [LOG 17.{idx}] Token: {link['token'][:8]}... | created_at: {link.get('created_at')} | recording_date: {link.get('recording_date')} | device: {link.get('device_name')[:30]}...")
-        
-        # === FILTRARE TEMPORALĂ ===
-        logger.info(f"🔍 [LOG 18] Checking date filter...")
-        if date_filter and date_filter.get('start') and date_filter.get('end'):
-            start_date = datetime.fromisoformat(date_filter['start']).date()
-            end_date = datetime.fromisoformat(date_filter['end']).date()
-            filter_label = date_filter.get('label', 'Interval Personalizat')
+        if admin_fig is not None or (graph_df is not None and not graph_df.empty):
+            # [DIAGNOSTIC LOG A3] Data Found
+            if graph_df is not None:
+                logger.info(f"✅ [ADMIN_VIEW] Date găsite: {len(graph_df)} rânduri. Generare figură...")
             
-            logger.info(f"🔍 [LOG 19] DATE FILTER ACTIVE!")
-            logger.info(f"🔍 [LOG 20] Filter label: '{filter_label}'")
-            logger.info(f"🔍 [LOG 21] Filter start_date: {start_date}")
-            logger.info(f"🔍 [LOG 22] Filter end_date: {end_date}")
-            logger.info(f"🔍 [LOG 23] Links BEFORE filtering: {len(all_links)}")
-            
-            # [DUAL FILTER MODE] Filtrăm după modul selectat: upload sau medical date
-            logger.warning(f"🔧 [FILTER_MODE] Active mode: {filter_mode}")
-            logger.warning(f"🔧 [FILTER_MODE] Filtering by: {'Last Processing Date (last_processed_at)' if filter_mode == 'upload' else 'Medical Test Date (recording_date)'}")
-            
-            filtered_links = []
-            for idx, link in enumerate(all_links):
-                if filter_mode == 'upload':
-                    # MODE A: Filter by LAST PROCESSING date (last_processed_at with fallback to created_at)
-                    # [FIX v5.0] Use last_processed_at to show reprocessed files
-                    processing_date_str = link.get('last_processed_at') or link.get('created_at')
-                    if processing_date_str:
-                        try:
-                            processing_date = datetime.fromisoformat(processing_date_str).date()
-                            is_in_range = start_date <= processing_date <= end_date
-                            field_used = 'last_processed_at' if link.get('last_processed_at') else 'created_at (fallback)'
-                            logger.info(f"   [LOG 24.{idx}] Token {link['token'][:8]}... | {field_used}: {processing_date} | in_range: {is_in_range}")
-                            if is_in_range:
-                                filtered_links.append(link)
-                        except Exception as parse_err:
-                            logger.warning(f"   ⚠️ [LOG 25.{idx}] Token {link['token'][:8]}... | Processing date parse FAILED: {parse_err}")
-                    else:
-                        logger.warning(f"   ⚠️ [LOG 26.{idx}] Token {link['token'][:8]}... | NO last_processed_at OR created_at field!")
+            # 2. Generăm graficul (doar la cache MISS)
+            if admin_fig is None:
+                admin_fig = create_plot(graph_df, file_name=graph_filename,
+                                        max_points=config.INTERACTIVE_PLOT_CONFIG['max_points_per_trace'])
+                
+                # [DIAGNOSTIC LOG A4] Plot Created
+                if admin_fig:
+                     logger.info(f"✅ [ADMIN_VIEW] Figura creată. Traces: {len(admin_fig.data) if hasattr(admin_fig, 'data') else 'N/A'}")
                 else:
-                    # MODE B: Filter by medical recording date (recording_date)
-                    if link.get('recording_date'):
-                        try:
-                            rec_date = datetime.strptime(link['recording_date'], '%Y-%m-%d').date()
-                            is_in_range = start_date <= rec_date <= end_date
-                            logger.info(f"   [LOG 24.{idx}] Token {link['token'][:8]}... | recording_date: {rec_date} | in_range: {is_in_range}")
-                            if is_in_range:
-                                filtered_links.append(link)
-                        except Exception as parse_err:
-                            logger.warning(f"   ⚠️ [LOG 25.{idx}] Token {link['token'][:8]}... | Recording date parse FAILED: {parse_err}")
-                    else:
-                        logger.warning(f"   ⚠️ [LOG 26.{idx}] Token {link['token'][:8]}... | NO recording_date field!")
+                     logger.error("❌ [ADMIN_VIEW] create_plot a returnat None!")
+
+                # Adăugăm logo dacă e configurat (opțional)
+                try:
+                    from plot_generator import apply_logo_to_figure
+                    admin_fig = apply_logo_to_figure(admin_fig)
+                    if admin_fig is not None and len(admin_fig.data) > 0:
+                        figure_cache.put_figure(admin_etag, admin_fig)
+                except Exception as logo_e:
+                    logger.warning(f"⚠️ [ADMIN_VIEW] Eroare logo: {logo_e}")
+            else:
+                logger.info(f"🧊 [ADMIN_VIEW] Figură servită din cache pentru {token[:8]}...")
             
-            logger.info(f"✅ [LOG 27] Links AFTER filtering: {len(filtered_links)} (removed {len(all_links) - len(filtered_links)})")
-            all_links = filtered_links
+            # 3. Randăm componenta Graph
+            # [DIAGNOSTIC LOG A5] Rendering Graph
+            graph_content = html.Div([
+                html.H4("📈 Grafic Interactiv Detaliat", style={'color': '#2980b9', 'marginBottom': '10px'}),
+                dcc.Graph(
+                    figure=admin_fig,
+                    config={'displayModeBar': True, 'scrollZoom': True},
+                    style={'height': '500px'},
+                    id={"type": "admin-graph", "index": token} # ID unic pentru debug
+                )
+            ], style={'marginBottom': '25px', 'padding': '15px', 'backgroundColor': 'white', 'borderRadius': '8px', 'border': '1px solid #ddd'})
+            logger.info(f"🚀 [ADMIN_VIEW] Componenta Graph adăugată în layout pentru {token[:8]}")
         else:
-            logger.info(f"ℹ️ [LOG 28] NO DATE FILTER active - showing ALL {len(all_links)} links")
+             # Fallback: Mesaj că nu există date
+             # [DIAGNOSTIC LOG A6] No Data
+             logger.warning(f"⚠️ [ADMIN_VIEW] Nu există date (df is None). Status: {graph_status}")
+             graph_content = html.Div([
+                html.H4("📉 Date Grafic Indisponibile", style={'color': '#7f8c8d', 'marginBottom': '10px'}),
+                html.P(f"Motiv: {graph_status}", style={'fontStyle': 'italic', 'color': '#e74c3c'})
+            ], style={'marginBottom': '25px', 'padding': '20px', 'backgroundColor': '#f8f9fa', 'borderRadius': '8px'})
+    except Exception as graph_err:
+        # [DIAGNOSTIC LOG A7] Exception
+        logger.error(f"❌ [ADMIN_VIEW] Eroare critică generare grafic: {graph_err}", exc_info=True)
+        graph_content = html.Div(f"Eroare generare grafic: {str(graph_err)}", style={'color': 'red'})
+
+
+    expanded_content = html.Div([
+        html.Hr(style={'margin': '15px 0', 'border': 'none', 'borderTop': '2px solid #bdc3c7'}),
+        
+        # AICI INSERĂM GRAFICUL GENERAT
+        html.Div(graph_content),
+        
+        # Secțiune imagini generate cu toggle view
+        html.Div([
+            # Header cu butoane toggle
+            html.Div([
+                html.H4("🖼️ Imagini Generate", style={'color': '#2980b9', 'marginBottom': '0', 'display': 'inline-block', 'marginRight': '20px'}),
+                html.Div([
+                    html.Button(
+                        '📊 Ansamblu',
+                        id={'type': 'view-grid-btn', 'index': token},
+                        n_clicks=0,
+                        style={
+                            'padding': '8px 20px',
+                            'marginRight': '10px',
+                            'backgroundColor': '#95a5a6',
+                            'color': 'white',
+                            'border': 'none',
+                            'borderRadius': '5px',
+                            'cursor': 'pointer',
+                            'fontSize': '13px',
+                            'fontWeight': 'bold',
+                            'transition': 'all 0.2s'
+                        }
+                    ),
+                    html.Button(
+                        '📄 Desfășurat',
+                        id={'type': 'view-list-btn', 'index': token},
+                        n_clicks=0,
+                        style={
+                            'padding': '8px 20px',
+                            'backgroundColor': '#27ae60',
+                            'color': 'white',
+                            'border': 'none',
+                            'borderRadius': '5px',
+                            'cursor': 'pointer',
+                            'fontSize': '13px',
+                            'fontWeight': 'bold',
+                            'transition': 'all 0.2s',
+                            'boxShadow': '0 2px 4px rgba(0,0,0,0.2)'
+                        }
+                    )
+                ], style={'display': 'inline-block', 'verticalAlign': 'middle'})
+            ], style={'marginBottom': '15px', 'display': 'flex', 'alignItems': 'center', 'justifyContent': 'space-between'}),
+            
+            # Container pentru imagini (va fi populat dinamic)
+            html.Div(
+                id={'type': 'images-display-container', 'index': token},
+                children=images_content
+            )
+        ], style={'marginBottom': '25px'}),
         
-        # === GRUPARE PE ZILE/SĂPTĂMÂNI/LUNI ===
-        grouped_links = {}
-        if grouping == 'day':
-            # Grupare pe zile (cu format DD/MM/YYYY pentru display)
-            for link in all_links:
-                date_raw = link.get('recording_date', 'Dată necunoscută')
-                if date_raw != 'Dată necunoscută':
-                    try:
-                        # Convertim din YYYY-MM-DD în DD/MM/YYYY pentru afișare
-                        rec_date = datetime.strptime(date_raw, '%Y-%m-%d').date()
-                        date_key = rec_date.strftime('%d/%m/%Y')
-                    except:
-                        date_key = 'Dată necunoscută'
-                else:
-                    date_key = 'Dată necunoscută'
-                
-                if date_key not in grouped_links:
-                    grouped_links[date_key] = []
-                grouped_links[date_key].append(link)
-        elif grouping == 'week':
-            # Grupare pe săptămâni
-            for link in all_links:
-                if link.get('recording_date'):
-                    try:
-                        rec_date = datetime.strptime(link['recording_date'], '%Y-%m-%d').date()
-                        # Calculăm numărul săptămânii
-                        week_num = rec_date.isocalendar()[1]
-                        year = rec_date.year
-                        week_key = f"Săptămâna {week_num}, {year}"
-                        if week_key not in grouped_links:
-                            grouped_links[week_key] = []
-                        grouped_links[week_key].append(link)
-                    except:
-                        if 'Dată necunoscută' not in grouped_links:
-                            grouped_links['Dată necunoscută'] = []
-                        grouped_links['Dată necunoscută'].append(link)
-                else:
-                    if 'Dată necunoscută' not in grouped_links:
-                        grouped_links['Dată necunoscută'] = []
-                    grouped_links['Dată necunoscută'].append(link)
-        elif grouping == 'month':
-            # Grupare pe luni (cu format DD/MM/YYYY pentru display)
-            for link in all_links:
-                if link.get('recording_date'):
-                    try:
-                        rec_date = datetime.strptime(link['recording_date'], '%Y-%m-%d').date()
-                        # Formatăm luna în format românesc  
-                        month_names = ['Ianuarie', 'Februarie', 'Martie', 'Aprilie', 'Mai', 'Iunie', 
-                                     'Iulie', 'August', 'Septembrie', 'Octombrie', 'Noiembrie', 'Decembrie']
-                        month_key = f"{month_names[rec_date.month - 1]} {rec_date.year}"
-                        if month_key not in grouped_links:
-                            grouped_links[month_key] = []
-                        grouped_links[month_key].append(link)
-                    except:
-                        if 'Dată necunoscută' not in grouped_links:
-                            grouped_links['Dată necunoscută'] = []
-                        grouped_links['Dată necunoscută'].append(link)
-                else:
-                    if 'Dată necunoscută' not in grouped_links:
-                        grouped_links['Dată necunoscută'] = []
-                    grouped_links['Dată necunoscută'].append(link)
-        else:
-            # Fără grupare - afișare liniară
-            grouped_links['Toate înregistrările'] = all_links
+        # Secțiune raport PDF
+        html.Div([
+            html.H4("📄 Raport PDF", style={'color': '#2980b9', 'marginBottom': '10px'}),
+            
+            # Upload nou PDF
+            html.Div([
+                dcc.Upload(
+                    id={'type': 'pdf-upload', 'index': token},
+                    children=html.Div([
+                        '📁 Click pentru a încărca raport PDF (Checkme O2)'
+                    ]),
+                    style={
+                        'width': '100%',
+                        'height': '60px',
+                        'lineHeight': '60px',
+                        'borderWidth': '2px',
+                        'borderStyle': 'dashed',
+                        'borderRadius': '8px',
+                        'textAlign': 'center',
+                        'backgroundColor': '#e8f5e9',
+                        'color': '#27ae60',
+                        'cursor': 'pointer',
+                        'fontWeight': 'bold'
+                    },
+                    multiple=False
+                ),
+                html.Div(
+                    id={'type': 'pdf-upload-feedback', 'index': token},
+                    style={'marginTop': '10px'}
+                )
+            ], style={'marginBottom': '20px'}),
+            
+            # Afișare PDF-uri existente (încărcat dinamic la expandare)
+            html.Div(
+                id={'type': 'pdf-display-container', 'index': token},
+                children=render_pdfs_display(token, patient_links.get_all_pdfs_for_link(token))
+            )
+        ], style={'marginBottom': '25px', 'padding': '20px', 'backgroundColor': '#f8f9fa', 'borderRadius': '8px'}),
+        
+        # Secțiune interpretare
+        html.Div([
+            html.H4("📝 Interpretare", style={'color': '#2980b9', 'marginBottom': '10px'}),
+            dcc.Textarea(
+                id={'type': 'medical-interpretation', 'index': token},
+                value=link_data.get('medical_notes', ''),
+                placeholder='Scrieți interpretarea aici (ex: Episoade de desaturare nocturnă, apnee obstructivă severă, recomand CPAP)...',
+                style={
+                    'width': '100%',
+                    'minHeight': '120px',
+                    'padding': '15px',
+                    'border': '2px solid #3498db',
+                    'borderRadius': '8px',
+                    'fontSize': '14px',
+                    'fontFamily': 'Arial, sans-serif'
+                }
+            ),
+            html.Button(
+                '💾 Salvează Interpretare',
+                id={'type': 'save-interpretation-btn', 'index': token},
+                n_clicks=0,
+                style={
+                    'marginTop': '10px',
+                    'padding': '10px 25px',
+                    'backgroundColor': '#27ae60',
+                    'color': 'white',
+                    'border': 'none',
+                    'borderRadius': '5px',
+                    'cursor': 'pointer',
+                    'fontWeight': 'bold'
+                }
+            ),
+            html.Span(
+                id={'type': 'save-interpretation-feedback', 'index': token},
+                style={'marginLeft': '15px', 'color': 'green', 'fontWeight': 'bold'}
+            )
+        ], style={'marginBottom': '25px'}),
+        
+        # Link către pacient
+        html.Div([
+            html.Hr(style={'margin': '20px 0'}),
+            html.Strong("🔗 Link Pacient: ", style={'marginRight': '10px', 'display': 'block', 'marginBottom': '10px'}),
+            dcc.Input(
+                id={'type': 'link-input-view', 'index': token},
+                value=f"{os.getenv('APP_URL', 'http://127.0.0.1:8050')}/?token={token}",
+                readOnly=True,
+                style={
+                    'width': '100%',
+                    'padding': '10px',
+                    'backgroundColor': '#ecf0f1',
+                    'border': '2px solid #bdc3c7',
+                    'borderRadius': '5px',
+                    'fontSize': '12px',
+                    'fontFamily': 'monospace',
+                    'marginBottom': '10px'
+                }
+            ),
+            html.Div([
+                html.Button(
+                    '📋 Copy Link',
+                    id={'type': 'copy-link-view', 'index': token},
+                    n_clicks=0,
+                    style={
+                        'padding': '8px 20px',
+                        'marginRight': '10px',
+                        'backgroundColor': '#3498db',
+                        'color': 'white',
+                        'border': 'none',
+                        'borderRadius': '5px',
+                        'cursor': 'pointer',
+                        'fontSize': '13px',
+                        'fontWeight': 'bold'
+                    }
+                ),
+                html.A(
+                    '🌐 Testează în browser',
+                    href=f"{os.getenv('APP_URL', 'http://127.0.0.1:8050')}/?token={token}",
+                    target='_blank',
+                    style={
+                        'padding': '8px 20px',
+                        'backgroundColor': '#27ae60',
+                        'color': 'white',
+                        'textDecoration': 'none',
+                        'borderRadius': '5px',
+                        'fontSize': '13px',
+                        'fontWeight': 'bold',
+                        'display': 'inline-block'
+                    }
+                )
+            ], style={'display': 'flex', 'gap': '10px'})
+        ], style={'marginTop': '20px'}),
+        
+        # Secțiune ștergere înregistrare
+        html.Div([
+            html.Hr(style={'margin': '20px 0', 'borderTop': '2px solid #e74c3c'}),
+            html.Div([
+                html.Strong("⚠️ Zonă Periculoasă", style={'color': '#e74c3c', 'fontSize': '16px', 'marginBottom': '10px', 'display': 'block'}),
+                html.P(
+                    "Ștergerea acestei înregistrări va șterge permanent toate datele asociate (CSV, imagini, PDF-uri). Această acțiune este IREVERSIBILĂ!",
+                    style={'fontSize': '13px', 'color': '#555', 'marginBottom': '15px', 'lineHeight': '1.6'}
+                ),
+                html.Button(
+                    '🗑️ Șterge această înregistrare',
+                    id={'type': 'delete-link-btn', 'index': token},
+                    n_clicks=0,
+                    style={
+                        'padding': '10px 30px',
+                        'backgroundColor': '#e74c3c',
+                        'color': 'white',
+                        'border': 'none',
+                        'borderRadius': '5px',
+                        'cursor': 'pointer',
+                        'fontSize': '14px',
+                        'fontWeight': 'bold'
+                    }
+                )
+            ], style={
+                'padding': '20px',
+                'backgroundColor': '#fff3cd',
+                'border': '2px solid #e74c3c',
+                'borderRadius': '8px'
+            })
+        ], style={'marginTop': '30px'})
+        
+    ], style={
+        'padding': '25px',
+        'backgroundColor': '#ffffff',
+        'borderRadius': '8px',
+        'marginTop': '10px',
+        'boxShadow': 'inset 0 2px 8px rgba(0,0,0,0.05)'
+    })
+    
+    return expanded_content
+
+
+def _build_compact_row(link_data: Dict, is_expanded: bool = False):
+    """Rândul compact (clickabil) + containerul gol pentru detaliile încărcate la cerere."""
+    token = link_data['token']
+    
+    # Formatare dată
+    date_display = "Data nespecificată"
+    try:
+        if link_data.get('recording_date'):
+            date_display = format_recording_date_ro(
+                link_data.get('recording_date', ''),
+                link_data.get('start_time', ''),
+                link_data.get('end_time', '')
+            )
+    except Exception as format_err:
+        logger.error(f"  ❌ EROARE la formatare dată pentru {token[:8]}: {format_err}", exc_info=True)
+        date_display = f"{link_data.get('recording_date', 'N/A')} {link_data.get('start_time', '')} - {link_data.get('end_time', '')}"
+    
+    # Status vizualizări
+    view_count = link_data.get('view_count', 0)
+    view_display = f"👁️ {view_count}"
+    
+    # Status PDF-uri
+    pdf_count = len(link_data.get('pdf_paths', []))
+    pdf_display = f" | 📕 {pdf_count}" if pdf_count > 0 else ""
+    
+    # === RÂND COMPACT (întotdeauna vizibil) - CLICKABIL PE ÎNTREAGA LINIE ===
+    compact_row = html.Button(
+        children=[
+            # Info condensată (FĂRĂ iconița play)
+            html.Div([
+                html.Strong(f"📅 {date_display}", style={'fontSize': '16px', 'color': '#2c3e50', 'display': 'block', 'marginBottom': '5px'}),
+                html.Small(f"🔧 {link_data['device_name']} | {view_display}{pdf_display}", style={'color': '#7f8c8d', 'display': 'block', 'fontSize': '13px'})
+            ], style={'flex': '1', 'textAlign': 'left'})
+        ],
+        id={'type': 'expand-row-btn', 'index': token},
+        n_clicks=0,
+        style={
+            'width': '100%',
+            'display': 'flex',
+            'alignItems': 'center',
+            'padding': '18px 20px',
+            'borderRadius': '8px',
+            'cursor': 'pointer',
+            'transition': 'all 0.3s ease',
+            'marginBottom': '10px',
+            **_row_highlight(is_expanded)
+        }
+    )
+    
+    # === DETALII (populate de toggle_data_view_row; la refresh, doar rândul deja expandat) ===
+    return html.Div([
+        compact_row,
+        html.Div(
+            id={'type': 'row-details', 'index': token},
+            children=_build_row_details(link_data) if is_expanded else None
+        )
+    ], style={
+        'marginBottom': '15px',
+        'backgroundColor': '#fff',
+        'borderRadius': '10px',
+        'boxShadow': '0 2px 6px rgba(0,0,0,0.1)',
+        'overflow': 'hidden'
+    })
+
+
+def _build_group_header(group_name: str, count: int, is_collapsed: bool):
+    """Header-ul clickabil al unui grup (iconița + culorile se schimbă prin Patch)."""
+    return html.Button(
+        children=[
+            html.Div([
+                html.Span(
+                    "▼" if not is_collapsed else "▶",
+                    id={'type': 'group-toggle-icon', 'index': group_name},
+                    style={
+                        'fontSize': '18px',
+                        'marginRight': '10px',
+                        'color': 'white' if not is_collapsed else '#3498db',
+                        'transition': 'transform 0.3s ease'
+                    }
+                ),
+                html.Span(
+                    f"📅 {group_name}",
+                    style={'fontSize': '18px', 'fontWeight': 'bold', 'color': 'inherit'}
+                ),
+                html.Span(
+                    f" — {count} {'înregistrare' if count == 1 else 'înregistrări'}",
+                    style={'fontSize': '14px', 'color': 'inherit', 'opacity': '0.8', 'marginLeft': '10px'}
+                )
+            ], style={'display': 'flex', 'alignItems': 'center'})
+        ],
+        id={'type': 'toggle-group-btn', 'index': group_name},
+        n_clicks=0,
+        style={
+            'width': '100%',
+            'padding': '15px 20px',
+            'marginTop': '25px',
+            'marginBottom': '10px',
+            'borderRadius': '8px',
+            'cursor': 'pointer',
+            'textAlign': 'left',
+            'fontSize': '16px',
+            'fontWeight': 'bold',
+            'transition': 'all 0.3s ease',
+            **_group_highlight(is_collapsed)
+        },
+        className='group-toggle-button'
+    )
+
+
+@app.callback(
+    [Output('data-view-container', 'children'),
+     Output('expanded-row-id', 'data')],
+    [Input('admin-refresh-data-view', 'n_clicks'),
+     Input('admin-refresh-trigger', 'data'),
+     Input('active-date-filter', 'data'),
+     Input('date-filter-mode', 'value'),  # [NEW] Filter mode: 'upload' or 'recording'
+     Input('date-grouping', 'value')],
+    [State('expanded-row-id', 'data'),
+     State('collapsed-groups-store', 'data')]
+)
+def load_data_view_with_accordion(n_clicks_refresh, trigger, date_filter, filter_mode, grouping, expanded_id, collapsed_groups):
+    """
+    Încarcă scheletul vizualizării datelor: grupuri + rânduri compacte.
+    Detaliile rândurilor se încarcă la cerere (toggle_data_view_row).
+    """
+    logger.info(f"⚡ [ADMIN_CALLBACK] Data view - trigger: {callback_context.triggered_id or 'initial'}")
+    
+    collapsed_groups = collapsed_groups or []
+    
+    try:
+        from datetime import datetime
+        
+        # [LOG 1-5] Parametri callback
+        logger.info(f"📋 [LOG 1] date_filter param: {date_filter}")
+        logger.info(f"📋 [LOG 1.5] filter_mode param: {filter_mode}")  # [NEW] Log filter mode
+        logger.info(f"📋 [LOG 2] grouping param: {grouping}")
+        logger.info(f"📋 [LOG 3] n_clicks_refresh: {n_clicks_refresh}")
+        logger.info(f"📋 [LOG 4] trigger data: {trigger}")
+        logger.info(f"📋 [LOG 5] expanded_id: {expanded_id}")
+        
+        # === FILTRARE TEMPORALĂ (în SQL, pe coloanele indexate) ===
+        # [DUAL FILTER MODE] 'upload' = ultima procesare (last_processed_at → created_at), altfel data testului
+        date_field = date_from = date_to = None
+        if date_filter and date_filter.get('start') and date_filter.get('end'):
+            date_field = 'processed' if filter_mode == 'upload' else 'recording'
+            date_from = datetime.fromisoformat(date_filter['start']).date()
+            date_to = datetime.fromisoformat(date_filter['end']).date()
+            logger.info(f"🔍 [DATA VIEW] Filtru '{date_filter.get('label', 'Interval Personalizat')}': "
+                        f"{date_field} {date_from} → {date_to}")
+        
+        all_links = patient_links.get_all_links_for_admin(date_field=date_field, date_from=date_from, date_to=date_to)
+        logger.info(f"📊 [DATA VIEW] {len(all_links)} link-uri după filtrare")
         
         if not all_links:
-            filter_msg = f" pentru perioada selectată ({date_filter.get('label', '')})" if date_filter else ""
+            if date_field is None:
+                logger.warning("⚠️ [DATA VIEW] NO LINKS FOUND - returning empty state")
+                message = "📭 Nu există înregistrări încă. Procesați fișiere CSV din tab-ul 'Procesare Batch'."
+            else:
+                filter_msg = f" pentru perioada selectată ({date_filter.get('label', '')})" if date_filter else ""
+                message = f"📭 Nu există înregistrări{filter_msg}. Încercați să modificați filtrul sau să procesați mai multe fișiere CSV."
             return html.Div(
-                f"📭 Nu există înregistrări{filter_msg}. Încercați să modificați filtrul sau să procesați mai multe fișiere CSV.",
+                message,
                 style={'padding': '50px', 'textAlign': 'center', 'color': '#666', 'fontStyle': 'italic', 'backgroundColor': '#f8f9fa', 'borderRadius': '10px'}
-            ), current_expanded, collapsed_groups
+            ), None
         
-        # Construim lista de rânduri cu funcționalitate accordion
-        rows = []
+        # === GRUPARE PE ZILE/SĂPTĂMÂNI/LUNI (o singură trecere) ===
+        def _group_label(recording_date: str) -> str:
+            try:
+                rec_date = datetime.strptime(recording_date, '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                return 'Dată necunoscută'
+            if grouping == 'day':
+                return rec_date.strftime('%d/%m/%Y')
+            if grouping == 'week':
+                return f"Săptămâna {rec_date.isocalendar()[1]}, {rec_date.year}"
+            return f"{_MONTH_NAMES_RO[rec_date.month - 1]} {rec_date.year}"
 
+        grouped_links = {}
+        if grouping in ('day', 'week', 'month'):
+            for link in all_links:
+                grouped_links.setdefault(_group_label(link.get('recording_date')), []).append(link)
+        else:
+            # Fără grupare - afișare liniară
+            grouped_links['Toate înregistrările'] = all_links
+        
         def _group_chrono_key(gname: str):
             """Cheie sortare: cele mai recente primele; 'Dată necunoscută' la final."""
             if grouping == 'day':
@@ -2072,17 +2648,13 @@ def load_data_view_with_accordion(n_clicks_refresh, trigger, expand_clicks, togg
             if grouping == 'month':
                 if gname == 'Dată necunoscută':
                     return (0, 0)
-                month_names_ro = [
-                    'Ianuarie', 'Februarie', 'Martie', 'Aprilie', 'Mai', 'Iunie',
-                    'Iulie', 'August', 'Septembrie', 'Octombrie', 'Noiembrie', 'Decembrie',
-                ]
                 parts = gname.rsplit(' ', 1)
                 if len(parts) == 2:
                     month_name, year_s = parts[0], parts[1]
                     try:
                         y = int(year_s)
-                        if month_name in month_names_ro:
-                            return (y, month_names_ro.index(month_name) + 1)
+                        if month_name in _MONTH_NAMES_RO:
+                            return (y, _MONTH_NAMES_RO.index(month_name) + 1)
                     except ValueError:
                         pass
                 return (0, 0)
@@ -2100,782 +2672,367 @@ def load_data_view_with_accordion(n_clicks_refresh, trigger, expand_clicks, togg
         sorted_groups = sorted(
             grouped_links.items(), key=lambda it: _group_chrono_key(it[0]), reverse=True
         )
-
-        # Parcurgem fiecare grupă
+        
+        # Rândul expandat rămâne deschis după refresh doar dacă e încă în listă
+        visible_tokens = {link['token'] for link in all_links}
+        current_expanded = expanded_id if expanded_id in visible_tokens else None
+        
+        rows = []
         for group_name, group_links in sorted_groups:
             group_links = sorted(group_links, key=_link_rec_sort_key, reverse=True)
             is_group_collapsed = group_name in collapsed_groups
             
             # Header pentru grupă (CLICABIL cu toggle)
             if grouping in ['week', 'month', 'day']:
-                # Iconița pentru collapse/expand
-                toggle_icon = "▼" if not is_group_collapsed else "▶"
-                
-                rows.append(html.Button(
-                    children=[
-                        html.Div([
-                            html.Span(
-                                toggle_icon, 
-                                style={
-                                    'fontSize': '18px', 
-                                    'marginRight': '10px', 
-                                    'color': 'white' if not is_group_collapsed else '#3498db',
-                                    'transition': 'transform 0.3s ease'
-                                }
-                            ),
-                            html.Span(
-                                f"📅 {group_name}", 
-                                style={
-                                    'fontSize': '18px', 
-                                    'fontWeight': 'bold', 
-                                    'color': 'white' if not is_group_collapsed else '#2c3e50'
-                                }
-                            ),
-                            html.Span(
-                                f" — {len(group_links)} {'înregistrare' if len(group_links) == 1 else 'înregistrări'}",
-                                style={
-                                    'fontSize': '14px', 
-                                    'color': 'rgba(255,255,255,0.9)' if not is_group_collapsed else '#7f8c8d', 
-                                    'marginLeft': '10px'
-                                }
-                            )
-                        ], style={'display': 'flex', 'alignItems': 'center'})
-                    ],
-                    id={'type': 'toggle-group-btn', 'index': group_name},
-                    n_clicks=0,
-                    style={
-                        'width': '100%',
-                        'padding': '15px 20px',
-                        'marginTop': '25px',
-                        'marginBottom': '10px',
-                        'backgroundColor': '#3498db' if not is_group_collapsed else '#ecf0f1',
-                        'color': 'white' if not is_group_collapsed else '#2c3e50',
-                        'border': f"2px solid {'#3498db' if not is_group_collapsed else '#bdc3c7'}",
-                        'borderRadius': '8px',
-                        'cursor': 'pointer',
-                        'textAlign': 'left',
-                        'fontSize': '16px',
-                        'fontWeight': 'bold',
-                        'transition': 'all 0.3s ease',
-                        'boxShadow': '0 3px 6px rgba(0,0,0,0.15)' if not is_group_collapsed else '0 2px 4px rgba(0,0,0,0.08)'
-                    },
-                    className='group-toggle-button'
-                ))
+                rows.append(_build_group_header(group_name, len(group_links), is_group_collapsed))
             
-            # Container pentru înregistrările din acest grup
-            group_rows = []
-            
-            logger.info(f"🔍 Grup '{group_name}': are {len(group_links)} link-uri în group_links")
-            
-            # Rânduri pentru fiecare link din grupă (ascunse dacă grupul e collapsed)
-            for idx, link_data in enumerate(group_links):
-                logger.info(f"  ↳ INTRAT în loop pentru link #{idx+1} din grup '{group_name}' - token: {link_data['token'][:8]}...")
-                token = link_data['token']
-                is_expanded = (current_expanded == token)
-                logger.info(f"  ↳ Token {token[:8]}... - is_expanded: {is_expanded}")
-                
-                # Formatare dată
-                date_display = "Data nespecificată"
-                logger.info(f"  ↳ Începere formatare dată pentru {token[:8]}...")
-                try:
-                    if link_data.get('recording_date'):
-                        date_display = format_recording_date_ro(
-                            link_data.get('recording_date', ''),
-                            link_data.get('start_time', ''),
-                            link_data.get('end_time', '')
-                        )
-                    logger.info(f"  ↳ Formatare dată completă: {date_display[:50]}...")
-                except Exception as format_err:
-                    logger.error(f"  ❌ EROARE la formatare dată pentru {token[:8]}: {format_err}", exc_info=True)
-                    date_display = f"{link_data.get('recording_date', 'N/A')} {link_data.get('start_time', '')} - {link_data.get('end_time', '')}"
-                
-                # Status vizualizări
-                view_count = link_data.get('view_count', 0)
-                view_display = f"👁️ {view_count}"
-                
-                # Status PDF-uri
-                pdf_count = len(link_data.get('pdf_paths', []))
-                pdf_display = f" | 📕 {pdf_count}" if pdf_count > 0 else ""
-
-                logger.info(f"  ↳ Creare compact_row pentru {token[:8]}...")
-                
-                # === RÂND COMPACT (întotdeauna vizibil) - CLICKABIL PE ÎNTREAGA LINIE ===
-                compact_row = html.Button(
-                    children=[
-                        # Info condensată (FĂRĂ iconița play)
-                        html.Div([
-                            html.Strong(f"📅 {date_display}", style={'fontSize': '16px', 'color': '#2c3e50', 'display': 'block', 'marginBottom': '5px'}),
-                            html.Small(f"🔧 {link_data['device_name']} | {view_display}{pdf_display}", style={'color': '#7f8c8d', 'display': 'block', 'fontSize': '13px'})
-                        ], style={'flex': '1', 'textAlign': 'left'})
-                    ],
-                    id={'type': 'expand-row-btn', 'index': token},
-                    n_clicks=0,
-                    style={
-                        'width': '100%',
-                        'display': 'flex',
-                        'alignItems': 'center',
-                        'padding': '18px 20px',
-                        'backgroundColor': '#fff' if not is_expanded else '#e8f4f8',
-                        'border': '2px solid #ddd' if not is_expanded else '2px solid #3498db',
-                        'borderLeft': '5px solid #3498db' if is_expanded else '5px solid #95a5a6',
-                        'borderRadius': '8px',
-                        'cursor': 'pointer',
-                        'transition': 'all 0.3s ease',
-                        'boxShadow': '0 2px 4px rgba(0,0,0,0.08)' if not is_expanded else '0 4px 12px rgba(52, 152, 219, 0.2)',
-                        'marginBottom': '10px'
-                    }
-                )
-                
-                logger.info(f"  ↳ Compact_row creat pentru {token[:8]}, acum expanded_content...")
-                
-                # === DETALII EXPANDATE (vizibil doar când is_expanded=True) ===
-                expanded_content = None
-                if is_expanded:
-                    # Încărcăm imaginile pentru rândul expandat
-                    images_content = [html.P("Nu există imagini disponibile.", style={'color': '#666', 'fontStyle': 'italic'})]
-                    
-                    # Încercăm să găsim folderul cu imagini pentru această înregistrare
-                    try:
-                        # Verificăm dacă avem calea stocată în metadata
-                        output_folder_path = link_data.get('output_folder_path')
-                        
-                        if output_folder_path and os.path.exists(output_folder_path):
-                                # Găsim imaginile din folder
-                                image_files = [f for f in os.listdir(output_folder_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-                                
-                                if image_files:
-                                    # Sortăm imaginile alfabetic
-                                    image_files.sort()
-                                    
-                                    # Creăm galerie de imagini
-                                    images_content = []
-                                    images_count = len(image_files)
-                                    
-                                    # Adăugăm header cu număr imagini
-                                    images_content.append(
-                                        html.P(
-                                            f"📊 {images_count} imagini generate",
-                                            style={'fontSize': '14px', 'color': '#2c3e50', 'fontWeight': 'bold', 'marginBottom': '15px'}
-                                        )
-                                    )
-                                    
-                                    # Creăm vizualizarea desfășurată (LIST VIEW - default)
-                                    for img_file in image_files:
-                                        img_path = os.path.join(output_folder_path, img_file)
-                                        try:
-                                            with open(img_path, 'rb') as img_f:
-                                                img_data = base64.b64encode(img_f.read()).decode()
-                                                images_content.append(
-                                                    html.Div([
-                                                        html.Img(
-                                                            src=f'data:image/jpeg;base64,{img_data}',
-                                                            style={
-                                                                'width': '100%',
-                                                                'maxWidth': '900px',
-                                                                'borderRadius': '8px',
-                                                                'boxShadow': '0 2px 8px rgba(0,0,0,0.15)',
-                                                                'marginBottom': '10px',
-                                                                'border': '1px solid #ddd',
-                                                                'display': 'block',
-                                                                'marginLeft': 'auto',
-                                                                'marginRight': 'auto'
-                                                            }
-                                                        ),
-                                                        html.P(
-                                                            img_file,
-                                                            style={
-                                                                'fontSize': '13px',
-                                                                'color': '#7f8c8d',
-                                                                'textAlign': 'center',
-                                                                'marginBottom': '25px',
-                                                                'fontFamily': 'monospace'
-                                                            }
-                                                        )
-                                                    ], className='image-item', **{'data-img-src': f'data:image/jpeg;base64,{img_data}', 'data-img-name': img_file})
-                                                )
-                                        except Exception as img_err:
-                                            logger.error(f"Eroare la încărcarea imaginii {img_file}: {img_err}")
-                                else:
-                                    images_content = [html.P(
-                                        f"Nu s-au găsit imagini în folderul: {output_folder_path}",
-                                        style={'color': '#e74c3c', 'fontStyle': 'italic'}
-                                    )]
-                        else:
-                            # Fallback: încercăm să găsim folderul după numărul aparatului
-                            output_base = config.OUTPUT_DIR
-                            if os.path.exists(output_base):
-                                device_num = link_data['device_name'].split('#')[-1] if '#' in link_data['device_name'] else ''
-                                
-                                for folder_name in os.listdir(output_base):
-                                    folder_path = os.path.join(output_base, folder_name)
-                                    if os.path.isdir(folder_path) and device_num in folder_name:
-                                        image_files = [f for f in os.listdir(folder_path) if f.lower().endswith(('.jpg', '.jpeg', '.png'))]
-                                        if image_files:
-                                            image_files.sort()
-                                            images_content = []
-                                            
-                                            images_content.append(
-                                                html.P(
-                                                    f"📊 {len(image_files)} imagini găsite (căutare automată)",
-                                                    style={'fontSize': '14px', 'color': '#f39c12', 'fontWeight': 'bold', 'marginBottom': '15px'}
-                                                )
-                                            )
-                                            
-                                            for img_file in image_files:
-                                                img_path = os.path.join(folder_path, img_file)
-                                                try:
-                                                    with open(img_path, 'rb') as img_f:
-                                                        img_data = base64.b64encode(img_f.read()).decode()
-                                                        images_content.append(
-                                                            html.Div([
-                                                                html.Img(
-                                                                    src=f'data:image/jpeg;base64,{img_data}',
-                                                                    style={
-                                                                        'width': '100%',
-                                                                        'maxWidth': '900px',
-                                                                        'borderRadius': '8px',
-                                                                        'boxShadow': '0 2px 8px rgba(0,0,0,0.15)',
-                                                                        'marginBottom': '10px',
-                                                                        'border': '1px solid #ddd'
-                                                                    }
-                                                                ),
-                                                                html.P(
-                                                                    img_file,
-                                                                    style={
-                                                                        'fontSize': '13px',
-                                                                        'color': '#7f8c8d',
-                                                                        'textAlign': 'center',
-                                                                        'marginBottom': '25px',
-                                                                        'fontFamily': 'monospace'
-                                                                    }
-                                                                )
-                                                            ])
-                                                        )
-                                                except Exception as img_err:
-                                                    logger.error(f"Eroare la încărcarea imaginii {img_file}: {img_err}")
-                                            break
-                    
-                    except Exception as e:
-                        logger.error(f"Eroare la căutarea imaginilor pentru {token[:8]}...: {e}", exc_info=True)
-                        images_content = [html.P(
-                            f"⚠️ Eroare la încărcarea imaginilor: {str(e)}",
-                            style={'color': '#e74c3c', 'fontStyle': 'italic'}
-                        )]
-                    
-                    # Secțiune grafic interactiv - IMPLEMENTAT v2.0
-                    graph_content = []
-                    try:
-                        # [DIAGNOSTIC LOG A1] Start Admin Graph
-                        logger.info(f"📊 [ADMIN_VIEW] Start generare grafic pentru token: {token[:8]}...")
-                        
-                        # 1. Recuperăm datele folosind serviciul centralizat
-                        # [DIAGNOSTIC LOG A2] Apel DataService
-                        graph_df, graph_filename, graph_status = data_service.get_patient_dataframe(token)
-                        
-                        if graph_df is not None and not graph_df.empty:
-                            # [DIAGNOSTIC LOG A3] Data Found
-                            logger.info(f"✅ [ADMIN_VIEW] Date găsite: {len(graph_df)} rânduri. Generare figură...")
-                            
-                            # 2. Generăm graficul
-                            admin_fig = create_plot(graph_df, file_name=graph_filename)
-                            
-                            # [DIAGNOSTIC LOG A4] Plot Created
-                            if admin_fig:
-                                 logger.info(f"✅ [ADMIN_VIEW] Figura creată. Traces: {len(admin_fig.data) if hasattr(admin_fig, 'data') else 'N/A'}")
-                            else:
-                                 logger.error("❌ [ADMIN_VIEW] create_plot a returnat None!")
-
-                            # Adăugăm logo dacă e configurat (opțional)
-                            try:
-                                from plot_generator import apply_logo_to_figure
-                                admin_fig = apply_logo_to_figure(admin_fig)
-                            except Exception as logo_e:
-                                logger.warning(f"⚠️ [ADMIN_VIEW] Eroare logo: {logo_e}")
-                            
-                            # 3. Randăm componenta Graph
-                            # [DIAGNOSTIC LOG A5] Rendering Graph
-                            graph_content = html.Div([
-                                html.H4("📈 Grafic Interactiv Detaliat", style={'color': '#2980b9', 'marginBottom': '10px'}),
-                                dcc.Graph(
-                                    figure=admin_fig,
-                                    config={'displayModeBar': True, 'scrollZoom': True},
-                                    style={'height': '500px'},
-                                    id={"type": "admin-graph", "index": token} # ID unic pentru debug
-                                )
-                            ], style={'marginBottom': '25px', 'padding': '15px', 'backgroundColor': 'white', 'borderRadius': '8px', 'border': '1px solid #ddd'})
-                            logger.info(f"🚀 [ADMIN_VIEW] Componenta Graph adăugată în layout pentru {token[:8]}")
-                        else:
-                             # Fallback: Mesaj că nu există date
-                             # [DIAGNOSTIC LOG A6] No Data
-                             logger.warning(f"⚠️ [ADMIN_VIEW] Nu există date (df is None). Status: {graph_status}")
-                             graph_content = html.Div([
-                                html.H4("📉 Date Grafic Indisponibile", style={'color': '#7f8c8d', 'marginBottom': '10px'}),
-                                html.P(f"Motiv: {graph_status}", style={'fontStyle': 'italic', 'color': '#e74c3c'})
-                            ], style={'marginBottom': '25px', 'padding': '20px', 'backgroundColor': '#f8f9fa', 'borderRadius': '8px'})
-                    except Exception as graph_err:
-                        # [DIAGNOSTIC LOG A7] Exception
-                        logger.error(f"❌ [ADMIN_VIEW] Eroare critică generare grafic: {graph_err}", exc_info=True)
-                        graph_content = html.Div(f"Eroare generare grafic: {str(graph_err)}", style={'color': 'red'})
-
-
-                    expanded_content = html.Div([
-                        html.Hr(style={'margin': '15px 0', 'border': 'none', 'borderTop': '2px solid #bdc3c7'}),
-                        
-                        # AICI INSERĂM GRAFICUL GENERAT
-                        html.Div(graph_content),
-                        
-                        # Secțiune imagini generate cu toggle view
-                        html.Div([
-                            # Header cu butoane toggle
-                            html.Div([
-                                html.H4("🖼️ Imagini Generate", style={'color': '#2980b9', 'marginBottom': '0', 'display': 'inline-block', 'marginRight': '20px'}),
-                                html.Div([
-                                    html.Button(
-                                        '📊 Ansamblu',
-                                        id={'type': 'view-grid-btn', 'index': token},
-                                        n_clicks=0,
-                                        style={
-                                            'padding': '8px 20px',
-                                            'marginRight': '10px',
-                                            'backgroundColor': '#95a5a6',
-                                            'color': 'white',
-                                            'border': 'none',
-                                            'borderRadius': '5px',
-                                            'cursor': 'pointer',
-                                            'fontSize': '13px',
-                                            'fontWeight': 'bold',
-                                            'transition': 'all 0.2s'
-                                        }
-                                    ),
-                                    html.Button(
-                                        '📄 Desfășurat',
-                                        id={'type': 'view-list-btn', 'index': token},
-                                        n_clicks=0,
-                                        style={
-                                            'padding': '8px 20px',
-                                            'backgroundColor': '#27ae60',
-                                            'color': 'white',
-                                            'border': 'none',
-                                            'borderRadius': '5px',
-                                            'cursor': 'pointer',
-                                            'fontSize': '13px',
-                                            'fontWeight': 'bold',
-                                            'transition': 'all 0.2s',
-                                            'boxShadow': '0 2px 4px rgba(0,0,0,0.2)'
-                                        }
-                                    )
-                                ], style={'display': 'inline-block', 'verticalAlign': 'middle'})
-                            ], style={'marginBottom': '15px', 'display': 'flex', 'alignItems': 'center', 'justifyContent': 'space-between'}),
-                            
-                            # Container pentru imagini (va fi populat dinamic)
-                            html.Div(
-                                id={'type': 'images-display-container', 'index': token},
-                                children=images_content
-                            )
-                        ], style={'marginBottom': '25px'}),
-                        
-                        # Secțiune raport PDF
-                        html.Div([
-                            html.H4("📄 Raport PDF", style={'color': '#2980b9', 'marginBottom': '10px'}),
-                            
-                            # Upload nou PDF
-                            html.Div([
-                                dcc.Upload(
-                                    id={'type': 'pdf-upload', 'index': token},
-                                    children=html.Div([
-                                        '📁 Click pentru a încărca raport PDF (Checkme O2)'
-                                    ]),
-                                    style={
-                                        'width': '100%',
-                                        'height': '60px',
-                                        'lineHeight': '60px',
-                                        'borderWidth': '2px',
-                                        'borderStyle': 'dashed',
-                                        'borderRadius': '8px',
-                                        'textAlign': 'center',
-                                        'backgroundColor': '#e8f5e9',
-                                        'color': '#27ae60',
-                                        'cursor': 'pointer',
-                                        'fontWeight': 'bold'
-                                    },
-                                    multiple=False
-                                ),
-                                html.Div(
-                                    id={'type': 'pdf-upload-feedback', 'index': token},
-                                    style={'marginTop': '10px'}
-                                )
-                            ], style={'marginBottom': '20px'}),
-                            
-                            # Afișare PDF-uri existente (încărcat dinamic la expandare)
-                            html.Div(
-                                id={'type': 'pdf-display-container', 'index': token},
-                                children=render_pdfs_display(token, patient_links.get_all_pdfs_for_link(token))
-                            )
-                        ], style={'marginBottom': '25px', 'padding': '20px', 'backgroundColor': '#f8f9fa', 'borderRadius': '8px'}),
-                        
-                        # Secțiune interpretare
-                        html.Div([
-                            html.H4("📝 Interpretare", style={'color': '#2980b9', 'marginBottom': '10px'}),
-                            dcc.Textarea(
-                                id={'type': 'medical-interpretation', 'index': token},
-                                value=link_data.get('medical_notes', ''),
-                                placeholder='Scrieți interpretarea aici (ex: Episoade de desaturare nocturnă, apnee obstructivă severă, recomand CPAP)...',
-                                style={
-                                    'width': '100%',
-                                    'minHeight': '120px',
-                                    'padding': '15px',
-                                    'border': '2px solid #3498db',
-                                    'borderRadius': '8px',
-                                    'fontSize': '14px',
-                                    'fontFamily': 'Arial, sans-serif'
-                                }
-                            ),
-                            html.Button(
-                                '💾 Salvează Interpretare',
-                                id={'type': 'save-interpretation-btn', 'index': token},
-                                n_clicks=0,
-                                style={
-                                    'marginTop': '10px',
-                                    'padding': '10px 25px',
-                                    'backgroundColor': '#27ae60',
-                                    'color': 'white',
-                                    'border': 'none',
-                                    'borderRadius': '5px',
-                                    'cursor': 'pointer',
-                                    'fontWeight': 'bold'
-                                }
-                            ),
-                            html.Span(
-                                id={'type': 'save-interpretation-feedback', 'index': token},
-                                style={'marginLeft': '15px', 'color': 'green', 'fontWeight': 'bold'}
-                            )
-                        ], style={'marginBottom': '25px'}),
-                        
-                        # Link către pacient
-                        html.Div([
-                            html.Hr(style={'margin': '20px 0'}),
-                            html.Strong("🔗 Link Pacient: ", style={'marginRight': '10px', 'display': 'block', 'marginBottom': '10px'}),
-                            dcc.Input(
-                                id={'type': 'link-input-view', 'index': token},
-                                value=f"{os.getenv('APP_URL', 'http://127.0.0.1:8050')}/?token={token}",
-                                readOnly=True,
-                                style={
-                                    'width': '100%',
-                                    'padding': '10px',
-                                    'backgroundColor': '#ecf0f1',
-                                    'border': '2px solid #bdc3c7',
-                                    'borderRadius': '5px',
-                                    'fontSize': '12px',
-                                    'fontFamily': 'monospace',
-                                    'marginBottom': '10px'
-                                }
-                            ),
-                            html.Div([
-                                html.Button(
-                                    '📋 Copy Link',
-                                    id={'type': 'copy-link-view', 'index': token},
-                                    n_clicks=0,
-                                    style={
-                                        'padding': '8px 20px',
-                                        'marginRight': '10px',
-                                        'backgroundColor': '#3498db',
-                                        'color': 'white',
-                                        'border': 'none',
-                                        'borderRadius': '5px',
-                                        'cursor': 'pointer',
-                                        'fontSize': '13px',
-                                        'fontWeight': 'bold'
-                                    }
-                                ),
-                                html.A(
-                                    '🌐 Testează în browser',
-                                    href=f"{os.getenv('APP_URL', 'http://127.0.0.1:8050')}/?token={token}",
-                                    target='_blank',
-                                    style={
-                                        'padding': '8px 20px',
-                                        'backgroundColor': '#27ae60',
-                                        'color': 'white',
-                                        'textDecoration': 'none',
-                                        'borderRadius': '5px',
-                                        'fontSize': '13px',
-                                        'fontWeight': 'bold',
-                                        'display': 'inline-block'
-                                    }
-                                )
-                            ], style={'display': 'flex', 'gap': '10px'})
-                        ], style={'marginTop': '20px'}),
-                        
-                        # Secțiune ștergere înregistrare
-                        html.Div([
-                            html.Hr(style={'margin': '20px 0', 'borderTop': '2px solid #e74c3c'}),
-                            html.Div([
-                                html.Strong("⚠️ Zonă Periculoasă", style={'color': '#e74c3c', 'fontSize': '16px', 'marginBottom': '10px', 'display': 'block'}),
-                                html.P(
-                                    "Ștergerea acestei înregistrări va șterge permanent toate datele asociate (CSV, imagini, PDF-uri). Această acțiune este IREVERSIBILĂ!",
-                                    style={'fontSize': '13px', 'color': '#555', 'marginBottom': '15px', 'lineHeight': '1.6'}
-                                ),
-                                html.Button(
-                                    '🗑️ Șterge această înregistrare',
-                                    id={'type': 'delete-link-btn', 'index': token},
-                                    n_clicks=0,
-                                    style={
-                                        'padding': '10px 30px',
-                                        'backgroundColor': '#e74c3c',
-                                        'color': 'white',
-                                        'border': 'none',
-                                        'borderRadius': '5px',
-                                        'cursor': 'pointer',
-                                        'fontSize': '14px',
-                                        'fontWeight': 'bold'
-                                    }
-                                )
-                            ], style={
-                                'padding': '20px',
-                                'backgroundColor': '#fff3cd',
-                                'border': '2px solid #e74c3c',
-                                'borderRadius': '8px'
-                            })
-                        ], style={'marginTop': '30px'})
-                        
-                    ], style={
-                        'padding': '25px',
-                        'backgroundColor': '#ffffff',
-                        'borderRadius': '8px',
-                        'marginTop': '10px',
-                        'boxShadow': 'inset 0 2px 8px rgba(0,0,0,0.05)'
-                    })
-                
-                logger.info(f"  ↳ Creare row_container pentru {token[:8]}...")
-                
-                # Combinăm rândul compact + detaliile expandate (ÎN AFARA blocului if is_expanded)
-                row_container = html.Div([
-                    compact_row,
-                    expanded_content if expanded_content else None
-                ], style={
-                    'marginBottom': '15px',
-                    'backgroundColor': '#fff',
-                    'borderRadius': '10px',
-                    'boxShadow': '0 2px 6px rgba(0,0,0,0.1)',
-                    'overflow': 'hidden'
-                })
-                
-                logger.info(f"  ↳ APPEND row_container pentru token {token[:8]}... în group_rows")
-                group_rows.append(row_container)
-            
-            # Wrappăm toate înregistrările din grup într-un container
-            # DACĂ grupul NU este collapsed, adăugăm container-ul
-            logger.info(f"🔍 Înainte de verificare: len(group_rows)={len(group_rows)}, is_group_collapsed={is_group_collapsed}")
-            if group_rows and not is_group_collapsed:
-                group_container = html.Div(
-                    group_rows,
-                    style={
-                        'paddingLeft': '10px',
-                        'paddingRight': '10px',
-                        'marginBottom': '10px'
-                    }
-                )
-                rows.append(group_container)
-                logger.info(f"✅ Adăugat container pentru grup '{group_name}' cu {len(group_rows)} înregistrări")
-            elif is_group_collapsed:
-                logger.info(f"⬇️ Grup '{group_name}' este COLLAPSED - {len(group_rows)} înregistrări ASCUNSE")
+            # Grupul colapsat rămâne în DOM, ascuns: toggle-ul schimbă doar `display`
+            rows.append(html.Div(
+                [_build_compact_row(link_data, link_data['token'] == current_expanded) for link_data in group_links],
+                id={'type': 'group-body', 'index': group_name},
+                style={
+                    'paddingLeft': '10px',
+                    'paddingRight': '10px',
+                    'marginBottom': '10px',
+                    'display': 'none' if is_group_collapsed else 'block'
+                }
+            ))
+            logger.debug(f"✅ Grup '{group_name}': {len(group_links)} înregistrări (collapsed: {is_group_collapsed})")
         
-        logger.info(f"📊 RETURNARE: Total {len(rows)} elemente în rows (grupuri + headere)")
-        logger.info(f"📋 Grupuri collapsed finale: {collapsed_groups}")
-        return html.Div(rows), current_expanded, collapsed_groups
+        logger.info(f"📊 RETURNARE: {len(sorted_groups)} grupuri, {len(all_links)} rânduri compacte")
+        return html.Div(rows), current_expanded
         
     except Exception as e:
         logger.error(f"Eroare la încărcarea data-view: {e}", exc_info=True)
         return html.Div(
             f"❌ EROARE la încărcarea datelor: {str(e)}",
             style={'padding': '20px', 'backgroundColor': '#ffdddd', 'border': '1px solid red', 'borderRadius': '5px', 'color': 'red'}
-        ), current_expanded, []
+        ), expanded_id
+
+
+@app.callback(
+    [Output({'type': 'row-details', 'index': ALL}, 'children'),
+     Output({'type': 'expand-row-btn', 'index': ALL}, 'style'),
+     Output('expanded-row-id', 'data', allow_duplicate=True)],
+    Input({'type': 'expand-row-btn', 'index': ALL}, 'n_clicks'),
+    State('expanded-row-id', 'data'),
+    prevent_initial_call=True
+)
+def toggle_data_view_row(expand_clicks, expanded_id):
+    """
+    Expandare / colapsare rând (accordion: un singur rând deschis).
+    Trimite doar detaliile rândului apăsat + golirea rândului închis; restul no_update.
+    """
+    triggered = callback_context.triggered_id
+    # Rânduri noi randate de schelet (n_clicks=0) - nu e un click
+    if not isinstance(triggered, dict) or not callback_context.triggered[0].get('value'):
+        return no_update, no_update, no_update
+    
+    clicked_token = triggered['index']
+    tokens = [output['id']['index'] for output in callback_context.outputs_list[0]]
+    details = [no_update] * len(tokens)
+    styles = [no_update] * len(tokens)
+    
+    # Închidem rândul deschis anterior (dacă e altul și încă e afișat)
+    if expanded_id and expanded_id != clicked_token and expanded_id in tokens:
+        position = tokens.index(expanded_id)
+        details[position] = None
+        styles[position] = _style_patch(_row_highlight(False))
+    
+    position = tokens.index(clicked_token)
+    if expanded_id == clicked_token:
+        logger.info(f"⬆️ [DATA VIEW] Colapsare rând {clicked_token[:8]}...")
+        details[position] = None
+        styles[position] = _style_patch(_row_highlight(False))
+        return details, styles, None
+    
+    logger.info(f"⬇️ [DATA VIEW] Expandare rând {clicked_token[:8]}... (detalii la cerere)")
+    link_data = patient_links.get_patient_link(clicked_token, track_view=False)
+    if not link_data:
+        details[position] = html.P("⚠️ Înregistrarea nu mai există (ștearsă între timp?). Reîmprospătați lista.",
+                                   style={'color': '#e74c3c', 'fontStyle': 'italic', 'padding': '15px'})
+    else:
+        try:
+            details[position] = _build_row_details({**link_data, 'token': clicked_token})
+        except Exception as e:
+            logger.error(f"❌ [DATA VIEW] Eroare la detaliile rândului {clicked_token[:8]}: {e}", exc_info=True)
+            details[position] = html.Div(f"❌ EROARE la încărcarea detaliilor: {str(e)}",
+                                         style={'padding': '15px', 'color': 'red'})
+    styles[position] = _style_patch(_row_highlight(True))
+    return details, styles, clicked_token
+
+
+@app.callback(
+    [Output('collapsed-groups-store', 'data'),
+     Output({'type': 'group-body', 'index': ALL}, 'style'),
+     Output({'type': 'toggle-group-btn', 'index': ALL}, 'style'),
+     Output({'type': 'group-toggle-icon', 'index': ALL}, 'children'),
+     Output({'type': 'group-toggle-icon', 'index': ALL}, 'style')],
+    Input({'type': 'toggle-group-btn', 'index': ALL}, 'n_clicks'),
+    State('collapsed-groups-store', 'data'),
+    prevent_initial_call=True
+)
+def toggle_data_view_group(toggle_group_clicks, collapsed_groups):
+    """Colapsare / expandare grup: doar stilurile (Patch) și iconița grupului apăsat."""
+    triggered = callback_context.triggered_id
+    if not isinstance(triggered, dict) or not callback_context.triggered[0].get('value'):
+        return (no_update,) * 5
+    
+    clicked_group = triggered['index']
+    collapsed_groups = list(collapsed_groups or [])
+    if clicked_group in collapsed_groups:
+        collapsed_groups.remove(clicked_group)
+        is_collapsed = False
+        logger.info(f"✅ EXPANDARE grup: '{clicked_group}' → Grupuri collapsed: {collapsed_groups}")
+    else:
+        collapsed_groups.append(clicked_group)
+        is_collapsed = True
+        logger.info(f"⬇️ COLAPSARE grup: '{clicked_group}' → Grupuri collapsed: {collapsed_groups}")
+    
+    def _only_clicked(output_index: int, value):
+        return [value if output['id']['index'] == clicked_group else no_update
+                for output in callback_context.outputs_list[output_index]]
+    
+    return (
+        collapsed_groups,
+        _only_clicked(1, _style_patch({'display': 'none' if is_collapsed else 'block'})),
+        _only_clicked(2, _style_patch(_group_highlight(is_collapsed))),
+        _only_clicked(3, "▶" if is_collapsed else "▼"),
+        _only_clicked(4, _style_patch({'color': '#3498db' if is_collapsed else 'white'})),
+    )
+
+
+@app.callback(
+    Output({"type": "admin-graph", "index": MATCH}, 'figure'),
+    Input({"type": "admin-graph", "index": MATCH}, 'relayoutData'),
+    prevent_initial_call=True
+)
+def zoom_admin_graph(relayout_data):
+    """Zoom pe graficul din rândul expandat → rezoluție completă pentru fereastra vizibilă."""
+    try:
+        token = callback_context.triggered_id['index']
+        return _zoom_window_patch(token, relayout_data, 'ADMIN_ZOOM')
+    except Exception as e:
+        logger.error(f"❌ [ADMIN_ZOOM] Eroare la re-generarea ferestrei: {e}", exc_info=True)
+        return no_update
+
 
 
 
+def _build_dashboard_link_card(link_data: Dict, app_url: str):
+    """Cardul unui link din dashboard (link copiabil, notițe, status trimis, vizualizări)."""
+    token = link_data['token']
+    link_url = f"{app_url}/?token={token}"
+    
+    # Formatare dată citibilă în română
+    date_display = "Data nespecificată"
+    if link_data.get('recording_date'):
+        date_display = format_recording_date_ro(
+            link_data.get('recording_date', ''),
+            link_data.get('start_time', ''),
+            link_data.get('end_time', '')
+        )
+    
+    # Status trimis
+    sent_status_display = "✅ Trimis" if link_data.get('sent_status') else "📤 Netrimis"
+    sent_color = '#27ae60' if link_data.get('sent_status') else '#e74c3c'
+    
+    # Vizualizări (DOAR în dashboard medical!)
+    view_count = link_data.get('view_count', 0)
+    first_viewed = link_data.get('first_viewed_at')
+    view_display = f"👁️ {view_count} vizualizări"
+    if view_count > 0 and first_viewed:
+        view_display += f" (prima: {first_viewed[:10]})"
+    
+    return html.Div([
+        # Header card - DATA MAI ÎNTÂI!
+        html.Div([
+            html.Div([
+                html.Strong(f"📅 {date_display}", style={'fontSize': '16px', 'color': '#2c3e50', 'display': 'block'}),
+                html.Small(f"🔧 {link_data['device_name']}", style={'color': '#7f8c8d', 'display': 'block', 'marginTop': '5px'})
+            ], style={'flex': '1'}),
+            html.Div([
+                html.Span(sent_status_display, style={
+                    'padding': '5px 12px',
+                    'backgroundColor': sent_color,
+                    'color': 'white',
+                    'borderRadius': '15px',
+                    'fontSize': '12px',
+                    'fontWeight': 'bold',
+                    'marginRight': '10px'
+                }),
+                html.Span(view_display, style={
+                    'padding': '5px 12px',
+                    'backgroundColor': '#3498db',
+                    'color': 'white',
+                    'borderRadius': '15px',
+                    'fontSize': '12px',
+                    'fontWeight': 'bold'
+                })
+            ])
+        ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center', 'marginBottom': '15px'}),
+    
+        # Link-ul (copiabil) + Butoane
+        html.Div([
+            html.Label("🔗 Link Pacient:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'fontSize': '14px'}),
+            dcc.Input(
+                id={'type': 'link-input-dashboard', 'index': token},
+                value=link_url,
+                readOnly=True,
+                style={'width': '100%', 'padding': '8px', 'backgroundColor': '#ecf0f1', 'border': '1px solid #bdc3c7', 'borderRadius': '5px', 'fontSize': '12px', 'fontFamily': 'monospace', 'marginBottom': '8px'}
+            ),
+            html.Div([
+                html.Button(
+                    '📋 Copy',
+                    id={'type': 'copy-link-dashboard', 'index': token},
+                    n_clicks=0,
+                    style={
+                        'padding': '6px 15px',
+                        'marginRight': '8px',
+                        'backgroundColor': '#3498db',
+                        'color': 'white',
+                        'border': 'none',
+                        'borderRadius': '4px',
+                        'cursor': 'pointer',
+                        'fontSize': '12px',
+                        'fontWeight': 'bold'
+                    }
+                ),
+                html.A(
+                    '🌐 Testează',
+                    href=link_url,
+                    target='_blank',
+                    style={
+                        'padding': '6px 15px',
+                        'backgroundColor': '#27ae60',
+                        'color': 'white',
+                        'textDecoration': 'none',
+                        'borderRadius': '4px',
+                        'fontSize': '12px',
+                        'fontWeight': 'bold',
+                        'display': 'inline-block'
+                    }
+                )
+            ], style={'display': 'flex', 'gap': '8px'})
+        ], style={'marginBottom': '15px'}),
+    
+        # Notițe (editabile)
+        html.Div([
+            html.Label("📝 Notițe:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'fontSize': '14px'}),
+            dcc.Textarea(
+                id={'type': 'medical-notes-textarea', 'index': token},
+                value=link_data.get('medical_notes', ''),
+                placeholder='Scrieți notițe aici (ex: Apnee severă, follow-up în 2 săptămâni)...',
+                style={'width': '100%', 'minHeight': '80px', 'padding': '10px', 'border': '1px solid #bdc3c7', 'borderRadius': '5px', 'fontSize': '14px'}
+            )
+        ], style={'marginBottom': '15px'}),
+    
+        # Acțiuni (checkbox + buton salvare)
+        html.Div([
+            dcc.Checklist(
+                id={'type': 'sent-status-checkbox', 'index': token},
+                options=[{'label': ' Marcat ca trimis către pacient', 'value': 'sent'}],
+                value=['sent'] if link_data.get('sent_status') else [],
+                style={'display': 'inline-block', 'marginRight': '20px'}
+            ),
+            html.Button(
+                '💾 Salvează Modificări',
+                id={'type': 'save-link-metadata-btn', 'index': token},
+                n_clicks=0,
+                style={
+                    'padding': '10px 20px',
+                    'backgroundColor': '#3498db',
+                    'color': 'white',
+                    'border': 'none',
+                    'borderRadius': '5px',
+                    'cursor': 'pointer',
+                    'fontWeight': 'bold'
+                }
+            ),
+            html.Span(
+                id={'type': 'save-feedback', 'index': token},
+                style={'marginLeft': '15px', 'color': 'green', 'fontWeight': 'bold'}
+            )
+        ], style={'display': 'flex', 'alignItems': 'center'}),
+    
+        # Footer cu info token
+        html.Hr(style={'margin': '15px 0'}),
+        html.Small(f"Token: {token}", style={'color': '#95a5a6', 'fontSize': '10px'})
+    
+    ], style={
+        'padding': '20px',
+        'marginBottom': '20px',
+        'backgroundColor': '#fff',
+        'borderRadius': '10px',
+        'border': '2px solid #e0e0e0',
+        'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
+    })
+
 
 @app.callback(
-    Output('admin-dashboard-table', 'children'),
+    [Output('admin-dashboard-table', 'children'),
+     Output('admin-dashboard-total', 'children'),
+     Output('admin-dashboard-page-label', 'children'),
+     Output('admin-dashboard-prev', 'disabled'),
+     Output('admin-dashboard-next', 'disabled'),
+     Output('admin-dashboard-page', 'data')],
     [Input('admin-refresh-dashboard', 'n_clicks'),
-     Input('admin-refresh-trigger', 'data')]
+     Input('admin-refresh-trigger', 'data'),
+     Input('admin-dashboard-search', 'value'),
+     Input('admin-dashboard-prev', 'n_clicks'),
+     Input('admin-dashboard-next', 'n_clicks')],
+    [State('admin-dashboard-page', 'data')]
 )
-def admin_load_dashboard_table(n_clicks, trigger):
+def admin_load_dashboard_table(n_clicks, trigger, search, prev_clicks, next_clicks, page_state):
     """
-    Încarcă tabelul dashboard cu toate link-urile și metadata.
+    Încarcă O PAGINĂ din dashboard-ul link-urilor (paginare keyset + căutare server-side).
+    
+    Stiva de cursoare din `admin-dashboard-page` ține începutul fiecărei pagini
+    vizitate: "Înainte" adaugă cursorul următor, "Înapoi" îl scoate; căutarea și
+    refresh-ul pornesc de la prima pagină.
     """
-    logger.debug("Refresh dashboard admin solicitat.")
+    triggered = callback_context.triggered_id
+    state = page_state or {}
+    cursors = list(state.get('cursors') or [None])
+    
+    if triggered == 'admin-dashboard-next' and state.get('next'):
+        cursors.append(state['next'])
+    elif triggered == 'admin-dashboard-prev' and len(cursors) > 1:
+        cursors.pop()
+    elif triggered not in ('admin-dashboard-next', 'admin-dashboard-prev'):
+        cursors = [None]
+    
+    logger.debug(f"Dashboard admin: pagina {len(cursors)} (căutare: {search!r}).")
     
     try:
-        all_links = patient_links.get_all_links_for_admin()
-        
-        if not all_links:
-            return html.Div(
-                "📭 Nu există link-uri generate încă. Rulați o procesare batch pentru a crea link-uri.",
+        page = patient_links.get_admin_links_page(search=search, cursor=cursors[-1])
+        total = page['total']
+        page_size = config.ADMIN_DASHBOARD_CONFIG['page_size']
+        total_pages = max(1, -(-total // page_size))
+        page_label = f"Pagina {len(cursors)} / {total_pages}"
+        new_state = {'cursors': cursors, 'next': page['next_cursor']}
+        navigation = (page_label, len(cursors) <= 1, not page['next_cursor'], new_state)
+        
+        if not page['links']:
+            message = (f"🔍 Niciun link nu corespunde căutării „{search.strip()}”." if (search or '').strip()
+                       else "📭 Nu există link-uri generate încă. Rulați o procesare batch pentru a crea link-uri.")
+            return (html.Div(
+                message,
                 style={'padding': '30px', 'textAlign': 'center', 'color': '#666', 'fontStyle': 'italic', 'backgroundColor': '#f8f9fa', 'borderRadius': '5px'}
-            )
+            ), f"{total} link-uri", *navigation)
         
         # Obținem APP_URL din environment
         app_url = os.getenv('APP_URL', 'http://127.0.0.1:8050')
         
-        # Construim carduri pentru fiecare link
-        link_cards = []
-        for link_data in all_links:
-            token = link_data['token']
-            link_url = f"{app_url}/?token={token}"
-            
-            # Formatare dată citibilă în română
-            date_display = "Data nespecificată"
-            if link_data.get('recording_date'):
-                date_display = format_recording_date_ro(
-                    link_data.get('recording_date', ''),
-                    link_data.get('start_time', ''),
-                    link_data.get('end_time', '')
-                )
-            
-            # Status trimis
-            sent_status_display = "✅ Trimis" if link_data.get('sent_status') else "📤 Netrimis"
-            sent_color = '#27ae60' if link_data.get('sent_status') else '#e74c3c'
-            
-            # Vizualizări (DOAR în dashboard medical!)
-            view_count = link_data.get('view_count', 0)
-            first_viewed = link_data.get('first_viewed_at')
-            view_display = f"👁️ {view_count} vizualizări"
-            if view_count > 0 and first_viewed:
-                view_display += f" (prima: {first_viewed[:10]})"
-            
-            link_cards.append(
-                html.Div([
-                    # Header card - DATA MAI ÎNTÂI!
-                    html.Div([
-                        html.Div([
-                            html.Strong(f"📅 {date_display}", style={'fontSize': '16px', 'color': '#2c3e50', 'display': 'block'}),
-                            html.Small(f"🔧 {link_data['device_name']}", style={'color': '#7f8c8d', 'display': 'block', 'marginTop': '5px'})
-                        ], style={'flex': '1'}),
-                        html.Div([
-                            html.Span(sent_status_display, style={
-                                'padding': '5px 12px',
-                                'backgroundColor': sent_color,
-                                'color': 'white',
-                                'borderRadius': '15px',
-                                'fontSize': '12px',
-                                'fontWeight': 'bold',
-                                'marginRight': '10px'
-                            }),
-                            html.Span(view_display, style={
-                                'padding': '5px 12px',
-                                'backgroundColor': '#3498db',
-                                'color': 'white',
-                                'borderRadius': '15px',
-                                'fontSize': '12px',
-                                'fontWeight': 'bold'
-                            })
-                        ])
-                    ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center', 'marginBottom': '15px'}),
-                    
-                    # Link-ul (copiabil) + Butoane
-                    html.Div([
-                        html.Label("🔗 Link Pacient:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'fontSize': '14px'}),
-                        dcc.Input(
-                            id={'type': 'link-input-dashboard', 'index': token},
-                            value=link_url,
-                            readOnly=True,
-                            style={'width': '100%', 'padding': '8px', 'backgroundColor': '#ecf0f1', 'border': '1px solid #bdc3c7', 'borderRadius': '5px', 'fontSize': '12px', 'fontFamily': 'monospace', 'marginBottom': '8px'}
-                        ),
-                        html.Div([
-                            html.Button(
-                                '📋 Copy',
-                                id={'type': 'copy-link-dashboard', 'index': token},
-                                n_clicks=0,
-                                style={
-                                    'padding': '6px 15px',
-                                    'marginRight': '8px',
-                                    'backgroundColor': '#3498db',
-                                    'color': 'white',
-                                    'border': 'none',
-                                    'borderRadius': '4px',
-                                    'cursor': 'pointer',
-                                    'fontSize': '12px',
-                                    'fontWeight': 'bold'
-                                }
-                            ),
-                            html.A(
-                                '🌐 Testează',
-                                href=link_url,
-                                target='_blank',
-                                style={
-                                    'padding': '6px 15px',
-                                    'backgroundColor': '#27ae60',
-                                    'color': 'white',
-                                    'textDecoration': 'none',
-                                    'borderRadius': '4px',
-                                    'fontSize': '12px',
-                                    'fontWeight': 'bold',
-                                    'display': 'inline-block'
-                                }
-                            )
-                        ], style={'display': 'flex', 'gap': '8px'})
-                    ], style={'marginBottom': '15px'}),
-                    
-                    # Notițe (editabile)
-                    html.Div([
-                        html.Label("📝 Notițe:", style={'fontWeight': 'bold', 'display': 'block', 'marginBottom': '5px', 'fontSize': '14px'}),
-                        dcc.Textarea(
-                            id={'type': 'medical-notes-textarea', 'index': token},
-                            value=link_data.get('medical_notes', ''),
-                            placeholder='Scrieți notițe aici (ex: Apnee severă, follow-up în 2 săptămâni)...',
-                            style={'width': '100%', 'minHeight': '80px', 'padding': '10px', 'border': '1px solid #bdc3c7', 'borderRadius': '5px', 'fontSize': '14px'}
-                        )
-                    ], style={'marginBottom': '15px'}),
-                    
-                    # Acțiuni (checkbox + buton salvare)
-                    html.Div([
-                        dcc.Checklist(
-                            id={'type': 'sent-status-checkbox', 'index': token},
-                            options=[{'label': ' Marcat ca trimis către pacient', 'value': 'sent'}],
-                            value=['sent'] if link_data.get('sent_status') else [],
-                            style={'display': 'inline-block', 'marginRight': '20px'}
-                        ),
-                        html.Button(
-                            '💾 Salvează Modificări',
-                            id={'type': 'save-link-metadata-btn', 'index': token},
-                            n_clicks=0,
-                            style={
-                                'padding': '10px 20px',
-                                'backgroundColor': '#3498db',
-                                'color': 'white',
-                                'border': 'none',
-                                'borderRadius': '5px',
-                                'cursor': 'pointer',
-                                'fontWeight': 'bold'
-                            }
-                        ),
-                        html.Span(
-                            id={'type': 'save-feedback', 'index': token},
-                            style={'marginLeft': '15px', 'color': 'green', 'fontWeight': 'bold'}
-                        )
-                    ], style={'display': 'flex', 'alignItems': 'center'}),
-                    
-                    # Footer cu info token
-                    html.Hr(style={'margin': '15px 0'}),
-                    html.Small(f"Token: {token}", style={'color': '#95a5a6', 'fontSize': '10px'})
-                    
-                ], style={
-                    'padding': '20px',
-                    'marginBottom': '20px',
-                    'backgroundColor': '#fff',
-                    'borderRadius': '10px',
-                    'border': '2px solid #e0e0e0',
-                    'boxShadow': '0 2px 4px rgba(0,0,0,0.1)'
-                })
-            )
-        
-        return html.Div(link_cards)
+        link_cards = [_build_dashboard_link_card(link_data, app_url) for link_data in page['links']]
+        return html.Div(link_cards), f"{total} link-uri", *navigation
         
     except Exception as e:
         logger.error(f"Eroare la încărcarea dashboard-ului: {e}", exc_info=True)
         return html.Div(
             f"❌ EROARE la încărcarea dashboard-ului: {str(e)}",
             style={'padding': '15px', 'backgroundColor': '#ffdddd', 'border': '1px solid red', 'borderRadius': '5px', 'color': 'red'}
-        )
+        ), no_update, no_update, no_update, no_update, no_update
 
 
 # CALLBACK DEZACTIVAT TEMPORAR - cauza console error "A callback is missing Inputs"
@@ -24,6 +24,7 @@ import patient_links
 from data_parser import parse_csv_data
 from plot_generator import create_plot
 import batch_session_manager
+import job_queue
 import config
 from auth_ui_components import create_auth_header
 import data_service  # [NEW] Serviciu centralizat de date
@@ -188,7 +189,8 @@ def patient_explore_csv(file_contents, file_name):
         
         # Generăm graficul
         initial_scale = config.ZOOM_SCALE_CONFIG['min_scale']
-        fig = create_plot(df, file_name, line_width_scale=initial_scale, marker_size_scale=initial_scale)
+        fig = create_plot(df, file_name, line_width_scale=initial_scale, marker_size_scale=initial_scale,
+                          max_points=config.INTERACTIVE_PLOT_CONFIG['max_points_per_trace'])
         
         # Aplicăm logo-ul pe figura interactivă (dacă este configurat)
         try:
@@ -522,23 +524,29 @@ def refresh_after_pdf_action(n_clicks):
      Output('admin-batch-progress-bar', 'style'),
      Output('admin-batch-status-detail', 'children')],
     [Input('admin-batch-progress-interval', 'n_intervals')],
-    [State('admin-batch-session-id', 'data')]
+    [State('admin-batch-session-id', 'data'),
+     State('admin-batch-job-id', 'data')]
 )
-def update_batch_progress_display(n_intervals, session_id):
+def update_batch_progress_display(n_intervals, session_id, job_id):
     """
     Actualizează afișarea progresului procesării batch în timp real.
     Citește starea din batch_session_manager.
     """
+    # Sesiunea de progres e cea a job-ului din coadă (admin-batch-session-id = ID upload)
+    if job_id:
+        job = job_queue.get_job(job_id)
+        if job and job.get('session_id'):
+            session_id = job['session_id']
+    
     if not session_id:
         return "0 / 0 fișiere", {'height': '30px', 'width': '0%', 'backgroundColor': '#27ae60', 'borderRadius': '5px'}, ""
     
-    # Obține progres sesiune
-    progress_data = batch_session_manager.get_session_progress(session_id)
+    # Obține progres sesiune (doar contoarele - fără lista de fișiere)
+    metadata = batch_session_manager.get_session_summary(session_id)
     
-    if not progress_data:
+    if not metadata:
         return "Sesiune nu există", {'height': '30px', 'width': '0%', 'backgroundColor': '#e74c3c', 'borderRadius': '5px'}, ""
     
-    metadata = progress_data['metadata']
     processed = metadata.get('processed_files', 0)
     total = metadata.get('total_files', 0)
     failed = metadata.get('failed_files', 0)
@@ -607,6 +615,7 @@ def display_batch_sessions_history(pathname, trigger):
         # Culoare în funcție de status
         status_colors = {
             'completed': '#27ae60',
+            'degraded': '#e67e22',
             'in_progress': '#f39c12',
             'failed': '#e74c3c',
             'pending': '#3498db'
@@ -616,6 +625,7 @@ def display_batch_sessions_history(pathname, trigger):
         # Badge status
         status_text = {
             'completed': '✅ Completă',
+            'degraded': '⚠️ Upload incomplet',
             'in_progress': '⏳ În curs',
             'failed': '❌ Eșuată',
             'pending': '🔵 Așteptare'
@@ -1,26 +1,199 @@
 # ==============================================================================
-# data_parser.py (VERSIUNEA 2.1 - CU LOGGING DE DIAGNOSTIC ADIȚIONAL)
+# data_parser.py (VERSIUNEA 3.0 - MOTOR DE INGESTIE RAPIDĂ CHECKME O2)
 # ------------------------------------------------------------------------------
 # ROL: Parsează, validează și curăță fișierele CSV de intrare.
 #
+# MODIFICĂRI CHEIE (v3.0):
+#  - PERFORMANȚĂ: Cale rapidă dedicată pentru formatul fix Checkme O2
+#    (`Timp,Nivel de oxigen,Puls cardiac,Mişcare`). Parsare direct din bytes
+#    cu dtype-uri declarate, decodare vectorizată a timestamp-ului cu lățime
+#    fixă (`%H:%M:%S %d/%m/%Y`), validare + contabilizare rânduri invalide
+#    într-o singură trecere și sortare doar dacă datele nu sunt deja monotone.
+#  - COMPATIBILITATE: Orice alt format (sau o surpriză în fișier) cade automat
+#    pe calea generică v2.1, care returnează același contract de DataFrame.
+#
 # MODIFICĂRI CHEIE (v2.1):
 #  - DIAGNOSTIC: S-a adăugat un log de nivel DEBUG pentru a înregistra
 #    numele coloanelor după redenumire. Acest lucru ajută la verificarea
 #    rapidă a faptului că maparea s-a efectuat corect.
 # ==============================================================================
 import pandas as pd
+import numpy as np
 import io
 from logger_setup import logger
 
+# --- Formatul fix exportat de aparatele Checkme O2 ---
+CHECKME_O2_COLUMNS = ['Timp', 'Nivel de oxigen', 'Puls cardiac', 'Mişcare']
+CHECKME_O2_TIME_FORMAT = '%H:%M:%S %d/%m/%Y'
+CHECKME_O2_NA_VALUES = ['--']
+
+# Lungimea fixă a câmpului de timp: "HH:MM:SS DD/MM/YYYY"
+_TIME_FIELD_WIDTH = 19
+_DIGIT_POSITIONS = [0, 1, 3, 4, 6, 7, 9, 10, 12, 13, 15, 16, 17, 18]
+_SEPARATORS = {2: ord(':'), 5: ord(':'), 8: ord(' '), 11: ord('/'), 14: ord('/')}
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+# [WHY] Unitatea de timp a indexului trebuie să fie identică cu cea produsă de
+# `pd.to_datetime` (ns în pandas 2.x, us în pandas 3.x) - contractul nu se schimbă.
+_TIME_DTYPE = pd.to_datetime(pd.Series(['00:00:00 01/01/2000']), format=CHECKME_O2_TIME_FORMAT).dtype
+
+
 def parse_csv_data(file_content: bytes, file_name: str) -> pd.DataFrame:
     """
     Parsează, validează și standardizează datele dintr-un fișier CSV.
+
+    Fișierele Checkme O2 trec prin calea rapidă; orice alt format (sau o
+    valoare neașteptată) este procesat de calea generică, mai tolerantă.
     """
     logger.info(f"Începerea parsării pentru fișierul: '{file_name}'")
     if not file_content:
         logger.error(f"Conținutul fișierului '{file_name}' este gol.")
         raise ValueError("Fișierul selectat este gol sau corupt.")
 
+    if _is_checkme_o2_layout(file_content):
+        try:
+            return _parse_checkme_o2_fast(file_content, file_name)
+        except (ValueError, UnicodeDecodeError) as fast_error:
+            # [WHY] Calea rapidă e strictă (dtype-uri declarate). Orice surpriză
+            # (text în coloane numerice, encoding) e tratată de calea generică.
+            logger.debug(f"Calea rapidă Checkme O2 a fost abandonată pentru '{file_name}': {fast_error}")
+
+    return _parse_csv_generic(file_content, file_name)
+
+
+def _is_checkme_o2_layout(file_content: bytes) -> bool:
+    """Verifică header-ul (primul rând) fără a decoda întregul fișier."""
+    header_end = file_content.find(b'\n')
+    header_bytes = file_content if header_end == -1 else file_content[:header_end]
+    try:
+        header = header_bytes.decode('utf-8-sig').strip()
+    except UnicodeDecodeError:
+        return False
+    return header.split(',') == CHECKME_O2_COLUMNS
+
+
+def _decode_checkme_timestamps(time_values: np.ndarray) -> np.ndarray:
+    """
+    Decodează vectorizat timestamp-urile "HH:MM:SS DD/MM/YYYY" în datetime64.
+
+    Rândurile care nu respectă strict formatul cu lățime fixă sunt trimise la
+    `pd.to_datetime` (errors='coerce'), deci semantica rămâne cea din v2.1.
+    """
+    n_rows = len(time_values)
+    try:
+        # 'S20': un octet în plus pentru a detecta valorile mai lungi de 19 caractere
+        raw = np.asarray(time_values, dtype='S20').view(np.uint8).reshape(n_rows, 20)
+    except (UnicodeEncodeError, ValueError, TypeError):
+        parsed = pd.to_datetime(pd.Series(time_values), format=CHECKME_O2_TIME_FORMAT, errors='coerce')
+        return parsed.to_numpy(dtype=_TIME_DTYPE)
+
+    digits = raw[:, _DIGIT_POSITIONS].astype(np.int64) - ord('0')
+    well_formed = (raw[:, _TIME_FIELD_WIDTH] == 0) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+    for position, separator in _SEPARATORS.items():
+        well_formed &= raw[:, position] == separator
+
+    hour = digits[:, 0] * 10 + digits[:, 1]
+    minute = digits[:, 2] * 10 + digits[:, 3]
+    second = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    month = digits[:, 8] * 10 + digits[:, 9]
+    year = digits[:, 10] * 1000 + digits[:, 11] * 100 + digits[:, 12] * 10 + digits[:, 13]
+
+    month_index = np.clip(month, 0, 12)
+    is_leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_length = _DAYS_IN_MONTH[month_index] + ((month_index == 2) & is_leap)
+    well_formed &= (hour < 24) & (minute < 60) & (second < 60)
+    well_formed &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= month_length)
+
+    # Zile de la epoch (algoritmul "days from civil", complet vectorizat)
+    shifted_year = year - (month <= 2)
+    era = shifted_year // 400
+    year_of_era = shifted_year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    epoch_days = era * 146097 + day_of_era - 719468
+    epoch_seconds = epoch_days * 86400 + hour * 3600 + minute * 60 + second
+
+    timestamps = epoch_seconds.astype('datetime64[s]').astype(_TIME_DTYPE)
+
+    if not well_formed.all():
+        odd_rows = ~well_formed
+        fallback = pd.to_datetime(pd.Series(time_values[odd_rows]), format=CHECKME_O2_TIME_FORMAT, errors='coerce')
+        timestamps[odd_rows] = fallback.to_numpy(dtype=_TIME_DTYPE)
+
+    return timestamps
+
+
+def _parse_checkme_o2_fast(file_content: bytes, file_name: str) -> pd.DataFrame:
+    """
+    Calea rapidă pentru formatul fix Checkme O2: parsare din bytes cu dtype-uri
+    declarate, validare într-o singură trecere vectorizată, sortare doar la nevoie.
+    """
+    raw_df = pd.read_csv(
+        io.BytesIO(file_content),
+        encoding='utf-8-sig',
+        dtype={
+            'Timp': object,
+            'Nivel de oxigen': 'float32',
+            'Puls cardiac': 'float32',
+            'Mişcare': 'float32',
+        },
+        na_values=CHECKME_O2_NA_VALUES,
+    )
+    initial_rows = len(raw_df)
+    logger.info(f"Fișierul '{file_name}' a fost încărcat. S-au găsit {initial_rows} rânduri.")
+
+    motion = raw_df['Mişcare'].to_numpy()
+    if np.isnan(motion).any():
+        # [WHY] Calea generică păstrează coloana așa cum o infere pandas (object cu '--',
+        # float cu celule goale) - tipul coloanei 'Motion' trebuie să fie același pe ambele căi.
+        raise ValueError("coloana 'Mişcare' conține valori lipsă")
+
+    timestamps = _decode_checkme_timestamps(raw_df['Timp'].to_numpy())
+    spo2 = raw_df['Nivel de oxigen'].to_numpy()
+    pulse = raw_df['Puls cardiac'].to_numpy()
+
+    # --- Validare într-o singură trecere ---
+    bad_date = np.isnat(timestamps)
+    bad_numeric = (np.isnan(spo2) | np.isnan(pulse)) & ~bad_date
+    valid = ~(bad_date | bad_numeric)
+
+    rows_with_bad_date = int(bad_date.sum())
+    if rows_with_bad_date > 0:
+        logger.warning(f"În '{file_name}', {rows_with_bad_date} rânduri aveau format de dată invalid și au fost eliminate.")
+    rows_with_bad_numeric = int(bad_numeric.sum())
+    if rows_with_bad_numeric > 0:
+        logger.warning(f"În '{file_name}', {rows_with_bad_numeric} rânduri aveau valori non-numerice în coloanele de date și au fost eliminate.")
+
+    final_rows = int(valid.sum())
+    if final_rows == 0:
+        logger.error(f"După curățare, nu a mai rămas niciun rând valid de date în '{file_name}'.")
+        raise ValueError("Fișierul nu conține date valide după procesare.")
+
+    df = pd.DataFrame(
+        {
+            'SpO2': spo2[valid].astype(np.int64),
+            'Pulse Rate': pulse[valid].astype(np.int64),
+            'Motion': motion[valid].astype(np.int64),
+        },
+        index=pd.DatetimeIndex(timestamps[valid], name='Time'),
+    )
+    logger.info("Coloanele au fost redenumite la standardul intern.")
+    logger.debug(f"Numele coloanelor după redenumire: {list(df.columns)}")
+
+    # [WHY] Exporturile Checkme O2 sunt deja cronologice - sortarea e doar o plasă de siguranță.
+    if not df.index.is_monotonic_increasing:
+        df.sort_index(inplace=True, kind='stable')
+
+    logger.info(f"Parsare finalizată pentru '{file_name}'. Rânduri valide: {final_rows}/{initial_rows}.")
+    return df
+
+
+def _parse_csv_generic(file_content: bytes, file_name: str) -> pd.DataFrame:
+    """
+    Calea generică (v2.1): inferență de tipuri + conversii tolerante.
+    Folosită pentru formate necunoscute sau fișiere cu valori neașteptate.
+    """
     try:
         decoded_content = file_content.decode('utf-8')
         content_stream = io.StringIO(decoded_content)
@@ -15,6 +15,27 @@ from typing import Optional, Tuple, Any
 from logger_setup import logger
 import patient_links
 from data_parser import parse_csv_data
+from recording_cache import compute_content_hash, load_parsed_artifact, store_parsed_artifact
+
+
+def _backfill_parsed_artifact(token: str, recording: dict, csv_content: bytes, df: pd.DataFrame):
+    """
+    Cache MISS: salvează artefactul Parquet (și hash-ul pe înregistrările vechi),
+    astfel încât următoarea citire să nu mai parseze CSV-ul.
+    """
+    content_hash = recording.get('content_hash') or compute_content_hash(csv_content)
+    stored = store_parsed_artifact(token, content_hash, df,
+                                   recording.get('storage_type', 'local'), recording.get('csv_path', ''))
+    if stored and not recording.get('content_hash') and recording.get('id'):
+        patient_links.set_recording_content_hash(token, recording['id'], content_hash)
+
+def get_latest_recording_id(token: str) -> Optional[str]:
+    """ID-ul înregistrării afișate pentru token (aceeași selecție ca get_patient_dataframe)."""
+    recordings = patient_links.get_patient_recordings(token)
+    if not recordings:
+        return None
+    return recordings[-1].get('id')
+
 
 def get_patient_dataframe(token: str) -> Tuple[Optional[pd.DataFrame], str, str]:
     """
@@ -71,6 +92,14 @@ def get_patient_dataframe(token: str) -> Tuple[Optional[pd.DataFrame], str, str]
         logger.info(f"   - CSV Path/Key: {csv_path_info}")
         logger.info(f"   - R2 URL: {r2_url}")
         
+        # 2a. Artefact Parquet (înregistrarea parsată la ingestie) - fără download/parsare CSV
+        content_hash = recording.get('content_hash')
+        if content_hash:
+            df = load_parsed_artifact(token, content_hash, storage_type, csv_path_info)
+            if df is not None and not df.empty:
+                logger.info(f"✅ [DATA_SERVICE] DataFrame din artefact Parquet: {len(df)} rânduri.")
+                return df, csv_filename, "Succes"
+        
         # 2. Încercăm recuperarea conținutului (Strategy Pattern: Scaleway -> Local -> Fallback)
         
         # STRATEGIA A: Cloudflare R2
@@ -161,6 +190,7 @@ def get_patient_dataframe(token: str) -> Tuple[Optional[pd.DataFrame], str, str]
                 logger.critical(f"❌ [DS_LOCAL] Cannot read: path invalid or missing")
 
         # STRATEGIA C: Legacy Folder Structure (Ultimul resort)
+        legacy_source = not csv_content
         if not csv_content:
             # [DIAGNOSTIC LOG 15] Tentativă Legacy
             # [DIAGNOSTIC LOG 15] Tentativă Legacy
@@ -201,6 +231,8 @@ def get_patient_dataframe(token: str) -> Tuple[Optional[pd.DataFrame], str, str]
                     logger.info(f"   - Columns: {list(df.columns)}")
                     logger.info(f"   - Index Start: {df.index[0] if not df.empty else 'N/A'}")
                     logger.info(f"   - Index End: {df.index[-1] if not df.empty else 'N/A'}")
+                    if not legacy_source:
+                        _backfill_parsed_artifact(token, recording, csv_content, df)
                     return df, csv_filename, "Succes"
                 else:
                     # [DIAGNOSTIC LOG 19] Parsare Empty
@@ -0,0 +1,211 @@
+# ==============================================================================
+# figure_cache.py
+# ------------------------------------------------------------------------------
+# ROL: Cache pentru figurile interactive deja serializate (JSON) ale pacienților.
+#
+# DE CE: Înregistrările sunt imutabile. Deschiderea repetată a aceluiași link
+#        (pacient sau rând expandat în dashboard-ul admin) refăcea de fiecare
+#        dată: descărcare/parsare → interpolare → construcție Plotly → logo →
+#        serializare. Un HIT sare peste toate acestea.
+#
+# CHEIE: (token, recording_id, amprentă stil, versiune logo, variantă)
+#        → ETag = SHA-1 al cheii (folosit și ca nume de fișier pe disc).
+#
+# MEMORIE: Buget în bytes (JSON), evacuare LRU. Opțional, intrările evacuate
+#          sunt scrise pe disc (PULSOX_FIGURE_CACHE_DIR) și promovate la loc
+#          în memorie la următorul acces.
+# ==============================================================================
+
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import config
+from logger_setup import logger
+
+
+class FigureCache:
+    """LRU thread-safe pentru figuri serializate, cu buget de memorie și spill pe disc."""
+
+    def __init__(self, memory_budget_bytes: int, disk_dir: Optional[str] = None,
+                 disk_budget_bytes: int = 0):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_dir = disk_dir
+        self.disk_budget_bytes = disk_budget_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'spills': 0}
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    # --- API public ---------------------------------------------------------
+
+    def get(self, etag: str) -> Optional[str]:
+        """Returnează JSON-ul figurii sau None (MISS)."""
+        with self._lock:
+            figure_json = self._entries.get(etag)
+            if figure_json is not None:
+                self._entries.move_to_end(etag)
+                self._counters['hits'] += 1
+                return figure_json
+
+        figure_json = self._read_from_disk(etag)
+        with self._lock:
+            if figure_json is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['disk_hits'] += 1
+            self._insert(etag, figure_json)
+        return figure_json
+
+    def put(self, etag: str, figure_json: str):
+        """Adaugă o figură serializată; evacuează intrările cele mai vechi peste buget."""
+        if len(figure_json) > self.memory_budget_bytes:
+            logger.warning(f"⚠️ [FIGURE_CACHE] Figură prea mare pentru buget ({len(figure_json)} bytes) - nu se salvează.")
+            return
+        with self._lock:
+            self._insert(etag, figure_json)
+            self._counters['stores'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._memory_bytes = 0
+
+    def stats(self) -> Dict:
+        """Contoare hit/miss + ocupare, pentru monitorizare (/health)."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['disk_hits'] + self._counters['misses']
+            hit_rate = (self._counters['hits'] + self._counters['disk_hits']) / lookups if lookups else 0.0
+            return {
+                **self._counters,
+                'hit_rate': round(hit_rate, 3),
+                'entries': len(self._entries),
+                'memory_bytes': self._memory_bytes,
+                'memory_budget_bytes': self.memory_budget_bytes,
+                'disk_spill': bool(self.disk_dir),
+            }
+
+    # --- Intern -------------------------------------------------------------
+
+    def _insert(self, etag: str, figure_json: str):
+        previous = self._entries.pop(etag, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._entries[etag] = figure_json
+        self._memory_bytes += len(figure_json)
+
+        while self._memory_bytes > self.memory_budget_bytes and self._entries:
+            evicted_etag, evicted_json = self._entries.popitem(last=False)
+            self._memory_bytes -= len(evicted_json)
+            self._counters['evictions'] += 1
+            if self._write_to_disk(evicted_etag, evicted_json):
+                self._counters['spills'] += 1
+
+    def _disk_path(self, etag: str) -> str:
+        return os.path.join(self.disk_dir, f"{etag}.json")
+
+    def _read_from_disk(self, etag: str) -> Optional[str]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(etag)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"⚠️ [FIGURE_CACHE] Citire disc eșuată ({etag[:12]}): {e}")
+            return None
+
+    def _write_to_disk(self, etag: str, figure_json: str) -> bool:
+        if not self.disk_dir:
+            return False
+        try:
+            tmp_path = self._disk_path(etag) + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(figure_json)
+            os.replace(tmp_path, self._disk_path(etag))
+            self._prune_disk()
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ [FIGURE_CACHE] Spill pe disc eșuat ({etag[:12]}): {e}")
+            return False
+
+    def _prune_disk(self):
+        """Păstrează folderul de spill sub buget, ștergând cele mai vechi fișiere."""
+        if not self.disk_budget_bytes:
+            return
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith('.json'):
+                path = os.path.join(self.disk_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_budget_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+_cache_config = config.FIGURE_CACHE_CONFIG
+figure_cache = FigureCache(
+    memory_budget_bytes=int(_cache_config['memory_budget_mb'] * 1024 * 1024),
+    disk_dir=_cache_config['disk_dir'],
+    disk_budget_bytes=int(_cache_config['disk_budget_mb'] * 1024 * 1024),
+)
+
+
+# ==============================================================================
+# CHEI / ETAG
+# ==============================================================================
+
+def get_logo_version(doctor_id: str = "default") -> str:
+    """Versiunea logo-ului aplicat pe figuri (se schimbă la upload sau la schimbarea setărilor)."""
+    try:
+        import doctor_settings
+        from plot_generator import LOGO_VERSION_FIELDS
+        settings = doctor_settings.load_doctor_settings(doctor_id)
+        return "|".join(str(settings.get(field)) for field in LOGO_VERSION_FIELDS)
+    except Exception as e:
+        logger.warning(f"⚠️ [FIGURE_CACHE] Versiune logo indisponibilă: {e}")
+        return "unknown"
+
+
+def build_figure_etag(token: str, recording_id: str, variant: str = "", doctor_id: str = "default") -> str:
+    """
+    ETag-ul unei figuri: SHA-1 peste (token, recording_id, amprentă stil, versiune logo, variantă).
+    """
+    from plot_generator import get_style_fingerprint
+
+    key = "|".join([token, str(recording_id), get_style_fingerprint(), get_logo_version(doctor_id), variant])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def get_figure(etag: Optional[str]) -> Optional[dict]:
+    """Figura (dict gata de trimis ca `figure`) pentru ETag sau None."""
+    if not etag:
+        return None
+    figure_json = figure_cache.get(etag)
+    if figure_json is None:
+        logger.info(f"🧊 [FIGURE_CACHE] MISS {etag[:12]}")
+        return None
+    logger.info(f"🧊 [FIGURE_CACHE] HIT {etag[:12]} ({len(figure_json)} bytes)")
+    return json.loads(figure_json)
+
+
+def put_figure(etag: Optional[str], fig) -> None:
+    """Serializează și salvează figura (non-critic)."""
+    if not etag or fig is None:
+        return
+    try:
+        figure_cache.put(etag, fig.to_json())
+    except Exception as e:
+        logger.warning(f"⚠️ [FIGURE_CACHE] Figura nu a putut fi salvată în cache: {e}")
@@ -0,0 +1,145 @@
+# ==============================================================================
+# ingest_index.py
+# ------------------------------------------------------------------------------
+# ROL: Index după conținut (SHA-256) al fișierelor deja ingerate de batch -
+#      tabela `ingested_files` (CSV → token, PDF → token).
+#
+# DE CE: Re-rularea unui batch pe același folder refăcea TOT pentru fiecare
+#        CSV: parsare, randarea tuturor feliilor, încă un `PatientRecording`,
+#        încă un upload S3. Acum amprentăm fișierele ÎNAINTE de orice muncă
+#        grea; cele cunoscute sunt legate de link-ul și imaginile existente.
+#
+# CĂUTARE: O singură interogare `IN (...)` pentru tot folderul. Înregistrările
+#          ingerate înainte de index sunt găsite prin
+#          `PatientRecording.content_hash` (aceeași amprentă, deja indexată).
+#
+# HASH: Identic cu `recording_cache.compute_content_hash` (SHA-256 pe bytes).
+#
+# NOTĂ: Funcțiile cu DB cer Flask app context (ca patient_links).
+# ==============================================================================
+
+import os
+import hashlib
+from typing import Dict, Iterable
+
+from logger_setup import logger
+
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def fingerprint_file(path: str) -> str:
+    """SHA-256 (hex) al fișierului, citit în bucăți - fără a-l ține în memorie."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_files(folder: str, file_names: Iterable[str]) -> Dict[str, str]:
+    """
+    Amprentele fișierelor dintr-un folder.
+
+    Returns:
+        Dict: {nume_fișier: sha256}; fișierele ilizibile lipsesc (se procesează normal)
+    """
+    hashes = {}
+    for name in file_names:
+        try:
+            hashes[name] = fingerprint_file(os.path.join(folder, name))
+        except OSError as e:
+            logger.warning(f"⚠️ [INGEST_INDEX] Amprentă imposibilă pentru '{name}': {e}")
+    return hashes
+
+
+def find_ingested_csvs(content_hashes: Iterable[str]) -> Dict[str, str]:
+    """
+    Token-urile deja asociate hash-urilor CSV date (cea mai recentă ingestie câștigă).
+
+    Returns:
+        Dict: {sha256: token}
+    """
+    from auth.models import IngestedFile, PatientRecording
+
+    wanted = set(h for h in content_hashes if h)
+    if not wanted:
+        return {}
+
+    found: Dict[str, str] = {}
+    rows = (IngestedFile.query
+            .with_entities(IngestedFile.content_hash, IngestedFile.token)
+            .filter(IngestedFile.kind == IngestedFile.KIND_CSV, IngestedFile.content_hash.in_(wanted))
+            .order_by(IngestedFile.created_at)
+            .all())
+    for content_hash, token in rows:
+        found[content_hash] = token
+
+    # Înregistrări ingerate înainte de index
+    legacy = wanted - found.keys()
+    if legacy:
+        rows = (PatientRecording.query
+                .with_entities(PatientRecording.content_hash, PatientRecording.token)
+                .filter(PatientRecording.content_hash.in_(legacy))
+                .order_by(PatientRecording.uploaded_at)
+                .all())
+        for content_hash, token in rows:
+            found[content_hash] = token
+
+    return found
+
+
+def is_ingested(kind: str, content_hash: str, token: str) -> bool:
+    """True dacă fișierul (tip + hash) e deja atașat acestui token."""
+    from auth.models import IngestedFile
+
+    if not content_hash:
+        return False
+    return IngestedFile.query.filter_by(kind=kind, content_hash=content_hash, token=token).first() is not None
+
+
+def record_ingested(kind: str, content_hash: str, token: str, filename: str = None,
+                    size_bytes: int = None) -> bool:
+    """
+    Adaugă (idempotent) o intrare în index. Non-critic: o eroare doar se loghează.
+
+    Returns:
+        bool: True dacă intrarea există după apel
+    """
+    from auth.models import IngestedFile, db
+
+    if not content_hash or not token:
+        return False
+    try:
+        if is_ingested(kind, content_hash, token):
+            return True
+        db.session.add(IngestedFile(
+            kind=kind,
+            content_hash=content_hash,
+            token=token,
+            original_filename=(filename or '')[:255] or None,
+            size_bytes=size_bytes,
+        ))
+        db.session.commit()
+        logger.info(f"🧾 [INGEST_INDEX] {kind.upper()} {content_hash[:12]} → {token[:8]}...")
+        return True
+    except Exception as e:
+        logger.warning(f"⚠️ [INGEST_INDEX] Intrare neînregistrată ({kind} {content_hash[:12]}): {e}")
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        return False
+
+
+def forget_token(token: str) -> int:
+    """Șterge intrările unui token (link șters) - fișierele lui se vor reprocesa."""
+    from auth.models import IngestedFile, db
+
+    try:
+        deleted = IngestedFile.query.filter_by(token=token).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted
+    except Exception as e:
+        logger.warning(f"⚠️ [INGEST_INDEX] Curățare index eșuată pentru {token[:8]}...: {e}")
+        db.session.rollback()
+        return 0
@@ -0,0 +1,402 @@
+# ==============================================================================
+# ingest_watcher.py - Ingestie continuă dintr-un folder "inbox"
+# ------------------------------------------------------------------------------
+# ROL: Serviciu de lungă durată care urmărește folderul configurat (implicit
+#      `intrare/`) și trece fiecare CSV/PDF Checkme O2 nou prin pipeline-ul
+#      batch existent (parsare → link → înregistrare → randare) imediat ce
+#      fișierul s-a stabilizat - fără click pe butonul de batch.
+#
+# FLUX:
+#   watchdog (evenimente) + rescanare periodică
+#     → debouncer: fișierul e "stabil" după `stable_s` fără schimbări de
+#       dimensiune/mtime (copierea de pe aparat s-a terminat)
+#     → coadă mărginită (`queue_size`; plină → debouncer-ul așteaptă)
+#     → worker: grupează până la `max_files_per_run` fișiere într-un
+#       `run_batch_job(only_files=...)` cu sesiune batch (vizibilă în admin)
+#     → cursor persistat: fișierele tratate nu se reiau după restart
+#
+# PERECHI CSV/PDF: un PDF sosit după CSV-ul lui relansează CSV-urile aceluiași
+#   aparat; cele deja ingerate (ingest_index) doar primesc PDF-ul.
+#
+# UTILIZARE:
+#   python ingest_watcher.py                 (buclă continuă)
+#   python ingest_watcher.py --once          (procesează ce e în inbox, apoi iese)
+#   python ingest_watcher.py --inbox D:\Checkme
+#
+# CONFIG: config.INGEST_WATCH_CONFIG (env PULSOX_INGEST_*). Același DATABASE_URL
+#         și filesystem ca procesul web (ca batch_worker.py).
+# ==============================================================================
+
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import config
+from logger_setup import logger
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_SUPPORT = True
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+    WATCHDOG_SUPPORT = False
+
+INGEST_EXTENSIONS = ('.csv', '.pdf')
+
+
+def _is_candidate(file_name: str) -> bool:
+    """CSV/PDF vizibil (fără fișiere ascunse sau temporare de copiere)."""
+    return (not file_name.startswith(('.', '~'))
+            and file_name.lower().endswith(INGEST_EXTENSIONS))
+
+
+def _file_signature(path: str) -> Optional[Tuple[int, int]]:
+    """(dimensiune, mtime_ns) sau None dacă fișierul a dispărut."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+class IngestCursor:
+    """
+    Fișierele deja tratate: {nume: {size, mtime_ns, status, processed_at}}.
+    Un fișier rescris (altă dimensiune/mtime) se tratează din nou.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get('files', {})
+            logger.info(f"📌 [INGEST_WATCHER] Cursor încărcat: {len(self._entries)} fișiere deja tratate")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"⚠️ [INGEST_WATCHER] Cursor ilizibil ({path}): {e} - pornim de la zero")
+
+    def is_done(self, file_name: str, signature: Tuple[int, int]) -> bool:
+        with self._lock:
+            entry = self._entries.get(file_name)
+        return bool(entry) and (entry.get('size'), entry.get('mtime_ns')) == tuple(signature)
+
+    def mark(self, items: Iterable[Tuple[str, Tuple[int, int], str]]):
+        """Marchează (nume, semnătură, status) și salvează atomic cursorul."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            for file_name, signature, status in items:
+                self._entries[file_name] = {
+                    'size': signature[0],
+                    'mtime_ns': signature[1],
+                    'status': status,
+                    'processed_at': now,
+                }
+            payload = {'updated_at': now, 'files': self._entries}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+
+class _InboxEventHandler(FileSystemEventHandler):
+    """Evenimentele watchdog → debouncer-ul watcher-ului."""
+
+    def __init__(self, watcher: 'InboxWatcher'):
+        super().__init__()
+        self._watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._watcher.notice(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._watcher.notice(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._watcher.notice(event.dest_path)
+
+
+class InboxWatcher:
+    """Debouncer + coadă mărginită + worker pentru un folder inbox."""
+
+    def __init__(self, flask_app, inbox: str = None, output_folder: str = None,
+                 window_minutes: int = None, watch_config: Dict = None):
+        self.config = {**config.INGEST_WATCH_CONFIG, **(watch_config or {})}
+        self.flask_app = flask_app
+        self.inbox = os.path.abspath(inbox or self.config['inbox'])
+        self.output_folder = output_folder or self.config['output_folder']
+        self.window_minutes = int(window_minutes or self.config['window_minutes'])
+        os.makedirs(self.inbox, exist_ok=True)
+
+        cursor_path = self.config['cursor_file'] or os.path.join(self.inbox, '.ingest_cursor.json')
+        self.cursor = IngestCursor(cursor_path)
+
+        # nume → (semnătură, momentul ultimei schimbări)
+        self._pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._queued = set()
+        self._pending_lock = threading.Lock()
+        self._ready: "queue.Queue[Tuple[str, Tuple[int, int]]]" = queue.Queue(maxsize=self.config['queue_size'])
+        self._stop = threading.Event()
+        self._stats = {'runs': 0, 'files': 0, 'failed': 0}
+
+    # --- Descoperire ------------------------------------------------------------
+
+    def notice(self, path: str):
+        """Un fișier a apărut/s-a schimbat - (re)pornește cronometrul de stabilitate."""
+        if os.path.dirname(os.path.abspath(path)) != self.inbox:
+            return  # doar nivelul de sus al inbox-ului
+        file_name = os.path.basename(path)
+        if not _is_candidate(file_name):
+            return
+        signature = _file_signature(path)
+        if signature is None or self.cursor.is_done(file_name, signature):
+            return
+        with self._pending_lock:
+            if file_name in self._queued:
+                return
+            previous = self._pending.get(file_name)
+            if previous is None or previous[0] != signature:
+                self._pending[file_name] = (signature, time.monotonic())
+
+    def scan(self):
+        """Rescanare completă (pornire + periodic): prinde fișierele sosite cât serviciul era oprit."""
+        try:
+            names = os.listdir(self.inbox)
+        except OSError as e:
+            logger.error(f"❌ [INGEST_WATCHER] Inbox inaccesibil '{self.inbox}': {e}")
+            return
+        for name in names:
+            self.notice(os.path.join(self.inbox, name))
+
+    def _promote_stable(self):
+        """Mută în coadă fișierele nemodificate de `stable_s` secunde."""
+        now = time.monotonic()
+        with self._pending_lock:
+            items = list(self._pending.items())
+
+        for file_name, (signature, changed_at) in items:
+            current = _file_signature(os.path.join(self.inbox, file_name))
+            with self._pending_lock:
+                if current is None:
+                    self._pending.pop(file_name, None)
+                    continue
+                if current != signature:
+                    self._pending[file_name] = (current, now)
+                    continue
+                if now - changed_at < self.config['stable_s']:
+                    continue
+            try:
+                self._ready.put_nowait((file_name, signature))
+            except queue.Full:
+                logger.warning(f"⏳ [INGEST_WATCHER] Coadă plină ({self.config['queue_size']}) - "
+                               f"'{file_name}' așteaptă")
+                return
+            with self._pending_lock:
+                self._pending.pop(file_name, None)
+                self._queued.add(file_name)
+            logger.info(f"📥 [INGEST_WATCHER] Fișier stabil: {file_name}")
+
+    def _debounce_loop(self):
+        last_scan = time.monotonic()
+        while not self._stop.wait(self.config['poll_s']):
+            if time.monotonic() - last_scan >= self.config['rescan_s']:
+                self.scan()
+                last_scan = time.monotonic()
+            self._promote_stable()
+
+    # --- Procesare --------------------------------------------------------------
+
+    def _next_batch(self, timeout: float) -> List[Tuple[str, Tuple[int, int]]]:
+        try:
+            batch = [self._ready.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.config['max_files_per_run']:
+            try:
+                batch.append(self._ready.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _csv_files_for(self, batch: List[Tuple[str, Tuple[int, int]]]) -> List[str]:
+        """CSV-urile de rulat: cele stabile + CSV-urile aparatului fiecărui PDF nou."""
+        from batch_processor import extract_device_number
+
+        csv_files = [name for name, _sig in batch if name.lower().endswith('.csv')]
+        pdf_devices = {extract_device_number(name) for name, _sig in batch if name.lower().endswith('.pdf')}
+        if pdf_devices:
+            try:
+                inbox_csvs = [f for f in os.listdir(self.inbox) if _is_candidate(f) and f.lower().endswith('.csv')]
+            except OSError:
+                inbox_csvs = []
+            for name in inbox_csvs:
+                if name not in csv_files and extract_device_number(name) in pdf_devices:
+                    csv_files.append(name)
+        return csv_files
+
+    def process_batch(self, batch: List[Tuple[str, Tuple[int, int]]]):
+        """Un `run_batch_job` pentru fișierele stabile grupate, apoi cursorul."""
+        import batch_session_manager
+        from batch_processor import run_batch_job
+
+        csv_files = self._csv_files_for(batch)
+        statuses = {}
+        if csv_files:
+            session_id = batch_session_manager.create_batch_session(total_files=len(csv_files), file_list=csv_files)
+            logger.warning(f"🚀 [INGEST_WATCHER] {len(csv_files)} CSV-uri din inbox → sesiune {session_id[:8]}")
+            started = time.perf_counter()
+            with self.flask_app.app_context():
+                generated_links = run_batch_job(
+                    self.inbox,
+                    self.output_folder,
+                    self.window_minutes,
+                    session_id=session_id,
+                    only_files=csv_files,
+                ) or []
+            batch_session_manager.mark_session_completed(session_id)
+
+            progress = batch_session_manager.get_session_progress(session_id) or {}
+            statuses = {f['filename']: f['status'] for f in progress.get('files', [])}
+            self._stats['runs'] += 1
+            logger.warning(f"✅ [INGEST_WATCHER] {len(generated_links)} link-uri în "
+                           f"{time.perf_counter() - started:.1f}s (sesiune {session_id[:8]})")
+
+        # Un PDF e tratat doar dacă toate CSV-urile aparatului lui rulate acum sunt `completed`
+        from batch_processor import extract_device_number
+        device_done: Dict[str, bool] = {}
+        for csv_file in csv_files:
+            device = extract_device_number(csv_file)
+            device_done[device] = device_done.get(device, True) and statuses.get(csv_file) == 'completed'
+
+        # În cursor intră DOAR fișierele raportate `completed` de sesiune; restul
+        # (eșuate, neraportate la o ieșire timpurie, PDF-uri fără CSV) se reiau la rescanare
+        marks = []
+        for file_name, signature in batch:
+            if file_name.lower().endswith('.csv'):
+                status = statuses.get(file_name, 'pending')
+            else:
+                status = 'completed' if device_done.get(extract_device_number(file_name)) else 'pending'
+            if status == 'completed':
+                marks.append((file_name, signature, status))
+            elif status == 'failed':
+                self._stats['failed'] += 1
+                logger.error(f"❌ [INGEST_WATCHER] '{file_name}' → failed (se reia la următoarea rescanare)")
+            else:
+                logger.info(f"⏳ [INGEST_WATCHER] '{file_name}' → {status} (netratat încă, se reia la rescanare)")
+        if marks:
+            self.cursor.mark(marks)
+        self._stats['files'] += len(batch)
+
+        with self._pending_lock:
+            self._queued.difference_update(name for name, _sig in batch)
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            batch = self._next_batch(timeout=self.config['poll_s'])
+            if not batch:
+                continue
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                logger.critical(f"💥 [INGEST_WATCHER] Lot eșuat ({len(batch)} fișiere): {e}", exc_info=True)
+                # Fără marcare în cursor: fișierele se reiau la următoarea rescanare
+                with self._pending_lock:
+                    self._queued.difference_update(name for name, _sig in batch)
+
+    # --- Ciclu de viață ---------------------------------------------------------
+
+    def run_once(self):
+        """Procesează tot ce e stabil acum în inbox (ignoră fereastra de stabilitate)."""
+        self.scan()
+        with self._pending_lock:
+            for file_name, (signature, _changed_at) in self._pending.items():
+                self._pending[file_name] = (signature, float('-inf'))
+        while True:
+            self._promote_stable()
+            batch = self._next_batch(timeout=0)
+            if not batch:
+                break
+            self.process_batch(batch)
+
+    def run_forever(self, stop_event: threading.Event = None):
+        if stop_event is not None:
+            self._stop = stop_event
+
+        observer = None
+        if WATCHDOG_SUPPORT:
+            observer = Observer()
+            observer.schedule(_InboxEventHandler(self), self.inbox, recursive=False)
+            observer.start()
+        else:
+            logger.warning("⚠️ [INGEST_WATCHER] watchdog nu este instalat - doar rescanare periodică")
+
+        logger.warning(f"👀 [INGEST_WATCHER] Urmărim '{self.inbox}' → '{self.output_folder}' "
+                       f"(stabil după {self.config['stable_s']}s, coadă {self.config['queue_size']})")
+        self.scan()
+
+        debouncer = threading.Thread(target=self._debounce_loop, name="ingest-debounce", daemon=True)
+        debouncer.start()
+        try:
+            self._worker_loop()
+        finally:
+            self._stop.set()
+            if observer is not None:
+                observer.stop()
+                observer.join(timeout=5)
+            debouncer.join(timeout=5)
+            logger.warning(f"🛑 [INGEST_WATCHER] Oprit: {self.stats()}")
+
+    def stats(self) -> Dict:
+        with self._pending_lock:
+            pending = len(self._pending)
+        return {**self._stats, 'pending': pending, 'queued': self._ready.qsize()}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Ingestie continuă din folderul inbox (CSV/PDF Checkme O2)")
+    parser.add_argument("--inbox", default=None, help="Folderul urmărit (implicit PULSOX_INGEST_INBOX)")
+    parser.add_argument("--output", default=None, help="Folderul de ieșire pentru imagini")
+    parser.add_argument("--once", action="store_true", help="Procesează conținutul curent al inbox-ului și iese")
+    args = parser.parse_args(argv)
+
+    from batch_worker import create_worker_app
+
+    flask_app = create_worker_app()
+    watcher = InboxWatcher(flask_app, inbox=args.inbox, output_folder=args.output)
+
+    if args.once:
+        watcher.run_once()
+        logger.warning(f"✅ [INGEST_WATCHER] Rulare unică terminată: {watcher.stats()}")
+        return 0
+
+    stop_event = threading.Event()
+
+    def _request_stop(signum, _frame):
+        logger.warning(f"🛑 [INGEST_WATCHER] Semnal {signum} primit - oprire după lotul curent")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, _request_stop)
+    signal.signal(signal.SIGINT, _request_stop)
+
+    watcher.run_forever(stop_event)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
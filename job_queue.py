@@ -0,0 +1,373 @@
+# ==============================================================================
+# job_queue.py
+# ------------------------------------------------------------------------------
+# ROL: Coadă persistentă (tabela `batch_jobs`, SQLite local / PostgreSQL cloud)
+#      pentru procesarea batch, decuplată de callback-urile Dash.
+#
+# DE CE: `admin_run_batch_processing` rula `run_batch_job` sincron, ocupând
+#        un thread gunicorn (4 workeri x 2 thread-uri) pe toată durata job-ului
+#        și lovind limita `--timeout 120` la upload-uri mari. Acum callback-ul
+#        doar pune job-ul în coadă și întoarce ID-ul.
+#
+# EXECUȚIE (config.BATCH_QUEUE_CONFIG['mode']):
+#   - 'inline': un thread daemon în procesul web consumă coada (implicit)
+#   - 'worker': procese separate `python batch_worker.py` (același filesystem -
+#               folderele de upload și progresul sesiunilor sunt pe disc);
+#               opt-in, nu e în Procfile (alt container = alt disc)
+#
+# GARANȚII:
+#   - Claim atomic (UPDATE ... WHERE status='queued'): un job rulează o singură dată
+#   - Limită de job-uri simultane per medic (best-effort între workeri)
+#   - Heartbeat; job-urile `running` fără heartbeat sunt repuse în coadă și
+#     reiau doar fișierele rămase (batch_session_manager.get_pending_files)
+#   - Anulare: job-urile din coadă se anulează imediat, cele active la
+#     următorul fișier
+#
+# NOTĂ: Toate funcțiile cer un Flask app context (ca patient_links).
+# ==============================================================================
+
+import os
+import shutil
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import config
+from logger_setup import logger
+
+
+def _queue_config() -> Dict:
+    return config.BATCH_QUEUE_CONFIG
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+# ==============================================================================
+# API COADĂ
+# ==============================================================================
+
+def enqueue_batch_job(input_folder: str, output_folder: str, window_minutes: int,
+                      session_id: str = None, doctor_id: int = None,
+                      batch_mode: str = 'local', cleanup_input: bool = False,
+                      force_reprocess: bool = False) -> str:
+    """
+    Pune un job batch în coadă.
+
+    Returns:
+        str: ID-ul job-ului (UUID)
+    """
+    from auth.models import db, BatchJob
+
+    job = BatchJob(
+        doctor_id=doctor_id,
+        status=BatchJob.STATUS_QUEUED,
+        batch_mode=batch_mode,
+        input_folder=input_folder,
+        output_folder=output_folder,
+        window_minutes=int(window_minutes),
+        session_id=session_id,
+        cleanup_input=cleanup_input,
+        force_reprocess=force_reprocess,
+    )
+    db.session.add(job)
+    db.session.commit()
+    logger.info(f"📥 [JOB_QUEUE] Job {job.id[:8]} în coadă (medic {doctor_id}, sesiune {(session_id or '-')[:8]})")
+    return job.id
+
+
+def get_job(job_id: str) -> Optional[Dict]:
+    from auth.models import db, BatchJob
+
+    if not job_id:
+        return None
+    job = db.session.get(BatchJob, job_id)
+    return job.to_dict() if job else None
+
+
+def list_jobs(doctor_id: int = None, statuses: List[str] = None, limit: int = 20) -> List[Dict]:
+    from auth.models import BatchJob
+
+    query = BatchJob.query
+    if doctor_id is not None:
+        query = query.filter(BatchJob.doctor_id == doctor_id)
+    if statuses:
+        query = query.filter(BatchJob.status.in_(statuses))
+    return [job.to_dict() for job in query.order_by(BatchJob.created_at.desc()).limit(limit).all()]
+
+
+def request_cancel(job_id: str) -> bool:
+    """
+    Anulează un job: imediat dacă e încă în coadă, altfel marchează cererea
+    (worker-ul se oprește înainte de următorul fișier).
+
+    Returns:
+        bool: True dacă job-ul exista și nu era deja finalizat
+    """
+    from auth.models import db, BatchJob
+
+    updated = BatchJob.query.filter_by(id=job_id, status=BatchJob.STATUS_QUEUED).update(
+        {'status': BatchJob.STATUS_CANCELLED, 'cancel_requested': True, 'finished_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    if not updated:
+        updated = BatchJob.query.filter_by(id=job_id, status=BatchJob.STATUS_RUNNING).update(
+            {'cancel_requested': True}, synchronize_session=False
+        )
+    db.session.commit()
+    if updated:
+        logger.warning(f"⏹️ [JOB_QUEUE] Anulare cerută pentru job {job_id[:8]}")
+    return bool(updated)
+
+
+def is_cancel_requested(job_id: str) -> bool:
+    """
+    Citește doar flag-ul din DB (interogare scalară): sesiunea rămâne neatinsă,
+    fără expirarea rândurilor puse deoparte de LinkBatchWriter.
+    """
+    from auth.models import db, BatchJob
+
+    requested = db.session.query(BatchJob.cancel_requested).filter_by(id=job_id).scalar()
+    return requested is None or bool(requested)
+
+
+def claim_next_job(worker_id: str = None) -> Optional[Dict]:
+    """
+    Preia cel mai vechi job din coadă care respectă limita per medic.
+
+    Returns:
+        Dict: Job-ul preluat (status 'running') sau None
+    """
+    from sqlalchemy import func
+    from auth.models import db, BatchJob
+
+    worker_id = worker_id or default_worker_id()
+    per_doctor_limit = _queue_config()['per_doctor_limit']
+
+    running_by_doctor = dict(
+        db.session.query(BatchJob.doctor_id, func.count(BatchJob.id))
+        .filter(BatchJob.status == BatchJob.STATUS_RUNNING)
+        .group_by(BatchJob.doctor_id)
+        .all()
+    )
+    candidates = (BatchJob.query.filter_by(status=BatchJob.STATUS_QUEUED)
+                  .order_by(BatchJob.created_at).limit(50).all())
+
+    for job in candidates:
+        if per_doctor_limit and running_by_doctor.get(job.doctor_id, 0) >= per_doctor_limit:
+            continue
+
+        now = datetime.utcnow()
+        # UPDATE condiționat: dacă alt worker l-a preluat între timp, rowcount = 0
+        claimed = BatchJob.query.filter_by(id=job.id, status=BatchJob.STATUS_QUEUED).update(
+            {'status': BatchJob.STATUS_RUNNING, 'worker_id': worker_id, 'started_at': now,
+             'heartbeat_at': now, 'attempts': BatchJob.attempts + 1},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if claimed:
+            db.session.expire_all()
+            logger.info(f"🏁 [JOB_QUEUE] Job {job.id[:8]} preluat de {worker_id}")
+            return get_job(job.id)
+    return None
+
+
+def heartbeat(job_id: str):
+    from auth.models import db, BatchJob
+
+    BatchJob.query.filter_by(id=job_id, status=BatchJob.STATUS_RUNNING).update(
+        {'heartbeat_at': datetime.utcnow()}, synchronize_session=False
+    )
+    db.session.commit()
+
+
+def finish_job(job_id: str, status: str, result: list = None, error: str = None):
+    from auth.models import db, BatchJob
+
+    BatchJob.query.filter_by(id=job_id).update(
+        {'status': status, 'result': result, 'error': error, 'finished_at': datetime.utcnow()},
+        synchronize_session=False
+    )
+    db.session.commit()
+    logger.info(f"🏁 [JOB_QUEUE] Job {job_id[:8]} → {status}")
+
+
+def recover_stale_jobs() -> int:
+    """
+    Repune în coadă job-urile `running` al căror worker nu mai trimite heartbeat
+    (crash / redeploy). Peste `max_attempts` încercări, job-ul devine 'failed'.
+
+    Returns:
+        int: Numărul de job-uri recuperate
+    """
+    from auth.models import db, BatchJob
+
+    queue_config = _queue_config()
+    cutoff = datetime.utcnow() - timedelta(seconds=queue_config['stale_after_s'])
+    stale_jobs = BatchJob.query.filter(
+        BatchJob.status == BatchJob.STATUS_RUNNING,
+        BatchJob.heartbeat_at < cutoff
+    ).all()
+
+    for job in stale_jobs:
+        if job.attempts >= queue_config['max_attempts']:
+            job.status = BatchJob.STATUS_FAILED
+            job.error = f"Worker oprit neașteptat de {job.attempts} ori"
+            job.finished_at = datetime.utcnow()
+        elif job.cancel_requested:
+            job.status = BatchJob.STATUS_CANCELLED
+            job.finished_at = datetime.utcnow()
+        else:
+            job.status = BatchJob.STATUS_QUEUED
+        logger.warning(f"🔁 [JOB_QUEUE] Job {job.id[:8]} fără heartbeat (worker {job.worker_id}) → {job.status}")
+    db.session.commit()
+    return len(stale_jobs)
+
+
+# ==============================================================================
+# EXECUȚIE
+# ==============================================================================
+
+def _files_to_resume(session_id: str) -> Optional[List[str]]:
+    """Fișierele neterminate ale unei sesiuni (None = procesăm tot folderul)."""
+    import batch_session_manager
+
+    if not session_id or not batch_session_manager.get_session_summary(session_id):
+        return None
+    return [entry['filename'] for entry in batch_session_manager.get_pending_files(session_id, include_interrupted=True)]
+
+
+def run_job(job: Dict, flask_app) -> str:
+    """
+    Execută un job preluat: `run_batch_job` cu heartbeat periodic și verificare
+    de anulare între fișiere. Apelat din worker, în app context.
+
+    Returns:
+        str: Statusul final al job-ului
+    """
+    from auth.models import BatchJob
+    from batch_processor import run_batch_job
+    import batch_session_manager
+
+    job_id = job['id']
+    stop_heartbeat = threading.Event()
+
+    def _heartbeat_loop():
+        with flask_app.app_context():
+            while not stop_heartbeat.wait(_queue_config()['heartbeat_s']):
+                try:
+                    heartbeat(job_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ [JOB_QUEUE] Heartbeat eșuat pentru {job_id[:8]}: {e}")
+
+    heartbeat_thread = threading.Thread(target=_heartbeat_loop, name=f"batch-job-heartbeat-{job_id[:8]}", daemon=True)
+    heartbeat_thread.start()
+
+    try:
+        only_files = _files_to_resume(job['session_id']) if job['attempts'] > 1 else None
+        if only_files is not None:
+            logger.warning(f"🔁 [JOB_QUEUE] Reluare job {job_id[:8]}: {len(only_files)} fișiere rămase")
+
+        generated_links = run_batch_job(
+            job['input_folder'],
+            job['output_folder'],
+            job['window_minutes'],
+            session_id=job['session_id'],
+            only_files=only_files,
+            should_cancel=lambda: is_cancel_requested(job_id),
+            force_reprocess=job.get('force_reprocess', False),
+        ) or []
+
+        status = BatchJob.STATUS_CANCELLED if is_cancel_requested(job_id) else BatchJob.STATUS_COMPLETED
+        finish_job(job_id, status, result=generated_links)
+
+        if job['session_id'] and status == BatchJob.STATUS_COMPLETED:
+            batch_session_manager.mark_session_completed(job['session_id'])
+
+        if job['cleanup_input'] and status == BatchJob.STATUS_COMPLETED:
+            try:
+                shutil.rmtree(job['input_folder'])
+                logger.info(f"🗑️ Folder temporar șters: {job['input_folder']}")
+            except Exception as cleanup_error:
+                logger.warning(f"Nu s-a putut șterge folderul temporar: {cleanup_error}")
+        return status
+
+    except Exception as e:
+        logger.critical(f"💥 [JOB_QUEUE] Job {job_id[:8]} eșuat: {e}", exc_info=True)
+        finish_job(job_id, BatchJob.STATUS_FAILED, error=str(e))
+        return BatchJob.STATUS_FAILED
+
+    finally:
+        stop_heartbeat.set()
+
+
+def work_loop(flask_app, worker_id: str = None, once: bool = False, stop_event: threading.Event = None):
+    """
+    Bucla unui worker: recuperare job-uri orfane → preluare → execuție.
+
+    Args:
+        flask_app: Aplicația Flask (pentru app context / DB)
+        worker_id: Identificator worker (implicit host:pid:thread)
+        once: Procesează cel mult un job și iese (util pentru cron / teste)
+        stop_event: Oprire cooperativă (semnale)
+    """
+    worker_id = worker_id or default_worker_id()
+    stop_event = stop_event or threading.Event()
+    poll_interval = _queue_config()['poll_interval_s']
+    logger.warning(f"👷 [JOB_QUEUE] Worker {worker_id} pornit (poll {poll_interval}s)")
+
+    while not stop_event.is_set():
+        job = None
+        try:
+            with flask_app.app_context():
+                recover_stale_jobs()
+                job = claim_next_job(worker_id)
+                if job:
+                    run_job(job, flask_app)
+        except Exception as e:
+            logger.error(f"❌ [JOB_QUEUE] Eroare în bucla worker-ului {worker_id}: {e}", exc_info=True)
+
+        if once:
+            break
+        if not job:
+            stop_event.wait(poll_interval)
+
+    logger.warning(f"👷 [JOB_QUEUE] Worker {worker_id} oprit")
+
+
+_inline_worker: Optional[threading.Thread] = None
+_inline_worker_pid: Optional[int] = None
+_inline_worker_lock = threading.Lock()
+
+
+def ensure_inline_worker(flask_app):
+    """Pornește (o singură dată per proces) worker-ul inline, dacă modul cozii e 'inline'."""
+    global _inline_worker, _inline_worker_pid
+    if _queue_config()['mode'] != 'inline':
+        return
+    with _inline_worker_lock:
+        # După fork (gunicorn --preload) thread-ul părintelui nu există în copil
+        if _inline_worker_pid == os.getpid() and _inline_worker is not None and _inline_worker.is_alive():
+            return
+        _inline_worker = threading.Thread(target=work_loop, args=(flask_app,),
+                                          name="batch-job-inline-worker", daemon=True)
+        _inline_worker.start()
+        _inline_worker_pid = os.getpid()
+
+
+def install_inline_worker(server):
+    """
+    Worker-ul inline pornește la primul request al fiecărui proces web, nu la
+    primul batch: după redeploy / crash, job-urile din coadă și cele `running`
+    orfane (recover_stale_jobs) sunt reluate fără să aștepte un batch nou.
+    Nu pornește la import: cu `--preload`, thread-ul ar rula în master-ul gunicorn.
+    """
+    if _queue_config()['mode'] != 'inline':
+        return
+
+    @server.before_request
+    def _start_inline_worker():
+        if _inline_worker_pid != os.getpid() or _inline_worker is None or not _inline_worker.is_alive():
+            ensure_inline_worker(server)
@@ -30,7 +30,8 @@ def get_medical_layout():
             children=[
                 _get_batch_tab(),
                 _get_settings_tab(),
-                _get_data_view_tab()
+                _get_data_view_tab(),
+                _get_links_dashboard_tab()
             ]
         ),
         
@@ -259,6 +260,15 @@ def _get_batch_tab():
                         )
                     ], className="mb-20"),
                     
+                    # Fișierele deja ingerate (același conținut) sunt legate de link-ul existent
+                    dcc.Checklist(
+                        id='admin-batch-force-reprocess',
+                        options=[{'label': ' 🔁 Forțează reprocesarea fișierelor deja încărcate', 'value': 'force'}],
+                        value=[],
+                        style={'fontSize': '14px'},
+                        className="mb-20"
+                    ),
+                    
                     html.Button(
                         '🚀 Pornește Procesare Batch + Generare Link-uri',
                         id='admin-start-batch-button',
@@ -290,7 +300,15 @@ def _get_batch_tab():
                                 'backgroundColor': '#f8f9fa',
                                 'borderRadius': '5px',
                                 'border': '1px solid #e0e0e0'
-                            })
+                            }),
+                            
+                            html.Button(
+                                '⏹️ Anulează Procesarea',
+                                id='admin-batch-cancel-button',
+                                n_clicks=0,
+                                className="btn-secondary",
+                                style={'marginTop': '10px'}
+                            )
                         ],
                         style={'display': 'none', 'marginBottom': '20px'}
                     ),
@@ -314,9 +332,11 @@ def _get_batch_tab():
                     ], className="medical-card", style={'backgroundColor': '#f8f9fa', 'border': '1px solid #e0e0e0'}),
                     
                     # Interval & Stores
-                    dcc.Interval(id='admin-batch-progress-interval', interval=1000, n_intervals=0, disabled=True),
+                    dcc.Interval(id='admin-batch-progress-interval', interval=config.PROGRESS_POLL_CONFIG['poll_ms'], n_intervals=0, disabled=True),
                     dcc.Store(id='admin-batch-uploaded-files-store', storage_type='memory', data=[]),
                     dcc.Store(id='admin-batch-session-id', data=None),
+                    dcc.Store(id='admin-batch-job-id', data=None),
+                    dcc.Store(id='admin-batch-job-event', data=None),  # evenimentul "done" din polling-ul de progres
                     dcc.Interval(id='force-routing-trigger', interval=100, n_intervals=0, max_intervals=1)
                 ]
             )
@@ -532,6 +552,46 @@ def _get_data_view_tab():
         ]
     )
 
+def _get_links_dashboard_tab():
+    # Paginat (keyset): fiecare request trimite doar o pagină de carduri, indiferent de numărul de link-uri
+    return dcc.Tab(
+        label="🔗 Link-uri Pacienți",
+        value='tab-links-dashboard',
+        children=[
+            html.Div(
+                className="tab-content-container",
+                children=[
+                    html.Div([
+                        html.H2("🔗 Link-uri Pacienți", style={'color': '#2c3e50', 'display': 'inline-block', 'marginRight': '20px'}),
+                        html.Button('🔄 Reîmprospătează', id='admin-refresh-dashboard', n_clicks=0, className="btn-primary", style={'verticalAlign': 'middle'})
+                    ], className="mb-20"),
+                    
+                    html.Div([
+                        dcc.Input(
+                            id='admin-dashboard-search',
+                            type='search',
+                            debounce=True,
+                            placeholder='🔍 Căutare după aparat sau notițe...',
+                            style={'width': '100%', 'maxWidth': '420px', 'padding': '10px', 'border': '1px solid #bdc3c7', 'borderRadius': '5px', 'fontSize': '14px'}
+                        ),
+                        html.Span(id='admin-dashboard-total', style={'marginLeft': '15px', 'color': '#7f8c8d', 'fontSize': '13px'})
+                    ], className="mb-20", style={'display': 'flex', 'alignItems': 'center', 'flexWrap': 'wrap', 'gap': '10px'}),
+                    
+                    # Cursoarele paginilor vizitate (stivă) - "Înapoi" nu re-interoghează pagini anterioare
+                    dcc.Store(id='admin-dashboard-page', data={'cursors': [None], 'next': None}),
+                    
+                    dcc.Loading(id="admin-dashboard-loading", type="default", children=html.Div(id='admin-dashboard-table')),
+                    
+                    html.Div([
+                        html.Button('⬅️ Înapoi', id='admin-dashboard-prev', n_clicks=0, disabled=True, className="btn-primary", style={'marginRight': '10px'}),
+                        html.Span(id='admin-dashboard-page-label', style={'marginRight': '10px', 'color': '#555', 'fontSize': '13px'}),
+                        html.Button('Înainte ➡️', id='admin-dashboard-next', n_clicks=0, disabled=True, className="btn-primary")
+                    ], className="mt-20", style={'display': 'flex', 'alignItems': 'center', 'justifyContent': 'center'})
+                ]
+            )
+        ]
+    )
+
 def _get_footer():
     return html.Div([
         html.Hr(style={'margin': '50px 0 30px 0', 'borderColor': '#e0e0e0'}),
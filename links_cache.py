@@ -0,0 +1,187 @@
+# ==============================================================================
+# links_cache.py
+# ------------------------------------------------------------------------------
+# ROL: Cache read-through (per proces) pentru metadata link-urilor de pacient
+#      (`patient_links.load_patient_links`), invalidat prin versiunea sursei.
+#
+# DE CE: `load_patient_links` rula la aproape fiecare callback (routing,
+#        tabelul din dashboard, vizualizare date, înregistrări, branding):
+#        toate rândurile PostgreSQL, descărcarea blob-ului S3 sau parsarea
+#        JSON-ului local - de fiecare dată.
+#
+# VERSIUNE (verificare ieftină, aceeași ordine a surselor ca load-ul):
+#   - PostgreSQL: (număr rânduri, max(updated_at)) din `patient_link_rows`
+#   - S3: ETag-ul obiectului `patient_links.json` (HEAD)
+#   - Local: (mtime_ns, dimensiune) ale fișierului
+#   Sursa e comună celor 4 workeri gunicorn: o scriere din oricare worker
+#   schimbă versiunea, iar ceilalți reîncarcă la următoarea verificare.
+#
+# PROSPEȚIME: versiunea se verifică cel mult o dată la `check_interval_s`;
+#             între verificări snapshot-ul se servește direct (întârzierea
+#             maximă e măsurată: `max_unverified_age_s`). `max_age_s` forțează
+#             reîncărcarea chiar dacă versiunea pare neschimbată.
+#
+# CONFIG: config.LINKS_CACHE_CONFIG (env PULSOX_LINKS_CACHE_*).
+# ==============================================================================
+
+import copy
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import config
+from logger_setup import logger
+
+
+def copy_links(links: Dict) -> Dict:
+    """
+    Copie completă pe care apelantul o poate modifica: și structurile imbricate
+    (recordings, metadata etc.) - altfel o modificare ar strica snapshot-ul procesului.
+    """
+    return copy.deepcopy(links)
+
+
+class LinksCache:
+    """Snapshot-ul link-urilor + versiunea sursei din care a fost încărcat."""
+
+    def __init__(self, check_interval_s: float = 1.0, max_age_s: float = 300, enabled: bool = True):
+        self.check_interval_s = max(0.0, float(check_interval_s))
+        self.max_age_s = float(max_age_s) if max_age_s else None
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._links: Optional[Dict] = None
+        self._version: Optional[Tuple] = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+        self._generation = 0  # crește la `invalidate`: un load început înainte nu mai e păstrat
+        self._counters = {
+            'hits': 0, 'misses': 0, 'version_checks': 0, 'version_changes': 0,
+            'check_errors': 0, 'invalidations': 0,
+        }
+        self._timings = {'check_s': 0.0, 'reload_s': 0.0}
+        self._max_unverified_age_s = 0.0
+
+    def get(self, loader: Callable[[], Dict]) -> Dict:
+        """
+        Link-urile (copie), din cache dacă versiunea sursei nu s-a schimbat.
+
+        Args:
+            loader: Încărcarea completă (PG → S3 → local)
+        """
+        if not self.enabled:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            links, version = self._links, self._version
+            checked_at, loaded_at = self._checked_at, self._loaded_at
+
+        if links is not None and now - checked_at < self.check_interval_s:
+            self._hit(now - checked_at)
+            return copy_links(links)
+
+        current = self._current_version()
+        expired = self.max_age_s is not None and now - loaded_at >= self.max_age_s
+        if links is not None and current is not None and current == version and not expired:
+            with self._lock:
+                self._checked_at = time.monotonic()
+            self._hit(0.0)
+            return copy_links(links)
+
+        with self._lock:
+            self._counters['misses'] += 1
+            if links is not None and current != version:
+                self._counters['version_changes'] += 1
+            generation = self._generation
+
+        started = time.monotonic()
+        fresh = loader()
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._timings['reload_s'] += elapsed
+            # Versiunea citită ÎNAINTE de load: o scriere concurentă produce cel mult o reîncărcare în plus
+            if generation == self._generation:
+                self._links = copy_links(fresh)
+                self._version = current
+                self._loaded_at = self._checked_at = time.monotonic()
+        logger.info(f"🔄 [LINKS_CACHE] {len(fresh)} link-uri reîncărcate în {elapsed * 1000:.0f} ms (versiune {current})")
+        return fresh
+
+    def invalidate(self):
+        """Scriere în procesul curent → următorul `get` reîncarcă."""
+        with self._lock:
+            self._links = None
+            self._version = None
+            self._generation += 1
+            self._counters['invalidations'] += 1
+
+    def stats(self) -> Dict:
+        """Contoare hit/miss + prospețime, pentru monitorizare (/health)."""
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            checks = self._counters['version_checks']
+            return {
+                **self._counters,
+                'hit_rate': round(self._counters['hits'] / lookups, 3) if lookups else 0.0,
+                'avg_check_ms': round(self._timings['check_s'] / checks * 1000, 2) if checks else 0.0,
+                'avg_reload_ms': round(self._timings['reload_s'] / self._counters['misses'] * 1000, 2)
+                                 if self._counters['misses'] else 0.0,
+                'max_unverified_age_s': round(self._max_unverified_age_s, 3),
+                'snapshot_age_s': round(time.monotonic() - self._loaded_at, 1) if self._links is not None else None,
+                'links': len(self._links) if self._links is not None else 0,
+                'check_interval_s': self.check_interval_s,
+            }
+
+    # --- Intern ---------------------------------------------------------------
+
+    def _hit(self, unverified_age_s: float):
+        with self._lock:
+            self._counters['hits'] += 1
+            self._max_unverified_age_s = max(self._max_unverified_age_s, unverified_age_s)
+
+    def _current_version(self) -> Optional[Tuple]:
+        """Versiunea sursei pe care ar folosi-o `load_patient_links` (None = necunoscută → reload)."""
+        started = time.monotonic()
+        try:
+            return _source_version()
+        except Exception as e:
+            with self._lock:
+                self._counters['check_errors'] += 1
+            logger.warning(f"⚠️ [LINKS_CACHE] Verificare versiune eșuată: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._counters['version_checks'] += 1
+                self._timings['check_s'] += time.monotonic() - started
+
+
+def _source_version() -> Optional[Tuple]:
+    from patient_links import PATIENT_LINKS_FILE, LINKS_METADATA_S3_KEY
+    from repositories.patient_repository import links_version
+
+    pg_version = links_version()
+    if pg_version is not None:
+        return ('pg',) + tuple(pg_version)
+
+    try:
+        from storage_service import r2_client
+        if r2_client.enabled:
+            etag = r2_client.get_object_etag(LINKS_METADATA_S3_KEY)
+            if etag:
+                return ('s3', etag)
+    except ImportError:
+        pass
+
+    try:
+        stat = os.stat(PATIENT_LINKS_FILE)
+        return ('local', stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        return ('local', None)
+
+
+links_cache = LinksCache(
+    check_interval_s=config.LINKS_CACHE_CONFIG['check_interval_s'],
+    max_age_s=config.LINKS_CACHE_CONFIG['max_age_s'],
+    enabled=config.LINKS_CACHE_CONFIG['enabled'],
+)
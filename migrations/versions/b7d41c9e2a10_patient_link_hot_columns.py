@@ -0,0 +1,121 @@
+"""Coloane indexate pentru câmpurile filtrate din patient_link_rows + backfill
+
+Câmpurile folosite de dashboard (is_active, device_name, recording_date,
+created_at, last_processed_at, sent_status) erau doar în `payload` (JSON):
+filtrarea, sortarea și gruparea se făceau în Python, după încărcarea tuturor
+link-urilor. Revizia adaugă coloanele + indexurile și le completează din
+payload, pe bucăți (idempotent: coloanele/indexurile existente sunt sărite).
+
+Revision ID: b7d41c9e2a10
+Revises:
+Create Date: 2026-10-18 09:00:00
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d41c9e2a10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLE = 'patient_link_rows'
+CHUNK_SIZE = 500
+
+COLUMNS = [
+    sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()),
+    sa.Column('device_name', sa.String(length=255), nullable=True),
+    sa.Column('recording_date', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('last_processed_at', sa.DateTime(), nullable=True),
+    sa.Column('sent_status', sa.Boolean(), nullable=False, server_default=sa.false()),
+]
+
+INDEXES = {
+    'ix_patient_link_rows_is_active': ['is_active'],
+    'ix_patient_link_rows_device_name': ['device_name'],
+    'ix_patient_link_rows_recording_date': ['recording_date'],
+    'ix_patient_link_rows_created_at': ['created_at'],
+    'ix_patient_link_rows_last_processed_at': ['last_processed_at'],
+    'ix_patient_link_rows_sent_status': ['sent_status'],
+    'ix_patient_link_rows_active_created': ['is_active', 'created_at'],
+}
+
+
+def _parse(value, parser):
+    if not value:
+        return None
+    try:
+        return parser(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _hot_columns(payload):
+    """Aceeași derivare ca PatientLinkRow.hot_columns (copiată: revizia nu importă modelele)."""
+    payload = payload or {}
+    return {
+        'is_active': bool(payload.get('is_active', True)),
+        'device_name': (payload.get('device_name') or None) and str(payload['device_name'])[:255],
+        'recording_date': _parse(payload.get('recording_date'), lambda v: datetime.strptime(v, '%Y-%m-%d').date()),
+        'created_at': _parse(payload.get('created_at'), lambda v: datetime.fromisoformat(v).replace(tzinfo=None)),
+        'last_processed_at': _parse(payload.get('last_processed_at'),
+                                    lambda v: datetime.fromisoformat(v).replace(tzinfo=None)),
+        'sent_status': bool(payload.get('sent_status', False)),
+    }
+
+
+def _backfill(bind):
+    rows_table = sa.table(TABLE, sa.column('token', sa.String), sa.column('payload'),
+                          *[sa.column(c.name, c.type) for c in COLUMNS])
+    last_token = ''
+    while True:
+        chunk = bind.execute(
+            sa.select(rows_table.c.token, rows_table.c.payload)
+            .where(rows_table.c.token > last_token)
+            .order_by(rows_table.c.token)
+            .limit(CHUNK_SIZE)
+        ).fetchall()
+        if not chunk:
+            break
+        for token, payload in chunk:
+            if isinstance(payload, str):
+                payload = json.loads(payload)
+            bind.execute(rows_table.update().where(rows_table.c.token == token).values(**_hot_columns(payload)))
+        last_token = chunk[-1][0]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if TABLE not in inspector.get_table_names():
+        return  # Tabel creat ulterior de db.create_all(), direct cu coloanele noi
+
+    existing_columns = {col['name'] for col in inspector.get_columns(TABLE)}
+    for column in COLUMNS:
+        if column.name not in existing_columns:
+            op.add_column(TABLE, column.copy())
+
+    existing_indexes = {index['name'] for index in inspector.get_indexes(TABLE)}
+    for name, columns in INDEXES.items():
+        if name not in existing_indexes:
+            op.create_index(name, TABLE, columns)
+
+    _backfill(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    existing_indexes = {index['name'] for index in inspector.get_indexes(TABLE)}
+    for name in INDEXES:
+        if name in existing_indexes:
+            op.drop_index(name, table_name=TABLE)
+    with op.batch_alter_table(TABLE) as batch_op:
+        for column in reversed(COLUMNS):
+            batch_op.drop_column(column.name)
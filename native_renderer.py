@@ -0,0 +1,313 @@
+# ==============================================================================
+# native_renderer.py
+# ------------------------------------------------------------------------------
+# ROL: Backend de export imagini pentru batch, fără browser (Kaleido/Chromium).
+#      Desenează același grafic GOLDEN_STYLE ca `plot_generator.create_plot`
+#      direct cu Pillow: bara-legendă de culoare, linia SaO2 cu gradient,
+#      panoul de puls, grile, axe și titlul dinamic.
+#
+# DE CE: `fig.write_image` pornește Chromium headless pentru fiecare felie -
+#        cel mai lent pas din batch și imposibil pe containere fără Chromium.
+#
+# SELECȚIE: config.IMAGE_EXPORT_BACKEND = 'native' (env PULSOX_IMAGE_BACKEND).
+#           Cu 'kaleido', batch-ul trece automat pe acest backend când
+#           Chrome lipsește.
+#
+# GEOMETRIE: Domeniile subploturilor sunt citite din template-ul figurii de bază
+#            (plot_generator.get_base_figure_template), deci rămân sincronizate
+#            cu create_plot. Marginile sunt cele implicite Plotly.
+# ==============================================================================
+
+import os
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+import config
+from logger_setup import logger
+
+SUPERSAMPLE = 2  # Desenăm la 2x și reducem prin medie pe blocuri (anti-aliasing ieftin)
+_PLOTLY_MARGIN = {'l': 80, 'r': 80, 't': 100, 'b': 80}
+_AXIS_TEXT_COLOR = (68, 68, 68)
+_FONT_CANDIDATES = ("arial.ttf", "Arial.ttf", "DejaVuSans.ttf", "LiberationSans-Regular.ttf")
+
+
+# ==============================================================================
+# UTILITARE
+# ==============================================================================
+
+@lru_cache(maxsize=16)
+def _font(size: int) -> ImageFont.ImageFont:
+    for name in _FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1
+        return ImageFont.load_default()
+
+
+def _rgb(color: str) -> Tuple[int, int, int]:
+    return ImageColor.getrgb(color)[:3]
+
+
+@lru_cache(maxsize=8)
+def _colorscale_table(colorscale_key: tuple) -> Tuple[np.ndarray, np.ndarray]:
+    positions = np.array([float(pos) for pos, _ in colorscale_key])
+    colors = np.array([_rgb(color) for _, color in colorscale_key], dtype=np.float64)
+    return positions, colors
+
+
+def map_colorscale(values: np.ndarray, colorscale: List, cmin: float, cmax: float) -> np.ndarray:
+    """Valorile → culori RGB (uint8, shape (n, 3)), interpolate liniar ca în Plotly."""
+    positions, colors = _colorscale_table(tuple((pos, color) for pos, color in colorscale))
+    span = (cmax - cmin) or 1.0
+    normalized = np.clip((np.asarray(values, dtype=np.float64) - cmin) / span, 0.0, 1.0)
+    rgb = np.column_stack([np.interp(normalized, positions, colors[:, channel]) for channel in range(3)])
+    return np.rint(rgb).astype(np.uint8)
+
+
+def _nice_step(span: float, target_ticks: int, steps=(1, 2, 2.5, 5, 10)) -> float:
+    if span <= 0:
+        return 1.0
+    raw = span / target_ticks
+    magnitude = 10 ** np.floor(np.log10(raw))
+    for step in steps:
+        if raw <= step * magnitude:
+            return step * magnitude
+    return 10 * magnitude
+
+
+def _autorange(values: np.ndarray) -> Tuple[float, float]:
+    """Aproximare a autorange-ului Plotly pentru linii: min/max + 5% padding."""
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return 0.0, 1.0
+    low, high = float(finite.min()), float(finite.max())
+    pad = (high - low) * 0.05 or 1.0
+    return low - pad, high + pad
+
+
+_TIME_STEPS_MINUTES = (1, 2, 5, 10, 15, 20, 30, 60, 120, 180, 240, 360)
+
+
+def _time_ticks(start: pd.Timestamp, end: pd.Timestamp, target_ticks: int = 7) -> List[pd.Timestamp]:
+    span_minutes = max((end - start).total_seconds() / 60.0, 1e-9)
+    step = next((s for s in _TIME_STEPS_MINUTES if span_minutes / s <= target_ticks), _TIME_STEPS_MINUTES[-1])
+    first = start.ceil(f"{step}min")
+    return list(pd.date_range(first, end, freq=f"{step}min"))
+
+
+class _Panel:
+    """Dreptunghiul unui subplot în pixeli + transformările de coordonate."""
+
+    def __init__(self, x_domain, y_domain, plot_box):
+        left, top, right, bottom = plot_box
+        self.x0 = left + x_domain[0] * (right - left)
+        self.x1 = left + x_domain[1] * (right - left)
+        self.y0 = bottom - y_domain[1] * (bottom - top)
+        self.y1 = bottom - y_domain[0] * (bottom - top)
+
+    def px_x(self, values: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+        return self.x0 + (values - vmin) / ((vmax - vmin) or 1.0) * (self.x1 - self.x0)
+
+    def px_y(self, values: np.ndarray, vmin: float, vmax: float) -> np.ndarray:
+        return self.y1 - (values - vmin) / ((vmax - vmin) or 1.0) * (self.y1 - self.y0)
+
+
+def _draw_text(draw: ImageDraw.ImageDraw, xy, text: str, font, fill, anchor: str):
+    draw.text(xy, text, font=font, fill=fill, anchor=anchor)
+
+
+def _draw_vertical_text(image: Image.Image, center, text: str, font, fill):
+    bbox = font.getbbox(text)
+    text_img = Image.new('RGBA', (bbox[2] - bbox[0] + 4, bbox[3] - bbox[1] + 4), (0, 0, 0, 0))
+    ImageDraw.Draw(text_img).text((2 - bbox[0], 2 - bbox[1]), text, font=font, fill=fill)
+    rotated = text_img.rotate(90, expand=True)
+    image.paste(rotated, (int(center[0] - rotated.width / 2), int(center[1] - rotated.height / 2)), rotated)
+
+
+def _draw_gradient_polyline(draw: ImageDraw.ImageDraw, xs: np.ndarray, ys: np.ndarray,
+                            colors: np.ndarray, width: int):
+    """Linie cu gradient: segmentele consecutive de aceeași culoare sunt desenate împreună."""
+    n = len(xs)
+    if n < 2:
+        return
+    segment_colors = colors[:-1]
+    change = np.any(segment_colors[1:] != segment_colors[:-1], axis=1)
+    boundaries = np.concatenate([[0], np.nonzero(change)[0] + 1, [n - 1]])
+    radius = width / 2.0
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        points = list(zip(xs[start:end + 1].tolist(), ys[start:end + 1].tolist()))
+        fill = tuple(int(c) for c in segment_colors[start])
+        draw.line(points, fill=fill, width=width, joint='curve')
+        # Capete rotunjite - fără "trepte" între segmentele de culori diferite
+        x_end, y_end = points[-1]
+        draw.ellipse((x_end - radius, y_end - radius, x_end + radius, y_end + radius), fill=fill)
+
+
+# ==============================================================================
+# RANDARE
+# ==============================================================================
+
+def render_plot(df_slice: pd.DataFrame, width: int = None, height: int = None,
+                line_width_scale: float = 1.0) -> Optional[Image.Image]:
+    """
+    Desenează graficul GOLDEN_STYLE pentru `df_slice`, în memorie (fără codare).
+
+    Args:
+        df_slice: DataFrame cu coloanele SpO2 / Pulse Rate și DatetimeIndex
+        width, height: Dimensiunea finală (implicit config.IMAGE_RESOLUTION)
+        line_width_scale: Factor de scalare pentru grosimea liniei SaO2
+
+    Returns:
+        Image.Image (RGB) sau None dacă felia are prea puține date
+    """
+    from plot_generator import get_base_figure_template, interpolate_data, build_plot_title
+
+    if df_slice is None or len(df_slice) < 2:
+        return None
+
+    width = width or config.IMAGE_RESOLUTION['width']
+    height = height or config.IMAGE_RESOLUTION['height']
+    s = SUPERSAMPLE
+    W, H = width * s, height * s
+
+    template_layout = get_base_figure_template()['layout']
+    layout_style = config.GOLDEN_STYLE['layout']
+    spo2_style = config.GOLDEN_STYLE['traces']['spo2']
+    pulse_style = config.GOLDEN_STYLE['traces']['pulse']
+    spo2_axis = config.GOLDEN_STYLE['axes']['yaxis_spo2']
+    pulse_axis = config.GOLDEN_STYLE['axes']['yaxis_pulse']
+    xaxis_style = config.GOLDEN_STYLE['axes']['xaxis']
+    font_family_size = layout_style['font'].get('size', 14)
+    text_color = _rgb(layout_style['font'].get('color', 'black'))
+
+    image = Image.new('RGB', (W, H), _rgb(layout_style['paper_bgcolor']))
+    draw = ImageDraw.Draw(image)
+    tick_font = _font(int(font_family_size * 0.85 * s))
+    label_font = _font(int(font_family_size * s))
+    title_font = _font(int(layout_style['title_font_size'] * s))
+
+    plot_box = (_PLOTLY_MARGIN['l'] * s, _PLOTLY_MARGIN['t'] * s,
+                W - _PLOTLY_MARGIN['r'] * s, H - _PLOTLY_MARGIN['b'] * s)
+    legend_panel = _Panel(template_layout['xaxis']['domain'], template_layout['yaxis']['domain'], plot_box)
+    spo2_panel = _Panel(template_layout['xaxis2']['domain'], template_layout['yaxis2']['domain'], plot_box)
+    pulse_panel = _Panel(template_layout['xaxis4']['domain'], template_layout['yaxis4']['domain'], plot_box)
+
+    plot_bg = _rgb(layout_style['plot_bgcolor'])
+    for panel in (legend_panel, spo2_panel, pulse_panel):
+        draw.rectangle((panel.x0, panel.y0, panel.x1, panel.y1), fill=plot_bg)
+
+    times = df_slice.index.asi8.astype(np.float64)
+    t_min, t_max = times[0], times[-1]
+    y_min, y_max = spo2_axis['range']
+
+    # --- Grile ---
+    spo2_grid = _rgb(spo2_axis['gridcolor'])
+    dtick = spo2_axis.get('dtick') or _nice_step(y_max - y_min, 6)
+    spo2_ticks = np.arange(np.ceil(y_min / dtick) * dtick, y_max + 1e-9, dtick)
+    for tick, y_px in zip(spo2_ticks, spo2_panel.px_y(spo2_ticks, y_min, y_max)):
+        draw.line((spo2_panel.x0, y_px, spo2_panel.x1, y_px), fill=spo2_grid, width=s)
+        _draw_text(draw, (legend_panel.x0 - 6 * s, y_px), f"{tick:g}", tick_font, _AXIS_TEXT_COLOR, 'rm')
+
+    x_ticks = _time_ticks(df_slice.index[0], df_slice.index[-1])
+    x_tick_values = np.array([tick.value for tick in x_ticks], dtype=np.float64) / _ns_per_unit(df_slice.index)
+    x_grid = _rgb(xaxis_style['gridcolor'])
+    for tick, x_px in zip(x_ticks, pulse_panel.px_x(x_tick_values, t_min, t_max)):
+        draw.line((x_px, pulse_panel.y0, x_px, pulse_panel.y1), fill=x_grid, width=s)
+        _draw_text(draw, (x_px, pulse_panel.y1 + 6 * s), tick.strftime('%H:%M'), tick_font, _AXIS_TEXT_COLOR, 'mt')
+
+    # --- Bara-legendă de culoare (heatmap) ---
+    legend_values = np.arange(y_min, y_max + 1)
+    legend_colors = map_colorscale(legend_values, spo2_style['colorscale'],
+                                   spo2_style['colorscale_min'], spo2_style['colorscale_max'])
+    cell_tops = legend_panel.px_y(np.minimum(legend_values + 0.5, y_max), y_min, y_max)
+    cell_bottoms = legend_panel.px_y(np.maximum(legend_values - 0.5, y_min), y_min, y_max)
+    for top, bottom, color in zip(cell_tops, cell_bottoms, legend_colors):
+        draw.rectangle((legend_panel.x0, top, legend_panel.x1, bottom), fill=tuple(int(c) for c in color))
+
+    # --- SaO2: linie cu gradient pe date densificate (~2 puncte / pixel) ---
+    target_points = int((spo2_panel.x1 - spo2_panel.x0) * 2)
+    dense = interpolate_data(df_slice[['SpO2']], factor=spo2_style['interpolation_factor'], max_points=target_points)
+    dense_values = dense['SpO2'].to_numpy(dtype=np.float64)
+    dense_times = dense.index.asi8.astype(np.float64)
+    valid = np.isfinite(dense_values)
+    spo2_colors = map_colorscale(dense_values[valid], spo2_style['colorscale'],
+                                 spo2_style['colorscale_min'], spo2_style['colorscale_max'])
+    spo2_xs = spo2_panel.px_x(dense_times[valid], t_min, t_max)
+    spo2_ys = spo2_panel.px_y(np.clip(dense_values[valid], y_min, y_max), y_min, y_max)
+    spo2_width = max(1, int(round(max(spo2_style['line_width'], spo2_style['marker_size']) * line_width_scale * s)))
+    _draw_gradient_polyline(draw, spo2_xs, spo2_ys, spo2_colors, spo2_width)
+
+    # --- Puls ---
+    pulse_values = df_slice['Pulse Rate'].to_numpy(dtype=np.float64)
+    p_min, p_max = pulse_axis.get('range') or _autorange(pulse_values)
+    pulse_step = _nice_step(p_max - p_min, 4, steps=(1, 2, 5, 10))
+    for tick in np.arange(np.ceil(p_min / pulse_step) * pulse_step, p_max + 1e-9, pulse_step):
+        y_px = float(pulse_panel.px_y(np.array([tick]), p_min, p_max)[0])
+        _draw_text(draw, (legend_panel.x0 - 6 * s, y_px), f"{tick:g}", tick_font, _AXIS_TEXT_COLOR, 'rm')
+    pulse_valid = np.isfinite(pulse_values)
+    pulse_points = list(zip(pulse_panel.px_x(times[pulse_valid], t_min, t_max).tolist(),
+                            pulse_panel.px_y(pulse_values[pulse_valid], p_min, p_max).tolist()))
+    if len(pulse_points) >= 2:
+        draw.line(pulse_points, fill=_rgb(pulse_style['color']), width=max(1, int(pulse_style['width'] * s)), joint='curve')
+
+    # --- Titluri axe ---
+    axis_title_x = legend_panel.x0 - 45 * s
+    _draw_vertical_text(image, (axis_title_x, (spo2_panel.y0 + spo2_panel.y1) / 2), spo2_axis['title'],
+                        label_font, _rgb(spo2_axis.get('color', 'black')))
+    _draw_vertical_text(image, (axis_title_x, (pulse_panel.y0 + pulse_panel.y1) / 2), pulse_axis['title'],
+                        label_font, _rgb(pulse_axis.get('color', 'black')))
+    _draw_text(draw, ((pulse_panel.x0 + pulse_panel.x1) / 2, pulse_panel.y1 + 30 * s), xaxis_style['title'],
+               label_font, text_color, 'mt')
+
+    # --- Titlu + legendă orizontală (dreapta sus) ---
+    _draw_text(draw, (W / 2, plot_box[1] / 2), build_plot_title(df_slice), title_font, text_color, 'mm')
+    legend_y = plot_box[1] - 14 * s
+    legend_x = plot_box[2]
+    for name, color in ((pulse_style['name'], _rgb(pulse_style['color'])),
+                        (spo2_style['name'], tuple(int(c) for c in legend_colors[-1]))):
+        text_width = draw.textlength(name, font=label_font)
+        _draw_text(draw, (legend_x, legend_y), name, label_font, text_color, 'rm')
+        sample_end = legend_x - text_width - 6 * s
+        draw.line((sample_end - 30 * s, legend_y, sample_end, legend_y), fill=color, width=3 * s)
+        legend_x = sample_end - 30 * s - 20 * s
+
+    # --- Micșorare (anti-aliasing) ---
+    return image.reduce(s) if s > 1 else image
+
+
+def render_plot_image(df_slice: pd.DataFrame, output_path: str, width: int = None, height: int = None,
+                      line_width_scale: float = 1.0) -> bool:
+    """
+    `render_plot` + salvare în formatul dedus din extensie (config.IMAGE_OUTPUT_CONFIG pentru calitate).
+
+    Returns:
+        bool: True dacă imaginea a fost salvată
+    """
+    from plot_generator import save_image
+
+    image = render_plot(df_slice, width, height, line_width_scale)
+    if image is None:
+        logger.warning(f"[NATIVE_RENDER] Date insuficiente pentru '{os.path.basename(output_path)}' - imagine omisă.")
+        return False
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    extension = os.path.splitext(output_path)[1].lower()
+    image_format = {'.jpg': 'jpeg', '.jpeg': 'jpeg', '.webp': 'webp'}.get(extension, 'png')
+    save_image(image, output_path, image_format=image_format)
+
+    logger.info(f"[NATIVE_RENDER] Imagine salvată: {os.path.basename(output_path)} ({image.width}x{image.height})")
+    return True
+
+
+def _ns_per_unit(index: pd.DatetimeIndex) -> float:
+    """Nanosecunde per unitate a indexului (asi8 e în unitatea indexului: ns/us/ms/s)."""
+    unit = np.datetime_data(index.dtype)[0]
+    return {'ns': 1, 'us': 1e3, 'ms': 1e6, 's': 1e9}[unit]
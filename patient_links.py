@@ -8,6 +8,10 @@
 #   - Fiecare pacient are un UUID unic (token)
 #   - Datele sunt stocate în patient_data/{token}/
 #   - Metadata pacienți în patient_links.json
+#   - Cu PostgreSQL activ, operațiile pe UN link (citire, notițe, status trimis,
+#     dezactivare, ștergere) merg pe rândul lui (repositories.patient_repository),
+#     nu pe load-all/save-all; blob-ul JSON (S3 + local) rămâne snapshot-ul
+#     de fallback, rescris la crearea/ștergerea link-urilor
 #
 # RESPECTĂ: .cursorrules - Privacy by Design (zero date personale!)
 # ==============================================================================
@@ -17,7 +21,7 @@ import json
 import uuid
 import shutil
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from logger_setup import logger
 
 # --- Configurare Căi ---
@@ -34,6 +38,26 @@ os.makedirs(PATIENT_DATA_DIR, exist_ok=True)
 # ==============================================================================
 
 def load_patient_links() -> Dict:
+    """
+    Link-urile tuturor pacienților, prin cache-ul per proces (links_cache):
+    reîncărcate doar când versiunea sursei (PG / ETag S3 / fișier local) se schimbă.
+    
+    Returns:
+        Dict: Dicționar cu token-uri ca chei și metadata ca valori (copie modificabilă)
+    """
+    from links_cache import links_cache
+    return links_cache.get(_load_patient_links_uncached)
+
+
+def _invalidate_links_cache() -> None:
+    try:
+        from links_cache import links_cache
+        links_cache.invalidate()
+    except Exception as e:
+        logger.debug(f"[LINKS_CACHE] invalidare ocolită: {e}")
+
+
+def _load_patient_links_uncached() -> Dict:
     """
     [CRITICAL FIX] Încarcă link-urile din SCALEWAY (persistent) cu fallback local.
     
@@ -50,7 +74,7 @@ def load_patient_links() -> Dict:
         _migrate = migrate_legacy_if_empty
         _pg = load_all_from_postgres()
         if _pg is not None:
-            logger.warning(f"📗 [LINKS_PG] Încărcate {len(_pg)} link-uri din PostgreSQL")
+            logger.info(f"📗 [LINKS_PG] Încărcate {len(_pg)} link-uri din PostgreSQL")
             return _pg
     except Exception as pg_err:
         logger.debug(f"[LINKS_PG] ocolit: {pg_err}")
@@ -106,7 +130,7 @@ def load_patient_links() -> Dict:
         try:
             with open(PATIENT_LINKS_FILE, 'r', encoding='utf-8') as f:
                 links = json.load(f)
-                logger.warning(f"💾 [LINKS_LOAD] Loaded {len(links)} links from LOCAL (ephemeral cache)")
+                logger.info(f"💾 [LINKS_LOAD] Loaded {len(links)} links from LOCAL (ephemeral cache)")
                 if _migrate:
                     _migrate(links)
                 return links
@@ -131,16 +155,28 @@ def save_patient_links(links: Dict) -> bool:
     Returns:
         bool: True dacă salvarea Scaleway a reușit
     """
-    import time
-    scaleway_success = False
-    local_success = False
-
     try:
         from repositories.patient_repository import replace_all_in_postgres
         replace_all_in_postgres(links)
     except Exception as pg_save_err:
         logger.debug(f"[LINKS_PG] save ocolit: {pg_save_err}")
 
+    return save_links_blob(links)
+
+
+def save_links_blob(links: Dict) -> bool:
+    """
+    Scrie dicționarul complet de link-uri în blob-ul JSON din Scaleway și în
+    cache-ul local (fără PostgreSQL - rândurile se scriu separat).
+    
+    Returns:
+        bool: True dacă cel puțin una dintre scrieri a reușit
+    """
+    import time
+    scaleway_success = False
+    local_success = False
+    _invalidate_links_cache()
+
     # PRIORITY 1: Save to Scaleway (PERSISTENT)
     try:
         from storage_service import r2_client
@@ -193,6 +229,75 @@ def save_patient_links(links: Dict) -> bool:
     return scaleway_success or local_success
 
 
+def new_link_metadata(device_name: str, notes: str = "", recording_date: str = None,
+                      start_time: str = None, end_time: str = None, pdf_path: str = None) -> Dict:
+    """Metadata inițială a unui link nou (structura din patient_links.json)."""
+    current_time = datetime.now().isoformat()
+    return {
+        "device_name": device_name,
+        "notes": notes,
+        "created_at": current_time,  # Prima procesare
+        "last_processed_at": current_time,  # [NEW] Ultima reprocessare
+        "last_accessed": None,
+        "is_active": True,
+        "recordings_count": 0,
+        # [NEW] Metadata medicală extinsă
+        "recording_date": recording_date,  # Data înregistrării
+        "start_time": start_time,          # Ora de început
+        "end_time": end_time,              # Ora de sfârșit
+        "medical_notes": "",               # Notițe medicale detaliate (textarea)
+        "sent_status": False,              # Marcat ca trimis către pacient
+        "sent_at": None,                   # Când a fost marcat ca trimis
+        "view_count": 0,                   # Număr total vizualizări
+        "first_viewed_at": None,           # Prima vizualizare
+        "last_viewed_at": None,            # Ultima vizualizare
+        "pdf_path": pdf_path               # Cale către PDF asociat (opțional)
+    }
+
+
+def _get_link_metadata(token: str) -> Optional[Dict]:
+    """Metadata unui link: rândul PostgreSQL sau, fără PG, dicționarul legacy."""
+    from repositories.patient_repository import get_link
+
+    row = get_link(token)
+    if row is not None:
+        return row or None
+    return load_patient_links().get(token)
+
+
+def _patch_link(token: str, fields: Dict) -> Optional[Dict]:
+    """
+    Aplică `fields` pe un singur link (UPDATE pe rând cu PG activ, altfel
+    load + save legacy).
+
+    Returns:
+        Dict: Metadata actualizată sau None dacă link-ul nu există / salvarea a eșuat
+    """
+    from repositories.patient_repository import patch_link_fields
+
+    patched = patch_link_fields(token, fields)
+    if patched is not None:
+        _invalidate_links_cache()
+        return patched or None
+
+    links = load_patient_links()
+    if token not in links:
+        return None
+    links[token].update(fields)
+    if not save_patient_links(links):
+        return None
+    return links[token]
+
+
+def _sync_links_blob_from_postgres() -> None:
+    """Rescrie snapshot-ul JSON (S3 + local) din tabelul PostgreSQL."""
+    from repositories.patient_repository import load_all_from_postgres
+
+    links = load_all_from_postgres(allow_empty=True)
+    if links is not None:
+        save_links_blob(links)
+
+
 def generate_patient_link(device_name: str, notes: str = "", recording_date: str = None, 
                          start_time: str = None, end_time: str = None, pdf_path: str = None) -> str:
     """
@@ -227,10 +332,18 @@ def generate_patient_link(device_name: str, notes: str = "", recording_date: str
     try:
         # [STEP 1] Verificare duplicate (evitare link-uri duplicate pentru același device + dată)
         logger.debug(f"🔍 [LINK_CREATE] STEP 1: Checking for existing link (duplicate detection)...")
-        links = load_patient_links()
+        from repositories.patient_repository import links_table_active, find_link_token, upsert_link
+
+        use_rows = links_table_active()
+        links = {} if use_rows else load_patient_links()
         
         existing_token = None
-        if device_name and recording_date and start_time:
+        if use_rows and device_name and recording_date and start_time:
+            existing_token = find_link_token(device_name, recording_date, start_time) or None
+            if existing_token:
+                logger.debug(f"✅ [LINK_CREATE] STEP 1 RESULT: Existing link found in PostgreSQL: {existing_token}")
+                return existing_token
+        elif device_name and recording_date and start_time:
             for token, metadata in links.items():
                 if (metadata.get('device_name') == device_name and 
                     metadata.get('recording_date') == recording_date and
@@ -263,34 +376,21 @@ def generate_patient_link(device_name: str, notes: str = "", recording_date: str
         os.makedirs(patient_folder, exist_ok=True)
         
         # Salvăm metadata EXTINSĂ pentru workflow medical
-        current_time = datetime.now().isoformat()
-        links[token] = {
-            "device_name": device_name,
-            "notes": notes,
-            "created_at": current_time,  # Prima procesare
-            "last_processed_at": current_time,  # [NEW] Ultima reprocessare
-            "last_accessed": None,
-            "is_active": True,
-            "recordings_count": 0,
-            # [NEW] Metadata medicală extinsă
-            "recording_date": recording_date,  # Data înregistrării
-            "start_time": start_time,          # Ora de început
-            "end_time": end_time,              # Ora de sfârșit
-            "medical_notes": "",               # Notițe medicale detaliate (textarea)
-            "sent_status": False,              # Marcat ca trimis către pacient
-            "sent_at": None,                   # Când a fost marcat ca trimis
-            "view_count": 0,                   # Număr total vizualizări
-            "first_viewed_at": None,           # Prima vizualizare
-            "last_viewed_at": None,            # Ultima vizualizare
-            "pdf_path": pdf_path               # Cale către PDF asociat (opțional)
-        }
+        links[token] = new_link_metadata(device_name, notes, recording_date, start_time, end_time, pdf_path)
+        current_time = links[token]['created_at']
         
         # [STEP 4] Salvare în Scaleway (persistent)
         logger.debug(f"💾 [LINK_CREATE] STEP 4: Saving to Scaleway (persistent storage)...")
         logger.debug(f"   - Links count: {len(links)}")
         logger.debug(f"   - New token added: {token[:8]}...")
         
-        save_success = save_patient_links(links)
+        if use_rows:
+            # Un singur INSERT; snapshot-ul JSON se rescrie din tabel
+            save_success = bool(upsert_link(token, links[token]))
+            if save_success:
+                _sync_links_blob_from_postgres()  # invalidează și cache-ul
+        else:
+            save_success = save_patient_links(links)
         
         # [DIAGNOSTIC LOG 3] Save result
         if save_success:
@@ -318,7 +418,8 @@ def generate_patient_link(device_name: str, notes: str = "", recording_date: str
 
 def get_patient_link(token: str, track_view: bool = True) -> Optional[Dict]:
     """
-    Preia metadata pentru un link de pacient.
+    Preia metadata pentru un link de pacient. Cu track_view=False e o citire
+    pură (nicio scriere).
     
     Args:
         token: UUID-ul pacientului
@@ -330,12 +431,8 @@ def get_patient_link(token: str, track_view: bool = True) -> Optional[Dict]:
     logger.debug(f"📥 [GET_PATIENT_LINK] *** START for token {token[:8]}... ***")
     logger.debug(f"📥 [GET_PATIENT_LINK] track_view={track_view}")
     
-    logger.debug(f"📥 [GET_PATIENT_LINK] Step 1: Loading all patient links from Scaleway...")
-    links = load_patient_links()
-    logger.debug(f"📥 [GET_PATIENT_LINK] Step 2: Loaded {len(links)} total links")
-    logger.debug(f"📥 [GET_PATIENT_LINK] Step 3: Searching for token {token[:8]}... in {len(links)} links")
-    
-    patient_data = links.get(token)
+    logger.debug(f"📥 [GET_PATIENT_LINK] Step 1: Loading link metadata for {token[:8]}...")
+    patient_data = _get_link_metadata(token)
     
     if patient_data:
         logger.debug(f"✅ [GET_PATIENT_LINK] Step 4: Token FOUND!")
@@ -343,22 +440,53 @@ def get_patient_link(token: str, track_view: bool = True) -> Optional[Dict]:
         logger.debug(f"📊 [GET_PATIENT_LINK] is_active: {patient_data.get('is_active', 'N/A')}")
         logger.debug(f"📊 [GET_PATIENT_LINK] created_at: {patient_data.get('created_at', 'N/A')}")
         
-        # Actualizăm last_accessed (backward compatibility)
-        patient_data['last_accessed'] = datetime.now().isoformat()
-        links[token] = patient_data
-        save_patient_links(links)
-        logger.debug(f"Link accesat: {token[:8]}...")
-        
-        # [NEW] Tracking automat vizualizări
+        # [NEW] Tracking automat vizualizări (write-behind; actualizează și last_accessed)
         if track_view:
             track_link_view(token)
     else:
         logger.debug(f"❌ [GET_PATIENT_LINK] Step 4: Token {token[:8]}... NOT FOUND!")
-        logger.debug(f"❌ [GET_PATIENT_LINK] Available tokens in DB: {[t[:8] + '...' for t in list(links.keys())[:10]]}")
     
     return patient_data
 
 
+def _link_in_date_range(data: Dict, date_field: str, start, end) -> bool:
+    """Filtrul de dată al fluxului legacy (echivalentul `list_links` din SQL)."""
+    try:
+        if date_field == 'recording':
+            if not data.get('recording_date'):
+                return False
+            day = datetime.strptime(data['recording_date'], '%Y-%m-%d').date()
+        else:
+            processed = data.get('last_processed_at') or data.get('created_at')
+            if not processed:
+                return False
+            day = datetime.fromisoformat(processed).date()
+    except (TypeError, ValueError):
+        return False
+    return (start is None or start <= day) and (end is None or day <= end)
+
+
+def _active_links(date_field: str = None, date_from=None, date_to=None) -> List:
+    """
+    (token, metadata) pentru link-urile active, cele mai noi primele - filtrate
+    și sortate în SQL (coloane indexate) cu PG activ.
+    """
+    from repositories.patient_repository import list_links, as_date
+
+    rows = list_links(active_only=True, date_field=date_field, date_from=date_from, date_to=date_to)
+    if rows is not None:
+        return rows
+
+    start, end = as_date(date_from), as_date(date_to)
+    result = [
+        (token, data) for token, data in load_patient_links().items()
+        if data.get('is_active', True)
+        and (date_field is None or _link_in_date_range(data, date_field, start, end))
+    ]
+    result.sort(key=lambda item: item[1].get('created_at') or '', reverse=True)
+    return result
+
+
 def get_all_patient_links() -> List[Dict]:
     """
     Preia toate link-urile active de pacienți (pentru dashboard admin).
@@ -366,18 +494,16 @@ def get_all_patient_links() -> List[Dict]:
     Returns:
         List[Dict]: Listă cu toate link-urile și metadata lor
     """
-    links = load_patient_links()
     result = []
     
-    for token, data in links.items():
-        if data.get('is_active', True):
-            result.append({
-                "token": token,
-                "device_name": data.get("device_name", "Unknown"),
-                "notes": data.get("notes", ""),
-                "created_at": data.get("created_at"),
-                "recordings_count": data.get("recordings_count", 0)
-            })
+    for token, data in _active_links():
+        result.append({
+            "token": token,
+            "device_name": data.get("device_name", "Unknown"),
+            "notes": data.get("notes", ""),
+            "created_at": data.get("created_at"),
+            "recordings_count": data.get("recordings_count", 0)
+        })
     
     logger.debug(f"Returnate {len(result)} link-uri active.")
     return result
@@ -393,15 +519,9 @@ def deactivate_patient_link(token: str) -> bool:
     Returns:
         bool: True dacă operațiunea a reușit
     """
-    links = load_patient_links()
-    
-    if token in links:
-        links[token]['is_active'] = False
-        links[token]['deactivated_at'] = datetime.now().isoformat()
-        
-        if save_patient_links(links):
-            logger.info(f"⚠️ Link dezactivat: {token[:8]}...")
-            return True
+    if _patch_link(token, {'is_active': False, 'deactivated_at': datetime.now().isoformat()}):
+        logger.info(f"⚠️ Link dezactivat: {token[:8]}...")
+        return True
     
     logger.error(f"Nu s-a putut dezactiva link-ul: {token}")
     return False
@@ -425,11 +545,22 @@ def delete_patient_link(token: str) -> bool:
             shutil.rmtree(patient_folder)
             logger.info(f"🗑️ Folder șters: {patient_folder}")
         
-        # Ștergem din metadata
-        links = load_patient_links()
-        if token in links:
-            del links[token]
-            save_patient_links(links)
+        # Ștergem din metadata (și din snapshot-ul JSON - dreptul de a fi uitat)
+        from repositories.patient_repository import delete_link
+        if delete_link(token) is not None:
+            _sync_links_blob_from_postgres()
+        else:
+            links = load_patient_links()
+            if token in links:
+                del links[token]
+                save_patient_links(links)
+        
+        # Ștergem și amprentele fișierelor din indexul de ingestie
+        try:
+            from ingest_index import forget_token
+            forget_token(token)
+        except Exception as index_err:
+            logger.warning(f"⚠️ Index ingestie necurățat pentru {token[:8]}...: {index_err}")
         
         logger.info(f"🗑️ Link șters complet (GDPR): {token[:8]}...")
         return True
@@ -479,11 +610,11 @@ def get_patient_recordings(token: str) -> List[Dict]:
         if len(recordings) == 0:
             logger.warning(f"🔍 [GET_RECORDINGS_PG] PostgreSQL empty - checking for old JSON recordings...")
             
-            # Load patient_links to see if there are old recordings
-            links = load_patient_links()
+            # Metadata link-ului - poate conține înregistrări vechi
+            link_metadata = _get_link_metadata(token) or {}
             
-            if token in links and 'recordings' in links[token]:
-                old_recordings = links[token]['recordings']
+            if 'recordings' in link_metadata:
+                old_recordings = link_metadata['recordings']
                 
                 if len(old_recordings) > 0:
                     logger.warning(f"📦 [MIGRATION] Found {len(old_recordings)} OLD recordings in patient_links.json")
@@ -565,7 +696,8 @@ def save_patient_recordings(token: str, recordings: List[Dict]) -> bool:
 
 def add_recording(token: str, csv_filename: str, csv_content: bytes, 
                  recording_date: str, start_time: str, end_time: str,
-                 avg_spo2: float = None, min_spo2: int = None, max_spo2: int = None) -> bool:
+                 avg_spo2: float = None, min_spo2: int = None, max_spo2: int = None,
+                 df=None, upload_group=None, link_writer=None) -> bool:
     """
     Adaugă o nouă înregistrare pentru un pacient.
     
@@ -577,9 +709,16 @@ def add_recording(token: str, csv_filename: str, csv_content: bytes,
         start_time: Ora de început (HH:MM:SS)
         end_time: Ora de sfârșit (HH:MM:SS)
         avg_spo2, min_spo2, max_spo2: Statistici opționale
+        df: DataFrame-ul deja parsat (opțional) - evită re-parsarea pentru
+            artefactul Parquet (vezi recording_cache)
+        upload_group: `upload_executor.UploadGroup` (batch) - CSV-ul se scrie
+            local, iar upload-ul S3 (CSV + Parquet) trece prin executorul
+            partajat; rândul se actualizează în `apply_recording_uploads`
+        link_writer: `batch_link_writer.LinkBatchWriter` (batch) - rândul nu se
+            scrie imediat, ci în tranzacția comună a următorului flush
         
     Returns:
-        bool: True dacă adăugarea a reușit
+        bool: True dacă adăugarea a reușit (în mod batch: rândul e în așteptare)
     """
     try:
         # Import Scaleway storage service
@@ -599,7 +738,10 @@ def add_recording(token: str, csv_filename: str, csv_content: bytes,
         csv_path = None
         r2_url = None
         
-        if r2_available:
+        # Upload amânat (batch): nu blocăm apelantul, o singură urcare per artefact
+        deferred_upload = r2_available and upload_group is not None
+        
+        if r2_available and not deferred_upload:
             logger.warning(f"☁️ [LINK_TRACE_SAVE] Attempting Scaleway Storage for {token[:8]}...")
             try:
                 # Salvăm în R2 cu nume structurat
@@ -625,6 +767,12 @@ def add_recording(token: str, csv_filename: str, csv_content: bytes,
                 f.write(csv_content)
             logger.info(f"⚠️ CSV salvat LOCAL: {csv_path} (TEMPORARY!)")
         
+        storage_type = 'r2' if (r2_available and r2_url) else 'local'
+        
+        # Artefact Parquet adresat după conținut - citirile ulterioare nu mai parsează CSV-ul
+        content_hash, artifact_content = _store_recording_artifact(token, csv_content, csv_filename,
+                                                                   storage_type, csv_path, df)
+        
         # CRITICAL FIX v2: Save to PostgreSQL (PERSISTENT) instead of JSON
         logger.warning(f"💾 [ADD_RECORDING_PG] Saving to PostgreSQL for {token[:8]}...")
         
@@ -647,7 +795,8 @@ def add_recording(token: str, csv_filename: str, csv_content: bytes,
                 original_filename=csv_filename,
                 csv_path=csv_path,
                 r2_url=r2_url,
-                storage_type='r2' if (r2_available and r2_url) else 'local',
+                storage_type=storage_type,
+                content_hash=content_hash,
                 recording_date=recording_date,
                 start_time=start_time,
                 end_time=end_time,
@@ -656,12 +805,19 @@ def add_recording(token: str, csv_filename: str, csv_content: bytes,
                 max_spo2=max_spo2
             )
             
-            db.session.add(recording)
-            db.session.commit()
+            if link_writer is not None:
+                link_writer.stage_recording(recording)
+            else:
+                db.session.add(recording)
+                db.session.commit()
             
             storage_info = "☁️ R2 (PERSISTENT)" if (r2_available and r2_url) else "💾 LOCAL (EPHEMERAL!)"
             logger.warning(f"✅ [ADD_RECORDING_PG] Saved to PostgreSQL | Token: {token[:8]} | Storage: {storage_info} | ID: {recording_id}")
             
+            if deferred_upload:
+                _schedule_recording_uploads(upload_group, token, recording_id, csv_filename, csv_content,
+                                            content_hash, artifact_content)
+            
             return True
             
         except Exception as e:
@@ -677,6 +833,225 @@ def add_recording(token: str, csv_filename: str, csv_content: bytes,
         return False
 
 
+def _upload_recording_csv(token: str, csv_content: bytes, r2_filename: str) -> str:
+    """Upload CSV pentru executor: fallback-ul local al storage_service contează ca eșec (reîncercare)."""
+    from storage_service import upload_patient_csv
+    
+    url = upload_patient_csv(token, csv_content, r2_filename)
+    if not url or not url.startswith('http'):
+        raise IOError(f"upload S3 eșuat (rezultat: {url})")
+    return url
+
+
+def _upload_recording_artifact(token: str, content_hash: str, artifact_content: bytes) -> str:
+    """Upload artefact Parquet pentru executor (aceeași cheie ca recording_cache, bytes deja serializați)."""
+    from storage_service import upload_patient_parsed
+    from recording_cache import artifact_filename
+    
+    url = upload_patient_parsed(token, artifact_content, artifact_filename(content_hash))
+    if not url or not url.startswith('http'):
+        raise IOError(f"upload S3 eșuat (rezultat: {url})")
+    return url
+
+
+def _schedule_recording_uploads(upload_group, token: str, recording_id: str, csv_filename: str,
+                                csv_content: bytes, content_hash: Optional[str],
+                                artifact_content: Optional[bytes] = None):
+    """Programează upload-ul CSV-ului (și al artefactului Parquet) în executorul partajat."""
+    from upload_executor import get_upload_executor
+    
+    executor = get_upload_executor()
+    r2_filename = f"recording_{recording_id}_{csv_filename}"
+    executor.submit(
+        _upload_recording_csv, token, csv_content, r2_filename,
+        label=f"{token[:8]}/csvs/{r2_filename}",
+        meta={'kind': 'csv', 'token': token, 'recording_id': recording_id, 'r2_filename': r2_filename},
+        group=upload_group
+    )
+    if content_hash and artifact_content:
+        executor.submit(
+            _upload_recording_artifact, token, content_hash, artifact_content,
+            label=f"{token[:8]}/parsed/{content_hash[:12]}",
+            meta={'kind': 'parquet', 'token': token, 'recording_id': recording_id},
+            group=upload_group
+        )
+
+
+def apply_recording_uploads(upload_group) -> int:
+    """
+    Trece pe S3 înregistrările al căror CSV a fost urcat de executor
+    (actualizare pe rând, un singur commit; metadatele link-urilor nu se ating).
+    
+    Returns:
+        int: Numărul de înregistrări actualizate
+    """
+    return _mark_recordings_uploaded(upload_group.results(), f"grup '{upload_group.name}'")
+
+
+def apply_late_recording_upload(flask_app, future) -> int:
+    """
+    Callback de finalizare pentru un upload terminat după bariera job-ului
+    (rulează în thread-ul executorului, cu propriul context de aplicație).
+    """
+    try:
+        with flask_app.app_context():
+            return _mark_recordings_uploaded([future.result()], "upload întârziat")
+    except Exception as e:
+        logger.error(f"❌ [UPLOAD_EXECUTOR] Upload întârziat neaplicat: {e}", exc_info=True)
+        return 0
+
+
+def reconcile_local_recordings(upload_group, limit: int = 100) -> int:
+    """
+    Reprogramează upload-ul înregistrărilor rămase locale (upload eșuat definitiv
+    sau neaplicat într-un job anterior) - rândurile se actualizează la bariera
+    job-ului curent. Fișierele locale dispărute (redeploy) nu se mai pot recupera.
+
+    Args:
+        upload_group: Grupul (bariera) job-ului curent
+        limit: Numărul maxim de înregistrări verificate (cele mai recente)
+
+    Returns:
+        int: Numărul de înregistrări reprogramate
+    """
+    try:
+        from storage_service import r2_client
+        if not r2_client.enabled:
+            return 0
+
+        from auth.models import PatientRecording
+        from recording_cache import local_artifact_path
+
+        recordings = (PatientRecording.query
+                      .filter_by(storage_type='local')
+                      .order_by(PatientRecording.id.desc())
+                      .limit(limit)
+                      .all())
+
+        scheduled = 0
+        missing = 0
+        for recording in recordings:
+            if not recording.csv_path or not os.path.isfile(recording.csv_path):
+                missing += 1
+                continue
+            with open(recording.csv_path, 'rb') as f:
+                csv_content = f.read()
+
+            artifact_content = None
+            artifact_path = local_artifact_path(recording.csv_path, recording.content_hash) if recording.content_hash else None
+            if artifact_path and os.path.isfile(artifact_path):
+                with open(artifact_path, 'rb') as f:
+                    artifact_content = f.read()
+
+            _schedule_recording_uploads(upload_group, recording.token, recording.recording_id,
+                                        recording.original_filename, csv_content,
+                                        recording.content_hash, artifact_content)
+            scheduled += 1
+
+        if scheduled or missing:
+            logger.warning(f"🔁 [UPLOAD_EXECUTOR] Reconciliere: {scheduled} înregistrări locale reprogramate pentru S3, "
+                           f"{missing} fără fișier local (nerecuperabile)")
+        return scheduled
+
+    except Exception as e:
+        logger.error(f"❌ [UPLOAD_EXECUTOR] Reconcilierea înregistrărilor locale a eșuat: {e}", exc_info=True)
+        return 0
+
+
+def _mark_recordings_uploaded(results: List[Dict], source: str) -> int:
+    """Actualizează rândurile ale căror CSV-uri au fost urcate (idempotent, un singur commit)."""
+    uploaded = [r for r in results if r['result'] and r['meta'].get('kind') == 'csv']
+    if not uploaded:
+        return 0
+    
+    try:
+        from auth.models import PatientRecording, db
+        
+        updated = 0
+        for upload in uploaded:
+            meta = upload['meta']
+            updated += PatientRecording.query.filter_by(
+                token=meta['token'], recording_id=meta['recording_id']
+            ).update({
+                'csv_path': f"r2://{meta['token']}/csvs/{meta['r2_filename']}",
+                'r2_url': upload['result'],
+                'storage_type': 'r2',
+            }, synchronize_session=False)
+        db.session.commit()
+        logger.warning(f"☁️ [UPLOAD_EXECUTOR] {updated} înregistrări mutate pe S3 ({source})")
+        return updated
+    
+    except Exception as e:
+        logger.error(f"❌ [UPLOAD_EXECUTOR] Actualizare înregistrări după upload eșuată: {e}", exc_info=True)
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return 0
+
+
+def _store_recording_artifact(token: str, csv_content: bytes, csv_filename: str,
+                              storage_type: str, csv_path: str, df=None) -> Tuple[Optional[str], Optional[bytes]]:
+    """
+    Calculează hash-ul CSV-ului și salvează artefactul Parquet al înregistrării.
+    
+    Returns:
+        tuple: (hash SHA-256 sau None, Parquet-ul serializat sau None) - bytes-ii
+            se refolosesc la upload-ul amânat, fără a doua serializare
+    """
+    content_hash = None
+    try:
+        from recording_cache import compute_content_hash, serialize_dataframe, store_parsed_artifact, PARQUET_SUPPORT
+        
+        content_hash = compute_content_hash(csv_content)
+        if not PARQUET_SUPPORT:
+            return content_hash, None
+        if df is None:
+            from data_parser import parse_csv_data
+            df = parse_csv_data(csv_content, csv_filename)
+        if df is None or df.empty:
+            return content_hash, None
+        artifact_content = serialize_dataframe(df)
+        store_parsed_artifact(token, content_hash, df, storage_type, csv_path, content=artifact_content)
+        return content_hash, artifact_content
+    except Exception as e:
+        logger.warning(f"⚠️ [RECORDING_CACHE] Artefact neprocesat pentru {token[:8]}... (non-critic): {e}")
+        return content_hash, None
+
+
+def set_recording_content_hash(token: str, recording_id: str, content_hash: str) -> bool:
+    """
+    Completează hash-ul de conținut pentru o înregistrare veche (backfill la prima citire).
+    
+    Args:
+        token: UUID-ul pacientului
+        recording_id: ID-ul scurt al înregistrării
+        content_hash: SHA-256 al CSV-ului
+        
+    Returns:
+        bool: True dacă actualizarea a reușit
+    """
+    try:
+        from auth.models import PatientRecording, db
+        
+        recording = PatientRecording.query.filter_by(token=token, recording_id=recording_id).first()
+        if not recording:
+            return False
+        
+        recording.content_hash = content_hash
+        db.session.commit()
+        logger.info(f"🗜️ [RECORDING_CACHE] content_hash completat pentru {token[:8]}.../{recording_id}")
+        return True
+        
+    except Exception as e:
+        logger.warning(f"⚠️ [RECORDING_CACHE] Backfill content_hash eșuat pentru {token[:8]}...: {e}")
+        try:
+            db.session.rollback()
+        except:
+            pass
+        return False
+
+
 def delete_recording(token: str, recording_id: str) -> bool:
     """
     Șterge o înregistrare specifică pentru un pacient.
@@ -807,13 +1182,11 @@ def validate_token(token: str) -> bool:
         logger.debug(f"❌ [TOKEN_VALIDATION] Token is None or empty - INVALID")
         return False
     
-    logger.debug(f"🔐 [TOKEN_VALIDATION] Step 1: Calling get_patient_link()...")
-    patient_data = get_patient_link(token, track_view=False)
-    logger.debug(f"🔐 [TOKEN_VALIDATION] Step 2: get_patient_link() returned: {type(patient_data)}")
+    # Citire pură: fără last_accessed / tracking (vizualizarea o contorizează pagina pacientului)
+    patient_data = _get_link_metadata(token)
     
     if not patient_data:
         logger.debug(f"❌ [TOKEN_VALIDATION] Token {token[:8]}... NOT FOUND in database - INVALID")
-        logger.debug(f"❌ [TOKEN_VALIDATION] get_patient_link() returned: {patient_data}")
         return False
     
     logger.debug(f"✅ [TOKEN_VALIDATION] Step 3: Token FOUND in database!")
@@ -845,45 +1218,61 @@ def validate_token(token: str) -> bool:
 def track_link_view(token: str) -> bool:
     """
     Înregistrează o vizualizare a link-ului de către pacient.
-    Actualizează contoarele și timestamp-urile.
+    
+    Vizualizarea intră în buffer-ul write-behind (view_tracker); contoarele
+    și timestamp-urile se scriu periodic, agregat, prin `apply_link_view_deltas`.
     
     Args:
         token: UUID-ul pacientului
         
     Returns:
-        bool: True dacă tracking-ul a reușit
+        bool: True dacă vizualizarea a fost înregistrată
     """
     try:
-        links = load_patient_links()
-        
-        if token not in links:
-            logger.warning(f"Token inexistent pentru tracking: {token}")
-            return False
-        
-        now = datetime.now().isoformat()
-        
-        # Incrementăm view_count
-        links[token]['view_count'] = links[token].get('view_count', 0) + 1
-        
-        # Setăm first_viewed_at dacă e prima vizualizare
-        if links[token].get('first_viewed_at') is None:
-            links[token]['first_viewed_at'] = now
-            logger.info(f"🔵 Prima vizualizare pentru link {token[:8]}...")
-        
-        # Actualizăm last_viewed_at
-        links[token]['last_viewed_at'] = now
-        
-        if save_patient_links(links):
-            logger.debug(f"📊 Tracking view: {token[:8]}... (Total: {links[token]['view_count']})")
-            return True
-        else:
-            return False
-            
+        import view_tracker
+        view_tracker.record_view(token)
+        return True
     except Exception as e:
         logger.error(f"Eroare la tracking vizualizare pentru {token}: {e}", exc_info=True)
         return False
 
 
+def apply_link_view_deltas(deltas: Dict[str, Dict]) -> bool:
+    """
+    Scrie vizualizările acumulate: incremente atomice SQL cu PostgreSQL activ,
+    altfel un singur load + save legacy pentru tot lotul.
+    
+    Args:
+        deltas: token -> {'count': int, 'first': ISO, 'last': ISO}
+        
+    Returns:
+        bool: True dacă lotul a fost persistat
+    """
+    from repositories.patient_repository import apply_view_deltas
+
+    applied = apply_view_deltas(deltas)
+    if applied is not None:
+        _invalidate_links_cache()
+        return applied
+
+    links = load_patient_links()
+    touched = 0
+    for token, delta in deltas.items():
+        metadata = links.get(token)
+        if metadata is None:
+            continue
+        metadata['view_count'] = (metadata.get('view_count') or 0) + delta['count']
+        if metadata.get('first_viewed_at') is None:
+            metadata['first_viewed_at'] = delta['first']
+            logger.info(f"🔵 Prima vizualizare pentru link {token[:8]}...")
+        metadata['last_viewed_at'] = max(metadata.get('last_viewed_at') or '', delta['last'])
+        metadata['last_accessed'] = max(metadata.get('last_accessed') or '', delta['last'])
+        touched += 1
+    if not touched:
+        return True
+    return save_patient_links(links)
+
+
 def update_link_medical_notes(token: str, medical_notes: str) -> bool:
     """
     Actualizează notițele medicale pentru un link de pacient.
@@ -896,20 +1285,14 @@ def update_link_medical_notes(token: str, medical_notes: str) -> bool:
         bool: True dacă actualizarea a reușit
     """
     try:
-        links = load_patient_links()
-        
-        if token not in links:
-            logger.warning(f"Token inexistent pentru actualizare notițe: {token}")
-            return False
+        fields = {'medical_notes': medical_notes, 'notes_updated_at': datetime.now().isoformat()}
         
-        links[token]['medical_notes'] = medical_notes
-        links[token]['notes_updated_at'] = datetime.now().isoformat()
-        
-        if save_patient_links(links):
+        if _patch_link(token, fields):
             logger.info(f"📝 Notițe medicale actualizate pentru {token[:8]}...")
             return True
-        else:
-            return False
+        
+        logger.warning(f"Token inexistent pentru actualizare notițe: {token}")
+        return False
             
     except Exception as e:
         logger.error(f"Eroare la actualizarea notițelor pentru {token}: {e}", exc_info=True)
@@ -928,70 +1311,126 @@ def mark_link_as_sent(token: str, sent: bool = True) -> bool:
         bool: True dacă actualizarea a reușit
     """
     try:
-        links = load_patient_links()
+        fields = {'sent_status': sent, 'sent_at': datetime.now().isoformat() if sent else None}
         
-        if token not in links:
+        if not _patch_link(token, fields):
             logger.warning(f"Token inexistent pentru marcare trimis: {token}")
             return False
         
-        links[token]['sent_status'] = sent
-        
         if sent:
-            links[token]['sent_at'] = datetime.now().isoformat()
             logger.info(f"📨 Link marcat ca TRIMIS: {token[:8]}...")
         else:
-            links[token]['sent_at'] = None
             logger.info(f"🔄 Link marcat ca NETRIMIS: {token[:8]}...")
-        
-        if save_patient_links(links):
-            return True
-        else:
-            return False
+        return True
             
     except Exception as e:
         logger.error(f"Eroare la marcarea status trimis pentru {token}: {e}", exc_info=True)
         return False
 
 
-def get_all_links_for_admin() -> List[Dict]:
+def _admin_link_entry(token: str, data: Dict) -> Dict:
+    """Metadata unui link în forma afișată de dashboard-ul medical."""
+    return {
+        "token": token,
+        "device_name": data.get("device_name", "Unknown"),
+        "notes": data.get("notes", ""),
+        "created_at": data.get("created_at"),
+        "last_processed_at": data.get("last_processed_at"),
+        "recordings_count": data.get("recordings_count", 0),
+        # Metadata medicală extinsă
+        "recording_date": data.get("recording_date"),
+        "start_time": data.get("start_time"),
+        "end_time": data.get("end_time"),
+        "medical_notes": data.get("medical_notes", ""),
+        "sent_status": data.get("sent_status", False),
+        "sent_at": data.get("sent_at"),
+        "view_count": data.get("view_count", 0),
+        "first_viewed_at": data.get("first_viewed_at"),
+        "last_viewed_at": data.get("last_viewed_at"),
+        "pdf_paths": data.get("pdf_paths", []),
+        "output_folder_path": data.get("output_folder_path")
+    }
+
+
+def get_all_links_for_admin(date_field: str = None, date_from=None, date_to=None) -> List[Dict]:
     """
     Preia TOATE link-urile cu metadata completă pentru dashboard-ul medical.
     Include: date, notițe, status trimis, vizualizări.
     
+    Args:
+        date_field: 'recording' (data testului) / 'processed' (ultima procesare); None = fără filtru
+        date_from / date_to: Intervalul inclusiv (date sau 'YYYY-MM-DD')
+    
     Returns:
         List[Dict]: Listă cu toate link-urile și metadata detaliată
     """
-    links = load_patient_links()
-    result = []
-    
-    for token, data in links.items():
-        if data.get('is_active', True):
-            result.append({
-                "token": token,
-                "device_name": data.get("device_name", "Unknown"),
-                "notes": data.get("notes", ""),
-                "created_at": data.get("created_at"),
-                "recordings_count": data.get("recordings_count", 0),
-                # Metadata medicală extinsă
-                "recording_date": data.get("recording_date"),
-                "start_time": data.get("start_time"),
-                "end_time": data.get("end_time"),
-                "medical_notes": data.get("medical_notes", ""),
-                "sent_status": data.get("sent_status", False),
-                "sent_at": data.get("sent_at"),
-                "view_count": data.get("view_count", 0),
-                "first_viewed_at": data.get("first_viewed_at"),
-                "last_viewed_at": data.get("last_viewed_at"),
-                "pdf_paths": data.get("pdf_paths", [])
-            })
-    
-    # Sortăm după created_at (cele mai noi primele)
-    result.sort(key=lambda x: x.get('created_at', ''), reverse=True)
+    result = [_admin_link_entry(token, data) for token, data in _active_links(date_field, date_from, date_to)]
     
     logger.debug(f"Dashboard admin: {len(result)} link-uri active returnate.")
     return result
 
 
+def _link_matches_search(data: Dict, term: str) -> bool:
+    """Căutarea din dashboard pe fluxul legacy (echivalentul `_search_filter` din SQL)."""
+    return any(term in str(data.get(field) or '').lower() for field in ('device_name', 'medical_notes', 'notes'))
+
+
+def get_admin_links_page(search: str = None, cursor=None, page_size: int = None) -> Dict:
+    """
+    O pagină din dashboard-ul link-urilor (cele mai noi primele), paginare keyset.
+    
+    Args:
+        search: Text căutat în numele aparatului și notițe (case-insensitive)
+        cursor: `next_cursor` al paginii anterioare (None = prima pagină)
+        page_size: Link-uri pe pagină (implicit config.ADMIN_DASHBOARD_CONFIG)
+    
+    Returns:
+        Dict: {'links': [...], 'total': int, 'next_cursor': list | None}
+    """
+    import config
+    from repositories.patient_repository import page_links, count_links
+    
+    page_size = page_size or config.ADMIN_DASHBOARD_CONFIG['page_size']
+    page = page_links(search=search, after=cursor, limit=page_size)
+    total = count_links(search=search) if page is not None else None
+    if page is not None and total is not None:
+        rows, next_cursor = page
+        return {
+            'links': [_admin_link_entry(token, data) for token, data in rows],
+            'total': total,
+            'next_cursor': next_cursor,
+        }
+    
+    # Fluxul legacy: aceeași ordine (created_at desc, apoi token) și același cursor, în memorie
+    term = (search or '').strip().lower()
+    matches = sorted(
+        ((data.get('created_at') or '', token, data) for token, data in load_patient_links().items()
+         if data.get('is_active', True) and (not term or _link_matches_search(data, term))),
+        key=lambda item: item[1],
+    )
+    matches.sort(key=lambda item: item[0], reverse=True)
+    total = len(matches)
+    
+    if cursor:
+        try:
+            after_created, after_token = cursor[0] or '', str(cursor[1])
+            matches = [m for m in matches
+                       if m[0] < after_created or (m[0] == after_created and m[1] > after_token)]
+        except (TypeError, IndexError):
+            pass
+    
+    page_rows = matches[:page_size]
+    next_cursor = None
+    if len(matches) > page_size:
+        last_created, last_token, _ = page_rows[-1]
+        next_cursor = [last_created or None, last_token]
+    return {
+        'links': [_admin_link_entry(token, data) for _, token, data in page_rows],
+        'total': total,
+        'next_cursor': next_cursor,
+    }
+
+
 # ==============================================================================
 # FUNCȚII PDF - GESTIONARE RAPOARTE PDF
 # ==============================================================================
@@ -1041,7 +1480,7 @@ def save_pdf_for_link(token: str, pdf_content: bytes, pdf_filename: str) -> Opti
         return None
 
 
-def save_pdf_parsed_data(token: str, pdf_path: str, parsed_data: Dict) -> bool:
+def save_pdf_parsed_data(token: str, pdf_path: str, parsed_data: Dict, update_link: bool = True) -> bool:
     """
     Salvează datele parsate din PDF în fișierul de metadata al pacientului.
     
@@ -1049,6 +1488,8 @@ def save_pdf_parsed_data(token: str, pdf_path: str, parsed_data: Dict) -> bool:
         token: UUID-ul pacientului
         pdf_path: Calea relativă către PDF
         parsed_data: Dicționar cu date parsate din PDF (de la pdf_parser)
+        update_link: Adaugă calea în `pdf_paths` al link-ului (False în batch -
+                     o face `LinkBatchWriter.append_pdf_path`, fără rescrierea link-urilor)
         
     Returns:
         bool: True dacă salvarea a reușit
@@ -1075,13 +1516,11 @@ def save_pdf_parsed_data(token: str, pdf_path: str, parsed_data: Dict) -> bool:
             json.dump(pdfs_metadata, f, indent=2, ensure_ascii=False)
         
         # Actualizăm și link-ul principal cu calea PDF
-        links = load_patient_links()
-        if token in links:
-            if 'pdf_paths' not in links[token]:
-                links[token]['pdf_paths'] = []
-            if pdf_path not in links[token]['pdf_paths']:
-                links[token]['pdf_paths'].append(pdf_path)
-            save_patient_links(links)
+        metadata = _get_link_metadata(token) if update_link else None
+        if metadata:
+            pdf_paths = list(metadata.get('pdf_paths') or [])
+            if pdf_path not in pdf_paths:
+                _patch_link(token, {'pdf_paths': pdf_paths + [pdf_path]})
         
         logger.info(f"✅ Metadata PDF salvată pentru {token[:8]}...: {pdf_path}")
         return True
@@ -1194,11 +1633,11 @@ def delete_pdf_from_link(token: str, pdf_path: str) -> bool:
                     json.dump(pdfs_metadata, f, indent=2, ensure_ascii=False)
         
         # Actualizăm link-ul principal
-        links = load_patient_links()
-        if token in links and 'pdf_paths' in links[token]:
-            if pdf_path in links[token]['pdf_paths']:
-                links[token]['pdf_paths'].remove(pdf_path)
-                save_patient_links(links)
+        metadata = _get_link_metadata(token) or {}
+        pdf_paths = list(metadata.get('pdf_paths') or [])
+        if pdf_path in pdf_paths:
+            pdf_paths.remove(pdf_path)
+            _patch_link(token, {'pdf_paths': pdf_paths})
         
         logger.info(f"✅ PDF șters complet pentru {token[:8]}...: {pdf_path}")
         return True
@@ -5,11 +5,15 @@
 #      și extrage statistici și evenimente (SpO2, puls, desaturări)
 #
 # RESPECTĂ: .cursorrules - Privacy by Design (ZERO date personale în PDF)
+#
+# INTRARE: Cale către fișier SAU conținutul PDF în memorie (bytes) - batch-ul
+#          și upload-ul din UI parsează direct din bytes, fără fișier temporar.
 # ==============================================================================
 
+import io
 import os
 import re
-from typing import Dict, Optional, List
+from typing import Dict, Optional, List, Union
 from datetime import datetime
 
 from logger_setup import logger
@@ -23,12 +27,12 @@ except ImportError:
     logger.warning("⚠️ pdfplumber nu este instalat. Instalați cu: pip install pdfplumber")
 
 
-def extract_pdf_text(pdf_path: str) -> str:
+def extract_pdf_text(pdf_path: Union[str, bytes]) -> str:
     """
     Extrage textul complet din PDF folosind pdfplumber.
     
     Args:
-        pdf_path (str): Calea către fișierul PDF
+        pdf_path (str | bytes): Calea către fișierul PDF sau conținutul lui
         
     Returns:
         str: Textul complet extras din PDF
@@ -38,7 +42,8 @@ def extract_pdf_text(pdf_path: str) -> str:
     
     try:
         text_content = []
-        with pdfplumber.open(pdf_path) as pdf:
+        source = io.BytesIO(pdf_path) if isinstance(pdf_path, (bytes, bytearray)) else pdf_path
+        with pdfplumber.open(source) as pdf:
             for page in pdf.pages:
                 page_text = page.extract_text()
                 if page_text:
@@ -53,7 +58,7 @@ def extract_pdf_text(pdf_path: str) -> str:
         raise
 
 
-def parse_checkme_o2_report(pdf_path: str) -> Dict:
+def parse_checkme_o2_report(pdf_path: Union[str, bytes], source_name: Optional[str] = None) -> Dict:
     """
     Parsează un raport PDF de la Checkme O2 și extrage datele structurate.
     
@@ -80,7 +85,8 @@ def parse_checkme_o2_report(pdf_path: str) -> Dict:
     - Cea mai lungă desaturare: 3min 15s
     
     Args:
-        pdf_path (str): Calea către fișierul PDF
+        pdf_path (str | bytes): Calea către fișierul PDF sau conținutul lui
+        source_name (str, optional): Numele afișat în log-uri (pentru bytes)
         
     Returns:
         Dict: Date structurate extrase din PDF
@@ -93,7 +99,9 @@ def parse_checkme_o2_report(pdf_path: str) -> Dict:
             "interpretation": "..."
         }
     """
-    logger.info(f"🔍 Parsare raport PDF: {os.path.basename(pdf_path)}")
+    if source_name is None:
+        source_name = "<memorie>" if isinstance(pdf_path, (bytes, bytearray)) else os.path.basename(pdf_path)
+    logger.info(f"🔍 Parsare raport PDF: {source_name}")
     
     try:
         # Extragem textul complet
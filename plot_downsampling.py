@@ -0,0 +1,176 @@
+# ==============================================================================
+# plot_downsampling.py
+# ------------------------------------------------------------------------------
+# ROL: Reducerea numărului de puncte trimise browser-ului pentru graficele
+#      interactive (patient-main-graph, admin-graph, patient-explore-graph).
+#
+# DE CE: O noapte completă are ~8k eșantioane brute + ~200k markeri densificați.
+#        Ecranul are ~1-2k pixeli pe orizontală - restul e payload JSON inutil
+#        și CPU consumat în workerii gunicorn.
+#
+# METODE:
+#  - 'minmax': Pentru fiecare bucket păstrăm minimul ȘI maximul (în ordine
+#              temporală) → nadirurile de desaturare nu dispar niciodată.
+#  - 'lttb':   Largest-Triangle-Three-Buckets - forma vizuală a curbei, cu
+#              nadirul global forțat în rezultat.
+#
+# ZOOM: `parse_relayout_window` + `slice_time_window` permit re-generarea la
+#       rezoluție completă doar pentru fereastra vizibilă (relayoutData).
+# ==============================================================================
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from logger_setup import logger
+
+
+def minmax_indices(values: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indicii punctelor păstrate prin bucket-uri min/max.
+
+    Args:
+        values: Valorile seriei (ordonate temporal)
+        n_out: Numărul maxim de puncte returnate
+
+    Returns:
+        np.ndarray: Indici sortați crescător (cel mult `n_out`)
+    """
+    n = len(values)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    n_buckets = n_out // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # np.*.reduceat pe valorile fără NaN (NaN = -inf/+inf ca să nu fie aleși)
+    clean = np.asarray(values, dtype=np.float64)
+    lows = np.where(np.isnan(clean), np.inf, clean)
+    highs = np.where(np.isnan(clean), -np.inf, clean)
+    bucket_min = np.minimum.reduceat(lows, starts)
+    bucket_max = np.maximum.reduceat(highs, starts)
+
+    # Prima apariție a min/max în fiecare bucket
+    bucket_id = np.repeat(np.arange(n_buckets), ends - starts)
+    positions = np.arange(n)
+    is_min = lows == bucket_min[bucket_id]
+    is_max = highs == bucket_max[bucket_id]
+    first_min = np.full(n_buckets, n, dtype=np.int64)
+    first_max = np.full(n_buckets, n, dtype=np.int64)
+    np.minimum.at(first_min, bucket_id[is_min], positions[is_min])
+    np.minimum.at(first_max, bucket_id[is_max], positions[is_max])
+
+    picked = np.concatenate([first_min, first_max, [0, n - 1]])
+    return np.unique(picked[picked < n])
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indicii punctelor păstrate prin Largest-Triangle-Three-Buckets.
+    Nadirul global este adăugat explicit dacă algoritmul l-a omis.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    y_filled = np.where(np.isnan(y), np.nanmean(y), y)
+
+    every = (n - 2) / (n_out - 2)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if end < next_end:
+            avg_x, avg_y = x[end:next_end].mean(), y_filled[end:next_end].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y_filled[n - 1]
+        areas = np.abs((x[a] - avg_x) * (y_filled[start:end] - y_filled[a])
+                       - (x[a] - x[start:end]) * (avg_y - y_filled[a]))
+        a = start + int(np.argmax(areas))
+        picked[i + 1] = a
+    picked[-1] = n - 1
+
+    if not np.isnan(y).all():
+        picked = np.append(picked, int(np.nanargmin(y)))
+    return np.unique(picked)
+
+
+def downsample_dataframe(df: pd.DataFrame, max_points: int, column: str = 'SpO2',
+                         method: str = None) -> pd.DataFrame:
+    """
+    Reduce DataFrame-ul la cel mult ~`max_points` rânduri, alegerea punctelor
+    fiind ghidată de `column` (implicit SpO2, pentru a păstra nadirurile).
+    Celelalte coloane sunt eșantionate la aceiași indici.
+    """
+    if df is None or df.empty or not max_points or len(df) <= max_points or column not in df.columns:
+        return df
+
+    method = method or config.INTERACTIVE_PLOT_CONFIG['downsample_method']
+    values = df[column].to_numpy(dtype=np.float64)
+    if method == 'lttb':
+        indices = lttb_indices(df.index.asi8, values, max_points)
+    else:
+        indices = minmax_indices(values, max_points)
+
+    logger.debug(f"Downsampling '{method}': {len(df)} → {len(indices)} puncte (plafon {max_points}).")
+    return df.iloc[indices]
+
+
+# ==============================================================================
+# FEREASTRĂ DE ZOOM (relayoutData)
+# ==============================================================================
+
+def parse_relayout_window(relayout_data: Optional[dict]) -> Tuple[Optional[str], Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+    """
+    Interpretează `relayoutData` de la un dcc.Graph.
+
+    Returns:
+        tuple: (action, start, end)
+            - ('zoom', start, end) pentru un interval pe axa X
+            - ('reset', None, None) pentru autorange (dublu-click / Reset axes)
+            - (None, None, None) pentru evenimente irelevante (autosize, axa Y etc.)
+    """
+    if not relayout_data:
+        return None, None, None
+
+    for key, value in relayout_data.items():
+        if key.startswith('xaxis') and key.endswith('.autorange') and value:
+            return 'reset', None, None
+
+    start = end = None
+    for key, value in relayout_data.items():
+        if not key.startswith('xaxis'):
+            continue
+        if key.endswith('.range[0]'):
+            start = value
+        elif key.endswith('.range[1]'):
+            end = value
+        elif key.endswith('.range') and isinstance(value, (list, tuple)) and len(value) == 2:
+            start, end = value
+
+    if start is None or end is None:
+        return None, None, None
+
+    try:
+        start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+    except (ValueError, TypeError):
+        return None, None, None
+    if end_ts < start_ts:
+        start_ts, end_ts = end_ts, start_ts
+    return 'zoom', start_ts, end_ts
+
+
+def slice_time_window(df: pd.DataFrame, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """Fereastra [start, end] (plus câte un punct de margine) prin căutare binară pe index."""
+    times = df.index
+    lo = max(int(times.searchsorted(start, side='left')) - 1, 0)
+    hi = min(int(times.searchsorted(end, side='right')) + 1, len(df))
+    return df.iloc[lo:hi]
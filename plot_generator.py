@@ -1,8 +1,35 @@
 # ==============================================================================
-# plot_generator.py (VERSIUNEA 12.0 - METODA LINE.COLOR)
+# plot_generator.py (VERSIUNEA 12.4 - LOGO COMPUS ÎN MEMORIE)
 # ------------------------------------------------------------------------------
 # ROL: Generează vizualizarea grafică a datelor de pulsoximetrie.
 #
+# MODIFICĂRI CHEIE (v12.4):
+#  - PERFORMANȚĂ: Logo-ul pe imaginile batch se compune în memorie, pe
+#    imaginea randată, înainte de singura codare finală (`composite_logo` +
+#    `save_image`) - nu mai redeschidem și recodăm fiecare JPG.
+#  - CACHE: Logo-ul redimensionat (RGBA) e păstrat per (medic, versiune logo,
+#    dimensiune, canvas) - `get_logo_overlay`.
+#  - FORMAT: JPEG progresiv / WebP / PNG cu calitate din config.IMAGE_OUTPUT_CONFIG.
+#
+# MODIFICĂRI CHEIE (v12.3):
+#  - PERFORMANȚĂ: Scheletul figurii (grila make_subplots, legenda-heatmap,
+#    stilurile urmelor, axele și layout-ul din GOLDEN_STYLE) e construit o
+#    singură dată per configurație de stil și reconstruit automat când
+#    colors_config.json se modifică. `create_plot` injectează doar datele
+#    urmelor și titlul dinamic.
+#
+# MODIFICĂRI CHEIE (v12.2):
+#  - INTERACTIV: `create_plot(..., max_points=N)` reduce urmele trimise
+#    browser-ului la ~N puncte (min/max per bucket - nadirurile rămân).
+#    Exportul de imagini (batch) rămâne la rezoluție completă.
+#
+# MODIFICĂRI CHEIE (v12.1):
+#  - PERFORMANȚĂ: `interpolate_data` lucrează pe epoch-uri int64 cu un singur
+#    `np.interp` vectorizat (fără union/sort/interpolate/loc pe ~220k puncte).
+#    Rezultat identic cu implementarea anterioară.
+#  - ADAPTIV: Factorul de densificare scade automat pentru a păstra numărul de
+#    markeri sub `max_dense_markers` (config.GOLDEN_STYLE).
+#
 # MODIFICĂRI CHEIE (v12.0):
 #  - IMPLEMENTAT: Metoda modernă `line.color` pentru crearea unei linii
 #    cu gradient de culoare pentru SaO2, înlocuind tehnica anterioară
@@ -18,55 +45,103 @@ import plotly.graph_objects as go
 import numpy as np
 from PIL import Image
 import io
+import os
+import copy
+import json
+import hashlib
+import threading
 
 import config
 from logger_setup import logger
 
 
 
-def interpolate_data(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+def resolve_densification_factor(n_points: int, factor: int, max_points: int = None) -> int:
+    """
+    Factorul efectiv de densificare: cel cerut, redus astfel încât numărul
+    total de markeri (n_points * factor) să nu depășească `max_points`.
+    """
+    if max_points is None:
+        max_points = config.GOLDEN_STYLE['traces']['spo2'].get('max_dense_markers')
+    if not max_points or n_points <= 0:
+        return max(1, factor)
+    return max(1, min(factor, max_points // n_points))
+
+
+def interpolate_data(df: pd.DataFrame, factor: int, max_points: int = None) -> pd.DataFrame:
     """
     Crește densitatea punctelor dintr-un DataFrame folosind interpolare temporală.
     Necesar pentru a crea o linie cu gradient fin.
+
+    Lucrează direct pe epoch-uri int64: grila densă e un `linspace` între primul
+    și ultimul moment, iar fiecare coloană e interpolată liniar cu `np.interp`
+    (echivalent cu `interpolate(method='time')` pe uniunea indecșilor, fără
+    uniune, sortare și căutare după etichete). Factorul e redus adaptiv pentru
+    a păstra numărul de markeri sub `max_points`.
     """
     # [WHY] Adăugăm un log de nivel DEBUG pentru a monitoriza cererile de interpolare.
     logger.debug(f"Request pentru interpolare date cu factorul {factor}. Puncte inițiale: {len(df)}")
 
-    if df.empty or factor <= 1:
+    effective_factor = resolve_densification_factor(len(df), factor, max_points)
+    if df.empty or effective_factor <= 1:
         # [WHY] Prevenim procesarea inutilă dacă nu e nevoie de interpolare.
         logger.debug("DataFrame gol sau factor de interpolare trivial. Se returnează datele originale.")
         return df
-        
-    # Creăm un nou index de timp cu de 'factor' ori mai multe puncte
-    new_index = pd.date_range(start=df.index.min(), end=df.index.max(), periods=len(df) * factor)
-    
-    # Re-eșantionăm DataFrame-ul pe noul index și interpolăm valorile lipsă
-    df_interpolated = df.reindex(df.index.union(new_index)).interpolate(method='time').loc[new_index]
-    
+
+    # Epoch-uri int64 în unitatea indexului (fără conversii de rezoluție)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index()
+    source_times = df.index.asi8
+    dense_count = len(df) * effective_factor
+    dense_times = np.linspace(0, source_times[-1] - source_times[0], dense_count, dtype=np.int64) + source_times[0]
+    new_index = pd.DatetimeIndex(dense_times.view(df.index.dtype), name=df.index.name)
+
+    x_source = source_times.astype(np.float64)
+    x_dense = dense_times.astype(np.float64)
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        if valid.all():
+            columns[col] = np.interp(x_dense, x_source, values)
+        elif valid.any():
+            columns[col] = np.interp(x_dense, x_source[valid], values[valid])
+        else:
+            columns[col] = np.full(dense_count, np.nan)
+
+    df_interpolated = pd.DataFrame(columns, index=new_index)
+
     # [WHY] Logăm rezultatul pentru a confirma că interpolarea a funcționat.
-    logger.info(f"Interpolare date finalizată. Puncte noi: {len(df_interpolated)}")
-    
+    logger.info(f"Interpolare date finalizată (factor efectiv {effective_factor}/{factor}). Puncte noi: {len(df_interpolated)}")
+
     return df_interpolated
 
-def create_plot(df_slice: pd.DataFrame, file_name: str, line_width_scale: float = 1.0, marker_size_scale: float = 1.0) -> go.Figure:
-    """
-    Creează figura Plotly completă, folosind un heatmap pe post de legendă
-    într-un subplot dedicat pentru aliniere perfectă.
-    
-    Args:
-        df_slice: DataFrame cu datele de pulsoximetrie
-        file_name: Numele fișierului pentru logging
-        line_width_scale: Factor de scalare pentru grosimea liniei (0.3-1.0 pentru zoom dinamic)
-        marker_size_scale: Factor de scalare pentru dimensiunea markerilor (0.3-1.0 pentru zoom dinamic)
-    """
-    # [WHY] Logăm începutul procesului pentru a urmări execuția.
-    logger.info(f"Pornire generare grafic avansat (cu heatmap) pentru '{file_name}'. Scalare: linie={line_width_scale:.2f}, marker={marker_size_scale:.2f}")
+# ==============================================================================
+# TEMPLATE FIGURĂ DE BAZĂ (CACHE)
+# ==============================================================================
+# Grila 2x2, legenda-heatmap, stilurile urmelor și toate setările de axe/layout
+# din GOLDEN_STYLE sunt identice pentru fiecare grafic. Le construim O SINGURĂ
+# DATĂ per configurație de stil (amprenta include colors_config.json) și la
+# fiecare randare injectăm doar datele urmelor și titlul dinamic.
 
-    # --- Pas 1: Crearea grilei de subploturi ---
+_BASE_TEMPLATE_LOCK = threading.Lock()
+_BASE_TEMPLATE_CACHE = {"key": None, "figure": None}
+
+# Ordinea urmelor în template (indici în figure['data'])
+_TRACE_HEATMAP, _TRACE_SPO2_LINE, _TRACE_SPO2_MARKERS, _TRACE_PULSE = range(4)
+
+
+def get_style_fingerprint() -> str:
+    """Amprenta stilului curent; se schimbă când GOLDEN_STYLE sau colors_config.json se schimbă."""
+    config.refresh_color_config()
+    payload = json.dumps(config.GOLDEN_STYLE, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _make_subplot_grid() -> go.Figure:
     # [WHY] Adăugăm shared_yaxes=True. Aceasta este cheia pentru a sincroniza
     # mișcarea verticală a legendei-heatmap cu cea a graficului principal.
-    logger.debug("Creare figură cu 'shared_yaxes=True' pentru a sincroniza legenda cu graficul.")
-    fig = make_subplots(
+    return make_subplots(
         rows=2, cols=2,
         column_widths=[0.05, 0.95],
         row_heights=[0.7, 0.3],
@@ -76,31 +151,24 @@ def create_plot(df_slice: pd.DataFrame, file_name: str, line_width_scale: float
         horizontal_spacing=0.01
     )
 
-    if df_slice.empty or len(df_slice) < 2:
-        logger.warning(f"DataFrame gol pentru '{file_name}'. Se returnează un grafic gol.")
-        return fig
 
-    # --- Pas 2: Preluarea stilurilor și pregătirea datelor ---
+def _build_base_figure_template() -> dict:
+    """
+    Construiește scheletul complet al figurii (fără date) și îl returnează ca dict.
+    """
+    logger.info("Construire template figură de bază (grilă, legendă-heatmap, stiluri axe).")
+
     spo2_style = config.GOLDEN_STYLE['traces']['spo2']
     pulse_style = config.GOLDEN_STYLE['traces']['pulse']
     layout_style = config.GOLDEN_STYLE['layout']
-    
-    # [WHY] Aplicăm factorii de scalare dinamici pentru zoom
-    dynamic_line_width = spo2_style['line_width'] * line_width_scale
-    dynamic_marker_size = spo2_style['marker_size'] * marker_size_scale
-    
-    # [WHY] Logăm intervalul de culoare folosit și valorile dinamice calculate
-    logger.info(f"Se aplică gradientul de culoare pe intervalul SaO2: [{spo2_style['colorscale_min']}, {spo2_style['colorscale_max']}]")
-    logger.debug(f"Valori dinamice calculate: line_width={dynamic_line_width:.2f}, marker_size={dynamic_marker_size:.2f}")
-    
-    # Interpolăm datele pentru o linie fină
-    df_spo2_dense = interpolate_data(df_slice[['SpO2']], factor=spo2_style['interpolation_factor'])
-    spo2_values = df_spo2_dense['SpO2'].values
 
-    # --- Pas 3: Crearea legendei-heatmap (Coloana 1) ---
+    # --- Pas 1: Crearea grilei de subploturi ---
+    fig = _make_subplot_grid()
+
+    # --- Pas 2: Crearea legendei-heatmap (Coloana 1) ---
     # [WHY] Pregătim datele pentru heatmap. `z` trebuie să fie o coloană (multiple liste cu un element).
     y_axis_values = np.arange(config.GOLDEN_STYLE['axes']['yaxis_spo2']['range'][0], config.GOLDEN_STYLE['axes']['yaxis_spo2']['range'][1] + 1)
-    heatmap_z = [[val] for val in y_axis_values] 
+    heatmap_z = [[val] for val in y_axis_values]
 
     heatmap_params = {
         'z': heatmap_z, # <-- CORECȚIE 1: Folosim datele remodelate
@@ -116,75 +184,43 @@ def create_plot(df_slice: pd.DataFrame, file_name: str, line_width_scale: float
     logger.debug(f"Adăugare Heatmap. Forma datelor 'z': {np.array(heatmap_z).shape}. Parametri: { {k: v for k, v in heatmap_params.items() if k != 'z'} }")
     fig.add_trace(go.Heatmap(heatmap_params), row=1, col=1)
 
-
-    # --- Pas 4: Crearea graficului SaO2 (Tehnica Hibridă) ---
-    # [WHY] Logăm stilurile aplicate pentru a depana ușor aspectul vizual.
-    logger.debug(f"Aplicare stiluri DINAMICE: lățime linie={dynamic_line_width:.2f}, dimensiune marker={dynamic_marker_size:.2f}")
-
+    # --- Pas 3: Urmele SaO2 (Tehnica Hibridă) și Puls - doar stilul static ---
     # Urma 1: Linia de Bază (Robustețe la Zoom)
-    line_params = {
-        'x': df_slice.index,
-        'y': df_slice['SpO2'],
-        'mode': 'lines',
-        'showlegend': False,
-        'line': dict(width=dynamic_line_width), # <-- Folosește valoarea DINAMICĂ
-        'marker': dict(
-            color=df_slice['SpO2'].values,
+    fig.add_trace(go.Scattergl(
+        mode='lines',
+        showlegend=False,
+        marker=dict(
             colorscale=spo2_style['colorscale'],
             cmin=spo2_style['colorscale_min'],
             cmax=spo2_style['colorscale_max']
         ),
-        'hoverinfo': 'none'
-    }
-    # [WHY] Logăm adăugarea urmei de bază, esențială pentru stabilitatea la zoom.
-    logger.debug(f"Adăugare urmă de BAZĂ SaO2 (linie) cu {len(df_slice)} puncte.")
-    fig.add_trace(go.Scattergl(line_params), row=1, col=2)
-
+        hoverinfo='none'
+    ), row=1, col=2)
 
     # Urma 2: Markerii de Detaliu (Finețe Vizuală)
-    marker_params = {
-        'color': spo2_values,
-        'colorscale': spo2_style['colorscale'],
-        'cmin': spo2_style['colorscale_min'],
-        'cmax': spo2_style['colorscale_max'],
-        'size': dynamic_marker_size, # <-- Folosește valoarea DINAMICĂ
-        'showscale': False
-    }
-    scatter_params = {
-        'x': df_spo2_dense.index,
-        'y': spo2_values,
-        'mode': 'markers',
-        'name': spo2_style['name'],
-        'marker': marker_params,
-        'hovertemplate': '<b>SaO2</b>: %{y:.1f}%<br><b>Timp</b>: %{x|%H:%M:%S}<extra></extra>'
-    }
-    # [WHY] Logăm adăugarea urmei de detaliu, responsabilă pentru aspectul fin.
-    logger.debug(f"Adăugare urmă de DETALIU SaO2 (markeri) cu {len(spo2_values)} puncte.")
-    fig.add_trace(go.Scattergl(scatter_params), row=1, col=2)
+    fig.add_trace(go.Scattergl(
+        mode='markers',
+        name=spo2_style['name'],
+        marker=dict(
+            colorscale=spo2_style['colorscale'],
+            cmin=spo2_style['colorscale_min'],
+            cmax=spo2_style['colorscale_max'],
+            showscale=False
+        ),
+        hovertemplate='<b>SaO2</b>: %{y:.1f}%<br><b>Timp</b>: %{x|%H:%M:%S}<extra></extra>'
+    ), row=1, col=2)
 
-    # --- Pas 5: Crearea graficului Puls (Coloana 2, Rândul 2) ---
-    # [WHY] Logăm adăugarea urmei secundare, specificând poziția.
-    logger.debug("Adăugare urmă Puls în row=2, col=2.")
+    # Urma 3: Puls (Coloana 2, Rândul 2)
     fig.add_trace(go.Scattergl(
-        x=df_slice.index,
-        y=df_slice['Pulse Rate'],
         name=pulse_style['name'],
         mode='lines',
         line=dict(color=pulse_style['color'], width=pulse_style['width']),
         hovertemplate='<b>Puls</b>: %{y} bpm<br><b>Timp</b>: %{x|%H:%M:%S}<extra></extra>'
     ), row=2, col=2)
 
-    # --- Pas 6: Stilul final și configurarea axelor multiple (VERSIUNEA FINALĂ) ---
-    # [WHY] Logăm explicit că intrăm în etapa finală de stilizare a figurii.
-    logger.debug("Inițiere Pas 6: Stilul final și configurarea axelor multiple.")
-
-    start_time = df_slice.index.min().strftime('%H:%M:%S')
-    end_time = df_slice.index.max().strftime('%H:%M:%S')
-    record_date = df_slice.index.min().strftime('%d/%m/%Y')
-    dynamic_title = f"Analiză Puls-Oximetrie: {record_date} (Interval: {start_time} - {end_time})"
-
+    # --- Pas 4: Stilul final și configurarea axelor multiple (VERSIUNEA FINALĂ) ---
     fig.update_layout(
-        title=dict(text=dynamic_title, x=0.5, font_size=layout_style['title_font_size']),
+        title=dict(x=0.5, font_size=layout_style['title_font_size']),
         height=700,
         plot_bgcolor=layout_style['plot_bgcolor'],
         paper_bgcolor=layout_style['paper_bgcolor'],
@@ -232,101 +268,289 @@ def create_plot(df_slice: pd.DataFrame, file_name: str, line_width_scale: float
         gridcolor=xaxis_style['gridcolor']
     )
 
+    return fig.to_dict()
+
+
+def get_base_figure_template() -> dict:
+    """
+    Returnează template-ul figurii de bază (dict validat), reconstruit doar când
+    amprenta stilului s-a schimbat. Apelanții trebuie să lucreze pe o copie.
+    """
+    key = get_style_fingerprint()
+    with _BASE_TEMPLATE_LOCK:
+        if _BASE_TEMPLATE_CACHE["key"] != key:
+            _BASE_TEMPLATE_CACHE["figure"] = _build_base_figure_template()
+            _BASE_TEMPLATE_CACHE["key"] = key
+            logger.info(f"Template figură de bază (re)construit. Amprentă stil: {key[:12]}")
+        return _BASE_TEMPLATE_CACHE["figure"]
+
+
+def build_plot_title(df_slice: pd.DataFrame) -> str:
+    """Titlul dinamic al graficului (data + intervalul orar al feliei)."""
+    start_time = df_slice.index.min().strftime('%H:%M:%S')
+    end_time = df_slice.index.max().strftime('%H:%M:%S')
+    record_date = df_slice.index.min().strftime('%d/%m/%Y')
+    return f"Analiză Puls-Oximetrie: {record_date} (Interval: {start_time} - {end_time})"
+
+
+def create_plot(df_slice: pd.DataFrame, file_name: str, line_width_scale: float = 1.0, marker_size_scale: float = 1.0,
+                max_points: int = None) -> go.Figure:
+    """
+    Creează figura Plotly completă, folosind un heatmap pe post de legendă
+    într-un subplot dedicat pentru aliniere perfectă.
+    
+    Scheletul figurii vine din `get_base_figure_template()`; aici se injectează
+    doar datele urmelor, dimensiunile dinamice și titlul.
+    
+    Args:
+        df_slice: DataFrame cu datele de pulsoximetrie
+        file_name: Numele fișierului pentru logging
+        line_width_scale: Factor de scalare pentru grosimea liniei (0.3-1.0 pentru zoom dinamic)
+        marker_size_scale: Factor de scalare pentru dimensiunea markerilor (0.3-1.0 pentru zoom dinamic)
+        max_points: Plafon de puncte per urmă pentru graficele interactive (None = toate
+                    punctele, ca pentru exportul de imagini). Vezi plot_downsampling.
+    """
+    # [WHY] Logăm începutul procesului pentru a urmări execuția.
+    logger.info(f"Pornire generare grafic avansat (cu heatmap) pentru '{file_name}'. Scalare: linie={line_width_scale:.2f}, marker={marker_size_scale:.2f}")
+
+    if df_slice.empty or len(df_slice) < 2:
+        logger.warning(f"DataFrame gol pentru '{file_name}'. Se returnează un grafic gol.")
+        return _make_subplot_grid()
+
+    figure_dict = copy.deepcopy(get_base_figure_template())
+
+    # --- Pas 1: Preluarea stilurilor și pregătirea datelor ---
+    spo2_style = config.GOLDEN_STYLE['traces']['spo2']
+    
+    # [WHY] Aplicăm factorii de scalare dinamici pentru zoom
+    dynamic_line_width = spo2_style['line_width'] * line_width_scale
+    dynamic_marker_size = spo2_style['marker_size'] * marker_size_scale
+    
+    # [WHY] Logăm intervalul de culoare folosit și valorile dinamice calculate
+    logger.info(f"Se aplică gradientul de culoare pe intervalul SaO2: [{spo2_style['colorscale_min']}, {spo2_style['colorscale_max']}]")
+    logger.debug(f"Valori dinamice calculate: line_width={dynamic_line_width:.2f}, marker_size={dynamic_marker_size:.2f}")
+    
+    # Grafice interactive: reducem urmele la ~lățimea ecranului, păstrând nadirurile
+    dense_cap = None
+    if max_points:
+        from plot_downsampling import downsample_dataframe
+        original_points = len(df_slice)
+        df_slice = downsample_dataframe(df_slice, max_points)
+        dense_cap = max_points * config.INTERACTIVE_PLOT_CONFIG['dense_marker_factor']
+        logger.info(f"Downsampling interactiv: {original_points} → {len(df_slice)} puncte (plafon {max_points}).")
+
+    # Interpolăm datele pentru o linie fină
+    df_spo2_dense = interpolate_data(df_slice[['SpO2']], factor=spo2_style['interpolation_factor'], max_points=dense_cap)
+    spo2_values = df_spo2_dense['SpO2'].values
+    raw_spo2 = df_slice['SpO2'].values
+
+    # --- Pas 2: Injectarea datelor în urmele template-ului ---
+    traces = figure_dict['data']
+
+    # Urma 1: Linia de Bază (Robustețe la Zoom)
+    # [WHY] Logăm adăugarea urmei de bază, esențială pentru stabilitatea la zoom.
+    logger.debug(f"Injectare urmă de BAZĂ SaO2 (linie) cu {len(df_slice)} puncte, lățime={dynamic_line_width:.2f}.")
+    line_trace = traces[_TRACE_SPO2_LINE]
+    line_trace['x'] = df_slice.index.to_numpy()
+    line_trace['y'] = raw_spo2
+    line_trace['line'] = dict(width=dynamic_line_width) # <-- Folosește valoarea DINAMICĂ
+    line_trace['marker']['color'] = raw_spo2
+
+    # Urma 2: Markerii de Detaliu (Finețe Vizuală)
+    # [WHY] Logăm adăugarea urmei de detaliu, responsabilă pentru aspectul fin.
+    logger.debug(f"Injectare urmă de DETALIU SaO2 (markeri) cu {len(spo2_values)} puncte, dimensiune={dynamic_marker_size:.2f}.")
+    marker_trace = traces[_TRACE_SPO2_MARKERS]
+    marker_trace['x'] = df_spo2_dense.index.to_numpy()
+    marker_trace['y'] = spo2_values
+    marker_trace['marker']['color'] = spo2_values
+    marker_trace['marker']['size'] = dynamic_marker_size # <-- Folosește valoarea DINAMICĂ
+
+    # Urma 3: Puls (Coloana 2, Rândul 2)
+    pulse_trace = traces[_TRACE_PULSE]
+    pulse_trace['x'] = df_slice.index.to_numpy()
+    pulse_trace['y'] = df_slice['Pulse Rate'].values
+
+    # --- Pas 3: Titlul dinamic ---
+    figure_dict['layout']['title']['text'] = build_plot_title(df_slice)
+
+    if max_points:
+        # Zoom-ul utilizatorului supraviețuiește înlocuirii urmelor (vezi plot_downsampling)
+        figure_dict['layout']['uirevision'] = file_name
+
+    # [WHY] Template-ul este deja validat de plotly; datele injectate sunt
+    # array-uri numerice/temporale - sărim re-validarea întregului layout.
+    fig = go.Figure(figure_dict, _validate=False)
+
     # [WHY] Log final care confirmă că toate setările au fost aplicate cu succes.
     logger.info("Figura finală a fost creată și stilizată cu toate corecțiile de layout și stil.")
     return fig
 
 
+# ==============================================================================
+# LOGO PE IMAGINI (BATCH) - compunere în memorie, o singură codare
+# ==============================================================================
+
+LOGO_SIZE_FACTORS = {
+    'small': 0.08,   # 8% din lățimea imaginii
+    'medium': 0.12,  # 12% din lățimea imaginii
+    'large': 0.18    # 18% din lățimea imaginii
+}
+LOGO_MAX_HEIGHT_FACTOR = 0.15  # Max 15% din înălțimea imaginii
+LOGO_MARGIN = 20  # Margine în pixeli
+# Câmpurile din setări care definesc "versiunea" logo-ului (și în figure_cache)
+LOGO_VERSION_FIELDS = ('logo_filename', 'logo_uploaded_at', 'apply_logo_to_images', 'logo_position', 'logo_size')
+
+_LOGO_OVERLAY_LOCK = threading.Lock()
+_LOGO_OVERLAY_CACHE = {}  # (doctor_id, versiune, dimensiune, canvas) -> (logo RGBA, poziție)
+_LOGO_OVERLAY_CACHE_MAX = 32
+
+
+def _reset_locks_after_fork():
+    """
+    Workerii batch ('fork') moștenesc lock-urile în starea de la fork: dacă un
+    thread al părintelui le ținea atunci, copilul s-ar bloca la prima randare.
+    """
+    global _BASE_TEMPLATE_LOCK, _LOGO_OVERLAY_LOCK
+    _BASE_TEMPLATE_LOCK = threading.Lock()
+    _LOGO_OVERLAY_LOCK = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def _resize_logo(logo_path: str, canvas_size: tuple, logo_size_setting: str, logo_position: str) -> tuple:
+    """Logo-ul redimensionat (RGBA) și colțul stânga-sus pe un canvas de `canvas_size`."""
+    base_width, base_height = canvas_size
+    with Image.open(logo_path) as logo_file:
+        logo_img = logo_file.convert('RGBA')
+
+    # Redimensionăm logo-ul menținând aspect ratio-ul
+    logo_aspect_ratio = logo_img.width / logo_img.height
+    new_logo_width = int(base_width * LOGO_SIZE_FACTORS.get(logo_size_setting, 0.12))
+    new_logo_height = int(new_logo_width / logo_aspect_ratio)
+
+    # Dacă logo-ul e prea înalt, ajustăm după înălțime
+    max_logo_height = int(base_height * LOGO_MAX_HEIGHT_FACTOR)
+    if new_logo_height > max_logo_height:
+        new_logo_height = max_logo_height
+        new_logo_width = int(new_logo_height * logo_aspect_ratio)
+
+    logo_img = logo_img.resize((new_logo_width, new_logo_height), Image.Resampling.LANCZOS)
+
+    positions = {
+        'top-right': (base_width - new_logo_width - LOGO_MARGIN, LOGO_MARGIN),
+        'top-left': (LOGO_MARGIN, LOGO_MARGIN),
+        'bottom-right': (base_width - new_logo_width - LOGO_MARGIN, base_height - new_logo_height - LOGO_MARGIN),
+        'bottom-left': (LOGO_MARGIN, base_height - new_logo_height - LOGO_MARGIN)
+    }
+    return logo_img, positions.get(logo_position, positions['top-right'])
+
+
+def get_logo_overlay(canvas_size: tuple, doctor_id: str = "default"):
+    """
+    Logo-ul medicului pregătit pentru un canvas, din cache.
+
+    Cheia cache-ului: (doctor_id, versiunea logo-ului + mtime fișier, dimensiune
+    setată, dimensiunea canvas-ului) - un logo nou sau alte setări produc o
+    intrare nouă, fără invalidare explicită.
+
+    Returns:
+        tuple (logo RGBA, (x, y)) sau None dacă logo-ul nu se aplică pe imagini
+    """
+    import doctor_settings
+
+    settings = doctor_settings.load_doctor_settings(doctor_id)
+    if not settings.get('apply_logo_to_images', True) or not settings.get('logo_filename'):
+        logger.debug(f"Logo nu este activat pentru imagini (doctor {doctor_id})")
+        return None
+
+    logo_path = doctor_settings.get_doctor_logo_path(doctor_id)
+    if not logo_path:
+        logger.debug(f"Nu există logo pentru medicul {doctor_id}")
+        return None
+
+    logo_version = "|".join(str(settings.get(field)) for field in LOGO_VERSION_FIELDS)
+    key = (doctor_id, f"{logo_version}|{os.path.getmtime(logo_path)}",
+           settings.get('logo_size', 'medium'), tuple(canvas_size))
+
+    with _LOGO_OVERLAY_LOCK:
+        overlay = _LOGO_OVERLAY_CACHE.get(key)
+    if overlay is not None:
+        return overlay
+
+    overlay = _resize_logo(logo_path, canvas_size, settings.get('logo_size', 'medium'),
+                           settings.get('logo_position', 'top-right'))
+    with _LOGO_OVERLAY_LOCK:
+        if len(_LOGO_OVERLAY_CACHE) >= _LOGO_OVERLAY_CACHE_MAX:
+            _LOGO_OVERLAY_CACHE.clear()
+        _LOGO_OVERLAY_CACHE[key] = overlay
+    logger.info(f"🖼️ Logo pregătit pentru {doctor_id} (canvas {canvas_size[0]}x{canvas_size[1]}, logo {overlay[0].width}x{overlay[0].height})")
+    return overlay
+
+
+def composite_logo(image: Image.Image, overlay) -> Image.Image:
+    """Lipește logo-ul (cu transparență) pe imagine, în memorie. Returnează imaginea RGB."""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if overlay is not None:
+        logo_img, position = overlay
+        image.paste(logo_img, position, logo_img)
+    return image
+
+
+def save_image(image: Image.Image, output_path: str, image_format: str = None, quality: int = None):
+    """
+    Codare finală (o singură dată) în formatul configurat pentru batch.
+
+    Args:
+        image: Imaginea RGB compusă
+        output_path: Calea fișierului
+        image_format: 'jpeg' | 'webp' | 'png' (implicit config.IMAGE_OUTPUT_CONFIG)
+        quality: Calitatea pentru JPEG/WebP (implicit din config)
+    """
+    output_config = config.IMAGE_OUTPUT_CONFIG
+    image_format = (image_format or output_config['format']).lower()
+    quality = quality or output_config['quality']
+
+    if image_format in ('jpeg', 'jpg'):
+        image.save(output_path, format='JPEG', quality=quality, optimize=True,
+                   progressive=output_config['progressive'])
+    elif image_format == 'webp':
+        image.save(output_path, format='WEBP', quality=quality, method=output_config['webp_method'])
+    else:
+        image.save(output_path, format='PNG', optimize=True)
+
+
 def apply_logo_to_image(image_path: str, doctor_id: str = "default") -> bool:
     """
-    Aplică logo-ul medicului pe o imagine generată.
-    
+    Aplică logo-ul medicului pe o imagine deja salvată pe disc.
+
+    Batch-ul compune logo-ul în memorie înainte de codare (`composite_logo` +
+    `save_image`); funcția rămâne pentru imagini existente.
+
     Args:
         image_path: Calea către imaginea pe care să se aplice logo-ul
         doctor_id: ID-ul medicului (default: "default")
-        
+
     Returns:
         bool: True dacă logo-ul a fost aplicat cu succes
     """
     try:
-        import doctor_settings
-        
-        # Verificăm dacă trebuie să aplicăm logo-ul
-        if not doctor_settings.should_apply_logo_to_images(doctor_id):
-            logger.debug(f"Logo nu este activat pentru imagini (doctor {doctor_id})")
-            return False
-        
-        # Încărcăm logo-ul
-        logo_path = doctor_settings.get_doctor_logo_path(doctor_id)
-        if not logo_path:
-            logger.debug(f"Nu există logo pentru medicul {doctor_id}")
+        with Image.open(image_path) as base_file:
+            base_img = base_file.convert('RGB')
+
+        overlay = get_logo_overlay(base_img.size, doctor_id)
+        if overlay is None:
             return False
-        
-        # Deschidem imaginea de bază
-        base_img = Image.open(image_path)
-        base_width, base_height = base_img.size
-        
-        # Deschidem logo-ul
-        logo_img = Image.open(logo_path)
-        
-        # Încărcăm setările
-        settings = doctor_settings.load_doctor_settings(doctor_id)
-        logo_position = settings.get('logo_position', 'top-right')
-        logo_size_setting = settings.get('logo_size', 'medium')
-        
-        # Calculăm dimensiunea logo-ului (proporțional cu imaginea de bază)
-        size_factors = {
-            'small': 0.08,   # 8% din lățimea imaginii
-            'medium': 0.12,  # 12% din lățimea imaginii
-            'large': 0.18    # 18% din lățimea imaginii
-        }
-        
-        max_logo_width = int(base_width * size_factors.get(logo_size_setting, 0.12))
-        
-        # Redimensionăm logo-ul menținând aspect ratio-ul
-        logo_aspect_ratio = logo_img.width / logo_img.height
-        new_logo_width = max_logo_width
-        new_logo_height = int(new_logo_width / logo_aspect_ratio)
-        
-        # Dacă logo-ul e prea înalt, ajustăm după înălțime
-        max_logo_height = int(base_height * 0.15)  # Max 15% din înălțimea imaginii
-        if new_logo_height > max_logo_height:
-            new_logo_height = max_logo_height
-            new_logo_width = int(new_logo_height * logo_aspect_ratio)
-        
-        logo_img = logo_img.resize((new_logo_width, new_logo_height), Image.Resampling.LANCZOS)
-        
-        # Calculăm poziția
-        margin = 20  # Margine în pixeli
-        positions = {
-            'top-right': (base_width - new_logo_width - margin, margin),
-            'top-left': (margin, margin),
-            'bottom-right': (base_width - new_logo_width - margin, base_height - new_logo_height - margin),
-            'bottom-left': (margin, base_height - new_logo_height - margin)
-        }
-        
-        position = positions.get(logo_position, positions['top-right'])
-        
-        # Convertim imaginea de bază în RGBA dacă nu e deja
-        if base_img.mode != 'RGBA':
-            base_img = base_img.convert('RGBA')
-        
-        # Convertim logo-ul în RGBA pentru transparență
-        if logo_img.mode != 'RGBA':
-            logo_img = logo_img.convert('RGBA')
-        
-        # Aplicăm logo-ul cu transparență
-        base_img.paste(logo_img, position, logo_img)
-        
-        # Salvăm imaginea (convertim înapoi în RGB pentru JPEG)
-        if image_path.lower().endswith('.jpg') or image_path.lower().endswith('.jpeg'):
-            base_img = base_img.convert('RGB')
-        
-        base_img.save(image_path, optimize=True, quality=95)
-        
-        logger.info(f"✅ Logo aplicat pe imaginea: {image_path} (poziție: {logo_position}, dimensiune: {new_logo_width}x{new_logo_height})")
+
+        image_format = 'jpeg' if image_path.lower().endswith(('.jpg', '.jpeg')) else \
+            'webp' if image_path.lower().endswith('.webp') else 'png'
+        save_image(composite_logo(base_img, overlay), image_path, image_format=image_format)
+
+        logger.info(f"✅ Logo aplicat pe imaginea: {image_path} (dimensiune: {overlay[0].width}x{overlay[0].height})")
         return True
-        
+
     except Exception as e:
         logger.error(f"Eroare la aplicarea logo-ului pe {image_path}: {e}", exc_info=True)
         return False
@@ -0,0 +1,139 @@
+# ==============================================================================
+# progress_stream.py
+# ------------------------------------------------------------------------------
+# ROL: Endpoint JSON ieftin pentru progresul unui job batch:
+#      GET /batch_progress/<job_id>?v=<versiune>
+#
+# DE CE: Bara de progres era actualizată de un `dcc.Interval` de 1000 ms -
+#        un callback Dash (thread gunicorn + citirea sesiunii) pe secundă, pe
+#        fiecare tab de admin deschis, cât timp rula job-ul. Un stream SSE
+#        ținea în schimb câte un thread gthread ocupat pe toată durata job-ului
+#        (cu --threads 2, jumătate din capacitatea worker-ului).
+#
+# PROTOCOL (cereri scurte, niciun thread ținut între ele):
+#   - clientul trimite ultima `version` văzută a sesiunii batch
+#   - 204 → nimic nou (o citire SQLite pe cheie primară, fără DB-ul aplicației)
+#   - 200 → {version, progress: {processed, failed, total, status}, done?, poll_ms}
+#   Statusul job-ului (eșec / anulare fără fișiere noi) se citește doar la o
+#   schimbare de versiune sau o dată la `job_check_s` per job și proces.
+#
+# CLIENT: assets/batch_progress_poll.js (fetch + dash_clientside.set_props).
+#         Endpoint dezactivat (404) sau erori repetate → polling-ul Dash clasic.
+#
+# CONFIG: config.PROGRESS_POLL_CONFIG (env PULSOX_PROGRESS_POLL_*).
+# ==============================================================================
+
+import time
+import threading
+from typing import Dict, Optional
+
+from flask import Response, jsonify, request
+from flask_login import current_user
+
+import config
+from logger_setup import logger
+
+# job_id → {'session_id', 'doctor_id', 'checked_at', 'status'} (evită citirea job-ului la fiecare cerere)
+_job_refs: Dict[str, Dict] = {}
+_job_refs_lock = threading.Lock()
+_JOB_REFS_MAX = 256
+
+
+def _load_job(job_id: str) -> Optional[Dict]:
+    """Starea proaspătă a job-ului (fără obiectul din identity map-ul sesiunii)."""
+    import job_queue
+    from auth.models import db
+
+    try:
+        return job_queue.get_job(job_id)
+    finally:
+        db.session.remove()
+
+
+def _job_ref(job_id: str, refresh: bool = False) -> Optional[Dict]:
+    """Referința job-ului din cache-ul procesului; `refresh` recitește statusul din DB."""
+    with _job_refs_lock:
+        ref = _job_refs.get(job_id)
+    if ref is not None and not refresh:
+        return ref
+
+    job = _load_job(job_id)
+    if job is None:
+        with _job_refs_lock:
+            _job_refs.pop(job_id, None)
+        return None
+
+    ref = {
+        'session_id': job.get('session_id'),
+        'doctor_id': job.get('doctor_id'),
+        'status': job.get('status'),
+        'checked_at': time.monotonic(),
+    }
+    with _job_refs_lock:
+        if len(_job_refs) >= _JOB_REFS_MAX:
+            _job_refs.pop(next(iter(_job_refs)))
+        _job_refs[job_id] = ref
+    return ref
+
+
+def _progress_payload(summary: dict) -> dict:
+    return {
+        'processed': summary.get('processed_files', 0),
+        'failed': summary.get('failed_files', 0),
+        'total': summary.get('total_files', 0),
+        'status': summary.get('status'),
+    }
+
+
+def route_batch_progress(app_server):
+    """
+    Configurează route-ul de progres batch.
+
+    Args:
+        app_server: Instanța Flask (app.server)
+    """
+
+    @app_server.route('/batch_progress/<job_id>', methods=['GET'])
+    def batch_progress(job_id):
+        from auth.models import BatchJob
+        import batch_session_manager
+
+        # Răspunsuri explicite (nu `abort`): handler-ul global din wsgi.py transformă excepțiile în 500
+        poll_config = config.PROGRESS_POLL_CONFIG
+        if not poll_config['enabled']:
+            return Response("progress endpoint disabled", status=404)
+        if not current_user.is_authenticated:
+            return Response("unauthorized", status=401)
+
+        ref = _job_ref(job_id)
+        if ref is None:
+            return Response("job not found", status=404)
+        if ref['doctor_id'] not in (None, current_user.id) and not getattr(current_user, 'is_admin', False):
+            return Response("forbidden", status=403)
+
+        session_id = ref['session_id']
+        since = request.args.get('v', type=int)
+        version = batch_session_manager.get_session_version(session_id) if session_id else None
+        changed = version != since
+
+        # Statusul job-ului: la schimbări de progres sau periodic (eșec / anulare)
+        if ref['status'] not in BatchJob.TERMINAL_STATUSES and (
+                changed or time.monotonic() - ref['checked_at'] >= poll_config['job_check_s']):
+            ref = _job_ref(job_id, refresh=True)
+            if ref is None:
+                return jsonify({'done': 'missing'})
+        done = ref['status'] if ref['status'] in BatchJob.TERMINAL_STATUSES else None
+
+        if not changed and not done:
+            return Response(status=204)
+
+        payload = {'version': version, 'poll_ms': poll_config['poll_ms']}
+        if session_id:
+            summary = batch_session_manager.get_session_summary(session_id)
+            if summary:
+                payload['progress'] = _progress_payload(summary)
+        if done:
+            payload['done'] = done
+        return jsonify(payload)
+
+    logger.info("✅ Route inițializat: /batch_progress/<job_id> (polling pe versiune)")
@@ -0,0 +1,174 @@
+# ==============================================================================
+# recording_cache.py
+# ------------------------------------------------------------------------------
+# ROL: Cache columnar (Parquet) al înregistrărilor deja parsate, adresat după
+#      conținut (SHA-256 al CSV-ului original).
+#
+# DE CE: O înregistrare nu se mai schimbă după `patient_links.add_recording`.
+#        Parsăm CSV-ul O SINGURĂ DATĂ la ingestie și salvăm DataFrame-ul ca
+#        artefact compact (SpO2/Puls ca uint8), lângă CSV - local și în S3.
+#        `data_service.get_patient_dataframe` îl încarcă direct și cade pe
+#        parsarea CSV doar dacă artefactul lipsește.
+#
+# LOCAȚIE ARTEFACT:
+#   - S3:    {token}/csvs/{sha256}.parquet
+#   - Local: același folder cu CSV-ul înregistrării
+#
+# DEPENDENȚĂ OPȚIONALĂ: pyarrow. Fără el cache-ul e dezactivat (PARQUET_SUPPORT)
+#                       și totul funcționează ca înainte, prin parsare CSV.
+# ==============================================================================
+
+import io
+import os
+import hashlib
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from logger_setup import logger
+
+try:
+    import pyarrow  # noqa: F401
+    PARQUET_SUPPORT = True
+except ImportError:
+    PARQUET_SUPPORT = False
+    logger.warning("⚠️ pyarrow nu este instalat - cache-ul Parquet al înregistrărilor este dezactivat. Instalați cu: pip install pyarrow")
+
+PARSED_ARTIFACT_SUFFIX = ".parquet"
+PARSED_ARTIFACT_CONTENT_TYPE = "application/vnd.apache.parquet"
+PARQUET_COMPRESSION = "zstd"
+
+# Coloanele numerice care respectă contractul `parse_csv_data` (int64 în memorie)
+_INTEGER_COLUMNS = ('SpO2', 'Pulse Rate', 'Motion')
+
+
+def compute_content_hash(csv_content: bytes) -> str:
+    """Amprenta SHA-256 (hex) a conținutului CSV - cheia artefactului."""
+    return hashlib.sha256(csv_content).hexdigest()
+
+
+def artifact_filename(content_hash: str) -> str:
+    return f"{content_hash}{PARSED_ARTIFACT_SUFFIX}"
+
+
+# ==============================================================================
+# SERIALIZARE
+# ==============================================================================
+
+def serialize_dataframe(df: pd.DataFrame) -> bytes:
+    """
+    Serializează DataFrame-ul parsat în Parquet, cu tipuri compacte:
+    coloanele întregi care încap în 0..255 devin uint8.
+    """
+    compact = df.copy()
+    for col in _INTEGER_COLUMNS:
+        if col in compact.columns and pd.api.types.is_integer_dtype(compact[col]):
+            values = compact[col].to_numpy()
+            if len(values) and values.min() >= 0 and values.max() <= 255:
+                compact[col] = values.astype(np.uint8)
+
+    buffer = io.BytesIO()
+    compact.to_parquet(buffer, engine='pyarrow', compression=PARQUET_COMPRESSION, index=True)
+    return buffer.getvalue()
+
+
+def deserialize_dataframe(content: bytes) -> pd.DataFrame:
+    """Inversul `serialize_dataframe`: restaurează contractul `parse_csv_data`."""
+    from data_parser import _TIME_DTYPE
+
+    df = pd.read_parquet(io.BytesIO(content), engine='pyarrow')
+    for col in _INTEGER_COLUMNS:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            df[col] = df[col].astype(np.int64)
+    df.index = pd.DatetimeIndex(df.index.astype(_TIME_DTYPE), name='Time')
+    return df
+
+
+# ==============================================================================
+# STOCARE / ÎNCĂRCARE
+# ==============================================================================
+
+def local_artifact_path(csv_path: str, content_hash: str) -> Optional[str]:
+    if not csv_path or '://' in csv_path:
+        return None
+    return os.path.join(os.path.dirname(csv_path), artifact_filename(content_hash))
+
+
+def store_parsed_artifact(token: str, content_hash: str, df: pd.DataFrame,
+                          storage_type: str, csv_path: str = None,
+                          content: Optional[bytes] = None) -> Optional[str]:
+    """
+    Salvează artefactul Parquet lângă CSV-ul înregistrării.
+
+    Args:
+        token: UUID-ul pacientului
+        content_hash: SHA-256 al CSV-ului original
+        df: DataFrame-ul returnat de `parse_csv_data`
+        storage_type: 'r2' (S3) sau 'local'
+        csv_path: Calea CSV-ului (pentru stocarea locală)
+        content: Parquet-ul deja serializat (opțional) - evită a doua serializare
+
+    Returns:
+        str: Locația artefactului sau None (eșec non-critic)
+    """
+    if not PARQUET_SUPPORT or not content_hash or df is None or df.empty:
+        return None
+
+    try:
+        if content is None:
+            content = serialize_dataframe(df)
+        filename = artifact_filename(content_hash)
+
+        if storage_type == 'r2':
+            from storage_service import upload_patient_parsed
+            location = upload_patient_parsed(token, content, filename)
+        else:
+            location = local_artifact_path(csv_path, content_hash)
+            if not location:
+                return None
+            os.makedirs(os.path.dirname(location), exist_ok=True)
+            with open(location, 'wb') as f:
+                f.write(content)
+
+        logger.info(f"🗜️ [RECORDING_CACHE] Artefact Parquet salvat pentru {token[:8]}...: {filename} ({len(content)} bytes)")
+        return location
+
+    except Exception as e:
+        logger.warning(f"⚠️ [RECORDING_CACHE] Artefactul Parquet nu a putut fi salvat pentru {token[:8]}...: {e}")
+        return None
+
+
+def load_parsed_artifact(token: str, content_hash: str, storage_type: str,
+                         csv_path: str = None) -> Optional[pd.DataFrame]:
+    """
+    Încarcă DataFrame-ul din artefactul Parquet.
+
+    Returns:
+        pd.DataFrame sau None dacă artefactul lipsește / nu poate fi citit
+    """
+    if not PARQUET_SUPPORT or not content_hash:
+        return None
+
+    try:
+        content = None
+        if storage_type == 'r2':
+            from storage_service import download_patient_file
+            content = download_patient_file(token, 'csvs', artifact_filename(content_hash))
+        else:
+            local_path = local_artifact_path(csv_path, content_hash)
+            if local_path and os.path.exists(local_path):
+                with open(local_path, 'rb') as f:
+                    content = f.read()
+
+        if not content:
+            logger.info(f"🗜️ [RECORDING_CACHE] MISS pentru {token[:8]}... ({content_hash[:12]})")
+            return None
+
+        df = deserialize_dataframe(content)
+        logger.info(f"🗜️ [RECORDING_CACHE] HIT pentru {token[:8]}... ({content_hash[:12]}, {len(df)} rânduri, {len(content)} bytes)")
+        return df
+
+    except Exception as e:
+        logger.warning(f"⚠️ [RECORDING_CACHE] Artefact ilizibil pentru {token[:8]}... ({content_hash[:12]}): {e}")
+        return None
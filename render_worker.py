@@ -0,0 +1,231 @@
+# ==============================================================================
+# render_worker.py
+# ------------------------------------------------------------------------------
+# ROL: Worker Kaleido persistent pentru exportul imaginilor din batch.
+#
+# DE CE: `fig.write_image` pornește și închide Chromium (Kaleido v1) la FIECARE
+#        apel - pentru o noapte cu 16 felii asta înseamnă 16 porniri de browser.
+#        Worker-ul deschide browserul o singură dată per proces, îl încălzește
+#        cu o figură minimă și primește apoi loturi de figuri, randate în
+#        paralel pe `tabs` tab-uri.
+#
+# PIPELINING: `submit_batch` întoarce un `concurrent.futures.Future` - apelantul
+#             (batch_processor) continuă cu parsarea fișierului următor cât timp
+#             feliile fișierului curent se randează.
+#
+# SĂNĂTATE: `health_check` randează figura de warm-up cu timeout; `restart`
+#           închide și redeschide browserul (folosit automat după un lot eșuat).
+#
+# CONFIG: config.KALEIDO_WORKER_CONFIG (env PULSOX_KALEIDO_*).
+# ==============================================================================
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+
+import config
+from logger_setup import logger
+
+# Figura minimă folosită la warm-up și health check
+_PROBE_FIGURE = {'data': [{'type': 'scatter', 'x': [0, 1], 'y': [0, 1]}], 'layout': {}}
+
+
+class KaleidoRenderWorker:
+    """Browser Kaleido de lungă durată, pe un event loop propriu (thread daemon)."""
+
+    def __init__(self, tabs: int = 1, timeout_s: float = 90, batch_size: int = 16,
+                 health_timeout_s: float = 20):
+        self.tabs = max(1, int(tabs))
+        self.timeout_s = timeout_s
+        self.batch_size = max(1, int(batch_size))
+        self.health_timeout_s = health_timeout_s
+
+        self._kaleido = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.RLock()
+        self._counters = {'batches': 0, 'figures': 0, 'failures': 0, 'restarts': 0}
+
+    # --- Ciclu de viață -----------------------------------------------------
+
+    def is_running(self) -> bool:
+        return self._kaleido is not None and self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Pornește browserul și îl încălzește. Ridică RuntimeError dacă Chrome lipsește."""
+        with self._lock:
+            if self.is_running():
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name="kaleido-render-worker", daemon=True)
+            self._thread.start()
+            try:
+                self._call(self._open(), timeout=self.timeout_s)
+                self._call(self._render_one(_PROBE_FIGURE, {'format': 'png', 'width': 32, 'height': 32}),
+                           timeout=self.timeout_s)
+            except Exception:
+                self._stop_loop()
+                raise
+            logger.info(f"🖨️ [RENDER_WORKER] Kaleido pornit și încălzit ({self.tabs} tab-uri).")
+
+    def stop(self):
+        """Închide browserul și thread-ul worker-ului (idempotent)."""
+        with self._lock:
+            if self._loop is None:
+                return
+            if self._kaleido is not None:
+                try:
+                    self._call(self._close(), timeout=self.health_timeout_s)
+                except Exception as e:
+                    logger.warning(f"⚠️ [RENDER_WORKER] Închidere Kaleido incompletă: {e}")
+            self._stop_loop()
+            logger.info("🖨️ [RENDER_WORKER] Kaleido oprit.")
+
+    def restart(self):
+        with self._lock:
+            self._counters['restarts'] += 1
+            logger.warning("🔄 [RENDER_WORKER] Repornire Kaleido...")
+            self.stop()
+            self.start()
+
+    def health_check(self) -> bool:
+        """True dacă browserul randează figura de probă în `health_timeout_s`."""
+        if not self.is_running():
+            return False
+        try:
+            self._call(self._render_one(_PROBE_FIGURE, {'format': 'png', 'width': 32, 'height': 32}),
+                       timeout=self.health_timeout_s)
+            return True
+        except Exception as e:
+            logger.warning(f"⚠️ [RENDER_WORKER] Health check eșuat: {e}")
+            return False
+
+    def ensure_healthy(self):
+        """Pornește worker-ul dacă e oprit; îl repornește dacă nu mai răspunde."""
+        with self._lock:
+            if not self.is_running():
+                self.start()
+            elif not self.health_check():
+                self.restart()
+
+    # --- Randare ------------------------------------------------------------
+
+    def submit_batch(self, figures: List, width: int = None, height: int = None,
+                     image_format: str = 'jpg') -> Future:
+        """
+        Trimite un lot de figuri spre randare, fără a aștepta.
+
+        Returns:
+            Future: rezultatul este List[bytes], în ordinea figurilor
+        """
+        if not self.is_running():
+            raise RuntimeError("Render worker-ul Kaleido nu este pornit.")
+        opts = {
+            'format': image_format,
+            'width': width or config.IMAGE_RESOLUTION['width'],
+            'height': height or config.IMAGE_RESOLUTION['height'],
+        }
+        return asyncio.run_coroutine_threadsafe(self._render_batch(list(figures), opts), self._loop)
+
+    def render_batch(self, figures: List, width: int = None, height: int = None,
+                     image_format: str = 'jpg') -> List[bytes]:
+        """Varianta blocantă a `submit_batch`."""
+        return self.submit_batch(figures, width, height, image_format).result()
+
+    def stats(self) -> Dict:
+        return {**self._counters, 'running': self.is_running(), 'tabs': self.tabs}
+
+    # --- Intern (rulează pe event loop-ul worker-ului) -----------------------
+
+    def _call(self, coroutine, timeout: float):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout=timeout)
+
+    def _stop_loop(self):
+        loop, thread = self._loop, self._thread
+        self._kaleido = None
+        self._loop = None
+        self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=self.health_timeout_s)
+        if loop is not None and not loop.is_running():
+            loop.close()
+
+    async def _open(self):
+        import kaleido
+        k = kaleido.Kaleido(n=self.tabs, timeout=self.timeout_s)
+        await k.open()
+        self._kaleido = k
+
+    async def _close(self):
+        k, self._kaleido = self._kaleido, None
+        if k is not None:
+            await k.close()
+
+    async def _render_one(self, fig, opts: Dict) -> bytes:
+        return await self._kaleido.calc_fig(fig, opts=opts)
+
+    async def _render_batch(self, figures: List, opts: Dict) -> List[bytes]:
+        results: List[bytes] = []
+        try:
+            # Tranșe de `batch_size`: Kaleido distribuie figurile pe tab-urile libere
+            for i in range(0, len(figures), self.batch_size):
+                chunk = figures[i:i + self.batch_size]
+                results.extend(await asyncio.gather(*(self._render_one(fig, opts) for fig in chunk)))
+        except Exception:
+            self._counters['failures'] += 1
+            raise
+        self._counters['batches'] += 1
+        self._counters['figures'] += len(figures)
+        return results
+
+
+# ==============================================================================
+# INSTANȚĂ PER PROCES
+# ==============================================================================
+
+_worker: Optional[KaleidoRenderWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_render_worker() -> KaleidoRenderWorker:
+    """Worker-ul procesului curent, pornit și verificat (RuntimeError dacă Chrome lipsește)."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            worker_config = config.KALEIDO_WORKER_CONFIG
+            _worker = KaleidoRenderWorker(
+                tabs=worker_config['tabs'],
+                timeout_s=worker_config['timeout_s'],
+                batch_size=worker_config['batch_size'],
+                health_timeout_s=worker_config['health_timeout_s'],
+            )
+        worker = _worker
+    worker.ensure_healthy()
+    return worker
+
+
+def shutdown_render_worker():
+    """Oprește worker-ul procesului (apelat la final de batch dacă nu e persistent)."""
+    with _worker_lock:
+        worker = _worker
+    if worker is not None:
+        worker.stop()
+
+
+def _forget_worker_after_fork():
+    """
+    Copilul unui fork (workerii batch) moștenește worker-ul părintelui fără
+    thread-ul lui de event loop și cu Chromium-ul părintelui - îl uităm (fără
+    `stop`), iar copilul își pornește propriul worker la prima cerere.
+    """
+    global _worker, _worker_lock
+    _worker = None
+    _worker_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_worker_after_fork)
@@ -3,12 +3,22 @@
 # ------------------------------------------------------------------------------
 # ROL: Persistență metadata link-uri pacient în PostgreSQL (JSON per token).
 #      Migrare automată din fluxul legacy (R2 / patient_links.json) la primul load.
+#
+# OPERAȚII PE RÂND (un singur token, SQL țintit - costul nu crește cu numărul
+# total de link-uri): get_link, upsert_link, patch_link_fields, delete_link,
+# find_link_token, list_links (filtre + sortare + paginare pe coloanele
+# indexate din PatientLinkRow), page_links / count_links (pagini keyset +
+# căutare pentru dashboard), apply_view_deltas
+# (incremente atomice pentru vizualizări, din view_tracker), links_version
+# (versiunea tabelului pentru links_cache).
+# Toate returnează None când tabelul nu e sursa de adevăr (PG dezactivat, fără
+# app context, tabel încă gol) → apelantul folosește fluxul legacy R2/JSON.
 # ==============================================================================
 
 from __future__ import annotations
 
 import os
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from logger_setup import logger
 
@@ -20,10 +30,11 @@ def _postgres_links_enabled() -> bool:
     )
 
 
-def load_all_from_postgres() -> Optional[Dict[str, Any]]:
+def load_all_from_postgres(allow_empty: bool = False) -> Optional[Dict[str, Any]]:
     """
     Returnează dict token -> metadata dacă există rânduri în DB și context Flask activ.
-    Altfel None (apelantul folosește R2/JSON).
+    Altfel None (apelantul folosește R2/JSON). Cu allow_empty=True, tabelul gol
+    întoarce {} (None rămâne doar pentru PG indisponibil).
     """
     if not _postgres_links_enabled():
         return None
@@ -34,7 +45,7 @@ def load_all_from_postgres() -> Optional[Dict[str, Any]]:
         from auth.models import PatientLinkRow
         rows = PatientLinkRow.query.all()
         if not rows:
-            return None
+            return {} if allow_empty else None
         return {row.token: row.payload for row in rows}
     except Exception as exc:
         logger.warning(f"[patient_repository] load PG skipped: {exc}")
@@ -43,7 +54,8 @@ def load_all_from_postgres() -> Optional[Dict[str, Any]]:
 
 def replace_all_in_postgres(links: Dict[str, Any]) -> bool:
     """
-    Înlocuiește conținutul tabelului cu dicționarul dat (upsert per token).
+    Înlocuiește conținutul tabelului cu dicționarul dat: șterge token-urile
+    dispărute (citind doar coloana `token`) + upsert pentru restul.
     """
     if not _postgres_links_enabled():
         return False
@@ -54,21 +66,11 @@ def replace_all_in_postgres(links: Dict[str, Any]) -> bool:
         if not has_app_context():
             return False
         from auth.models import db, PatientLinkRow
-        existing_tokens = {r.token for r in PatientLinkRow.query.all()}
-        new_tokens = {t for t in links if t}
-        for obsolete in existing_tokens - new_tokens:
-            row = PatientLinkRow.query.get(obsolete)
-            if row is not None:
-                db.session.delete(row)
-        for token, payload in links.items():
-            if not token:
-                continue
-            row = PatientLinkRow.query.get(token)
-            if row is None:
-                row = PatientLinkRow(token=token, payload=payload)
-                db.session.add(row)
-            else:
-                row.payload = payload
+        existing_tokens = {t for (t,) in db.session.query(PatientLinkRow.token)}
+        obsolete = list(existing_tokens - {t for t in links if t})
+        if obsolete:
+            PatientLinkRow.query.filter(PatientLinkRow.token.in_(obsolete)).delete(synchronize_session=False)
+        upsert_links_in_postgres(links, commit=False)
         db.session.commit()
         logger.info(f"[patient_repository] PostgreSQL: salvate {len(links)} link-uri")
         return True
@@ -82,6 +84,46 @@ def replace_all_in_postgres(links: Dict[str, Any]) -> bool:
         return False
 
 
+def upsert_links_in_postgres(links: Dict[str, Any], commit: bool = True) -> bool:
+    """
+    Upsert doar pentru token-urile date (fără a citi/rescrie tot tabelul).
+    Cu commit=False, apelantul face commit-ul (tranzacție comună) și primește
+    excepțiile, pentru rollback.
+    """
+    if not _postgres_links_enabled():
+        return False
+    if not links:
+        return True
+    try:
+        from flask import has_app_context
+        if not has_app_context():
+            return False
+        from auth.models import db, PatientLinkRow
+        tokens = [t for t in links if t]
+        existing = {r.token: r for r in PatientLinkRow.query.filter(PatientLinkRow.token.in_(tokens)).all()}
+        for token in tokens:
+            payload = dict(links[token])  # obiect nou → modificarea JSON e detectată
+            row = existing.get(token)
+            if row is None:
+                db.session.add(PatientLinkRow(token=token, payload=payload))
+            else:
+                row.payload = payload
+        if commit:
+            db.session.commit()
+        logger.info(f"[patient_repository] PostgreSQL: upsert {len(tokens)} link-uri")
+        return True
+    except Exception as exc:
+        if not commit:
+            raise
+        logger.error(f"[patient_repository] upsert PG failed: {exc}", exc_info=True)
+        try:
+            from auth.models import db
+            db.session.rollback()
+        except Exception:
+            pass
+        return False
+
+
 def migrate_legacy_if_empty(legacy: Dict[str, Any]) -> None:
     """Dacă PG e gol și legacy are date, inserează o singură dată."""
     if not legacy or not _postgres_links_enabled():
@@ -106,3 +148,469 @@ def migrate_legacy_if_empty(legacy: Dict[str, Any]) -> None:
             db.session.rollback()
         except Exception:
             pass
+
+
+# ==============================================================================
+# OPERAȚII PE RÂND
+# ==============================================================================
+
+def links_table_active() -> bool:
+    """PostgreSQL e sursa de adevăr: activat, app context și cel puțin un rând."""
+    if not _postgres_links_enabled():
+        return False
+    from flask import has_app_context
+    if not has_app_context():
+        return False
+    try:
+        from auth.models import db, PatientLinkRow
+        return db.session.query(PatientLinkRow.token).limit(1).first() is not None
+    except Exception as exc:
+        logger.warning(f"[patient_repository] PG indisponibil: {exc}")
+        _rollback_quietly()
+        return False
+
+
+def links_version() -> Optional[Tuple[int, Optional[str]]]:
+    """
+    Versiunea ieftină a tabelului: (număr rânduri, max(updated_at)) - se schimbă
+    la orice insert / update / delete. None dacă PG nu e sursa de adevăr.
+    """
+    if not _postgres_links_enabled():
+        return None
+    from flask import has_app_context
+    if not has_app_context():
+        return None
+    try:
+        from sqlalchemy import func
+        from auth.models import db, PatientLinkRow
+        count, last_update = db.session.query(
+            func.count(PatientLinkRow.token), func.max(PatientLinkRow.updated_at)
+        ).one()
+        if not count:
+            return None
+        return count, (last_update.isoformat() if hasattr(last_update, 'isoformat') else last_update)
+    except Exception as exc:
+        logger.warning(f"[patient_repository] links_version PG skipped: {exc}")
+        _rollback_quietly()
+        return None
+
+
+def _rollback_quietly() -> None:
+    try:
+        from auth.models import db
+        db.session.rollback()
+    except Exception:
+        pass
+
+
+def get_link(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Metadata unui singur link (lookup după cheia primară).
+
+    Returns:
+        Dict cu metadata, {} dacă token-ul nu există, None dacă PG nu e activ
+    """
+    if not token:
+        return None
+    try:
+        if not links_table_active():
+            return None
+        from auth.models import db, PatientLinkRow
+        row = db.session.get(PatientLinkRow, token)
+        return dict(row.payload) if row is not None else {}
+    except Exception as exc:
+        logger.warning(f"[patient_repository] get_link PG skipped: {exc}")
+        return None
+
+
+def find_link_token(device_name: str, recording_date: str, start_time: str) -> Optional[str]:
+    """
+    Token-ul link-ului existent pentru (aparat, dată, oră start) - detectarea
+    duplicatelor din `generate_patient_link`.
+
+    Returns:
+        Token, "" dacă nu există, None dacă PG nu e activ
+    """
+    try:
+        if not links_table_active():
+            return None
+        from auth.models import db, PatientLinkRow
+        row = db.session.query(PatientLinkRow.token).filter(
+            PatientLinkRow.device_name == device_name,
+            PatientLinkRow.recording_date == as_date(recording_date),
+            PatientLinkRow.payload['start_time'].as_string() == start_time,
+        ).limit(1).first()
+        return row[0] if row is not None else ""
+    except Exception as exc:
+        logger.warning(f"[patient_repository] find_link_token PG skipped: {exc}")
+        return None
+
+
+def upsert_link(token: str, payload: Dict[str, Any], commit: bool = True) -> Optional[bool]:
+    """
+    Inserează sau rescrie metadata unui singur link.
+
+    Returns:
+        True la succes, False la eroare, None dacă PG nu e activ
+    """
+    if not token:
+        return None
+    try:
+        # Tabel gol → fluxul legacy (primul save migrează toate link-urile, nu doar acesta)
+        if not links_table_active():
+            return None
+        from auth.models import db, PatientLinkRow
+        row = db.session.get(PatientLinkRow, token)
+        if row is None:
+            db.session.add(PatientLinkRow(token=token, payload=dict(payload)))
+        else:
+            row.payload = dict(payload)
+        if commit:
+            db.session.commit()
+        return True
+    except Exception as exc:
+        if not commit:
+            raise
+        logger.error(f"[patient_repository] upsert_link PG failed: {exc}", exc_info=True)
+        _rollback_quietly()
+        return False
+
+
+def patch_link_fields(token: str, fields: Dict[str, Any], append: Dict[str, List] = None,
+                      commit: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Actualizează doar câmpurile date din payload-ul unui link (rândul e
+    blocat cu SELECT ... FOR UPDATE pe PostgreSQL până la commit).
+
+    Args:
+        fields: Câmpurile suprascrise
+        append: Liste completate fără duplicate (ex: {'pdf_paths': [...]})
+        commit: False → apelantul face commit-ul (tranzacție comună) și
+                primește excepțiile, pentru rollback
+
+    Returns:
+        Payload-ul actualizat, {} dacă token-ul nu există sau scrierea a eșuat,
+        None dacă PG nu e activ
+    """
+    if not token:
+        return None
+    try:
+        if not links_table_active():
+            return None
+        from auth.models import db, PatientLinkRow
+        row = PatientLinkRow.query.filter_by(token=token).with_for_update().first()
+        if row is None:
+            if commit:
+                db.session.rollback()
+            return {}
+        payload = dict(row.payload)  # obiect nou → modificarea JSON e detectată
+        payload.update(fields or {})
+        for key, values in (append or {}).items():
+            current = list(payload.get(key) or [])
+            current.extend(value for value in values if value not in current)
+            payload[key] = current
+        row.payload = payload
+        if commit:
+            db.session.commit()
+        return payload
+    except Exception as exc:
+        if not commit:
+            raise
+        logger.error(f"[patient_repository] patch_link_fields PG failed: {exc}", exc_info=True)
+        _rollback_quietly()
+        return {}
+
+
+def delete_link(token: str) -> Optional[bool]:
+    """
+    Șterge rândul unui link.
+
+    Returns:
+        True dacă a fost șters, False dacă nu exista / eroare, None dacă PG nu e activ
+    """
+    if not token:
+        return None
+    try:
+        if not links_table_active():
+            return None
+        from auth.models import db, PatientLinkRow
+        deleted = PatientLinkRow.query.filter_by(token=token).delete(synchronize_session=False)
+        db.session.commit()
+        return deleted > 0
+    except Exception as exc:
+        logger.error(f"[patient_repository] delete_link PG failed: {exc}", exc_info=True)
+        _rollback_quietly()
+        return False
+
+
+def as_date(value):
+    """date / datetime / 'YYYY-MM-DD...' → date (None dacă lipsește)."""
+    from datetime import date, datetime
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return datetime.fromisoformat(str(value)).date()
+
+
+def list_links(active_only: bool = True, device_name: str = None, sent_status: bool = None,
+               date_field: str = None, date_from=None, date_to=None, order: str = 'created',
+               limit: int = None, offset: int = 0) -> Optional[List[Tuple[str, Dict[str, Any]]]]:
+    """
+    Link-urile filtrate și sortate în SQL pe coloanele indexate, paginat.
+
+    Args:
+        active_only: Doar link-urile active
+        device_name: Filtru exact pe numele aparatului
+        sent_status: Filtru pe statusul "trimis" (None = toate)
+        date_field: 'recording' (recording_date) sau 'processed'
+                    (last_processed_at, cu fallback created_at); None = fără filtru
+        date_from / date_to: Interval inclusiv (date sau ISO)
+        order: 'created' (created_at desc) sau 'recording' (recording_date desc)
+        limit / offset: Paginare (limit None = toate)
+
+    Returns:
+        Listă (token, payload) sau None dacă PG nu e activ
+    """
+    try:
+        if not links_table_active():
+            return None
+        from datetime import datetime, time, timedelta
+        from sqlalchemy import and_, or_
+        from auth.models import PatientLinkRow as Row
+
+        query = Row.query
+        if active_only:
+            query = query.filter(Row.is_active.is_(True))
+        if device_name is not None:
+            query = query.filter(Row.device_name == device_name)
+        if sent_status is not None:
+            query = query.filter(Row.sent_status.is_(bool(sent_status)))
+
+        start, end = as_date(date_from), as_date(date_to)
+        if date_field == 'recording':
+            if start is not None:
+                query = query.filter(Row.recording_date >= start)
+            if end is not None:
+                query = query.filter(Row.recording_date <= end)
+        elif date_field == 'processed' and (start is not None or end is not None):
+            # Interval semi-deschis pe timestamp: [start 00:00, end+1 00:00) - folosește indexurile
+            def _in_range(column):
+                conditions = [column.isnot(None)]
+                if start is not None:
+                    conditions.append(column >= datetime.combine(start, time.min))
+                if end is not None:
+                    conditions.append(column < datetime.combine(end + timedelta(days=1), time.min))
+                return and_(*conditions)
+            query = query.filter(or_(
+                _in_range(Row.last_processed_at),
+                and_(Row.last_processed_at.is_(None), _in_range(Row.created_at)),
+            ))
+
+        if order == 'recording':
+            query = query.order_by(Row.recording_date.desc().nulls_last(), Row.created_at.desc().nulls_last(), Row.token)
+        else:
+            query = query.order_by(Row.created_at.desc().nulls_last(), Row.token)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return [(row.token, row.payload) for row in query]
+    except Exception as exc:
+        logger.warning(f"[patient_repository] list_links PG skipped: {exc}")
+        _rollback_quietly()
+        return None
+
+
+def _search_filter(query, Row, search: str):
+    """Căutare case-insensitive (ILIKE) în numele aparatului și în notițele din payload."""
+    from sqlalchemy import or_
+
+    term = (search or '').strip()
+    if not term:
+        return query
+    pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    return query.filter(or_(
+        Row.device_name.ilike(pattern, escape='\\'),
+        Row.payload['medical_notes'].as_string().ilike(pattern, escape='\\'),
+        Row.payload['notes'].as_string().ilike(pattern, escape='\\'),
+    ))
+
+
+def _parse_cursor(cursor):
+    """[created_at ISO | None, token] → (datetime | None, token); invalid → None (prima pagină)."""
+    from datetime import datetime
+    try:
+        created_at, token = cursor
+        return (datetime.fromisoformat(created_at) if created_at else None), str(token)
+    except (TypeError, ValueError):
+        return None
+
+
+def page_links(search: str = None, after=None, limit: int = 25,
+               active_only: bool = True) -> Optional[Tuple[List[Tuple[str, Dict[str, Any]]], Optional[List]]]:
+    """
+    O pagină de link-uri (created_at desc, apoi token), paginare keyset: costul
+    nu depinde de numărul paginii sau de numărul total de link-uri.
+
+    Args:
+        search: Text căutat în numele aparatului / notițe (None = toate)
+        after: Cursorul returnat de pagina anterioară (None = prima pagină)
+        limit: Dimensiunea paginii
+
+    Returns:
+        (listă (token, payload), cursor pagina următoare | None) sau None dacă PG nu e activ
+    """
+    try:
+        if not links_table_active():
+            return None
+        from sqlalchemy import and_, or_
+        from auth.models import PatientLinkRow as Row
+
+        query = Row.query
+        if active_only:
+            query = query.filter(Row.is_active.is_(True))
+        query = _search_filter(query, Row, search)
+
+        position = _parse_cursor(after) if after else None
+        if position is not None:
+            created_at, token = position
+            # Ordinea: created_at desc NULLS LAST, token asc → "după cursor"
+            if created_at is None:
+                query = query.filter(Row.created_at.is_(None), Row.token > token)
+            else:
+                query = query.filter(or_(
+                    Row.created_at < created_at,
+                    and_(Row.created_at == created_at, Row.token > token),
+                    Row.created_at.is_(None),
+                ))
+
+        rows = (query.order_by(Row.created_at.desc().nulls_last(), Row.token)
+                .limit(limit + 1).all())
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = [last.created_at.isoformat() if last.created_at else None, last.token]
+        return [(row.token, row.payload) for row in rows], next_cursor
+    except Exception as exc:
+        logger.warning(f"[patient_repository] page_links PG skipped: {exc}")
+        _rollback_quietly()
+        return None
+
+
+def count_links(search: str = None, active_only: bool = True) -> Optional[int]:
+    """Numărul de link-uri care corespund filtrelor `page_links` (None dacă PG nu e activ)."""
+    try:
+        if not links_table_active():
+            return None
+        from sqlalchemy import func
+        from auth.models import db, PatientLinkRow as Row
+
+        query = db.session.query(func.count(Row.token))
+        if active_only:
+            query = query.filter(Row.is_active.is_(True))
+        return int(_search_filter(query, Row, search).scalar() or 0)
+    except Exception as exc:
+        logger.warning(f"[patient_repository] count_links PG skipped: {exc}")
+        _rollback_quietly()
+        return None
+
+
+def backfill_link_columns(chunk_size: int = 500) -> int:
+    """
+    Completează coloanele indexate din payload pentru toate rândurile, pe
+    bucăți de `chunk_size` (ordonat după token, fără OFFSET).
+
+    Returns:
+        int: Numărul de rânduri actualizate
+    """
+    from auth.models import db, PatientLinkRow
+
+    updated = 0
+    last_token = ''
+    while True:
+        rows = (PatientLinkRow.query.filter(PatientLinkRow.token > last_token)
+                .order_by(PatientLinkRow.token).limit(chunk_size).all())
+        if not rows:
+            break
+        for row in rows:
+            for column, value in PatientLinkRow.hot_columns(row.payload).items():
+                setattr(row, column, value)
+        db.session.commit()
+        updated += len(rows)
+        last_token = rows[-1].token
+    return updated
+
+
+# Incremente atomice pe payload-ul JSON (fără citire în Python); pe alte dialecte → rând blocat + merge
+_VIEW_DELTA_SQL = {
+    "postgresql": """
+        UPDATE patient_link_rows SET
+            payload = (payload::jsonb || jsonb_build_object(
+                'view_count', COALESCE((payload->>'view_count')::int, 0) + :count,
+                'first_viewed_at', COALESCE(payload->>'first_viewed_at', :first),
+                'last_viewed_at', GREATEST(payload->>'last_viewed_at', :last),
+                'last_accessed', GREATEST(payload->>'last_accessed', :last)
+            ))::json,
+            updated_at = :now
+        WHERE token = :token
+    """,
+    "sqlite": """
+        UPDATE patient_link_rows SET
+            payload = json_set(payload,
+                '$.view_count', COALESCE(json_extract(payload, '$.view_count'), 0) + :count,
+                '$.first_viewed_at', COALESCE(json_extract(payload, '$.first_viewed_at'), :first),
+                '$.last_viewed_at', max(COALESCE(json_extract(payload, '$.last_viewed_at'), ''), :last),
+                '$.last_accessed', max(COALESCE(json_extract(payload, '$.last_accessed'), ''), :last)
+            ),
+            updated_at = :now
+        WHERE token = :token
+    """,
+}
+
+
+def apply_view_deltas(deltas: Dict[str, Dict[str, Any]]) -> Optional[bool]:
+    """
+    Aplică vizualizările acumulate (view_tracker) într-o singură tranzacție:
+    view_count += count, first_viewed_at păstrat dacă există, last_viewed_at /
+    last_accessed = maximul dintre valoarea din DB și cea din buffer.
+
+    Args:
+        deltas: token -> {'count': int, 'first': ISO, 'last': ISO}
+
+    Returns:
+        True la succes, False la eroare, None dacă PG nu e activ
+    """
+    if not deltas:
+        return True
+    try:
+        if not links_table_active():
+            return None
+        from datetime import datetime
+        from sqlalchemy import text
+        from auth.models import db, PatientLinkRow
+
+        now = datetime.utcnow()
+        sql = _VIEW_DELTA_SQL.get(db.engine.dialect.name)
+        if sql is not None:
+            db.session.execute(text(sql), [
+                {'token': token, 'count': d['count'], 'first': d['first'], 'last': d['last'], 'now': now}
+                for token, d in deltas.items()
+            ])
+        else:
+            rows = PatientLinkRow.query.filter(PatientLinkRow.token.in_(list(deltas))).with_for_update().all()
+            for row in rows:
+                d = deltas[row.token]
+                payload = dict(row.payload)
+                payload['view_count'] = (payload.get('view_count') or 0) + d['count']
+                payload['first_viewed_at'] = payload.get('first_viewed_at') or d['first']
+                payload['last_viewed_at'] = max(payload.get('last_viewed_at') or '', d['last'])
+                payload['last_accessed'] = max(payload.get('last_accessed') or '', d['last'])
+                row.payload = payload
+        db.session.commit()
+        return True
+    except Exception as exc:
+        logger.error(f"[patient_repository] apply_view_deltas PG failed: {exc}", exc_info=True)
+        _rollback_quietly()
+        return False
@@ -1,12 +1,14 @@
 # ==============================================================================
-# repositories/session_repository.py — fațadă peste batch_session_manager (JSON local)
+# repositories/session_repository.py — fațadă peste batch_session_manager (SQLite local)
 # ==============================================================================
 
 from batch_session_manager import (  # noqa: F401
     create_batch_session,
     update_file_status,
     get_session_progress,
+    get_session_summary,
     get_pending_files,
     get_all_sessions,
     mark_session_completed,
+    mark_session_degraded,
 )
@@ -8,6 +8,7 @@ from storage_service import (  # noqa: F401
     upload_patient_csv,
     upload_patient_pdf,
     upload_patient_plot,
+    upload_patient_parsed,
     download_patient_file,
     list_patient_files,
     delete_patient_folder,
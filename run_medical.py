@@ -215,6 +215,10 @@ init_auth_manager(app)
 # Inițializăm route-urile de autentificare
 init_auth_routes(app)
 
+# Coada batch (mod 'inline'): worker-ul pornește la primul request, nu la primul batch
+import job_queue
+job_queue.install_inline_worker(app.server)
+
 # === REQUEST LOGGING (production monitoring) ===
 # ELIMINAT: Werkzeug loggează deja toate cererile HTTP
 # Logging custom genereaza duplicate (3 linii per request!)
@@ -9,6 +9,7 @@ from typing import Any, Dict, List
 from batch_processor import run_batch_job as _run_batch_job
 from batch_processor import extract_device_number as _extract_device_number
 from batch_processor import generate_intuitive_folder_name as _generate_intuitive_folder_name
+from job_queue import enqueue_batch_job as _enqueue_batch_job
 
 
 def run_batch_job(*args: Any, **kwargs: Any):
@@ -16,6 +17,11 @@ def run_batch_job(*args: Any, **kwargs: Any):
     return _run_batch_job(*args, **kwargs)
 
 
+def enqueue_batch_job(*args: Any, **kwargs: Any) -> str:
+    """Pune job-ul batch în coada persistentă (aceeași semnătură ca job_queue.enqueue_batch_job)."""
+    return _enqueue_batch_job(*args, **kwargs)
+
+
 def extract_device_number(filename: str) -> str:
     return _extract_device_number(filename)
 
@@ -14,6 +14,106 @@ LOGS_DIR = os.path.join(OUTPUT_DIR, "LOGS")
 # --- Setări pentru Procesarea în Lot (Batch) ---
 DEFAULT_WINDOW_MINUTES = 30
 IMAGE_RESOLUTION = {"width": 1280, "height": 720}
+# Procese worker pentru batch multi-fișier (1 = secvențial, comportamentul clasic)
+BATCH_WORKERS = max(1, int(os.environ.get("PULSOX_BATCH_WORKERS", "1")))
+# Implicit 'forkserver': pool-ul pornește din thread-ul job-ului, într-un proces gunicorn
+# cu mai multe thread-uri (view tracker, heartbeat, pool SQLAlchemy) - un fork de acolo
+# moștenește lock-uri ținute de alte thread-uri. 'fork' rămâne opțional (mai rapid la pornire).
+BATCH_MP_CONTEXT = os.environ.get("PULSOX_BATCH_MP_CONTEXT", "forkserver").strip().lower()  # forkserver | spawn | fork
+# Thread-uri pentru randarea/codarea feliilor aceluiași fișier (0/1 = serial)
+SLICE_RENDER_WORKERS = int(os.environ.get("PULSOX_SLICE_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Rapoartele PDF ale batch-ului (batch_pdf_index.py): thread-uri de parsare și
+# toleranța maximă (minute) între ora înregistrării CSV și ora din numele PDF-ului
+BATCH_PDF_PARSE_WORKERS = max(1, int(os.environ.get("PULSOX_BATCH_PDF_WORKERS", "2")))
+BATCH_PDF_MATCH_TOLERANCE_MIN = float(os.environ.get("PULSOX_BATCH_PDF_MATCH_TOLERANCE_MIN", "720"))
+# Metadatele batch (link-uri, înregistrări) se scriu o dată la N fișiere (batch_link_writer.py)
+BATCH_METADATA_FLUSH_EVERY = max(1, int(os.environ.get("PULSOX_BATCH_FLUSH_EVERY", "10")))
+# Coadă persistentă pentru job-uri batch (job_queue.py / batch_worker.py)
+BATCH_QUEUE_CONFIG = {
+    # 'inline' = thread în procesul web; 'worker' = procese separate `python batch_worker.py`
+    "mode": os.environ.get("PULSOX_BATCH_QUEUE_MODE", "inline").strip().lower(),
+    "per_doctor_limit": int(os.environ.get("PULSOX_BATCH_PER_DOCTOR_LIMIT", "1")),
+    "poll_interval_s": float(os.environ.get("PULSOX_BATCH_POLL_INTERVAL_S", "2")),
+    "heartbeat_s": float(os.environ.get("PULSOX_BATCH_HEARTBEAT_S", "15")),
+    "stale_after_s": float(os.environ.get("PULSOX_BATCH_STALE_AFTER_S", "120")),
+    "max_attempts": int(os.environ.get("PULSOX_BATCH_MAX_ATTEMPTS", "3")),
+}
+# Progres batch prin polling pe versiunea sesiunii (progress_stream.py); dezactivat → callback-ul Dash
+PROGRESS_POLL_CONFIG = {
+    "enabled": os.environ.get("PULSOX_PROGRESS_POLL", "true").strip().lower() in ("1", "true", "yes"),
+    # Intervalul de polling al browserului (și al interval-ului Dash de rezervă)
+    "poll_ms": max(500, int(os.environ.get("PULSOX_PROGRESS_POLL_MS", "3000"))),
+    # Verificarea statusului job-ului când sesiunea nu se schimbă (eșec / anulare)
+    "job_check_s": float(os.environ.get("PULSOX_PROGRESS_POLL_JOB_CHECK_S", "5")),
+}
+# Cache per proces pentru metadata link-urilor (links_cache.py), invalidat prin versiunea sursei
+LINKS_CACHE_CONFIG = {
+    "enabled": os.environ.get("PULSOX_LINKS_CACHE", "true").strip().lower() in ("1", "true", "yes"),
+    # Versiunea (PG / ETag S3 / fișier local) se verifică cel mult o dată la N secunde
+    "check_interval_s": float(os.environ.get("PULSOX_LINKS_CACHE_CHECK_S", "1")),
+    # Reîncărcare forțată după N secunde (0 = doar la schimbarea versiunii)
+    "max_age_s": float(os.environ.get("PULSOX_LINKS_CACHE_MAX_AGE_S", "300")),
+}
+# Vizualizările link-urilor de pacient (view_tracker.py): buffer write-behind per proces
+VIEW_TRACKING_CONFIG = {
+    # false → flush la fiecare vizualizare (fără buffer)
+    "write_behind": os.environ.get("PULSOX_VIEW_WRITE_BEHIND", "true").strip().lower() in ("1", "true", "yes"),
+    "flush_interval_s": float(os.environ.get("PULSOX_VIEW_FLUSH_S", "10")),
+    # Token-uri distincte în buffer peste care flush-ul pornește imediat
+    "max_pending": max(1, int(os.environ.get("PULSOX_VIEW_MAX_PENDING", "1000"))),
+}
+# Dashboard-ul link-urilor (tab "Link-uri Pacienți"): pagini keyset de N carduri
+ADMIN_DASHBOARD_CONFIG = {
+    "page_size": max(1, int(os.environ.get("PULSOX_DASHBOARD_PAGE_SIZE", "25"))),
+}
+# Ingestie continuă dintr-un folder "inbox" (ingest_watcher.py)
+INGEST_WATCH_CONFIG = {
+    "inbox": os.environ.get("PULSOX_INGEST_INBOX", "intrare"),
+    "output_folder": os.environ.get("PULSOX_INGEST_OUTPUT", OUTPUT_DIR),
+    "window_minutes": int(os.environ.get("PULSOX_INGEST_WINDOW_MINUTES", str(DEFAULT_WINDOW_MINUTES))),
+    # Un fișier e preluat după ce dimensiunea/mtime nu s-au schimbat atâtea secunde
+    "stable_s": float(os.environ.get("PULSOX_INGEST_STABLE_S", "5")),
+    "poll_s": float(os.environ.get("PULSOX_INGEST_POLL_S", "1")),
+    # Rescanare completă periodică (evenimente pierdute pe share-uri de rețea)
+    "rescan_s": float(os.environ.get("PULSOX_INGEST_RESCAN_S", "60")),
+    # Coada de fișiere stabile; plină → debouncer-ul așteaptă (backpressure)
+    "queue_size": max(1, int(os.environ.get("PULSOX_INGEST_QUEUE_SIZE", "64"))),
+    # Fișiere stabile grupate într-un singur `run_batch_job`
+    "max_files_per_run": max(1, int(os.environ.get("PULSOX_INGEST_MAX_FILES_PER_RUN", "20"))),
+    # Gol → "<inbox>/.ingest_cursor.json"
+    "cursor_file": os.environ.get("PULSOX_INGEST_CURSOR_FILE", ""),
+}
+# Executor partajat pentru upload-urile S3 din batch (upload_executor.py)
+UPLOAD_EXECUTOR_CONFIG = {
+    "workers": max(1, int(os.environ.get("PULSOX_UPLOAD_WORKERS", "4"))),
+    # Upload-uri în așteptare peste `workers`; peste limită `submit` blochează (backpressure)
+    "queue_depth": max(0, int(os.environ.get("PULSOX_UPLOAD_QUEUE_DEPTH", "16"))),
+    "max_retries": int(os.environ.get("PULSOX_UPLOAD_MAX_RETRIES", "3")),
+    "backoff_s": float(os.environ.get("PULSOX_UPLOAD_BACKOFF_S", "0.5")),  # dublat la fiecare reîncercare
+    "barrier_timeout_s": float(os.environ.get("PULSOX_UPLOAD_BARRIER_TIMEOUT_S", "600")),
+}
+# Backend export JPG în batch: 'kaleido' (Plotly + Chromium) sau 'native' (Pillow, in-process)
+IMAGE_EXPORT_BACKEND = os.environ.get("PULSOX_IMAGE_BACKEND", "kaleido").strip().lower()
+# Format final imagini batch (logo compus în memorie, o singură codare): 'jpeg' | 'webp' | 'png'
+IMAGE_OUTPUT_CONFIG = {
+    "format": os.environ.get("PULSOX_IMAGE_FORMAT", "jpeg").strip().lower(),
+    "quality": int(os.environ.get("PULSOX_IMAGE_QUALITY", "95")),
+    "progressive": os.environ.get("PULSOX_IMAGE_PROGRESSIVE", "true").strip().lower() in ("1", "true", "yes"),
+    "webp_method": int(os.environ.get("PULSOX_WEBP_METHOD", "4")),  # 0 (rapid) .. 6 (compact)
+}
+IMAGE_OUTPUT_EXTENSION = {"jpeg": ".jpg", "jpg": ".jpg", "webp": ".webp", "png": ".png"}.get(
+    IMAGE_OUTPUT_CONFIG["format"], ".jpg"
+)
+# Worker Kaleido persistent (render_worker.py): un browser per proces, loturi de figuri
+KALEIDO_WORKER_CONFIG = {
+    "tabs": int(os.environ.get("PULSOX_KALEIDO_TABS", "2")),
+    "batch_size": int(os.environ.get("PULSOX_KALEIDO_BATCH_SIZE", "16")),
+    "timeout_s": float(os.environ.get("PULSOX_KALEIDO_TIMEOUT_S", "90")),
+    "health_timeout_s": float(os.environ.get("PULSOX_KALEIDO_HEALTH_TIMEOUT_S", "20")),
+    # False = browserul se închide la finalul fiecărui job batch (implicit: Chromium
+    # nu rămâne în memoria workerilor web între job-uri; batch_worker.py îl păstrează)
+    "keep_alive": os.environ.get("PULSOX_KALEIDO_KEEP_ALIVE", "false").strip().lower() in ("1", "true", "yes"),
+}
 
 
 def get_batch_browse_root() -> str:
@@ -75,7 +175,15 @@ def load_color_config():
         return default_config
 
 
+def _color_config_mtime():
+    try:
+        return os.path.getmtime("colors_config.json")
+    except OSError:
+        return None
+
+
 _COLOR_CONFIG = load_color_config()
+_COLOR_CONFIG_MTIME = _color_config_mtime()
 
 ZOOM_SCALE_CONFIG = {
     "min_scale": 0.50,
@@ -84,6 +192,20 @@ ZOOM_SCALE_CONFIG = {
     "base_marker_size": 4,
 }
 
+# Grafice interactive (dcc.Graph): plafon de puncte per urmă ≈ lățimea în pixeli
+INTERACTIVE_PLOT_CONFIG = {
+    "max_points_per_trace": 2000,
+    "dense_marker_factor": 4,        # Markeri densificați per punct afișat (gradient fin)
+    "downsample_method": "minmax",   # 'minmax' (păstrează nadirurile) sau 'lttb'
+}
+
+# Cache figuri interactive serializate (figure_cache.py)
+FIGURE_CACHE_CONFIG = {
+    "memory_budget_mb": float(os.environ.get("PULSOX_FIGURE_CACHE_MB", "64")),
+    "disk_dir": os.environ.get("PULSOX_FIGURE_CACHE_DIR", "").strip() or None,  # Spill pe disc (opțional)
+    "disk_budget_mb": float(os.environ.get("PULSOX_FIGURE_CACHE_DISK_MB", "512")),
+}
+
 GOLDEN_STYLE = {
     "layout": {
         "plot_bgcolor": "white",
@@ -106,6 +228,7 @@ GOLDEN_STYLE = {
         "spo2": {
             "name": "SaO2",
             "interpolation_factor": 30,
+            "max_dense_markers": 150000,  # Plafon markeri densificați - factorul efectiv scade adaptiv
             "marker_size": 4,
             "line_width": 3,
             "colorscale_min": _COLOR_CONFIG["colorscale_min"],
@@ -124,3 +247,25 @@ GOLDEN_STYLE = {
         "xanchor": "right", "x": 1
     }
 }
+
+
+def refresh_color_config() -> bool:
+    """
+    Reîncarcă colors_config.json dacă fișierul s-a modificat de la ultima citire
+    și actualizează pe loc culorile SaO2 din GOLDEN_STYLE.
+    Returnează True dacă s-a reîncărcat.
+    """
+    global _COLOR_CONFIG, _COLOR_CONFIG_MTIME
+
+    mtime = _color_config_mtime()
+    if mtime == _COLOR_CONFIG_MTIME:
+        return False
+
+    _COLOR_CONFIG = load_color_config()
+    _COLOR_CONFIG_MTIME = mtime
+    GOLDEN_STYLE["traces"]["spo2"].update({
+        "colorscale_min": _COLOR_CONFIG["colorscale_min"],
+        "colorscale_max": _COLOR_CONFIG["colorscale_max"],
+        "colorscale": _COLOR_CONFIG["colorscale"]
+    })
+    return True
@@ -312,6 +312,27 @@ class S3StorageClient:
             return False
     
     
+    def get_object_etag(self, key: str) -> Optional[str]:
+        """
+        ETag-ul unui obiect S3 (HEAD, fără descărcare) - versiunea folosită de
+        cache-uri pentru verificarea prospețimii.
+        
+        Returns:
+            str: ETag-ul sau None dacă S3 e dezactivat / obiectul nu există
+        """
+        if not self.enabled:
+            return None
+        
+        try:
+            response = self.client.head_object(Bucket=self.bucket_name, Key=key)
+            return response.get('ETag')
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', 'Unknown')
+            if error_code not in ('404', 'NoSuchKey', 'NotFound'):
+                logger.warning(f"⚠️ [S3_HEAD] HEAD eșuat pentru {key}: {error_code}")
+            return None
+    
+    
     def list_files(self, prefix: str = "") -> list[str]:
         """
         Listează fișierele dintr-un folder S3.
@@ -545,6 +566,22 @@ def upload_patient_plot(token: str, plot_content: bytes, filename: str) -> Optio
     return s3_client.upload_file(plot_content, key, content_type='image/png')
 
 
+def upload_patient_parsed(token: str, parsed_content: bytes, filename: str) -> Optional[str]:
+    """
+    Uploadează artefactul Parquet (înregistrare deja parsată) lângă CSV-ul original.
+    
+    Args:
+        token: UUID pacient
+        parsed_content: Conținutul Parquet (bytes)
+        filename: Numele artefactului ("{sha256}.parquet")
+        
+    Returns:
+        str: URL sau calea fișierului
+    """
+    key = f"{token}/csvs/{filename}"
+    return s3_client.upload_file(parsed_content, key, content_type='application/vnd.apache.parquet')
+
+
 def download_patient_file(token: str, file_type: str, filename: str) -> Optional[bytes]:
     """
     Descarcă un fișier pacient din S3.
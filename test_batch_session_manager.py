@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# test_batch_session_manager.py
+# ------------------------------------------------------------------------------
+# ROL: Testează store-ul SQLite al progresului batch (batch_session_manager):
+#      contoarele actualizate incremental de `update_file_status` trebuie să
+#      fie mereu egale cu numărătoarea rândurilor per fișier, iar `version`
+#      crește la fiecare schimbare (folosită de polling-ul de progres).
+#
+# USAGE: python test_batch_session_manager.py   (sau: python -m pytest test_batch_session_manager.py)
+# ==============================================================================
+
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import batch_session_manager
+
+# Store-ul de progres într-un folder temporar (nu în batch_sessions/ al proiectului)
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="pulsox_test_sessions_"))
+batch_session_manager.BATCH_SESSIONS_DIR = _TMP_DIR
+batch_session_manager.PROGRESS_DB_FILE = _TMP_DIR / "progress.sqlite3"
+batch_session_manager.SESSIONS_INDEX_FILE = _TMP_DIR / "sessions_index.json"
+batch_session_manager._local.conn = None
+
+
+def _counters(session_id):
+    summary = batch_session_manager.get_session_summary(session_id)
+    return summary['processed_files'], summary['failed_files'], summary['status']
+
+
+def _recount(session_id):
+    files = batch_session_manager.get_session_progress(session_id)['files']
+    return (sum(1 for f in files if f['status'] == 'completed'),
+            sum(1 for f in files if f['status'] == 'failed'))
+
+
+def test_counters_follow_status_transitions():
+    files = ['a.csv', 'b.csv', 'c.csv']
+    session_id = batch_session_manager.create_batch_session(len(files), files)
+    assert _counters(session_id) == (0, 0, 'pending')
+
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'processing')
+    assert _counters(session_id) == (0, 0, 'in_progress')
+
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'completed', token='tok-a')
+    batch_session_manager.update_file_status(session_id, 'b.csv', 'failed', error='CSV invalid')
+    assert _counters(session_id) == (1, 1, 'in_progress')
+
+    # Același status de două ori nu se numără de două ori
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'completed')
+    assert _counters(session_id) == (1, 1, 'in_progress')
+
+    # Reprocesare: failed → completed mută fișierul dintr-un contor în celălalt
+    batch_session_manager.update_file_status(session_id, 'b.csv', 'completed')
+    assert _counters(session_id) == (2, 0, 'in_progress')
+
+    batch_session_manager.update_file_status(session_id, 'c.csv', 'completed')
+    assert _counters(session_id) == (3, 0, 'completed')
+    assert _recount(session_id) == (3, 0)
+
+    files_by_name = {f['filename']: f for f in batch_session_manager.get_session_progress(session_id)['files']}
+    assert files_by_name['a.csv']['token'] == 'tok-a'
+    assert files_by_name['b.csv']['error'] == 'CSV invalid'
+
+
+def test_unknown_session_or_file_is_rejected():
+    session_id = batch_session_manager.create_batch_session(1, ['a.csv'])
+    assert not batch_session_manager.update_file_status('sesiune-inexistenta', 'a.csv', 'completed')
+    assert not batch_session_manager.update_file_status(session_id, 'lipsa.csv', 'completed')
+    assert _counters(session_id) == (0, 0, 'pending')
+
+
+def test_version_changes_on_every_update():
+    session_id = batch_session_manager.create_batch_session(2, ['a.csv', 'b.csv'])
+    versions = [batch_session_manager.get_session_version(session_id)]
+
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'processing')
+    versions.append(batch_session_manager.get_session_version(session_id))
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'completed')
+    versions.append(batch_session_manager.get_session_version(session_id))
+    batch_session_manager.mark_session_completed(session_id)
+    versions.append(batch_session_manager.get_session_version(session_id))
+
+    assert versions == sorted(set(versions))
+    assert batch_session_manager.get_session_version('sesiune-inexistenta') is None
+
+
+def test_degraded_session_is_not_marked_completed():
+    session_id = batch_session_manager.create_batch_session(1, ['a.csv'])
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'completed')
+    batch_session_manager.mark_session_degraded(session_id, "upload-uri neterminate")
+    batch_session_manager.mark_session_completed(session_id)
+    assert _counters(session_id) == (1, 0, 'degraded')
+
+
+def test_concurrent_updates_keep_counters_consistent():
+    files = [f"f{i:03d}.csv" for i in range(60)]
+    session_id = batch_session_manager.create_batch_session(len(files), files)
+
+    def _worker(chunk):
+        for index, file_name in chunk:
+            batch_session_manager.update_file_status(session_id, file_name, 'processing')
+            batch_session_manager.update_file_status(session_id, file_name, 'failed' if index % 5 == 0 else 'completed')
+
+    chunks = [list(enumerate(files))[i::4] for i in range(4)]
+    threads = [threading.Thread(target=_worker, args=(chunk,)) for chunk in chunks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    processed, failed, status = _counters(session_id)
+    assert (processed, failed) == _recount(session_id) == (48, 12)
+    assert status == 'completed'
+    assert batch_session_manager.get_pending_files(session_id, include_interrupted=True) == []
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith('test_') and callable(obj)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  [PASS] | {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAIL] | {test.__name__}: {e!r}")
+    print(f"\nTOTAL: {len(tests) - failed}/{len(tests)} teste trecute")
+    sys.exit(1 if failed else 0)
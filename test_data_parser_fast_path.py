@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# test_data_parser_fast_path.py
+# ------------------------------------------------------------------------------
+# ROL: Verifică faptul că, pentru fișiere Checkme O2, calea rapidă din
+#      data_parser produce EXACT același DataFrame ca și calea generică v2.1
+#      (index, coloane, valori și dtype-uri).
+#
+# USAGE: python test_data_parser_fast_path.py   (sau: python -m pytest test_data_parser_fast_path.py)
+# ==============================================================================
+
+import glob
+import os
+import sys
+
+import pandas as pd
+
+import data_parser
+
+HEADER = 'Timp,Nivel de oxigen,Puls cardiac,Mişcare\n'
+SAMPLE_FOLDERS = ['bach data', 'intrare']
+
+
+def _csv(rows):
+    return (HEADER + '\n'.join(rows) + '\n').encode('utf-8')
+
+
+def _assert_same_result(content: bytes, file_name: str = 'test.csv'):
+    fast = data_parser.parse_csv_data(content, file_name)
+    generic = data_parser._parse_csv_generic(content, file_name)
+    pd.testing.assert_frame_equal(fast, generic)
+    return fast
+
+
+def test_fast_path_is_used_for_checkme_layout():
+    assert data_parser._is_checkme_o2_layout(_csv(['22:00:00 14/10/2025,95,60,0']))
+    assert not data_parser._is_checkme_o2_layout(b'Time,SpO2,Pulse\n22:00:00 14/10/2025,95,60\n')
+
+
+def test_sample_files_match_generic_path():
+    files = [f for folder in SAMPLE_FOLDERS for f in glob.glob(os.path.join(folder, '*.csv'))]
+    for path in files:
+        with open(path, 'rb') as f:
+            content = f.read()
+        fast = data_parser._parse_checkme_o2_fast(content, os.path.basename(path))
+        generic = data_parser._parse_csv_generic(content, os.path.basename(path))
+        pd.testing.assert_frame_equal(fast, generic)
+
+
+def test_missing_values_and_bad_dates_match():
+    df = _assert_same_result(_csv([
+        '22:00:02 14/10/2025,95,60,0',
+        '22:00:00 14/10/2025,--,--,1',
+        '31/02/2025 22:00:04,90,70,0',
+        '22:00:04 29/02/2024,96,61,2',
+    ]))
+    assert len(df) == 2
+    assert df.index.is_monotonic_increasing
+
+
+def test_unsorted_rows_match():
+    _assert_same_result(_csv([
+        '22:00:04 14/10/2025,95,60,0',
+        '22:00:00 14/10/2025,96,61,0',
+        '22:00:02 14/10/2025,97,62,1',
+    ]))
+
+
+def test_motion_dtype_matches_with_missing_motion():
+    # '--' în 'Mişcare' → coloană object pe calea generică; calea rapidă trebuie să dea același tip
+    df = _assert_same_result(_csv([
+        '22:00:00 14/10/2025,95,60,0',
+        '22:00:02 14/10/2025,96,61,--',
+    ]))
+    assert df['Motion'].dtype != 'float32'
+
+    _assert_same_result(_csv([
+        '22:00:00 14/10/2025,95,60,0',
+        '22:00:02 14/10/2025,96,61,',
+    ]))
+
+
+def test_no_valid_rows_raises():
+    try:
+        data_parser.parse_csv_data(_csv(['bad,--,--,0']), 'gol.csv')
+    except ValueError:
+        return
+    raise AssertionError("Se aștepta ValueError pentru un fișier fără rânduri valide")
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith('test_') and callable(obj)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  [PASS] | {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAIL] | {test.__name__}: {e}")
+    print(f"\nTOTAL: {len(tests) - failed}/{len(tests)} teste trecute")
+    sys.exit(1 if failed else 0)
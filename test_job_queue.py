@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# test_job_queue.py
+# ------------------------------------------------------------------------------
+# ROL: Testează coada de job-uri batch (job_queue) pe o bază SQLite temporară:
+#      - claim atomic, ordinea FIFO și limita per medic
+#      - anularea job-urilor din coadă / în execuție
+#      - recuperarea job-urilor fără heartbeat și reluarea doar a fișierelor rămase
+#
+# USAGE: python test_job_queue.py   (sau: python -m pytest test_job_queue.py)
+# ==============================================================================
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+_TMP_DIR = tempfile.mkdtemp(prefix="pulsox_test_job_queue_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'jobs.db')}"
+
+import config
+import job_queue
+import batch_processor
+import batch_session_manager
+import batch_worker
+from auth.models import db, BatchJob
+
+# Progresul sesiunilor în folderul temporar (nu în batch_sessions/ al proiectului)
+batch_session_manager.BATCH_SESSIONS_DIR = Path(_TMP_DIR) / "batch_sessions"
+batch_session_manager.PROGRESS_DB_FILE = batch_session_manager.BATCH_SESSIONS_DIR / "progress.sqlite3"
+batch_session_manager.BATCH_SESSIONS_DIR.mkdir()
+
+_app = batch_worker.create_worker_app()
+
+
+def _clear_jobs():
+    BatchJob.query.delete()
+    db.session.commit()
+
+
+def _enqueue(doctor_id=1, session_id=None):
+    return job_queue.enqueue_batch_job(_TMP_DIR, _TMP_DIR, 30, session_id=session_id, doctor_id=doctor_id)
+
+
+def test_claim_is_fifo_and_exclusive():
+    with _app.app_context():
+        _clear_jobs()
+        first = _enqueue(doctor_id=1)
+        second = _enqueue(doctor_id=2)
+
+        claimed = job_queue.claim_next_job("worker-a")
+        assert claimed['id'] == first
+        assert claimed['status'] == BatchJob.STATUS_RUNNING
+        assert claimed['attempts'] == 1
+        assert claimed['worker_id'] == "worker-a"
+
+        assert job_queue.claim_next_job("worker-b")['id'] == second
+        assert job_queue.claim_next_job("worker-c") is None
+
+
+def test_claim_respects_per_doctor_limit():
+    queue_config = config.BATCH_QUEUE_CONFIG
+    previous_limit = queue_config['per_doctor_limit']
+    queue_config['per_doctor_limit'] = 1
+    try:
+        with _app.app_context():
+            _clear_jobs()
+            first = _enqueue(doctor_id=7)
+            second = _enqueue(doctor_id=7)
+
+            assert job_queue.claim_next_job()['id'] == first
+            assert job_queue.claim_next_job() is None
+
+            job_queue.finish_job(first, BatchJob.STATUS_COMPLETED)
+            assert job_queue.claim_next_job()['id'] == second
+    finally:
+        queue_config['per_doctor_limit'] = previous_limit
+
+
+def test_cancel_queued_and_running_jobs():
+    with _app.app_context():
+        _clear_jobs()
+        running = _enqueue(doctor_id=1)
+        queued = _enqueue(doctor_id=2)
+        job_queue.claim_next_job()
+
+        assert not job_queue.is_cancel_requested(running)
+        assert job_queue.request_cancel(queued)
+        assert job_queue.get_job(queued)['status'] == BatchJob.STATUS_CANCELLED
+
+        # Job-ul activ doar primește cererea; se oprește la următorul fișier
+        assert job_queue.request_cancel(running)
+        assert job_queue.get_job(running)['status'] == BatchJob.STATUS_RUNNING
+        assert job_queue.is_cancel_requested(running)
+
+        job_queue.finish_job(running, BatchJob.STATUS_CANCELLED)
+        assert not job_queue.request_cancel(running)
+
+        # Un job inexistent (șters) se tratează ca anulat
+        assert job_queue.is_cancel_requested("job-inexistent")
+
+
+def test_stale_job_is_requeued_and_resumes_remaining_files():
+    files = ['a.csv', 'b.csv', 'c.csv']
+    session_id = batch_session_manager.create_batch_session(len(files), files)
+    batch_session_manager.update_file_status(session_id, 'a.csv', 'completed')
+    batch_session_manager.update_file_status(session_id, 'b.csv', 'processing')
+
+    with _app.app_context():
+        _clear_jobs()
+        job_id = _enqueue(session_id=session_id)
+        job_queue.claim_next_job("worker-crashed")
+
+        # Worker oprit: heartbeat-ul e mai vechi decât `stale_after_s`
+        stale_at = datetime.utcnow() - timedelta(seconds=config.BATCH_QUEUE_CONFIG['stale_after_s'] + 60)
+        BatchJob.query.filter_by(id=job_id).update({'heartbeat_at': stale_at})
+        db.session.commit()
+
+        assert job_queue.recover_stale_jobs() == 1
+        assert job_queue.get_job(job_id)['status'] == BatchJob.STATUS_QUEUED
+
+        job = job_queue.claim_next_job("worker-new")
+        assert job['attempts'] == 2
+
+        calls = []
+        original_run_batch_job = batch_processor.run_batch_job
+        batch_processor.run_batch_job = lambda *args, **kwargs: calls.append(kwargs) or []
+        try:
+            status = job_queue.run_job(job, _app)
+        finally:
+            batch_processor.run_batch_job = original_run_batch_job
+
+        assert status == BatchJob.STATUS_COMPLETED
+        assert calls[0]['only_files'] == ['b.csv', 'c.csv']
+        assert job_queue.get_job(job_id)['status'] == BatchJob.STATUS_COMPLETED
+
+
+def test_stale_job_over_max_attempts_fails():
+    with _app.app_context():
+        _clear_jobs()
+        job_id = _enqueue()
+        job_queue.claim_next_job()
+        stale_at = datetime.utcnow() - timedelta(seconds=config.BATCH_QUEUE_CONFIG['stale_after_s'] + 60)
+        BatchJob.query.filter_by(id=job_id).update({
+            'heartbeat_at': stale_at,
+            'attempts': config.BATCH_QUEUE_CONFIG['max_attempts'],
+        })
+        db.session.commit()
+
+        job_queue.recover_stale_jobs()
+        assert job_queue.get_job(job_id)['status'] == BatchJob.STATUS_FAILED
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith('test_') and callable(obj)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  [PASS] | {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAIL] | {test.__name__}: {e!r}")
+    print(f"\nTOTAL: {len(tests) - failed}/{len(tests)} teste trecute")
+    sys.exit(1 if failed else 0)
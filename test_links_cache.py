@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# test_links_cache.py
+# ------------------------------------------------------------------------------
+# ROL: Testează cache-ul per proces al link-urilor (links_cache.LinksCache):
+#      - hit între verificări, reîncărcare la schimbarea versiunii sursei
+#      - `invalidate` (inclusiv în timpul unui load început înainte)
+#      - copii complete (modificările apelantului nu strică snapshot-ul)
+#      - versiunea reală din patient_link_rows (SQLite temporar) la upsert
+#
+# USAGE: python test_links_cache.py   (sau: python -m pytest test_links_cache.py)
+# ==============================================================================
+
+import os
+import sys
+import tempfile
+import time
+
+_TMP_DIR = tempfile.mkdtemp(prefix="pulsox_test_links_cache_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'links.db')}"
+os.environ["USE_POSTGRES_PATIENT_LINKS"] = "1"
+
+import batch_worker
+import links_cache
+from links_cache import LinksCache
+from auth.models import db, PatientLinkRow
+from repositories import patient_repository as repo
+
+_app = batch_worker.create_worker_app()
+
+
+class _Source:
+    """Sursă controlată de test: versiunea și datele returnate de loader."""
+
+    def __init__(self):
+        self.version = ('test', 1)
+        self.links = {'tok-1': {'device_name': 'Checkme O2 #3539', 'recordings': [{'id': 'r1'}]}}
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return {token: dict(data) for token, data in self.links.items()}
+
+
+def _with_source(test):
+    """Rulează testul cu `_source_version` legat de o sursă controlată."""
+    def wrapper():
+        source = _Source()
+        original = links_cache._source_version
+        links_cache._source_version = lambda: source.version
+        try:
+            test(source)
+        finally:
+            links_cache._source_version = original
+    wrapper.__name__ = test.__name__
+    return wrapper
+
+
+@_with_source
+def test_hits_between_checks(source):
+    cache = LinksCache(check_interval_s=60)
+    assert cache.get(source.load) == source.links
+    source.version = ('test', 2)  # nu se verifică încă (interval de 60 s)
+    cache.get(source.load)
+    cache.get(source.load)
+    assert source.loads == 1
+    assert cache.stats()['hits'] == 2
+
+
+@_with_source
+def test_version_change_reloads(source):
+    cache = LinksCache(check_interval_s=0)
+    cache.get(source.load)
+    cache.get(source.load)
+    assert source.loads == 1
+
+    source.version = ('test', 2)
+    source.links['tok-2'] = {'device_name': 'Checkme O2 #3541'}
+    assert set(cache.get(source.load)) == {'tok-1', 'tok-2'}
+    assert source.loads == 2
+    assert cache.stats()['version_changes'] == 1
+
+
+@_with_source
+def test_unknown_version_always_reloads(source):
+    cache = LinksCache(check_interval_s=0)
+    source.version = None
+    cache.get(source.load)
+    cache.get(source.load)
+    assert source.loads == 2
+
+
+@_with_source
+def test_invalidate_forces_reload(source):
+    cache = LinksCache(check_interval_s=60)
+    cache.get(source.load)
+    cache.invalidate()
+    cache.get(source.load)
+    assert source.loads == 2
+    assert cache.stats()['invalidations'] == 1
+
+
+@_with_source
+def test_invalidate_during_load_discards_stale_snapshot(source):
+    cache = LinksCache(check_interval_s=60)
+
+    def _load_with_concurrent_write():
+        data = source.load()
+        cache.invalidate()  # o scriere în același proces, în timpul load-ului
+        return data
+
+    cache.get(_load_with_concurrent_write)
+    cache.get(source.load)
+    assert source.loads == 2
+
+
+@_with_source
+def test_max_age_forces_reload(source):
+    cache = LinksCache(check_interval_s=0, max_age_s=0.01)
+    cache.get(source.load)
+    time.sleep(0.02)
+    cache.get(source.load)
+    assert source.loads == 2
+
+
+@_with_source
+def test_returned_links_are_deep_copies(source):
+    cache = LinksCache(check_interval_s=60)
+    first = cache.get(source.load)
+    first['tok-1']['device_name'] = 'modificat'
+    first['tok-1']['recordings'].append({'id': 'r2'})
+    first['tok-x'] = {}
+
+    second = cache.get(source.load)
+    assert second['tok-1']['device_name'] == 'Checkme O2 #3539'
+    assert second['tok-1']['recordings'] == [{'id': 'r1'}]
+    assert 'tok-x' not in second
+    assert source.loads == 1
+
+
+@_with_source
+def test_disabled_cache_always_loads(source):
+    cache = LinksCache(enabled=False)
+    cache.get(source.load)
+    cache.get(source.load)
+    assert source.loads == 2
+
+
+def test_link_rows_version_invalidates_other_processes():
+    """Versiunea PG (număr rânduri, max(updated_at)) se schimbă la insert și la rescriere."""
+    with _app.app_context():
+        PatientLinkRow.query.delete()
+        db.session.commit()
+        assert repo.upsert_links_in_postgres({'tok-1': {'device_name': 'Checkme O2 #3539'}})
+
+        loads = []
+
+        def _load():
+            loads.append(1)
+            return repo.load_all_from_postgres()
+
+        cache = LinksCache(check_interval_s=0)
+        assert set(cache.get(_load)) == {'tok-1'}
+        cache.get(_load)
+        assert len(loads) == 1
+
+        # Scrieri "din alt worker": fără invalidate în procesul curent
+        assert repo.upsert_link('tok-2', {'device_name': 'Checkme O2 #3541'}) is True
+        assert set(cache.get(_load)) == {'tok-1', 'tok-2'}
+        assert len(loads) == 2
+
+        assert repo.patch_link_fields('tok-1', {'notes': 'actualizat'})
+        assert cache.get(_load)['tok-1']['notes'] == 'actualizat'
+        assert len(loads) == 3
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith('test_') and callable(obj)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  [PASS] | {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAIL] | {test.__name__}: {e!r}")
+    print(f"\nTOTAL: {len(tests) - failed}/{len(tests)} teste trecute")
+    sys.exit(1 if failed else 0)
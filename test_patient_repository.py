@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# ==============================================================================
+# test_patient_repository.py
+# ------------------------------------------------------------------------------
+# ROL: Testează operațiile pe rând din repositories/patient_repository.py
+#      (tabela patient_link_rows) pe o bază SQLite temporară:
+#      - upsert_link: inserare / rescriere + coloanele indexate derivate
+#      - patch_link_fields: câmpuri suprascrise, liste completate fără duplicate
+#      - page_links / count_links: ordinea keyset (created_at desc, token) și căutarea
+#      - fallback-ul legacy (None) când tabelul nu e sursa de adevăr
+#
+# USAGE: python test_patient_repository.py   (sau: python -m pytest test_patient_repository.py)
+# ==============================================================================
+
+import os
+import sys
+import tempfile
+from datetime import date
+
+_TMP_DIR = tempfile.mkdtemp(prefix="pulsox_test_repository_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP_DIR, 'links.db')}"
+os.environ["USE_POSTGRES_PATIENT_LINKS"] = "1"
+
+import batch_worker
+from auth.models import db, PatientLinkRow
+from repositories import patient_repository as repo
+
+_app = batch_worker.create_worker_app()
+
+
+def _payload(device_name="Checkme O2 #3539", created_at="2025-10-14T08:00:00", **extra):
+    payload = {
+        "device_name": device_name,
+        "created_at": created_at,
+        "recording_date": "2025-10-14",
+        "is_active": True,
+        "notes": "",
+        "medical_notes": "",
+    }
+    payload.update(extra)
+    return payload
+
+
+def _reset_table(links=None):
+    PatientLinkRow.query.delete()
+    db.session.commit()
+    if links:
+        assert repo.upsert_links_in_postgres(links)
+
+
+def test_empty_table_falls_back_to_legacy():
+    with _app.app_context():
+        _reset_table()
+        assert not repo.links_table_active()
+        assert repo.upsert_link("tok-1", _payload()) is None
+        assert repo.patch_link_fields("tok-1", {"notes": "x"}) is None
+        assert repo.get_link("tok-1") is None
+
+
+def test_disabled_postgres_falls_back_to_legacy():
+    with _app.app_context():
+        _reset_table({"tok-seed": _payload()})
+        os.environ["USE_POSTGRES_PATIENT_LINKS"] = "0"
+        try:
+            assert repo.upsert_link("tok-1", _payload()) is None
+            assert repo.get_link("tok-seed") is None
+        finally:
+            os.environ["USE_POSTGRES_PATIENT_LINKS"] = "1"
+
+
+def test_upsert_link_inserts_and_overwrites():
+    with _app.app_context():
+        _reset_table({"tok-seed": _payload()})
+
+        assert repo.upsert_link("tok-1", _payload(device_name="Checkme O2 #3541")) is True
+        assert repo.get_link("tok-1")["device_name"] == "Checkme O2 #3541"
+
+        assert repo.upsert_link("tok-1", _payload(device_name="Checkme O2 #3541", recording_date="2025-10-20",
+                                                  is_active=False)) is True
+        db.session.expire_all()
+        row = db.session.get(PatientLinkRow, "tok-1")
+        assert row.payload["recording_date"] == "2025-10-20"
+        # Coloanele indexate urmează payload-ul la fiecare rescriere
+        assert row.recording_date == date(2025, 10, 20)
+        assert row.is_active is False
+        assert row.device_name == "Checkme O2 #3541"
+
+        assert repo.get_link("tok-necunoscut") == {}
+        assert PatientLinkRow.query.count() == 2
+
+
+def test_patch_link_fields_updates_only_given_fields():
+    with _app.app_context():
+        _reset_table({"tok-1": _payload(pdf_paths=["a.pdf"], sent_status=False)})
+
+        patched = repo.patch_link_fields(
+            "tok-1",
+            {"sent_status": True, "medical_notes": "Apnee moderată"},
+            append={"pdf_paths": ["a.pdf", "b.pdf", "b.pdf"]},
+        )
+        assert patched["sent_status"] is True
+        assert patched["medical_notes"] == "Apnee moderată"
+        assert patched["pdf_paths"] == ["a.pdf", "b.pdf"]
+        assert patched["device_name"] == "Checkme O2 #3539"
+
+        db.session.expire_all()
+        row = db.session.get(PatientLinkRow, "tok-1")
+        assert row.payload == patched
+        assert row.sent_status is True
+
+        assert repo.patch_link_fields("tok-necunoscut", {"notes": "x"}) == {}
+
+
+def test_patch_link_fields_without_commit_joins_caller_transaction():
+    with _app.app_context():
+        _reset_table({"tok-1": _payload()})
+
+        repo.patch_link_fields("tok-1", {"notes": "nesalvat"}, commit=False)
+        db.session.rollback()
+        assert repo.get_link("tok-1")["notes"] == ""
+
+        repo.patch_link_fields("tok-1", {"notes": "salvat"}, commit=False)
+        db.session.commit()
+        assert repo.get_link("tok-1")["notes"] == "salvat"
+
+
+def _page_fixture():
+    """Link-uri cu created_at egale (departajare pe token), fără created_at și inactive."""
+    return {
+        "tok-a": _payload(created_at="2025-10-14T08:00:00"),
+        "tok-c": _payload(created_at="2025-10-14T08:00:00"),
+        "tok-b": _payload(created_at="2025-10-14T08:00:00"),
+        "tok-d": _payload(created_at="2025-10-15T09:30:00", device_name="Checkme O2 #3541"),
+        "tok-e": _payload(created_at="2025-10-13T22:00:00", medical_notes="Apnee severă"),
+        "tok-f": _payload(created_at=None),
+        "tok-g": _payload(created_at=None),
+        "tok-h": _payload(created_at="2025-10-16T07:00:00", is_active=False),
+    }
+
+
+def _walk_pages(search=None, limit=2):
+    tokens, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = repo.page_links(search=search, after=cursor, limit=limit)
+        tokens.extend(token for token, _ in rows)
+        pages += 1
+        assert pages < 20, "paginarea nu se termină"
+        if cursor is None:
+            return tokens
+
+
+def test_page_links_keyset_order():
+    with _app.app_context():
+        _reset_table(_page_fixture())
+
+        # created_at desc (NULL la final), apoi token asc; link-urile inactive lipsesc
+        expected = ["tok-d", "tok-a", "tok-b", "tok-c", "tok-e", "tok-f", "tok-g"]
+        for limit in (1, 2, 3, 7, 50):
+            assert _walk_pages(limit=limit) == expected
+
+        rows, cursor = repo.page_links(limit=3)
+        assert [token for token, _ in rows] == expected[:3]
+        assert cursor == ["2025-10-14T08:00:00", "tok-b"]
+        assert repo.count_links() == len(expected)
+
+
+def test_page_links_cursor_is_stable_across_inserts():
+    with _app.app_context():
+        _reset_table(_page_fixture())
+        first_page, cursor = repo.page_links(limit=3)
+
+        # Un link nou (mai recent) nu deplasează paginile următoare
+        assert repo.upsert_link("tok-new", _payload(created_at="2025-10-20T10:00:00")) is True
+        second_page, _ = repo.page_links(after=cursor, limit=3)
+        assert [token for token, _ in second_page] == ["tok-c", "tok-e", "tok-f"]
+
+
+def test_page_links_search_and_invalid_cursor():
+    with _app.app_context():
+        _reset_table(_page_fixture())
+
+        assert _walk_pages(search="#3541") == ["tok-d"]
+        assert _walk_pages(search="apnee") == ["tok-e"]
+        assert repo.count_links(search="apnee") == 1
+        assert _walk_pages(search="100%") == []
+
+        # Cursor invalid → prima pagină
+        rows, _ = repo.page_links(after=["nu-e-data", "tok-a"], limit=2)
+        assert [token for token, _ in rows] == ["tok-d", "tok-a"]
+
+
+if __name__ == "__main__":
+    tests = [obj for name, obj in sorted(globals().items()) if name.startswith('test_') and callable(obj)]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"  [PASS] | {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"  [FAIL] | {test.__name__}: {e!r}")
+    print(f"\nTOTAL: {len(tests) - failed}/{len(tests)} teste trecute")
+    sys.exit(1 if failed else 0)
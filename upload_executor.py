@@ -0,0 +1,198 @@
+# ==============================================================================
+# upload_executor.py
+# ------------------------------------------------------------------------------
+# ROL: Executor partajat (per proces) pentru upload-urile S3 din batch.
+#
+# DE CE: Batch-ul pornea câte un `threading.Thread` nelimitat per CSV, care
+#        urca DIN NOU același CSV (deja urcat de `add_recording`) sub altă
+#        cheie și rescria toate metadatele link-urilor - în paralel, cu
+#        suprascrieri concurente.
+#
+# GARANȚII:
+#   - `workers` thread-uri fixe; cel mult `workers + queue_depth` upload-uri
+#     în zbor - peste limită `submit` blochează apelantul (backpressure)
+#   - Reîncercare cu backoff exponențial (eroare sau rezultat None)
+#   - `UploadGroup`: barieră - batch-ul așteaptă toate upload-urile lui
+#     înainte de a marca sesiunea finalizată; cele terminate după barieră se
+#     aplică din callback (`on_late_result`), cele eșuate se reiau la
+#     următorul job (patient_links.reconcile_local_recordings)
+#
+# CONFIG: config.UPLOAD_EXECUTOR_CONFIG (env PULSOX_UPLOAD_*).
+# ==============================================================================
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+import config
+from logger_setup import logger
+
+
+class UploadGroup:
+    """Upload-urile unui job (barieră de finalizare + rezultate etichetate)."""
+
+    def __init__(self, name: str = "batch"):
+        self.name = name
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    def add(self, future: Future):
+        with self._lock:
+            self._futures.append(future)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._futures)
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Așteaptă toate upload-urile grupului.
+
+        Returns:
+            bool: True dacă toate s-au terminat în `timeout`
+        """
+        with self._lock:
+            futures = list(self._futures)
+        if not futures:
+            return True
+        _done, not_done = wait(futures, timeout=timeout)
+        if not_done:
+            logger.warning(f"⏳ [UPLOAD_EXECUTOR] Grup '{self.name}': {len(not_done)}/{len(futures)} upload-uri încă în curs după {timeout}s")
+        return not not_done
+
+    def on_late_result(self, callback: Callable[[Future], Any]) -> int:
+        """
+        Atașează `callback` upload-urilor încă în curs (după barieră);
+        se apelează în thread-ul executorului la terminarea fiecăruia.
+
+        Returns:
+            int: Numărul de upload-uri încă în curs
+        """
+        with self._lock:
+            pending = [f for f in self._futures if not f.done()]
+        for future in pending:
+            future.add_done_callback(callback)
+        return len(pending)
+
+    def failed(self) -> List[Dict]:
+        """Upload-urile terminate care au eșuat definitiv (după toate reîncercările)."""
+        return [r for r in self.results() if r['result'] is None]
+
+    def results(self) -> List[Dict]:
+        """Rezultatele upload-urilor terminate: {'label', 'meta', 'result', 'error'}."""
+        with self._lock:
+            futures = list(self._futures)
+        return [f.result() for f in futures if f.done()]
+
+
+class UploadExecutor:
+    """Pool de thread-uri limitat, cu coadă mărginită și reîncercări."""
+
+    def __init__(self, workers: int = 4, queue_depth: int = 16, max_retries: int = 3,
+                 backoff_s: float = 0.5):
+        self.workers = max(1, int(workers))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_s = backoff_s
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="upload-executor")
+        self._slots = threading.BoundedSemaphore(self.workers + max(0, int(queue_depth)))
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'succeeded': 0, 'failed': 0, 'retries': 0, 'blocked': 0}
+
+    def submit(self, upload_fn: Callable[..., Any], *args, label: str = "",
+               meta: Dict = None, group: Optional[UploadGroup] = None) -> Future:
+        """
+        Programează un upload. Blochează dacă executorul e plin (backpressure).
+
+        Args:
+            upload_fn: Funcția de upload; eroare sau None → reîncercare
+            label: Etichetă pentru log-uri (ex: cheia S3)
+            meta: Date returnate împreună cu rezultatul (ex: token, recording_id)
+            group: Grupul (bariera) job-ului
+
+        Returns:
+            Future: rezultatul este {'label', 'meta', 'result', 'error'}
+        """
+        if not self._slots.acquire(blocking=False):
+            self._count('blocked')
+            self._slots.acquire()
+
+        try:
+            future = self._pool.submit(self._run_with_retry, upload_fn, args, label, meta or {})
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _f: self._slots.release())
+        self._count('submitted')
+        if group is not None:
+            group.add(future)
+        return future
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._counters, 'workers': self.workers}
+
+    def shutdown(self, wait: bool = True):
+        self._pool.shutdown(wait=wait)
+
+    # --- Intern -------------------------------------------------------------
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._counters[key] += amount
+
+    def _run_with_retry(self, upload_fn, args, label: str, meta: Dict) -> Dict:
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self.backoff_s * (2 ** (attempt - 1))
+                self._count('retries')
+                logger.warning(f"🔁 [UPLOAD_EXECUTOR] Reîncercare {attempt}/{self.max_retries} pentru {label} în {delay:.1f}s ({error})")
+                time.sleep(delay)
+            try:
+                result = upload_fn(*args)
+                if result is not None:
+                    self._count('succeeded')
+                    return {'label': label, 'meta': meta, 'result': result, 'error': None}
+                error = "rezultat gol"
+            except Exception as e:
+                error = str(e)
+
+        self._count('failed')
+        logger.error(f"❌ [UPLOAD_EXECUTOR] Upload eșuat definitiv: {label} ({error})")
+        return {'label': label, 'meta': meta, 'result': None, 'error': error}
+
+
+# ==============================================================================
+# INSTANȚĂ PER PROCES
+# ==============================================================================
+
+_executor: Optional[UploadExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_upload_executor() -> UploadExecutor:
+    """Executorul procesului curent (creat la prima utilizare)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            executor_config = config.UPLOAD_EXECUTOR_CONFIG
+            _executor = UploadExecutor(
+                workers=executor_config['workers'],
+                queue_depth=executor_config['queue_depth'],
+                max_retries=executor_config['max_retries'],
+                backoff_s=executor_config['backoff_s'],
+            )
+        return _executor
+
+
+def _forget_executor_after_fork():
+    """Thread-urile pool-ului nu supraviețuiesc unui fork - copilul creează un executor nou."""
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_executor_after_fork)
@@ -0,0 +1,225 @@
+# ==============================================================================
+# view_tracker.py
+# ------------------------------------------------------------------------------
+# ROL: Buffer write-behind pentru vizualizările link-urilor de pacient:
+#      per token, în memorie, numărul de vizualizări + prima / ultima oră;
+#      scrise periodic, agregat (patient_links.apply_link_view_deltas).
+#
+# DE CE: Fiecare deschidere a paginii pacientului rescria TOT dicționarul de
+#        link-uri de două ori (last_accessed + view_count): PostgreSQL,
+#        blob-ul S3 și JSON-ul local.
+#
+# FLUSH: thread per proces, la `flush_interval_s` sau când buffer-ul atinge
+#        `max_pending` token-uri; plus la oprirea procesului (atexit).
+#        În PostgreSQL: UPDATE cu incremente atomice (view_count += n) -
+#        corect și cu mai mulți workeri gunicorn, fiecare cu buffer-ul lui.
+#        La eșec, delta-urile revin în buffer pentru următorul flush; buffer-ul
+#        rămâne plafonat la `max_pending` token-uri (DB căzut): cele mai vechi
+#        (ultima vizualizare) se pierd și se numără în `dropped_views`.
+#
+# CONFIG: config.VIEW_TRACKING_CONFIG (env PULSOX_VIEW_*). Dezactivat → flush
+#         imediat la fiecare vizualizare (tot agregat, fără rescrieri complete).
+# ==============================================================================
+
+import atexit
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+import config
+from logger_setup import logger
+
+
+def _merge_delta(target: Dict, delta: Dict):
+    target['count'] += delta['count']
+    target['first'] = min(target['first'], delta['first'])
+    target['last'] = max(target['last'], delta['last'])
+
+
+class ViewTracker:
+    """Vizualizări acumulate în memorie și scrise pe loturi."""
+
+    def __init__(self, flush_interval_s: float = 10, max_pending: int = 1000, enabled: bool = True):
+        self.flush_interval_s = max(0.1, float(flush_interval_s))
+        self.max_pending = max(1, int(max_pending))
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = os.getpid()
+        self._app = None
+        self._counters = {'recorded': 0, 'flushes': 0, 'flushed_views': 0, 'failed_flushes': 0,
+                          'dropped_tokens': 0, 'dropped_views': 0}
+
+    def record(self, token: str, when: datetime = None):
+        """O vizualizare a link-ului `token` (fără I/O în request)."""
+        if not token:
+            return
+        now = (when or datetime.now()).isoformat()
+        self._capture_app()
+        with self._lock:
+            self._reset_after_fork()
+            delta = self._pending.get(token)
+            if delta is None:
+                self._pending[token] = {'count': 1, 'first': now, 'last': now}
+            else:
+                _merge_delta(delta, {'count': 1, 'first': now, 'last': now})
+            self._counters['recorded'] += 1
+            pending = len(self._pending)
+
+        if not self.enabled:
+            self.flush()
+            return
+        self._ensure_thread()
+        if pending >= self.max_pending:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Scrie delta-urile acumulate.
+
+        Returns:
+            int: Numărul de vizualizări persistate
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            views = sum(d['count'] for d in pending.values())
+            try:
+                ok = self._apply(pending)
+            except Exception as e:
+                logger.error(f"❌ [VIEW_TRACKER] Flush eșuat: {e}", exc_info=True)
+                ok = False
+
+            if not ok:
+                with self._lock:
+                    for token, delta in pending.items():
+                        current = self._pending.get(token)
+                        if current is None:
+                            self._pending[token] = delta
+                        else:
+                            _merge_delta(current, delta)
+                    self._counters['failed_flushes'] += 1
+                    dropped_tokens, dropped_views = self._trim_pending()
+                if dropped_tokens:
+                    logger.error(f"❌ [VIEW_TRACKER] Buffer plin ({self.max_pending} link-uri): {dropped_views} vizualizări "
+                                 f"pentru {dropped_tokens} link-uri pierdute (cele mai vechi)")
+                logger.warning(f"⚠️ [VIEW_TRACKER] {views - dropped_views} vizualizări păstrate în buffer pentru reîncercare")
+                return 0
+
+            with self._lock:
+                self._counters['flushes'] += 1
+                self._counters['flushed_views'] += views
+            logger.debug(f"📊 [VIEW_TRACKER] Flush: {views} vizualizări pentru {len(pending)} link-uri")
+            return views
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**self._counters, 'pending_tokens': len(self._pending),
+                    'pending_views': sum(d['count'] for d in self._pending.values())}
+
+    def stop(self):
+        """Oprește thread-ul și scrie ce a rămas în buffer."""
+        self._stop.set()
+        self._wake.set()
+        self._flush_in_context()
+
+    # --- Intern ---------------------------------------------------------------
+
+    def _apply(self, pending: Dict[str, Dict]) -> bool:
+        from patient_links import apply_link_view_deltas
+
+        return apply_link_view_deltas(pending)
+
+    def _trim_pending(self):
+        """
+        Plafonează buffer-ul la `max_pending` token-uri, eliminând pe cele cu cea mai
+        veche ultimă vizualizare. Apelat sub `_lock`, după un flush eșuat.
+
+        Returns:
+            tuple: (token-uri eliminate, vizualizări pierdute)
+        """
+        excess = len(self._pending) - self.max_pending
+        if excess <= 0:
+            return 0, 0
+        oldest = sorted(self._pending, key=lambda token: self._pending[token]['last'])[:excess]
+        dropped_views = sum(self._pending.pop(token)['count'] for token in oldest)
+        self._counters['dropped_tokens'] += excess
+        self._counters['dropped_views'] += dropped_views
+        return excess, dropped_views
+
+    def _capture_app(self):
+        if self._app is not None:
+            return
+        try:
+            from flask import current_app, has_app_context
+            if has_app_context():
+                self._app = current_app._get_current_object()
+        except Exception:
+            pass
+
+    def _flush_in_context(self):
+        if self._app is not None:
+            with self._app.app_context():
+                self.flush()
+        else:
+            self.flush()
+
+    def _reset_after_fork(self):
+        # Copilul unui fork nu moștenește thread-ul; buffer-ul rămâne al părintelui
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pending = {}
+            self._thread = None
+            self._wake = threading.Event()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="view-tracker-flush", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            try:
+                self._flush_in_context()
+            except Exception as e:
+                logger.error(f"❌ [VIEW_TRACKER] Eroare în thread-ul de flush: {e}", exc_info=True)
+
+
+_tracker: Optional[ViewTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_view_tracker() -> ViewTracker:
+    """Tracker-ul per proces (creat la prima vizualizare)."""
+    global _tracker
+    with _tracker_lock:
+        if _tracker is None:
+            cfg = config.VIEW_TRACKING_CONFIG
+            _tracker = ViewTracker(
+                flush_interval_s=cfg['flush_interval_s'],
+                max_pending=cfg['max_pending'],
+                enabled=cfg['write_behind'],
+            )
+            atexit.register(_tracker.stop)
+        return _tracker
+
+
+def record_view(token: str):
+    get_view_tracker().record(token)
+
+
+def flush_views() -> int:
+    """Flush imediat (teste, oprire controlată). Necesită app context pentru PostgreSQL."""
+    return get_view_tracker().flush()
@@ -190,6 +190,10 @@ def initialize_application():
     init_auth_routes(app)
     logger.warning("✅ Auth modules initialized")
     
+    # Coada batch (mod 'inline'): worker-ul pornește per proces la primul request
+    import job_queue
+    job_queue.install_inline_worker(server)
+    
     # Dash Uploader
     import dash_uploader as du
     du.configure_upload(app, os.path.join(os.getcwd(), 'temp_uploads'))